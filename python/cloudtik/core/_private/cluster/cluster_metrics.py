@@ -1,10 +1,10 @@
 from collections import Counter
+from collections.abc import Mapping
 from dataclasses import dataclass
-from functools import reduce
 import logging
 from numbers import Number
 import time
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Iterable, Optional
 
 import numpy as np
 
@@ -73,6 +73,244 @@ def freq_of_dicts(dicts: List[Dict],
     return as_list
 
 
+# The columns of the node times in the node metrics table
+_HEARTBEAT_TIME = 0
+_USED_TIME = 1
+_RESOURCE_TIME = 2
+_NUM_TIME_COLUMNS = 3
+
+_INITIAL_NODE_CAPACITY = 16
+
+
+class NodeMetricsTable:
+    """Node indexed columnar store of the node metrics.
+
+    Each node ip is assigned a row of the arrays of the node times (last
+    heartbeat, last used and last resource time) and of the static and
+    dynamic resource matrix which has a column for each resource name.
+    The rows are kept compact when nodes are removed, so that the queries
+    over all the nodes are vectorized operations on the arrays. The rows
+    ordered by the last used time are cached until a last used time changes.
+    """
+
+    def __init__(self, capacity: int = _INITIAL_NODE_CAPACITY):
+        self._row_by_ip: Dict[str, int] = {}
+        self._ips: List[str] = []
+        self._capacity = capacity
+
+        self._times = np.full((capacity, _NUM_TIME_COLUMNS), np.nan)
+        self._has_times = np.zeros((capacity, _NUM_TIME_COLUMNS), dtype=bool)
+
+        self._column_by_resource: Dict[str, int] = {}
+        self._resources: List[str] = []
+        self._static_resources = np.zeros((capacity, 0))
+        self._dynamic_resources = np.zeros((capacity, 0))
+        self._has_resources = np.zeros((capacity, 0), dtype=bool)
+
+        # The rows sorted by the last used time
+        self._idle_order = None
+
+    def __len__(self):
+        return len(self._ips)
+
+    def _get_row(self, ip: str) -> int:
+        row = self._row_by_ip.get(ip)
+        if row is None:
+            row = len(self._ips)
+            if row == self._capacity:
+                self._grow_rows()
+            self._row_by_ip[ip] = row
+            self._ips.append(ip)
+        return row
+
+    def _grow_rows(self):
+        capacity = self._capacity * 2
+
+        def grow(array, fill_value):
+            grown = np.full(
+                (capacity,) + array.shape[1:], fill_value, dtype=array.dtype)
+            grown[:self._capacity] = array
+            return grown
+
+        self._times = grow(self._times, np.nan)
+        self._has_times = grow(self._has_times, False)
+        self._static_resources = grow(self._static_resources, 0.0)
+        self._dynamic_resources = grow(self._dynamic_resources, 0.0)
+        self._has_resources = grow(self._has_resources, False)
+        self._capacity = capacity
+
+    def _get_column(self, resource_name: str) -> int:
+        column = self._column_by_resource.get(resource_name)
+        if column is None:
+            column = len(self._resources)
+            self._column_by_resource[resource_name] = column
+            self._resources.append(resource_name)
+            self._static_resources = np.hstack(
+                [self._static_resources, np.zeros((self._capacity, 1))])
+            self._dynamic_resources = np.hstack(
+                [self._dynamic_resources, np.zeros((self._capacity, 1))])
+            self._has_resources = np.hstack(
+                [self._has_resources, np.zeros((self._capacity, 1), dtype=bool)])
+        return column
+
+    def set_time(self, ip: str, time_column: int, value: Optional[float]):
+        row = self._get_row(ip)
+        self._times[row, time_column] = np.nan if value is None else value
+        self._has_times[row, time_column] = True
+        if time_column == _USED_TIME:
+            self._idle_order = None
+
+    def has_time(self, ip: str, time_column: int) -> bool:
+        row = self._row_by_ip.get(ip)
+        return row is not None and self._has_times[row, time_column]
+
+    def get_time(self, ip: str, time_column: int) -> Optional[float]:
+        row = self._row_by_ip.get(ip)
+        if row is None or not self._has_times[row, time_column]:
+            raise KeyError(ip)
+        value = self._times[row, time_column]
+        return None if np.isnan(value) else float(value)
+
+    def ips_with_time(self, time_column: int) -> List[str]:
+        rows = np.flatnonzero(self._has_times[:len(self._ips), time_column])
+        return [self._ips[row] for row in rows]
+
+    def count_time(self, time_column: int) -> int:
+        return int(np.count_nonzero(
+            self._has_times[:len(self._ips), time_column]))
+
+    def set_resources(self, ip: str,
+                      static_resources: Dict[str, float],
+                      dynamic_resources: Dict[str, float]):
+        row = self._get_row(ip)
+        static_columns = [
+            self._get_column(resource_name) for resource_name in static_resources]
+        dynamic_columns = [
+            self._get_column(resource_name) for resource_name in dynamic_resources]
+        self._static_resources[row] = 0.0
+        self._static_resources[row, static_columns] = list(
+            static_resources.values())
+        self._has_resources[row] = False
+        self._has_resources[row, static_columns] = True
+        self._dynamic_resources[row] = 0.0
+        self._dynamic_resources[row, dynamic_columns] = list(
+            dynamic_resources.values())
+
+    def remove_ips_except(self, active_ips: Iterable[str]) -> List[str]:
+        """Remove the rows of the ips not in active ips and compact the rows.
+
+        Returns:
+            The removed ips.
+        """
+        unwanted_ips = self._row_by_ip.keys() - set(active_ips)
+        if not unwanted_ips:
+            return []
+
+        rows = np.array([
+            row for row, ip in enumerate(self._ips) if ip not in unwanted_ips],
+            dtype=int)
+        num_rows = len(rows)
+
+        def compact(array, fill_value):
+            array[:num_rows] = array[rows]
+            array[num_rows:] = fill_value
+
+        compact(self._times, np.nan)
+        compact(self._has_times, False)
+        compact(self._static_resources, 0.0)
+        compact(self._dynamic_resources, 0.0)
+        compact(self._has_resources, False)
+
+        removed_ips = [
+            ip for ip in self._ips if ip in unwanted_ips]
+        self._ips = [self._ips[row] for row in rows]
+        self._row_by_ip = {ip: row for row, ip in enumerate(self._ips)}
+        self._idle_order = None
+        return removed_ips
+
+    def _get_idle_order(self):
+        if self._idle_order is None:
+            num_rows = len(self._ips)
+            rows = np.flatnonzero(self._has_times[:num_rows, _USED_TIME])
+            used_times = self._times[rows, _USED_TIME]
+            # The unknown (None) used time are ordered as the most recently used
+            used_times = np.where(np.isnan(used_times), np.inf, used_times)
+            order = np.argsort(used_times, kind="stable")
+            self._idle_order = (rows[order], used_times[order])
+        return self._idle_order
+
+    def get_idle_ips(self, horizon: float) -> List[str]:
+        """Return the ips not used since horizon, the least recently used first."""
+        rows, used_times = self._get_idle_order()
+        num_idle = int(np.searchsorted(used_times, horizon, side="left"))
+        return [self._ips[row] for row in rows[:num_idle]]
+
+    def get_times_since(self, time_column: int, now: float) -> np.ndarray:
+        num_rows = len(self._ips)
+        times = self._times[:num_rows, time_column][
+            self._has_times[:num_rows, time_column]]
+        return now - times[~np.isnan(times)]
+
+    def get_most_delayed(self, time_column: int, now: float,
+                         limit: int) -> Dict[str, float]:
+        num_rows = len(self._ips)
+        rows = np.flatnonzero(
+            self._has_times[:num_rows, time_column]
+            & ~np.isnan(self._times[:num_rows, time_column]))
+        times = self._times[rows, time_column]
+        order = np.argsort(times, kind="stable")[:limit]
+        return {self._ips[rows[i]]: now - float(times[i]) for i in order}
+
+    def get_resource_totals(self) -> Tuple[Dict[str, float], Dict[str, float], Dict[str, float]]:
+        """Return the total, available and used amounts of each resource.
+
+        Only the resources in the static resources of a node are returned.
+        The used amount is summed only over the nodes having the resource in
+        the static resources.
+        """
+        num_rows = len(self._ips)
+        static_resources = self._static_resources[:num_rows]
+        dynamic_resources = self._dynamic_resources[:num_rows]
+        has_resources = self._has_resources[:num_rows]
+
+        present = has_resources.any(axis=0)
+        total = static_resources.sum(axis=0)
+        available = dynamic_resources.sum(axis=0)
+        used = np.where(
+            has_resources, static_resources - dynamic_resources, 0.0).sum(axis=0)
+
+        totals, availables, useds = {}, {}, {}
+        for column in np.flatnonzero(present):
+            resource_name = self._resources[column]
+            totals[resource_name] = float(total[column])
+            availables[resource_name] = float(available[column])
+            useds[resource_name] = float(used[column])
+        return totals, availables, useds
+
+
+class NodeTimeView(Mapping):
+    """A read only dict view of ip to a node time column of the table."""
+
+    def __init__(self, table: NodeMetricsTable, time_column: int):
+        self._table = table
+        self._time_column = time_column
+
+    def __getitem__(self, ip):
+        return self._table.get_time(ip, self._time_column)
+
+    def __contains__(self, ip):
+        return self._table.has_time(ip, self._time_column)
+
+    def __iter__(self):
+        return iter(self._table.ips_with_time(self._time_column))
+
+    def __len__(self):
+        return self._table.count_time(self._time_column)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
 class ClusterMetrics:
     """Container for cluster load metrics.
 
@@ -84,12 +322,18 @@ class ClusterMetrics:
     def __init__(self):
         self.node_id_by_ip = {}
 
+        # The node times and resources of the nodes for vectorized queries
+        self.node_metrics = NodeMetricsTable()
+
         # Heartbeat metrics
-        self.last_heartbeat_time_by_ip = {}
+        self.last_heartbeat_time_by_ip = NodeTimeView(
+            self.node_metrics, _HEARTBEAT_TIME)
 
         # Resources metrics
-        self.last_used_time_by_ip = {}
-        self.last_resource_time_by_ip = {}
+        self.last_used_time_by_ip = NodeTimeView(
+            self.node_metrics, _USED_TIME)
+        self.last_resource_time_by_ip = NodeTimeView(
+            self.node_metrics, _RESOURCE_TIME)
         self.static_resources_by_ip = {}
         self.dynamic_resources_by_ip = {}
         self.resource_load_by_ip = {}
@@ -105,7 +349,7 @@ class ClusterMetrics:
                          node_id: str,
                          last_heartbeat_time):
         self.node_id_by_ip[ip] = node_id
-        self.last_heartbeat_time_by_ip[ip] = last_heartbeat_time
+        self.node_metrics.set_time(ip, _HEARTBEAT_TIME, last_heartbeat_time)
 
     def update_autoscaling_instructions(self,
                                         autoscaling_instructions: Dict[str, Any]):
@@ -144,6 +388,8 @@ class ClusterMetrics:
             if resource_name not in dynamic_resources_update:
                 dynamic_resources_update[resource_name] = 0.0
         self.dynamic_resources_by_ip[ip] = dynamic_resources_update
+        self.node_metrics.set_resources(
+            ip, static_resources, dynamic_resources_update)
 
         # Every time we update the resource state,
         # If a node is not idle, we will update its last used time
@@ -152,9 +398,9 @@ class ClusterMetrics:
         if (ip not in self.last_used_time_by_ip
                 or ("in_use" in resource_load and resource_load["in_use"])
                 or not self._is_node_idle(ip)):
-            self.last_used_time_by_ip[ip] = last_resource_time
+            self.node_metrics.set_time(ip, _USED_TIME, last_resource_time)
 
-        self.last_resource_time_by_ip[ip] = last_resource_time
+        self.node_metrics.set_time(ip, _RESOURCE_TIME, last_resource_time)
 
     def _is_node_idle(self, ip):
         # TODO: We may need some tolerance when making such comparisons
@@ -167,11 +413,18 @@ class ClusterMetrics:
         logger.debug("Node {} is newly setup, treating as active".format(ip))
         if not last_heartbeat_time:
             last_heartbeat_time = time.time()
-        self.last_heartbeat_time_by_ip[ip] = last_heartbeat_time
+        self.node_metrics.set_time(ip, _HEARTBEAT_TIME, last_heartbeat_time)
 
     def is_active(self, ip):
         return ip in self.last_heartbeat_time_by_ip
 
+    def get_idle_ips(self, horizon: float) -> List[str]:
+        """Return the node ips not used since the horizon time.
+
+        The least recently used is the first.
+        """
+        return self.node_metrics.get_idle_ips(horizon)
+
     def prune_active_ips(self, active_ips: List[str]):
         """The ips stored by LoadMetrics are obtained by polling
         the redis in ClusterController.update_cluster_metrics().
@@ -186,26 +439,25 @@ class ClusterMetrics:
         """
         active_ips = set(active_ips)
 
-        def prune(mapping, should_log):
-            unwanted_ips = set(mapping) - active_ips
+        def prune(mapping):
+            unwanted_ips = mapping.keys() - active_ips
             for unwanted_ip in unwanted_ips:
-                if should_log:
-                    logger.info("Cluster Metrics: " f"Removed ip: {unwanted_ip}.")
                 del mapping[unwanted_ip]
-            if unwanted_ips and should_log:
-                logger.info(
-                    "Cluster Metrics: "
-                    "Removed {} stale ip mappings: {} not in {}".format(
-                        len(unwanted_ips), unwanted_ips, active_ips))
-            assert not (unwanted_ips & set(mapping))
-
-        prune(self.last_used_time_by_ip, should_log=True)
-        prune(self.static_resources_by_ip, should_log=False)
-        prune(self.node_id_by_ip, should_log=False)
-        prune(self.dynamic_resources_by_ip, should_log=False)
-        prune(self.resource_load_by_ip, should_log=False)
-        prune(self.last_heartbeat_time_by_ip, should_log=False)
-        prune(self.last_resource_time_by_ip, should_log=False)
+
+        unwanted_ips = set(self.last_used_time_by_ip) - active_ips
+        self.node_metrics.remove_ips_except(active_ips)
+        for unwanted_ip in unwanted_ips:
+            logger.info("Cluster Metrics: " f"Removed ip: {unwanted_ip}.")
+        if unwanted_ips:
+            logger.info(
+                "Cluster Metrics: "
+                "Removed {} stale ip mappings: {} not in {}".format(
+                    len(unwanted_ips), unwanted_ips, active_ips))
+
+        prune(self.static_resources_by_ip)
+        prune(self.node_id_by_ip)
+        prune(self.dynamic_resources_by_ip)
+        prune(self.resource_load_by_ip)
 
     def get_node_resources(self):
         """Return a list of node resources (static resource sizes).
@@ -229,36 +481,7 @@ class ClusterMetrics:
         return self.dynamic_resources_by_ip
 
     def _get_resource_usage(self):
-        num_nodes = 0
-        num_non_idle = 0
-        resources_used = {}
-        resources_total = {}
-        for ip, max_resources in self.static_resources_by_ip.items():
-            # Nodes without resources don't count as nodes (e.g. unmanaged
-            # nodes)
-            if any(max_resources.values()):
-                num_nodes += 1
-            avail_resources = self.dynamic_resources_by_ip[ip]
-            resource_load = self.resource_load_by_ip[ip]
-            max_frac = 0.0
-            for resource_id, amount in resource_load.get("utilization", {}).items():
-                if amount > 0:
-                    max_frac = 1.0  # the resource is saturated
-            for resource_id, amount in max_resources.items():
-                used = amount - avail_resources[resource_id]
-                if resource_id not in resources_used:
-                    resources_used[resource_id] = 0.0
-                    resources_total[resource_id] = 0.0
-                resources_used[resource_id] += used
-                resources_total[resource_id] += amount
-                used = max(0, used)
-                if amount > 0:
-                    frac = used / float(amount)
-                    if frac > max_frac:
-                        max_frac = frac
-            if max_frac > 0:
-                num_non_idle += 1
-
+        resources_total, _, resources_used = self.node_metrics.get_resource_totals()
         return resources_used, resources_total
 
     def get_resource_demands(self, clip=True):
@@ -281,21 +504,15 @@ class ClusterMetrics:
 
         For example, "3 CPUs, 4 GPUs".
         """
-        total_resources = reduce(add_resources,
-                                 self.static_resources_by_ip.values()
-                                 ) if self.static_resources_by_ip else {}
+        total_resources, _, _ = self.node_metrics.get_resource_totals()
         out = "{} CPUs".format(int(total_resources.get("CPU", 0)))
         if "GPU" in total_resources:
             out += ", {} GPUs".format(int(total_resources["GPU"]))
         return out
 
     def summary(self):
-        available_resources = reduce(add_resources,
-                                     self.dynamic_resources_by_ip.values()
-                                     ) if self.dynamic_resources_by_ip else {}
-        total_resources = reduce(add_resources,
-                                 self.static_resources_by_ip.values()
-                                 ) if self.static_resources_by_ip else {}
+        total_resources, available_resources, _ = \
+            self.node_metrics.get_resource_totals()
         usage_dict = {}
         for key in total_resources:
             if key in ["memory"]:
@@ -336,17 +553,11 @@ class ClusterMetrics:
         resources_used, resources_total = self._get_resource_usage()
 
         now = time.time()
-        idle_times = [now - t for t in self.last_used_time_by_ip.values()]
-        heartbeat_times = [
-            now - t for t in self.last_heartbeat_time_by_ip.values()
-        ]
-        most_delayed_heartbeats = sorted(
-            self.last_heartbeat_time_by_ip.items(),
-            key=lambda pair: pair[1])[:5]
-        most_delayed_heartbeats = {
-            ip: (now - t)
-            for ip, t in most_delayed_heartbeats
-        }
+        idle_times = self.node_metrics.get_times_since(_USED_TIME, now)
+        heartbeat_times = self.node_metrics.get_times_since(
+            _HEARTBEAT_TIME, now)
+        most_delayed_heartbeats = self.node_metrics.get_most_delayed(
+            _HEARTBEAT_TIME, now, limit=5)
 
         def format_resource(key, value):
             if key in ["memory"]:
@@ -366,12 +577,12 @@ class ClusterMetrics:
                 if not rid.startswith("node:")
             ]),
             "NodeIdleSeconds": "Min={} Mean={} Max={}".format(
-                int(np.min(idle_times)) if idle_times else -1,
-                int(np.mean(idle_times)) if idle_times else -1,
-                int(np.max(idle_times)) if idle_times else -1),
+                int(np.min(idle_times)) if len(idle_times) else -1,
+                int(np.mean(idle_times)) if len(idle_times) else -1,
+                int(np.max(idle_times)) if len(idle_times) else -1),
             "TimeSinceLastHeartbeat": "Min={} Mean={} Max={}".format(
-                int(np.min(heartbeat_times)) if heartbeat_times else -1,
-                int(np.mean(heartbeat_times)) if heartbeat_times else -1,
-                int(np.max(heartbeat_times)) if heartbeat_times else -1),
+                int(np.min(heartbeat_times)) if len(heartbeat_times) else -1,
+                int(np.mean(heartbeat_times)) if len(heartbeat_times) else -1,
+                int(np.max(heartbeat_times)) if len(heartbeat_times) else -1),
             "MostDelayedHeartbeats": most_delayed_heartbeats,
         }
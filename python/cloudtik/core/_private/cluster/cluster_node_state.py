@@ -0,0 +1,235 @@
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from cloudtik.core.node_provider import NodeProvider
+from cloudtik.core.tags import CLOUDTIK_TAG_NODE_KIND, CLOUDTIK_TAG_NODE_STATUS, \
+    CLOUDTIK_TAG_USER_NODE_TYPE, NODE_KIND_WORKER, NODE_KIND_HEAD, STATUS_UP_TO_DATE, \
+    STATUS_UPDATE_FAILED
+
+logger = logging.getLogger(__name__)
+
+# The node status which will not be changed without an updater
+SETTLED_NODE_STATUSES = {STATUS_UP_TO_DATE, STATUS_UPDATE_FAILED}
+
+
+class ClusterNodeState:
+    """An incrementally maintained view of the non-terminated nodes.
+
+    The node ids, the ips and the tags of the non-terminated nodes are indexed
+    so that the per-node lookups are served locally. Instead of re-listing
+    the nodes and fetching the tags of all nodes from the provider on every
+    update, the view applies the deltas reported by the cluster scaler:
+
+        (1) Nodes launched: the node ids are re-listed at next update and
+            the tags and ips of the new nodes are fetched. A stopped node
+            reused with the same node id was removed from the view when
+            stopped, so it is fetched as a new node.
+        (2) Nodes terminated: the nodes are removed from the view.
+        (3) Tags changed: the tags written through the view are merged and the
+            nodes updated by the updaters are refreshed when completed.
+
+    The node ids are re-listed at the re-list interval (by default at every
+    update with a single provider call) and only the tags and ips of the new
+    nodes are fetched. Nodes which are not settled yet (missing tags, ip or
+    with a status which is being updated) are refreshed at each update.
+    A full re-sync from the provider is done at the given (slower) interval
+    to catch the tag changes made outside the cluster scaler.
+    """
+
+    def __init__(self, provider: NodeProvider,
+                 full_sync_interval_s: int,
+                 relist_interval_s: int = 0):
+        self.provider = provider
+        self.full_sync_interval_s = full_sync_interval_s
+        self.relist_interval_s = relist_interval_s
+        self.last_full_sync_time = None
+        self.last_relist_time = None
+
+        # All non-terminated nodes in the order of provider listing
+        self.all_node_ids: List[str] = []
+        self.worker_ids: List[str] = []
+        self.head_id: Optional[str] = None
+
+        self._tags_by_node: Dict[str, Dict[str, str]] = {}
+        self._ip_by_node: Dict[str, Optional[str]] = {}
+        self._node_by_ip: Dict[str, str] = {}
+
+        # The deltas reported from other threads
+        self._lock = threading.Lock()
+        self._full_sync_requested = True
+        self._launched = False
+
+    def request_full_sync(self) -> None:
+        with self._lock:
+            self._full_sync_requested = True
+
+    def nodes_launched(self) -> None:
+        """Report that new nodes were launched. Thread safe."""
+        with self._lock:
+            self._launched = True
+
+    def update(self, now: Optional[float] = None) -> None:
+        """Bring the view up to date with a full sync or the deltas."""
+        if now is None:
+            now = time.time()
+        with self._lock:
+            full_sync = self._full_sync_requested or (
+                self.last_full_sync_time is None) or (
+                now - self.last_full_sync_time >= self.full_sync_interval_s)
+            launched = self._launched
+            self._full_sync_requested = False
+            self._launched = False
+
+        if full_sync:
+            self._sync(refresh_all=True)
+            self.last_full_sync_time = now
+            self.last_relist_time = now
+            return
+
+        relisted = False
+        if launched or now - self.last_relist_time >= self.relist_interval_s:
+            self._sync(refresh_all=False)
+            self.last_relist_time = now
+            relisted = True
+
+        refresh_node_ids = [
+            node_id for node_id in self.all_node_ids
+            if not self._is_settled(node_id)]
+        if refresh_node_ids and not self.refresh_nodes(
+                refresh_node_ids) and not relisted:
+            # Some nodes may have gone, list again
+            self._sync(refresh_all=False)
+            self.last_relist_time = now
+
+    def refresh_nodes(self, node_ids: Iterable[str]) -> bool:
+        """Fetch the tags and ips of the nodes from provider.
+
+        Returns False if any node failed to fetch.
+        """
+        succeeded = True
+        for node_id in node_ids:
+            if node_id not in self._tags_by_node:
+                continue
+            try:
+                self._fetch_node(node_id)
+            except Exception as e:
+                logger.debug(
+                    "Failed to refresh the state of node {}: {}".format(
+                        node_id, e))
+                succeeded = False
+        if succeeded:
+            self._index_node_kinds()
+        return succeeded
+
+    def node_tags(self, node_id: str) -> Dict[str, str]:
+        tags = self._tags_by_node.get(node_id)
+        if tags is None:
+            return self.provider.node_tags(node_id)
+        return tags
+
+    def node_type(self, node_id: str) -> Optional[str]:
+        return self.node_tags(node_id).get(CLOUDTIK_TAG_USER_NODE_TYPE)
+
+    def internal_ip(self, node_id: str) -> Optional[str]:
+        if node_id not in self._ip_by_node:
+            return self.provider.internal_ip(node_id)
+        ip = self._ip_by_node[node_id]
+        if ip is None:
+            # The ip may be not available when the node was pending
+            ip = self.provider.internal_ip(node_id)
+            self._index_ip(node_id, ip)
+        return ip
+
+    def get_node_id(self, ip: str) -> Optional[str]:
+        return self._node_by_ip.get(ip)
+
+    def internal_ips(self) -> List[str]:
+        return [self.internal_ip(node_id) for node_id in self.all_node_ids]
+
+    def set_node_tags(self, node_id: str, tags: Dict[str, str]) -> None:
+        """Set the node tags to provider and update the view."""
+        self.provider.set_node_tags(node_id, tags)
+        cached_tags = self._tags_by_node.get(node_id)
+        if cached_tags is not None:
+            # Don't update in place which may be owned by the provider
+            new_tags = dict(cached_tags)
+            new_tags.update(tags)
+            self._tags_by_node[node_id] = new_tags
+
+    def remove_nodes(self, node_ids: Iterable[str]) -> None:
+        """Remove the terminated nodes from the view."""
+        removing = set(node_ids)
+        if not removing:
+            return
+        self.all_node_ids = [
+            node_id for node_id in self.all_node_ids if node_id not in removing]
+        for node_id in removing:
+            self._remove_node(node_id)
+        self._index_node_kinds()
+
+    def _sync(self, refresh_all: bool) -> None:
+        node_ids = self.provider.non_terminated_nodes({})
+        current = set(node_ids)
+        for node_id in list(self._tags_by_node.keys()):
+            if node_id not in current:
+                self._remove_node(node_id)
+        self.all_node_ids = []
+        for node_id in node_ids:
+            if refresh_all or node_id not in self._tags_by_node:
+                try:
+                    self._fetch_node(node_id)
+                except Exception as e:
+                    # The node may be terminated just after listing
+                    logger.debug(
+                        "Failed to get the state of node {}: {}".format(
+                            node_id, e))
+                    self._remove_node(node_id)
+                    continue
+            self.all_node_ids.append(node_id)
+        self._index_node_kinds()
+
+    def _fetch_node(self, node_id: str) -> None:
+        self._tags_by_node[node_id] = self.provider.node_tags(node_id)
+        try:
+            ip = self.provider.internal_ip(node_id)
+        except Exception as e:
+            # Will be fetched again when needed
+            logger.debug(
+                "Failed to get the ip of node {}: {}".format(node_id, e))
+            ip = None
+        self._index_ip(node_id, ip)
+
+    def _index_ip(self, node_id: str, ip: Optional[str]) -> None:
+        old_ip = self._ip_by_node.get(node_id)
+        if old_ip is not None and old_ip != ip and (
+                self._node_by_ip.get(old_ip) == node_id):
+            del self._node_by_ip[old_ip]
+        self._ip_by_node[node_id] = ip
+        if ip is not None:
+            self._node_by_ip[ip] = node_id
+
+    def _remove_node(self, node_id: str) -> None:
+        self._tags_by_node.pop(node_id, None)
+        ip = self._ip_by_node.pop(node_id, None)
+        if ip is not None and self._node_by_ip.get(ip) == node_id:
+            del self._node_by_ip[ip]
+
+    def _index_node_kinds(self) -> None:
+        self.worker_ids = []
+        self.head_id = None
+        for node_id in self.all_node_ids:
+            node_kind = self._tags_by_node[node_id].get(CLOUDTIK_TAG_NODE_KIND)
+            if node_kind == NODE_KIND_WORKER:
+                self.worker_ids.append(node_id)
+            elif node_kind == NODE_KIND_HEAD:
+                self.head_id = node_id
+
+    def _is_settled(self, node_id: str) -> bool:
+        if self._ip_by_node.get(node_id) is None:
+            return False
+        tags = self._tags_by_node[node_id]
+        if CLOUDTIK_TAG_NODE_KIND not in tags:
+            return False
+        return tags.get(CLOUDTIK_TAG_NODE_STATUS) in SETTLED_NODE_STATUSES
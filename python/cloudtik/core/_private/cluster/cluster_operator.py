@@ -70,6 +70,8 @@ from cloudtik.core._private.cluster.cluster_dump import Archive, \
     create_archive_for_remote_nodes, get_all_local_data, \
     create_archive_for_cluster_nodes
 from cloudtik.core._private.state.control_state import ControlState
+from cloudtik.core._private.state.record_codec import decode_record
+from cloudtik.core._private.state.state_table_store import NODE_INFO_TABLE
 
 from cloudtik.core._private.cluster.cluster_metrics import ClusterMetricsSummary
 from cloudtik.core._private.cluster.cluster_scaler import ClusterScalerSummary
@@ -562,11 +564,14 @@ def _stop_docker_on_nodes(
                 is_head_node=False,
                 use_internal_ip=use_internal_ip)
 
-            _exec(
-                updater,
-                f"docker stop {container_name}",
-                with_output=False,
-                run_env="host")
+            try:
+                _exec(
+                    updater,
+                    f"docker stop {container_name}",
+                    with_output=False,
+                    run_env="host")
+            finally:
+                updater.close()
         except Exception:
             raise RuntimeError(f"Docker stop failed on {node_id}") from None
 
@@ -1143,20 +1148,23 @@ def _exec_cluster(config: Dict[str, Any],
     # Only when there is no job waiter we hold the tmux or screen session
     hold_session = False if job_waiter else True
     timestamp = time.time_ns()
-    result = _exec(
-        updater,
-        cmd,
-        screen,
-        tmux,
-        port_forward=port_forward,
-        with_output=with_output,
-        run_env=run_env,
-        hold_session=hold_session,
-        timestamp=timestamp)
+    try:
+        result = _exec(
+            updater,
+            cmd,
+            screen,
+            tmux,
+            port_forward=port_forward,
+            with_output=with_output,
+            run_env=run_env,
+            hold_session=hold_session,
+            timestamp=timestamp)
 
-    # if a job waiter is specified, we always wait for its completion.
-    if job_waiter is not None:
-        job_waiter.wait_for_completion(head_node, cmd, timestamp)
+        # if a job waiter is specified, we always wait for its completion.
+        if job_waiter is not None:
+            job_waiter.wait_for_completion(head_node, cmd, timestamp)
+    finally:
+        updater.close()
 
     # if the cmd is not run with screen or tmux
     # or in the future we can check the screen or tmux session completion
@@ -1246,19 +1254,22 @@ def _rsync(config: Dict[str, Any],
             is_head_node=is_head_node,
             process_runner=_runner,
             use_internal_ip=use_internal_ip)
-        if down:
-            rsync = updater.rsync_down
-        else:
-            rsync = updater.rsync_up
-
-        if source and target:
-            # print rsync progress for single file rsync
-            if cli_logger.verbosity > 0:
-                call_context.set_output_redirected(False)
-                call_context.set_rsync_silent(False)
-            rsync(source, target, is_file_mount)
-        else:
-            updater.sync_file_mounts(rsync)
+        try:
+            if down:
+                rsync = updater.rsync_down
+            else:
+                rsync = updater.rsync_up
+
+            if source and target:
+                # print rsync progress for single file rsync
+                if cli_logger.verbosity > 0:
+                    call_context.set_output_redirected(False)
+                    call_context.set_rsync_silent(False)
+                rsync(source, target, is_file_mount)
+            else:
+                updater.sync_file_mounts(rsync, upload=not down)
+        finally:
+            updater.close()
 
     head_node = _get_running_head_node(config)
     if not node_ip:
@@ -1359,26 +1370,29 @@ def rsync_node_on_head(config: Dict[str, Any],
             is_head_node=False,
             process_runner=subprocess,
             use_internal_ip=True)
-        if down:
-            rsync = updater.rsync_down
-        else:
-            rsync = updater.rsync_up
-
-        if source and target:
+        try:
             if down:
-                # rsync down, expand user for target (on head) if it is not handled
-                target = os.path.expanduser(target)
+                rsync = updater.rsync_down
             else:
-                # rsync up, expand user for source (on head) if it is not handled
-                source = os.path.expanduser(source)
-
-            # print rsync progress for single file rsync
-            if cli_logger.verbosity > 0:
-                call_context.set_output_redirected(False)
-                call_context.set_rsync_silent(False)
-            rsync(source, target, is_file_mount)
-        else:
-            updater.sync_file_mounts(rsync)
+                rsync = updater.rsync_up
+
+            if source and target:
+                if down:
+                    # rsync down, expand user for target (on head) if it is not handled
+                    target = os.path.expanduser(target)
+                else:
+                    # rsync up, expand user for source (on head) if it is not handled
+                    source = os.path.expanduser(source)
+
+                # print rsync progress for single file rsync
+                if cli_logger.verbosity > 0:
+                    call_context.set_output_redirected(False)
+                    call_context.set_rsync_silent(False)
+                rsync(source, target, is_file_mount)
+            else:
+                updater.sync_file_mounts(rsync, upload=not down)
+        finally:
+            updater.close()
 
     nodes = []
     if node_ip:
@@ -2179,26 +2193,35 @@ def cluster_process_status_on_head(redis_address, redis_password):
     control_state.initialize_control_state(redis_ip_address, redis_port,
                                            redis_password)
     node_table = control_state.get_node_table()
+    node_info_table = control_state.get_user_state_table(NODE_INFO_TABLE)
 
     tb = pt.PrettyTable()
     tb.field_names = ["node-ip", "node-type", "n-controller", "n-manager", "l-monitor",
                       "c-controller", "r-manager", "r-server"]
-    all_nodes = node_table.get_all().values()
+    all_nodes = node_table.get_all(raw_values=True).values()
+    static_nodes_info = None
     nodes_info = []
     for value in all_nodes:
-        node_info = eval(value)
+        node_info = decode_record(value)
         if not is_alive_time(node_info.get("last_heartbeat_time", 0)):
             continue
+        if "node_type" not in node_info:
+            # The heartbeat record without the node info published separately
+            if static_nodes_info is None:
+                static_nodes_info = node_info_table.get_all(raw_values=True)
+            static_node_info = static_nodes_info.get(node_info["node_id"])
+            if static_node_info is not None:
+                node_info.update(decode_record(static_node_info))
         nodes_info.append(node_info)
 
     # sort nodes info based on node type and then node ip for workers
     def node_info_sort(node_info):
-        return node_info["node_type"] + node_info["node_ip"]
+        return node_info.get("node_type", "") + node_info["node_ip"]
     nodes_info.sort(key=node_info_sort)
 
     for node_info in nodes_info:
-        process_info = node_info["process"]
-        tb.add_row([node_info["node_ip"], node_info["node_type"],
+        process_info = node_info.get("process", {})
+        tb.add_row([node_info["node_ip"], node_info.get("node_type", "-"),
                     process_info.get("NodeController", "-"), process_info.get("NodeManager", "-"),
                     process_info.get("LogMonitor", "-"), process_info.get("ClusterController", "-"),
                     process_info.get("ResourceManager", "-"), process_info.get("RedisServer", "-")
@@ -2446,21 +2469,24 @@ def exec_cmd_on_head(config,
 
     hold_session = False if job_waiter else True
     timestamp = time.time_ns()
-    result = _exec(
-        updater,
-        cmd,
-        screen,
-        tmux,
-        port_forward=port_forward,
-        with_output=with_output,
-        run_env=run_env,
-        shutdown_after_run=False,
-        hold_session=hold_session,
-        timestamp=timestamp)
+    try:
+        result = _exec(
+            updater,
+            cmd,
+            screen,
+            tmux,
+            port_forward=port_forward,
+            with_output=with_output,
+            run_env=run_env,
+            shutdown_after_run=False,
+            hold_session=hold_session,
+            timestamp=timestamp)
 
-    # if a job waiter is specified, we always wait for its completion.
-    if job_waiter is not None:
-        job_waiter.wait_for_completion(node_id, cmd, timestamp)
+        # if a job waiter is specified, we always wait for its completion.
+        if job_waiter is not None:
+            job_waiter.wait_for_completion(node_id, cmd, timestamp)
+    finally:
+        updater.close()
 
     return result
 
@@ -2658,7 +2684,10 @@ def _do_start_node_on_head(
             runtime_config=runtime_config)
 
         node_envs.update(node_runtime_envs)
-        updater.exec_commands("Starting", start_commands, node_envs)
+        try:
+            updater.exec_commands("Starting", start_commands, node_envs)
+        finally:
+            updater.close()
 
     _cli_logger = call_context.cli_logger
 
@@ -2936,7 +2965,10 @@ def _do_stop_node_on_head(
             runtime_config=runtime_config)
 
         node_envs.update(node_runtime_envs)
-        updater.exec_commands("Stopping", stop_commands, node_envs)
+        try:
+            updater.exec_commands("Stopping", stop_commands, node_envs)
+        finally:
+            updater.close()
 
     _cli_logger = call_context.cli_logger
 
@@ -19,6 +19,7 @@ from six.moves import queue
 from cloudtik.core._private import constants
 from cloudtik.core._private.call_context import CallContext
 from cloudtik.core._private.cluster.cluster_metrics_updater import ClusterMetricsUpdater
+from cloudtik.core._private.cluster.cluster_node_state import ClusterNodeState
 from cloudtik.core._private.cluster.resource_scaling_policy import ResourceScalingPolicy
 from cloudtik.core._private.core_utils import ConcurrentCounter
 from cloudtik.core._private.crypto import AESCipher
@@ -40,13 +41,16 @@ from cloudtik.core._private.cluster.cluster_metrics import ClusterMetrics
 from cloudtik.core._private.prometheus_metrics import ClusterPrometheusMetrics
 from cloudtik.core._private.providers import _get_node_provider
 from cloudtik.core._private.node.node_updater import NodeUpdaterThread
+from cloudtik.core._private.node.file_mounts_distributor import FileMountsDistributor
 from cloudtik.core._private.cluster.node_launcher import NodeLauncher
+from cloudtik.core._private.cluster.node_provider_executor import NodeProviderExecutor
+from cloudtik.core.async_node_provider import get_async_node_provider
 from cloudtik.core._private.cluster.node_tracker import NodeTracker
 from cloudtik.core._private.cluster.resource_demand_scheduler import \
     get_bin_pack_residual, ResourceDemandScheduler, NodeType, NodeID, NodeIP, \
     ResourceDict
 from cloudtik.core._private.utils import validate_config, \
-    hash_launch_conf, hash_runtime_conf, \
+    LaunchHashCache, hash_runtime_conf, \
     format_info_string, get_commands_to_run, with_head_node_ip_environment_variables, \
     encode_cluster_secrets, _get_node_specific_commands, _get_node_specific_config, \
     _get_node_specific_docker_config, _get_node_specific_runtime_config, \
@@ -55,7 +59,8 @@ from cloudtik.core._private.utils import validate_config, \
     process_config_with_privacy, decrypt_config, CLOUDTIK_CLUSTER_SCALING_STATUS
 from cloudtik.core._private.constants import CLOUDTIK_MAX_NUM_FAILURES, \
     CLOUDTIK_MAX_LAUNCH_BATCH, CLOUDTIK_MAX_CONCURRENT_LAUNCHES, \
-    CLOUDTIK_UPDATE_INTERVAL_S, CLOUDTIK_HEARTBEAT_TIMEOUT_S, CLOUDTIK_RUNTIME_ENV_SECRETS
+    CLOUDTIK_UPDATE_INTERVAL_S, CLOUDTIK_HEARTBEAT_TIMEOUT_S, CLOUDTIK_RUNTIME_ENV_SECRETS, \
+    CLOUDTIK_NODE_STATE_FULL_SYNC_INTERVAL_S, CLOUDTIK_NODE_STATE_RELIST_INTERVAL_S
 
 logger = logging.getLogger(__name__)
 
@@ -80,7 +85,15 @@ class ClusterScalerSummary:
 class NonTerminatedNodes:
     """Class to extract and organize information on non-terminated nodes."""
 
-    def __init__(self, provider: NodeProvider):
+    def __init__(self, provider: NodeProvider,
+                 node_state: Optional[ClusterNodeState] = None):
+        if node_state is not None:
+            # Take a snapshot from the incrementally maintained node state
+            self.all_node_ids = list(node_state.all_node_ids)
+            self.worker_ids: List[NodeID] = list(node_state.worker_ids)
+            self.head_id: Optional[NodeID] = node_state.head_id
+            return
+
         # All non-terminated nodes
         self.all_node_ids = provider.non_terminated_nodes({})
 
@@ -144,6 +157,8 @@ class ClusterScaler:
             max_failures: int = CLOUDTIK_MAX_NUM_FAILURES,
             process_runner: Any = subprocess,
             update_interval_s: int = CLOUDTIK_UPDATE_INTERVAL_S,
+            node_state_sync_interval_s: int = CLOUDTIK_NODE_STATE_FULL_SYNC_INTERVAL_S,
+            node_state_relist_interval_s: int = CLOUDTIK_NODE_STATE_RELIST_INTERVAL_S,
             event_summarizer: Optional[EventSummarizer] = None,
             prometheus_metrics: Optional[ClusterPrometheusMetrics] = None,
     ):
@@ -161,6 +176,11 @@ class ClusterScaler:
                 before exiting.
             process_runner: Subproc-like interface used by the CommandRunner.
             update_interval_s: Seconds between running the autoscaling loop.
+            node_state_sync_interval_s: Seconds between full re-sync of the
+                non-terminated nodes from the provider. In between, the node
+                state is maintained incrementally.
+            node_state_relist_interval_s: Seconds between re-listing the
+                non-terminated node ids from the provider.
             event_summarizer: Utility to consolidate duplicated messages.
             prometheus_metrics: Prometheus metrics for cluster scaler related operations.
         """
@@ -188,6 +208,12 @@ class ClusterScaler:
         # Keep this before self.reset (self.provider needs to be created
         # exactly once).
         self.provider = None
+        # Runs the create and terminate calls of the provider at the same time
+        self.provider_executor = None
+        self.node_state_sync_interval_s = node_state_sync_interval_s
+        self.node_state_relist_interval_s = node_state_relist_interval_s
+        # The incremental view of non-terminated nodes (created with provider)
+        self.node_state: Optional[ClusterNodeState] = None
         # Keep this before self.reset (if an exception occurs in reset
         # then prometheus_metrics must be instantiated to increment the
         # exception counter)
@@ -204,6 +230,8 @@ class ClusterScaler:
         # These are initialized for each config change
         self.runtime_hash = None
         self.file_mounts_contents_hash = None
+        self.file_mounts_distributor = None
+        self.launch_hash_cache = None
         self.runtime_hash_for_node_types = {}
         self.minimal_nodes_before_update = {}
         self.available_node_types = None
@@ -262,10 +290,12 @@ class ClusterScaler:
         for i in range(int(max_batches)):
             node_launcher = NodeLauncher(
                 provider=self.provider,
+                provider_executor=self.provider_executor,
                 queue=self.launch_queue,
                 index=i,
                 pending=self.pending_launches,
                 node_types=self.available_node_types,
+                node_state=self.node_state,
                 prometheus_metrics=self.prometheus_metrics,
                 event_summarizer=self.event_summarizer)
             node_launcher.daemon = True
@@ -346,8 +376,16 @@ class ClusterScaler:
 
         self.last_update_time = now
 
-        # Query the provider to update the list of non-terminated nodes
-        self.non_terminated_nodes = NonTerminatedNodes(self.provider)
+        # Take the pending launches before listing the nodes. A launch done
+        # in between is counted in both instead of missing from both which
+        # would launch the nodes again.
+        pending_launches = self.pending_launches.breakdown()
+
+        # Update the list of non-terminated nodes with the changes since last
+        # update or a full re-sync with provider at the sync interval
+        self.node_state.update(now)
+        self.non_terminated_nodes = NonTerminatedNodes(
+            self.provider, self.node_state)
 
         # This will accumulate the nodes we need to terminate.
         self.nodes_to_terminate = []
@@ -357,10 +395,8 @@ class ClusterScaler:
         self.prometheus_metrics.running_workers.set(num_workers)
 
         # Remove from LoadMetrics the ips unknown to the NodeProvider.
-        self.cluster_metrics.prune_active_ips(active_ips=[
-            self.provider.internal_ip(node_id)
-            for node_id in self.non_terminated_nodes.all_node_ids
-        ])
+        self.cluster_metrics.prune_active_ips(
+            active_ips=self.node_state.internal_ips())
 
         # Update status strings
         logger.info(self.info_string())
@@ -394,7 +430,7 @@ class ClusterScaler:
         to_launch, unfulfilled = (
             self.resource_demand_scheduler.get_nodes_to_launch(
                 self.non_terminated_nodes.all_node_ids,
-                self.pending_launches.breakdown(),
+                pending_launches,
                 self.cluster_metrics.get_resource_demands(),
                 self.cluster_metrics.get_resource_utilization(),
                 self.cluster_metrics.get_static_node_resources_by_ip(),
@@ -427,17 +463,18 @@ class ClusterScaler:
         The basic logic to decide whether a node is idle is to check whether the available resources
         is the same as the total resources. (We may need some tolerance when making such comparisons)
         """
-        last_used = self.cluster_metrics.last_used_time_by_ip
         horizon = now - (60 * self.config["idle_timeout_minutes"])
-
-        if logger.isEnabledFor(logging.DEBUG):
-            logger.debug("Nodes last used (horizon={}): {}".format(horizon, last_used))
+        # The ips not used since the horizon are looked up from the sorted
+        # last used times of the node metrics table
+        idle_ips = set(self.cluster_metrics.get_idle_ips(horizon))
+        logger.debug("{} nodes idle (horizon={}).".format(
+            len(idle_ips), horizon))
 
         # Sort based on last used to make sure to keep min_workers that
         # were most recently used. Otherwise, _keep_min_workers_of_node_type
         # might keep a node that should be terminated.
         sorted_node_ids = self._sort_based_on_last_used(
-            self.non_terminated_nodes.worker_ids, last_used)
+            self.non_terminated_nodes.worker_ids)
 
         # Don't terminate nodes needed by request_resources()
         nodes_not_allowed_to_terminate: FrozenSet[NodeID] = {}
@@ -452,7 +489,7 @@ class ClusterScaler:
 
         def keep_node(node_id: NodeID) -> None:
             # Update per-type counts.
-            tags = self.provider.node_tags(node_id)
+            tags = self.node_state.node_tags(node_id)
             if CLOUDTIK_TAG_USER_NODE_TYPE in tags:
                 node_type = tags[CLOUDTIK_TAG_USER_NODE_TYPE]
                 node_type_counts[node_type] += 1
@@ -475,8 +512,8 @@ class ClusterScaler:
                 keep_node(node_id)
                 continue
 
-            node_ip = self.provider.internal_ip(node_id)
-            if node_ip in last_used and last_used[node_ip] < horizon:
+            node_ip = self.node_state.internal_ip(node_id)
+            if node_ip in idle_ips:
                 self.schedule_node_termination(node_id, "idle", logger.info)
             elif not self.launch_config_ok(node_id):
                 self.schedule_node_termination(node_id, "outdated",
@@ -516,7 +553,7 @@ class ClusterScaler:
         if reason_opt is None:
             raise Exception("reason should be not None.")
         reason: str = reason_opt
-        node_ip = self.provider.internal_ip(node_id)
+        node_ip = self.node_state.internal_ip(node_id)
         # Log, record an event, and add node_id to nodes_to_terminate.
         logger_method("Cluster Controller: "
                       f"Terminating the node with id {node_id}"
@@ -537,7 +574,8 @@ class ClusterScaler:
         # Do runtime specific internal preparation for termination
         self.drain_nodes_gracefully(self.nodes_to_terminate)
         # Terminate the nodes
-        self.provider.terminate_nodes(self.nodes_to_terminate)
+        self.provider_executor.terminate_nodes(self.nodes_to_terminate)
+        self.node_state.remove_nodes(self.nodes_to_terminate)
         for node in self.nodes_to_terminate:
             self.node_tracker.untrack(node)
             self.prometheus_metrics.stopped_nodes.inc()
@@ -594,6 +632,8 @@ class ClusterScaler:
             if not updater.is_alive():
                 completed_nodes.append(node_id)
         if completed_nodes:
+            # The updaters changed the node tags
+            self.node_state.refresh_nodes(completed_nodes)
             failed_nodes = []
             for node_id in completed_nodes:
                 updater = self.updaters[node_id]
@@ -608,7 +648,7 @@ class ClusterScaler:
                     # Mark the node as active to prevent the node recovery
                     # logic immediately trying to restart the services on the new node.
                     self.cluster_metrics.mark_active(
-                        self.provider.internal_ip(node_id))
+                        self.node_state.internal_ip(node_id))
                 else:
                     failed_nodes.append(node_id)
                     self.num_failed_updates[node_id] += 1
@@ -685,23 +725,24 @@ class ClusterScaler:
                     key="infeasible_{}".format(sorted(request.items())),
                     interval_s=30)
 
-    def _sort_based_on_last_used(self, nodes: List[NodeID],
-                                 last_used: Dict[str, float]) -> List[NodeID]:
+    def _sort_based_on_last_used(self, nodes: List[NodeID]) -> List[NodeID]:
         """Sort the nodes based on the last time they were used.
 
         The first item in the return list is the most recently used.
         """
-        last_used_copy = copy.deepcopy(last_used)
+        # The last used times are looked up in the node metrics table
+        # without a copy of all the times
+        last_used = self.cluster_metrics.last_used_time_by_ip
         # Add the unconnected nodes as the least recently used (the end of
         # list). This prioritizes connected nodes.
         least_recently_used = -1
 
         def last_time_used(node_id: NodeID):
-            node_ip = self.provider.internal_ip(node_id)
-            if node_ip not in last_used_copy:
+            node_ip = self.node_state.internal_ip(node_id)
+            if node_ip not in last_used:
                 return least_recently_used
             else:
-                return last_used_copy[node_ip]
+                return last_used[node_ip]
 
         return sorted(nodes, key=last_time_used, reverse=True)
 
@@ -730,7 +771,7 @@ class ClusterScaler:
                 NodeIP,
                 ResourceDict] = \
                 self.cluster_metrics.get_static_node_resources_by_ip()
-            head_node_ip = self.provider.internal_ip(
+            head_node_ip = self.node_state.internal_ip(
                 self.non_terminated_nodes.head_id)
             head_node_resources = static_nodes.get(head_node_ip, {})
 
@@ -738,7 +779,7 @@ class ClusterScaler:
         resource_demand_vector_worker_node_ids = []
         # Get max resources on all the non terminated nodes.
         for node_id in sorted_node_ids:
-            tags = self.provider.node_tags(node_id)
+            tags = self.node_state.node_tags(node_id)
             if CLOUDTIK_TAG_USER_NODE_TYPE in tags:
                 node_type = tags[CLOUDTIK_TAG_USER_NODE_TYPE]
                 node_resources: ResourceDict = copy.deepcopy(
@@ -749,7 +790,7 @@ class ClusterScaler:
                         NodeIP,
                         ResourceDict] = \
                             self.cluster_metrics.get_static_node_resources_by_ip()
-                    node_ip = self.provider.internal_ip(node_id)
+                    node_ip = self.node_state.internal_ip(node_id)
                     node_resources = static_nodes.get(node_ip, {})
                 max_node_resources.append(node_resources)
                 resource_demand_vector_worker_node_ids.append(node_id)
@@ -805,7 +846,7 @@ class ClusterScaler:
             Optional[str]: reason for termination. Not None on
             KeepOrTerminate.terminate, None otherwise.
         """
-        tags = self.provider.node_tags(node_id)
+        tags = self.node_state.node_tags(node_id)
         if CLOUDTIK_TAG_USER_NODE_TYPE in tags:
             node_type = tags[CLOUDTIK_TAG_USER_NODE_TYPE]
 
@@ -828,7 +869,7 @@ class ClusterScaler:
         return KeepOrTerminate.decide_later, None
 
     def _node_resources(self, node_id):
-        node_type = self.provider.node_tags(node_id).get(
+        node_type = self.node_state.node_tags(node_id).get(
             CLOUDTIK_TAG_USER_NODE_TYPE)
         if self.available_node_types:
             return self.available_node_types.get(node_type, {}).get(
@@ -866,12 +907,21 @@ class ClusterScaler:
                     exc_info=e)
 
         self.config = new_config
+        self.launch_hash_cache = LaunchHashCache(self.config)
 
         self._update_runtime_hashes(self.config)
 
         if not self.provider:
             self.provider = _get_node_provider(self.config["provider"],
                                                self.config["cluster_name"])
+            self.provider_executor = NodeProviderExecutor(
+                get_async_node_provider(self.provider))
+        if self.node_state is None:
+            self.node_state = ClusterNodeState(
+                self.provider, self.node_state_sync_interval_s,
+                self.node_state_relist_interval_s)
+        else:
+            self.node_state.request_full_sync()
 
         self.available_node_types = self.config["available_node_types"]
 
@@ -928,6 +978,7 @@ class ClusterScaler:
         self.runtime_hash = new_runtime_hash
         self.file_mounts_contents_hash = new_file_mounts_contents_hash
         self.runtime_hash_for_node_types = new_runtime_hash_for_node_types
+        self._reset_file_mounts_distributor(new_config)
 
     def _update_file_mounts_contents_hash(self, config):
         sync_continuously = config.get("file_mounts_sync_continuously", False)
@@ -944,7 +995,19 @@ class ClusterScaler:
             generate_file_mounts_contents_hash=True,
             generate_node_types_runtime_hash=False
         )
-        self.file_mounts_contents_hash = new_file_mounts_contents_hash
+        if new_file_mounts_contents_hash != self.file_mounts_contents_hash:
+            self.file_mounts_contents_hash = new_file_mounts_contents_hash
+            self._reset_file_mounts_distributor(config)
+
+    def _reset_file_mounts_distributor(self, config):
+        # The nodes synced with the previous contents cannot be the sources
+        if self.file_mounts_distributor is not None:
+            self.file_mounts_distributor.close()
+        fan_out = config.get("file_mounts_fan_out", 0)
+        if fan_out > 0:
+            self.file_mounts_distributor = FileMountsDistributor(fan_out)
+        else:
+            self.file_mounts_distributor = None
 
     def _publish_runtime_configs(self):
         # Push global runtime config
@@ -1012,7 +1075,7 @@ class ClusterScaler:
     def launch_config_ok(self, node_id):
         if self.disable_launch_config_check:
             return True
-        node_tags = self.provider.node_tags(node_id)
+        node_tags = self.node_state.node_tags(node_id)
         tag_launch_conf = node_tags.get(CLOUDTIK_TAG_LAUNCH_CONFIG)
         node_type = node_tags.get(CLOUDTIK_TAG_USER_NODE_TYPE)
         if node_type not in self.available_node_types:
@@ -1020,12 +1083,7 @@ class ClusterScaler:
             # Don't keep the node.
             return False
 
-        launch_config = {}
-        if node_type:
-            launch_config.update(
-                self.config["available_node_types"][node_type]["node_config"])
-        calculated_launch_hash = hash_launch_conf(launch_config,
-                                                  self.config["auth"])
+        calculated_launch_hash = self.launch_hash_cache.get(node_type)
 
         if calculated_launch_hash != tag_launch_conf:
             return False
@@ -1033,7 +1091,7 @@ class ClusterScaler:
 
     def get_node_runtime_hash(self, node_id, node_tags = None):
         if node_tags is None:
-            node_tags = self.provider.node_tags(node_id)
+            node_tags = self.node_state.node_tags(node_id)
         if CLOUDTIK_TAG_USER_NODE_TYPE in node_tags:
             node_type = node_tags[CLOUDTIK_TAG_USER_NODE_TYPE]
             if node_type in self.runtime_hash_for_node_types:
@@ -1043,7 +1101,7 @@ class ClusterScaler:
         return self.runtime_hash
 
     def files_up_to_date(self, node_id):
-        node_tags = self.provider.node_tags(node_id)
+        node_tags = self.node_state.node_tags(node_id)
         applied_config_hash = node_tags.get(CLOUDTIK_TAG_RUNTIME_CONFIG)
         applied_file_mounts_contents_hash = node_tags.get(
             CLOUDTIK_TAG_FILE_MOUNTS_CONTENTS)
@@ -1064,7 +1122,7 @@ class ClusterScaler:
         """Determine whether we've received a heartbeat from a node within the
         last CLOUDTIK_HEARTBEAT_TIMEOUT_S seconds.
         """
-        key = self.provider.internal_ip(node_id)
+        key = self.node_state.internal_ip(node_id)
 
         if key in self.cluster_metrics.last_heartbeat_time_by_ip:
             last_heartbeat_time = self.cluster_metrics.last_heartbeat_time_by_ip[
@@ -1079,7 +1137,7 @@ class ClusterScaler:
         These nodes are subsequently terminated.
         """
         for node_id in self.non_terminated_nodes.worker_ids:
-            node_status = self.provider.node_tags(node_id)[CLOUDTIK_TAG_NODE_STATUS]
+            node_status = self.node_state.node_tags(node_id)[CLOUDTIK_TAG_NODE_STATUS]
             # We're not responsible for taking down
             # nodes with pending or failed status:
             if not node_status == STATUS_UP_TO_DATE:
@@ -1087,7 +1145,7 @@ class ClusterScaler:
             # This node is up-to-date. If it hasn't had the chance to produce
             # a heartbeat, fake the heartbeat now (see logic for completed node
             # updaters).
-            ip = self.provider.internal_ip(node_id)
+            ip = self.node_state.internal_ip(node_id)
             if ip not in self.cluster_metrics.last_heartbeat_time_by_ip:
                 self.cluster_metrics.mark_active(ip)
             # Heartbeat indicates node is healthy:
@@ -1115,7 +1173,7 @@ class ClusterScaler:
             " (lost contact with node).",
             quantity=1,
             aggregate=operator.add)
-        head_node_ip = self.provider.internal_ip(
+        head_node_ip = self.node_state.internal_ip(
             self.non_terminated_nodes.head_id)
         runtime_hash = self.get_node_runtime_hash(node_id)
         docker_config = self._get_node_specific_docker_config(node_id)
@@ -1154,7 +1212,7 @@ class ClusterScaler:
         self.updaters[node_id] = updater
 
     def _get_node_type(self, node_id: str) -> str:
-        node_tags = self.provider.node_tags(node_id)
+        node_tags = self.node_state.node_tags(node_id)
         if CLOUDTIK_TAG_USER_NODE_TYPE in node_tags:
             return node_tags[CLOUDTIK_TAG_USER_NODE_TYPE]
         else:
@@ -1181,7 +1239,7 @@ class ClusterScaler:
         if not self.can_update(node_id):
             return UpdateInstructions(None, None, None, None)  # no update
 
-        status = self.provider.node_tags(node_id).get(CLOUDTIK_TAG_NODE_STATUS)
+        status = self.node_state.node_tags(node_id).get(CLOUDTIK_TAG_NODE_STATUS)
         if status == STATUS_UP_TO_DATE and self.files_up_to_date(node_id):
             return UpdateInstructions(None, None, None, None)  # no update
 
@@ -1211,10 +1269,10 @@ class ClusterScaler:
                       node_resources, docker_config, call_context):
         logger.info(f"Creating new (spawn_updater) updater thread for node"
                     f" {node_id}.")
-        ip = self.provider.internal_ip(node_id)
+        ip = self.node_state.internal_ip(node_id)
         node_type = self._get_node_type(node_id)
         self.node_tracker.track(node_id, ip, node_type)
-        head_node_ip = self.provider.internal_ip(
+        head_node_ip = self.node_state.internal_ip(
             self.non_terminated_nodes.head_id)
         runtime_hash = self.get_node_runtime_hash(node_id)
         runtime_config = self._get_node_specific_runtime_config(node_id)
@@ -1250,7 +1308,8 @@ class ClusterScaler:
             docker_config=docker_config,
             node_resources=node_resources,
             runtime_config=runtime_config,
-            environment_variables=environment_variables)
+            environment_variables=environment_variables,
+            file_mounts_distributor=self.file_mounts_distributor)
         updater.start()
         self.updaters[node_id] = updater
 
@@ -1277,10 +1336,11 @@ class ClusterScaler:
         self.pending_launches.inc(node_type, count)
         self.prometheus_metrics.pending_nodes.set(self.pending_launches.value)
         config = copy.deepcopy(self.config)
+        launch_hash = self.launch_hash_cache.get(node_type)
         # Split into individual launch requests of the max batch size.
         while count > 0:
             self.launch_queue.put((config, min(count, self.max_launch_batch),
-                                   node_type))
+                                   node_type, launch_hash))
             count -= self.max_launch_batch
 
     def workers(self):
@@ -1290,7 +1350,8 @@ class ClusterScaler:
         logger.error("Cluster Controller: kill_workers triggered")
         nodes = self.workers()
         if nodes:
-            self.provider.terminate_nodes(nodes)
+            self.provider_executor.terminate_nodes(nodes)
+            self.node_state.remove_nodes(nodes)
             for node in nodes:
                 self.node_tracker.untrack(node)
                 self.prometheus_metrics.stopped_nodes.inc()
@@ -1314,8 +1375,8 @@ class ClusterScaler:
         non_failed = set()
 
         for node_id in self.non_terminated_nodes.all_node_ids:
-            ip = self.provider.internal_ip(node_id)
-            node_tags = self.provider.node_tags(node_id)
+            ip = self.node_state.internal_ip(node_id)
+            node_tags = self.node_state.node_tags(node_id)
 
             if not all(
                     tag in node_tags
@@ -1367,7 +1428,7 @@ class ClusterScaler:
     def _init_next_node_number(self):
         self.next_node_number = CLOUDTIK_TAG_HEAD_NODE_NUMBER + 1
         for node_id in self.non_terminated_nodes.worker_ids:
-            node_number_tag = self.provider.node_tags(node_id).get(CLOUDTIK_TAG_NODE_NUMBER)
+            node_number_tag = self.node_state.node_tags(node_id).get(CLOUDTIK_TAG_NODE_NUMBER)
             if node_number_tag is None:
                 continue
 
@@ -1380,24 +1441,24 @@ class ClusterScaler:
             self._init_next_node_number()
 
         for node_id in self.non_terminated_nodes.worker_ids:
-            node_number_tag = self.provider.node_tags(node_id).get(CLOUDTIK_TAG_NODE_NUMBER)
+            node_number_tag = self.node_state.node_tags(node_id).get(CLOUDTIK_TAG_NODE_NUMBER)
             if node_number_tag is None:
                 # New node, assign the node number
-                self.provider.set_node_tags(
+                self.node_state.set_node_tags(
                     node_id, {CLOUDTIK_TAG_NODE_NUMBER: str(self.next_node_number)})
                 self.next_node_number += 1
 
     def _collect_nodes_info(self):
         nodes_info_map = {}
         for node_id in self.non_terminated_nodes.all_node_ids:
-            tags = self.provider.node_tags(node_id)
+            tags = self.node_state.node_tags(node_id)
             if CLOUDTIK_TAG_USER_NODE_TYPE in tags:
                 node_type = tags[CLOUDTIK_TAG_USER_NODE_TYPE]
                 if node_type not in nodes_info_map:
                     nodes_info_map[node_type] = {}
                 nodes_info = nodes_info_map[node_type]
 
-                node_info = {"node_ip": self.provider.internal_ip(node_id)}
+                node_info = {"node_ip": self.node_state.internal_ip(node_id)}
                 if CLOUDTIK_TAG_NODE_NUMBER in tags:
                     node_info["node_number"] = int(tags[CLOUDTIK_TAG_NODE_NUMBER])
                 nodes_info[node_id] = node_info
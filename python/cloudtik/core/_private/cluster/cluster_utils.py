@@ -90,10 +90,13 @@ def run_on_node(
         is_head_node=is_head_node,
         use_internal_ip=use_internal_ip)
 
-    exec_out = updater.cmd_executor.run(
-        cmd,
-        with_output=with_output,
-        run_env=run_env)
+    try:
+        exec_out = updater.cmd_executor.run(
+            cmd,
+            with_output=with_output,
+            run_env=run_env)
+    finally:
+        updater.close()
     if with_output:
         return exec_out.decode(encoding="utf-8")
     else:
@@ -11,7 +11,6 @@ from cloudtik.core.tags import (CLOUDTIK_TAG_LAUNCH_CONFIG, CLOUDTIK_TAG_NODE_ST
                                 CLOUDTIK_TAG_USER_NODE_TYPE, STATUS_UNINITIALIZED,
                                 NODE_KIND_WORKER)
 from cloudtik.core._private.prometheus_metrics import ClusterPrometheusMetrics
-from cloudtik.core._private.utils import hash_launch_conf
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +26,8 @@ class NodeLauncher(threading.Thread):
                  prometheus_metrics=None,
                  node_types=None,
                  index=None,
+                 node_state=None,
+                 provider_executor=None,
                  *args,
                  **kwargs):
         self.queue = queue
@@ -35,11 +36,13 @@ class NodeLauncher(threading.Thread):
         self.provider = provider
         self.node_types = node_types
         self.index = str(index) if index is not None else ""
+        self.node_state = node_state
+        self.provider_executor = provider_executor
         self.event_summarizer = event_summarizer
         super(NodeLauncher, self).__init__(*args, **kwargs)
 
     def _launch_node(self, config: Dict[str, Any], count: int,
-                     node_type: Optional[str]):
+                     node_type: Optional[str], launch_hash: str):
         if self.node_types:
             assert node_type, node_type
 
@@ -49,7 +52,6 @@ class NodeLauncher(threading.Thread):
                 config["available_node_types"][node_type]["node_config"])
         resources = copy.deepcopy(
             config["available_node_types"][node_type]["resources"])
-        launch_hash = hash_launch_conf(launch_config, config["auth"])
         self.log("Launching {} nodes, type {}.".format(count, node_type))
         node_config = {}
         node_tags = {
@@ -66,8 +68,16 @@ class NodeLauncher(threading.Thread):
             node_tags[CLOUDTIK_TAG_USER_NODE_TYPE] = node_type
             node_config.update(launch_config)
         launch_start_time = time.time()
-        self.provider.create_node_with_resources(node_config, node_tags, count,
-                                                 resources)
+        # Create with the provider executor if there is one so that the
+        # creating is limited together with the other calls to the provider
+        provider = self.provider_executor or self.provider
+        try:
+            provider.create_node_with_resources(node_config, node_tags, count,
+                                                resources)
+        finally:
+            if self.node_state is not None:
+                # Nodes may be created even when failed
+                self.node_state.nodes_launched()
         launch_time = time.time() - launch_start_time
         for _ in range(count):
             # Note: when launching multiple nodes we observe the time it
@@ -79,10 +89,10 @@ class NodeLauncher(threading.Thread):
 
     def run(self):
         while True:
-            config, count, node_type = self.queue.get()
+            config, count, node_type, launch_hash = self.queue.get()
             self.log("Got {} nodes to launch.".format(count))
             try:
-                self._launch_node(config, count, node_type)
+                self._launch_node(config, count, node_type, launch_hash)
             except Exception:
                 self.prometheus_metrics.node_launch_exceptions.inc()
                 self.prometheus_metrics.failed_create_nodes.inc(count)
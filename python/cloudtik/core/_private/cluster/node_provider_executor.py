@@ -0,0 +1,50 @@
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from cloudtik.core.async_node_provider import AsyncNodeProvider
+
+logger = logging.getLogger(__name__)
+
+
+class NodeProviderExecutor:
+    """Run the calls of an async node provider in an event loop thread.
+
+    The calls from the threads of the cluster scaler and the node launchers
+    are submitted to the event loop, so the calls to the cloud from all of
+    them are in flight at the same time within the limits of the provider.
+    """
+
+    def __init__(self, async_provider: AsyncNodeProvider):
+        self.async_provider = async_provider
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._run_loop, name="node_provider_executor", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def submit(self, coro):
+        """Submit a coroutine to the event loop and return the future."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def create_node_with_resources(
+            self, node_config: Dict[str, Any], tags: Dict[str, str],
+            count: int,
+            resources: Dict[str, float]) -> Optional[Dict[str, Any]]:
+        return self.submit(self.async_provider.create_node_with_resources(
+            node_config, tags, count, resources)).result()
+
+    def terminate_nodes(self, node_ids: List[str]) -> None:
+        self.submit(self.async_provider.terminate_nodes(node_ids)).result()
+
+    def set_node_tags(self, node_id: str, tags: Dict[str, str]) -> None:
+        self.submit(self.async_provider.set_node_tags(node_id, tags)).result()
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
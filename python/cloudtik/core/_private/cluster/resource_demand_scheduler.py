@@ -18,6 +18,7 @@ from typing import Optional
 from typing import Tuple
 
 from cloudtik.core.node_provider import NodeProvider
+from cloudtik.core._private.cluster.resource_packing import ResourceDemandPacker
 from cloudtik.core._private.constants import CLOUDTIK_CONSERVE_GPU_NODES, to_memory_units
 from cloudtik.core.tags import (
     CLOUDTIK_TAG_USER_NODE_TYPE, NODE_KIND_UNMANAGED,
@@ -515,6 +516,11 @@ def get_nodes_for(node_types: Dict[NodeType, NodeTypeConfigDict],
     nodes_to_add = collections.defaultdict(int)
 
     while resources and sum(nodes_to_add.values()) < max_to_add:
+        # Encode the demands once for scoring all the node types
+        if strict_spread:
+            packer = ResourceDemandPacker([resources[0]], sort_demands=False)
+        else:
+            packer = ResourceDemandPacker(resources, sort_demands=False)
         utilization_scores = []
         for node_type in node_types:
             max_workers_of_node_type = node_types[node_type].get(
@@ -529,12 +535,10 @@ def get_nodes_for(node_types: Dict[NodeType, NodeTypeConfigDict],
                                  f"exceeds the max number ({max_workers_of_node_type})")
                 continue
             node_resources = node_types[node_type]["resources"]
-            if strict_spread:
-                # If handling strict spread, only one bundle can be placed on
-                # the node.
-                score = _utilization_score(node_resources, [resources[0]])
-            else:
-                score = _utilization_score(node_resources, resources)
+            # If handling strict spread, only one bundle can be placed on
+            # the node.
+            score = _utilization_score(
+                node_resources, packer.demands, packer=packer)
             if score is not None:
                 utilization_scores.append((score, node_type))
 
@@ -562,10 +566,13 @@ def get_nodes_for(node_types: Dict[NodeType, NodeTypeConfigDict],
 
 
 def _utilization_score(node_resources: ResourceDict,
-                       resources: List[ResourceDict]) -> Optional[float]:
-    remaining = copy.deepcopy(node_resources)
+                       resources: List[ResourceDict],
+                       packer: Optional[ResourceDemandPacker] = None
+                       ) -> Optional[float]:
+    if packer is None:
+        packer = ResourceDemandPacker(resources, sort_demands=False)
     is_gpu_node = "GPU" in node_resources and node_resources["GPU"] > 0
-    any_gpu_task = any("GPU" in r for r in resources)
+    any_gpu_task = packer.has_resource("GPU")
 
     # Avoid launching GPU nodes if there aren't any GPU tasks at all. Note that
     # if there *is* a GPU task, then CPU tasks can be scheduled as well.
@@ -573,17 +580,12 @@ def _utilization_score(node_resources: ResourceDict,
         if is_gpu_node and not any_gpu_task:
             return None
 
-    fittable = []
-    resource_types = set()
-    for r in resources:
-        for k, v in r.items():
-            if v > 0:
-                resource_types.add(k)
-        if _fits(remaining, r):
-            fittable.append(r)
-            _inplace_subtract(remaining, r)
-    if not fittable:
+    unfulfilled, nodes = packer.pack([node_resources])
+    if len(unfulfilled) == len(packer.demands):
+        # Nothing fittable
         return None
+    remaining = nodes[0]
+    resource_types = packer.demanded_resources
 
     util_by_resources = []
     num_matching_resource_types = 0
@@ -615,6 +617,9 @@ def get_bin_pack_residual(node_resources: List[ResourceDict],
                           ) -> (List[ResourceDict], List[ResourceDict]):
     """Return a subset of resource_demands that cannot fit in the cluster.
 
+    The demands are packed with a first-fit algorithm on a dense resource
+    matrix. See ResourceDemandPacker for details.
+
     Args:
         node_resources (List[ResourceDict]): List of resources per node.
         resource_demands (List[ResourceDict]): List of resource bundles that
@@ -626,40 +631,12 @@ def get_bin_pack_residual(node_resources: List[ResourceDict],
         List[ResourceDict]: the residual list resources that do not fit.
         List[ResourceDict]: The updated node_resources after the method.
     """
-
-    unfulfilled = []
-
-    # A most naive bin packing algorithm.
-    nodes = copy.deepcopy(node_resources)
-    # List of nodes that cannot be used again due to strict spread.
-    used = []
     # We order the resource demands in the following way:
     # More complex demands first.
     # Break ties: heavier demands first.
     # Break ties: lexicographically (to ensure stable ordering).
-    for demand in sorted(
-            resource_demands,
-            key=lambda demand: (len(demand.values()),
-                                sum(demand.values()),
-                                sorted(demand.items())),
-            reverse=True):
-        found = False
-        node = None
-        for i in range(len(nodes)):
-            node = nodes[i]
-            if _fits(node, demand):
-                found = True
-                # In the strict_spread case, we can't reuse nodes.
-                if strict_spread:
-                    used.append(node)
-                    del nodes[i]
-                break
-        if found and node:
-            _inplace_subtract(node, demand)
-        else:
-            unfulfilled.append(demand)
-
-    return unfulfilled, nodes + used
+    packer = ResourceDemandPacker(resource_demands, sort_demands=True)
+    return packer.pack(node_resources, strict_spread)
 
 
 def _fits(node: ResourceDict, resources: ResourceDict) -> bool:
@@ -669,13 +646,6 @@ def _fits(node: ResourceDict, resources: ResourceDict) -> bool:
     return True
 
 
-def _inplace_subtract(node: ResourceDict, resources: ResourceDict) -> None:
-    for k, v in resources.items():
-        assert k in node, (k, node)
-        node[k] -= v
-        assert node[k] >= 0.0, (node, k, v)
-
-
 def _inplace_add(a: collections.defaultdict, b: Dict) -> None:
     """Generically adds values in `b` to `a`.
     a[k] should be defined for all k in b.keys()"""
@@ -0,0 +1,243 @@
+"""Dense-matrix bin packing of resource demands onto nodes.
+
+The resource names of the demands are mapped to matrix columns and
+consecutive identical demands are packed as one batch with array
+operations. The packing gives exactly the same answers as the naive
+first-fit algorithm working on resource dicts.
+"""
+
+from numbers import Real
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# e.g., {"GPU": 1}.
+ResourceDict = Dict[str, Real]
+
+
+def _demand_sort_key(demand: ResourceDict):
+    # More complex demands first.
+    # Break ties: heavier demands first.
+    # Break ties: lexicographically (to ensure stable ordering).
+    return (len(demand.values()),
+            sum(demand.values()),
+            sorted(demand.items()))
+
+
+def _is_integral(values: np.ndarray) -> bool:
+    return bool(np.all(np.floor(values) == values))
+
+
+class ResourceDemandPacker:
+    """Packs a list of resource demands onto node resources.
+
+    The demands are encoded once into a matrix with one row for each run of
+    identical demands so that the same demands can be packed onto many
+    different lists of node resources cheaply.
+
+    Args:
+        resource_demands: The resource bundles to pack.
+        sort_demands: Whether to order the demands with the more complex and
+            heavier demands first as the scheduler does. If false, the demands
+            are packed in the given order.
+    """
+
+    def __init__(self,
+                 resource_demands: List[ResourceDict],
+                 sort_demands: bool = True) -> None:
+        if sort_demands:
+            resource_demands = sorted(
+                resource_demands, key=_demand_sort_key, reverse=True)
+        self.demands = list(resource_demands)
+
+        # Map each resource name appeared in the demands to a column
+        self.columns: Dict[str, int] = {}
+        # The resource names with positive demands
+        self.demanded_resources = set()
+        for demand in self.demands:
+            for k, v in demand.items():
+                if k not in self.columns:
+                    self.columns[k] = len(self.columns)
+                if v > 0:
+                    self.demanded_resources.add(k)
+
+        # Group the consecutive identical demands into runs
+        self.runs: List[Tuple[int, int]] = []
+        rows = []
+        for i, demand in enumerate(self.demands):
+            if self.runs and demand == self.demands[self.runs[-1][0]]:
+                start, count = self.runs[-1]
+                self.runs[-1] = (start, count + 1)
+                continue
+            self.runs.append((i, 1))
+            row = [0.0] * len(self.columns)
+            for k, v in demand.items():
+                row[self.columns[k]] = v
+            rows.append(row)
+        self.demand_matrix = np.array(
+            rows, dtype=np.float64).reshape(len(rows), len(self.columns))
+
+    def has_resource(self, resource_name: str) -> bool:
+        """Whether any of the demands contains the resource name."""
+        return resource_name in self.columns
+
+    def to_node_matrix(self, node_resources: List[ResourceDict]) -> np.ndarray:
+        """Encode the node resources for the demanded resource columns.
+
+        Resources not present in the node are encoded as zero.
+        """
+        node_matrix = np.zeros(
+            (len(node_resources), len(self.columns)), dtype=np.float64)
+        for k, column in self.columns.items():
+            node_matrix[:, column] = [
+                node.get(k, 0.0) for node in node_resources]
+        return node_matrix
+
+    def pack(self,
+             node_resources: List[ResourceDict],
+             strict_spread: bool = False
+             ) -> (List[ResourceDict], List[ResourceDict]):
+        """Return the demands that cannot fit and the updated node resources.
+
+        Args:
+            node_resources: List of resources per node. It is not modified.
+            strict_spread: If true, each demand must be placed on a
+                different node.
+
+        Returns:
+            List[ResourceDict]: the residual list resources that do not fit.
+            List[ResourceDict]: The updated node_resources after the packing.
+                With strict_spread, the used nodes are moved to the end
+                in the order they were used.
+        """
+        node_matrix = self.to_node_matrix(node_resources)
+        placed_counts, touched, used_order = self.pack_matrix(
+            node_matrix, strict_spread)
+
+        unfulfilled = []
+        for (start, count), placed in zip(self.runs, placed_counts):
+            unfulfilled.extend(self.demands[start + placed:start + count])
+
+        nodes = []
+        for i, node in enumerate(node_resources):
+            if touched[i]:
+                nodes.append(_to_node_resources(
+                    node, node_matrix[i], self.columns))
+            else:
+                nodes.append(dict(node))
+        if strict_spread:
+            used = set(used_order)
+            nodes = [node for i, node in enumerate(nodes) if i not in used] + [
+                nodes[i] for i in used_order]
+        return unfulfilled, nodes
+
+    def pack_matrix(self,
+                    node_matrix: np.ndarray,
+                    strict_spread: bool = False
+                    ) -> (List[int], np.ndarray, List[int]):
+        """Pack the demands onto the node matrix in place.
+
+        Returns:
+            List[int]: the number of demands placed for each run.
+            np.ndarray: the mask of the nodes which demands placed on.
+            List[int]: the node indexes used in order if strict_spread.
+        """
+        num_nodes = node_matrix.shape[0]
+        active = np.ones(num_nodes, dtype=bool)
+        touched = np.zeros(num_nodes, dtype=bool)
+        placed_counts = []
+        used_order = []
+        for run_index, (_, count) in enumerate(self.runs):
+            demand = self.demand_matrix[run_index]
+            placed = self._place_run(
+                node_matrix, active, demand, count, strict_spread)
+            touched |= placed > 0
+            if strict_spread:
+                used = np.flatnonzero(placed)
+                active[used] = False
+                used_order.extend(used.tolist())
+            placed_counts.append(int(placed.sum()))
+        return placed_counts, touched, used_order
+
+    @staticmethod
+    def _place_run(node_matrix: np.ndarray,
+                   active: np.ndarray,
+                   demand: np.ndarray,
+                   count: int,
+                   strict_spread: bool) -> np.ndarray:
+        """First fit a run of identical demands.
+
+        Returns the number of demands placed on each node.
+        """
+        num_nodes = node_matrix.shape[0]
+        placed = np.zeros(num_nodes, dtype=np.int64)
+        positive = demand > 0
+        # A demand fits only if it fits for every resource including the
+        # resources it demands zero of.
+        candidates = active & np.all(
+            node_matrix[:, ~positive] >= demand[~positive], axis=1)
+        if not np.any(candidates):
+            return placed
+
+        capacity = node_matrix[:, positive]
+        needed = demand[positive]
+        if strict_spread or not np.any(positive):
+            # Each node can hold only one demand (strict spread) or
+            # unlimited number of zero demands.
+            fits = candidates & np.all(capacity >= needed, axis=1)
+            if strict_spread:
+                per_node = fits.astype(np.int64)
+            else:
+                per_node = np.where(fits, count, 0)
+            _fill_first_fit(placed, per_node, count)
+        elif _is_integral(needed) and _is_integral(capacity[candidates]):
+            # Integral quantities: the number of demands fit on each node
+            # can be computed exactly with integer division.
+            per_node = np.zeros(num_nodes, dtype=np.int64)
+            per_node[candidates] = np.maximum(np.min(
+                capacity[candidates].astype(np.int64)
+                // needed.astype(np.int64), axis=1), 0)
+            _fill_first_fit(placed, per_node, count)
+        else:
+            # Fractional quantities: subtract one by one on the node to
+            # get exactly the same floating point results.
+            remaining = count
+            start = 0
+            while remaining > 0:
+                fits = candidates[start:] & np.all(
+                    capacity[start:] >= needed, axis=1)
+                if not np.any(fits):
+                    break
+                i = start + int(np.argmax(fits))
+                row = node_matrix[i]
+                while remaining > 0 and np.all(row[positive] >= needed):
+                    row -= demand
+                    placed[i] += 1
+                    remaining -= 1
+                start = i + 1
+            return placed
+
+        node_matrix -= placed[:, None] * demand[None, :]
+        return placed
+
+
+def _fill_first_fit(placed: np.ndarray, per_node: np.ndarray,
+                    count: int) -> None:
+    """Fill the nodes in order with the number of demands each can hold."""
+    filled_before = np.cumsum(per_node) - per_node
+    placed[:] = np.clip(count - filled_before, 0, per_node)
+
+
+def _to_node_resources(node: ResourceDict,
+                       row: np.ndarray,
+                       columns: Dict[str, int]) -> ResourceDict:
+    updated = dict(node)
+    for k, column in columns.items():
+        if k not in updated:
+            continue
+        value = float(row[column])
+        if isinstance(updated[k], int) and value.is_integer():
+            value = int(value)
+        updated[k] = value
+    return updated
+
@@ -1,20 +1,26 @@
 import copy
 from getpass import getuser
 from shlex import quote
-from typing import Dict, List
+from typing import Dict, List, Optional
 import click
 import hashlib
 import json
 import logging
 import os
+import shutil
 import subprocess
 import sys
+import tempfile
+import threading
 import time
+import uuid
 import warnings
 
 from cloudtik.core.command_executor import CommandExecutor
 from cloudtik.core._private.constants import \
     CLOUDTIK_NODE_SSH_INTERVAL_S, \
+    CLOUDTIK_SSH_CONTROL_PERSIST_S, \
+    CLOUDTIK_SSH_CONTROL_CHECK_INTERVAL_S, \
     CLOUDTIK_DEFAULT_SHARED_MEMORY_MAX_BYTES, \
     CLOUDTIK_DEFAULT_SHARED_MEMORY_PROPORTION, \
     CLOUDTIK_NODE_START_WAIT_S, \
@@ -40,6 +46,8 @@ KUBECTL_RSYNC = os.path.join(
     os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
     "providers/_private/_kubernetes/kubectl-rsync.sh")
 MAX_HOME_RETRIES = 3
+# The timeout of the control commands to a SSH master connection
+SSH_CONTROL_TIMEOUT_S = 10
 HOME_RETRY_DELAY_S = 5
 
 PRIVACY_KEYWORDS = ["PASSWORD", "ACCOUNT", "SECRET", "ACCESS_KEY", "PRIVATE_KEY"]
@@ -362,7 +370,7 @@ class SSHOptions:
             self.arg_dict.update({
                 "ControlMaster": "auto",
                 "ControlPath": "{}/%C".format(control_path),
-                "ControlPersist": "10s",
+                "ControlPersist": "{}s".format(CLOUDTIK_SSH_CONTROL_PERSIST_S),
             })
         self.arg_dict.update(kwargs)
 
@@ -376,6 +384,138 @@ class SSHOptions:
         ]
 
 
+class SSHRelayKey:
+    """An ephemeral SSH key pair with which the nodes sync the files to each
+    other. The private key is installed on the source nodes until their
+    executors are closed and the public key is authorized on the target
+    nodes only during the syncs to them."""
+
+    def __init__(self):
+        self.name = "cloudtik-relay-{}".format(uuid.uuid4().hex[:16])
+        self.key_dir = tempfile.mkdtemp(prefix="cloudtik_relay_")
+        self.private_key = os.path.join(self.key_dir, "key.pem")
+        try:
+            subprocess.check_call(
+                ["ssh-keygen", "-q", "-t", "ed25519", "-N", "",
+                 "-C", self.name, "-f", self.private_key],
+                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+            with open(self.private_key + ".pub") as f:
+                self.public_key = f.read().strip()
+        except Exception:
+            self.delete()
+            raise
+        # The private key on the source nodes
+        self.remote_private_key = "~/{}.pem".format(self.name)
+
+    def delete(self):
+        shutil.rmtree(self.key_dir, ignore_errors=True)
+
+
+class SSHControlMaster:
+    """The SSH master connection to a node shared through the control socket.
+
+    The master is created by the first command connecting to the node and
+    persists after the command for the following commands. Whether the master
+    is alive is checked at most once per check interval. A master exited
+    (the persist time expired or the connection lost) is replaced by the next
+    command connecting to the node. A master not responding to the check in
+    time is stale and the commands run without multiplexing.
+    """
+
+    def __init__(self, ssh_cmd, process_runner):
+        # The ssh command with the options and the destination
+        self.ssh_cmd = ssh_cmd
+        self.process_runner = process_runner
+        self.lock = threading.Lock()
+        self.ref_count = 0
+        self.alive = False
+        self.stale = False
+        self.last_check_time = None
+
+    def check(self) -> bool:
+        with self.lock:
+            if self.stale:
+                return False
+            now = time.monotonic()
+            if self.alive and (
+                    now - self.last_check_time <
+                    CLOUDTIK_SSH_CONTROL_CHECK_INTERVAL_S):
+                return True
+            result = self._control("check")
+            alive = bool(result)
+            if result is None:
+                logger.debug(
+                    "The SSH master connection of `{}` is stale.".format(
+                        self.ssh_cmd[-1]))
+                self.stale = True
+            elif self.alive and not alive:
+                logger.debug(
+                    "The SSH master connection of `{}` exited.".format(
+                        self.ssh_cmd[-1]))
+            self.alive = alive
+            self.last_check_time = now
+            return alive
+
+    def stop(self) -> None:
+        """Stop the master from accepting new sessions. The master exits
+        after the running sessions (possibly of other processes) are done."""
+        with self.lock:
+            self._control("stop")
+            self.alive = False
+
+    def _control(self, control_command) -> Optional[bool]:
+        """Returns None if the master is not responding in time."""
+        cmd = self.ssh_cmd[:-1] + ["-O", control_command, self.ssh_cmd[-1]]
+        try:
+            self.process_runner.check_call(
+                cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL, timeout=SSH_CONTROL_TIMEOUT_S)
+            return True
+        except subprocess.TimeoutExpired:
+            return None
+        except (subprocess.CalledProcessError, OSError):
+            return False
+
+
+class SSHConnectionPool:
+    """The SSH master connections of this process, one for each node.
+
+    The executors of the same node (the updater, the job waiters, ...) share
+    the master which is stopped when the last of them is closed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.masters = {}
+
+    def acquire(self, key, ssh_cmd, process_runner) -> SSHControlMaster:
+        with self.lock:
+            master = self.masters.get(key)
+            if master is None:
+                master = SSHControlMaster(ssh_cmd, process_runner)
+                self.masters[key] = master
+            master.ref_count += 1
+            return master
+
+    def release(self, key, master: SSHControlMaster) -> None:
+        with self.lock:
+            master.ref_count -= 1
+            if master.ref_count > 0 or self.masters.get(key) is not master:
+                return
+            del self.masters[key]
+        master.stop()
+
+    def remove(self, key, master: SSHControlMaster) -> None:
+        """Remove the stale master so that the executors acquiring the
+        master of the node later get a new one."""
+        with self.lock:
+            if self.masters.get(key) is master:
+                del self.masters[key]
+
+
+_ssh_connection_pool = SSHConnectionPool()
+
+
 class SSHCommandExecutor(CommandExecutor):
     def __init__(self, call_context, log_prefix, node_id, provider, auth_config,
                  cluster_name, process_runner, use_internal_ip):
@@ -396,12 +536,26 @@ class SSHCommandExecutor(CommandExecutor):
         self.ssh_user = auth_config["ssh_user"]
         self.ssh_control_path = ssh_control_path
         self.ssh_ip = None
+        self.ssh_master = None
+        self.ssh_master_lock = threading.Lock()
+        self.relay_lock = threading.Lock()
+        # The relay key installed on this node as a source
+        self.relay_key = None
+        # The relay key name -> the number of the syncs to this node
+        self.relay_keys_authorized = {}
         self.ssh_proxy_command = auth_config.get("ssh_proxy_command", None)
         self.ssh_options = SSHOptions(
             self.call_context,
             self.ssh_private_key,
             self.ssh_control_path,
             ProxyCommand=self.ssh_proxy_command)
+        self.ssh_options_no_control = SSHOptions(
+            self.call_context,
+            self.ssh_private_key,
+            ProxyCommand=self.ssh_proxy_command,
+            ControlMaster="no",
+            ControlPath="none")
+        self.ssh_multiplexing = True
 
     def _get_node_ip(self):
         if self.use_internal_ip:
@@ -455,6 +609,58 @@ class SSHCommandExecutor(CommandExecutor):
         except OSError as e:
             self.cli_logger.warning("{}", str(e))  # todo: msg
 
+    def _get_ssh_master_key(self):
+        return self.ssh_control_path, self.ssh_user, self.ssh_ip
+
+    def _check_ssh_master(self) -> SSHOptions:
+        """Returns the ssh options of the commands to run."""
+        # All the commands to the node are multiplexed on a single master
+        # connection of the node shared in this process. The executor of a
+        # file mounts source is used by multiple threads.
+        with self.ssh_master_lock:
+            if not self.ssh_multiplexing:
+                return self.ssh_options_no_control
+            if self.ssh_master is None:
+                ssh_cmd = ["ssh"] + self.ssh_options.to_ssh_options_list(
+                    timeout=SSH_CONTROL_TIMEOUT_S) + [
+                    "{}@{}".format(self.ssh_user, self.ssh_ip)]
+                self.ssh_master = _ssh_connection_pool.acquire(
+                    self._get_ssh_master_key(), ssh_cmd, self.process_runner)
+            ssh_master = self.ssh_master
+        # A master not alive and not stale is created by the command
+        if ssh_master.check() or not ssh_master.stale:
+            return self.ssh_options
+
+        # The commands through the stale master may hang
+        self.cli_logger.warning(
+            "The SSH master connection to {} is stale, "
+            "running the commands without multiplexing.", self.ssh_ip)
+        key = self._get_ssh_master_key()
+        with self.ssh_master_lock:
+            if self.ssh_master is ssh_master:
+                self.ssh_master = None
+                self.ssh_multiplexing = False
+            else:
+                ssh_master = None
+        if ssh_master is not None:
+            _ssh_connection_pool.remove(key, ssh_master)
+            _ssh_connection_pool.release(key, ssh_master)
+        return self.ssh_options_no_control
+
+    def close(self):
+        with self.relay_lock:
+            relay_key = self.relay_key
+            self.relay_key = None
+        if relay_key is not None:
+            self.run("rm -f {}".format(relay_key.remote_private_key))
+
+        with self.ssh_master_lock:
+            ssh_master = self.ssh_master
+            self.ssh_master = None
+        if ssh_master is not None:
+            _ssh_connection_pool.release(
+                self._get_ssh_master_key(), ssh_master)
+
     def _run_helper(self,
                     final_cmd,
                     with_output=False,
@@ -548,6 +754,8 @@ class SSHCommandExecutor(CommandExecutor):
             type(ssh_options))
 
         self._set_ssh_ip_if_required()
+        if ssh_options is self.ssh_options:
+            ssh_options = self._check_ssh_master()
 
         if self.call_context.is_using_login_shells():
             ssh = ["ssh", "-tt"]
@@ -619,13 +827,14 @@ class SSHCommandExecutor(CommandExecutor):
 
     def run_rsync_up(self, source, target, options=None):
         self._set_ssh_ip_if_required()
+        ssh_options = self._check_ssh_master()
         options = options or {}
 
         command = ["rsync"]
         command += [
             "--rsh",
             subprocess.list2cmdline(
-                ["ssh"] + self.ssh_options.to_ssh_options_list(timeout=120))
+                ["ssh"] + ssh_options.to_ssh_options_list(timeout=120))
         ]
         command += ["-avz"]
         command += self._create_rsync_filter_args(options=options)
@@ -637,12 +846,13 @@ class SSHCommandExecutor(CommandExecutor):
 
     def run_rsync_down(self, source, target, options=None):
         self._set_ssh_ip_if_required()
+        ssh_options = self._check_ssh_master()
 
         command = ["rsync"]
         command += [
             "--rsh",
             subprocess.list2cmdline(
-                ["ssh"] + self.ssh_options.to_ssh_options_list(timeout=120))
+                ["ssh"] + ssh_options.to_ssh_options_list(timeout=120))
         ]
         command += ["-avz"]
         command += self._create_rsync_filter_args(options=options)
@@ -652,6 +862,83 @@ class SSHCommandExecutor(CommandExecutor):
         self.cli_logger.verbose("Running `{}`", cf.bold(" ".join(command)))
         self._run_helper(command, silent=self.call_context.is_rsync_silent())
 
+    def get_host_path(self, path):
+        return path
+
+    def _install_rsync_relay_key(self, relay_key: SSHRelayKey):
+        with self.relay_lock:
+            if self.relay_key is relay_key:
+                return
+            assert self.relay_key is None, \
+                "Another relay key is installed on the node."
+            self.run_rsync_up(relay_key.private_key,
+                              relay_key.remote_private_key)
+            self.run("chmod 600 {}".format(relay_key.remote_private_key))
+            self.relay_key = relay_key
+
+    def _authorize_rsync_relay_key(self, relay_key: SSHRelayKey):
+        with self.relay_lock:
+            count = self.relay_keys_authorized.get(relay_key.name, 0)
+            if count == 0:
+                self.run(
+                    "mkdir -p ~/.ssh && chmod 700 ~/.ssh && "
+                    "echo {} >> ~/.ssh/authorized_keys".format(
+                        quote(relay_key.public_key)))
+            self.relay_keys_authorized[relay_key.name] = count + 1
+
+    def _revoke_rsync_relay_key(self, relay_key: SSHRelayKey):
+        with self.relay_lock:
+            count = self.relay_keys_authorized.pop(relay_key.name) - 1
+            if count > 0:
+                self.relay_keys_authorized[relay_key.name] = count
+                return
+            self.run("sed -i '/ {}$/d' ~/.ssh/authorized_keys".format(
+                relay_key.name))
+
+    def supports_rsync_relay(self):
+        # The nodes connect to each other directly
+        return not self.ssh_proxy_command
+
+    def run_rsync_relay(self, source_executor, source, target, relay_key,
+                        options=None):
+        source_ssh_executor = _get_ssh_command_executor(source_executor)
+        if source_ssh_executor is None or not self.supports_rsync_relay():
+            raise RuntimeError(
+                "Rsync relay requires SSH access between the nodes.")
+        self._set_ssh_ip_if_required()
+        source_ssh_executor._install_rsync_relay_key(relay_key)
+        self._authorize_rsync_relay_key(relay_key)
+        try:
+            self._run_rsync_relay(
+                source_ssh_executor, source_executor.get_host_path(source),
+                target, relay_key, options or {})
+        finally:
+            self._revoke_rsync_relay_key(relay_key)
+
+    def _run_rsync_relay(self, source_ssh_executor, source, target,
+                         relay_key, options):
+        ssh_options = SSHOptions(
+            self.call_context, relay_key.remote_private_key)
+        command = ["rsync"]
+        command += [
+            "--rsh",
+            quote(subprocess.list2cmdline(
+                ["ssh"] + ssh_options.to_ssh_options_list(timeout=120)))
+        ]
+        command += [
+            "--rsync-path",
+            quote("mkdir -p {} && rsync".format(
+                os.path.dirname(target.rstrip("/"))))
+        ]
+        command += ["-avz"]
+        command += [quote(arg)
+                    for arg in self._create_rsync_filter_args(options=options)]
+        command += [
+            source, "{}@{}:{}".format(self.ssh_user, self.ssh_ip, target)
+        ]
+        source_ssh_executor.run(
+            " ".join(command), silent=self.call_context.is_rsync_silent())
+
     def remote_shell_command_str(self):
         self._set_ssh_ip_if_required()
         command = "ssh -o IdentitiesOnly=yes"
@@ -719,6 +1006,15 @@ class SSHCommandExecutor(CommandExecutor):
         self.run(f"sudo chmod a+w {mount_path}")
 
 
+def _get_ssh_command_executor(cmd_executor):
+    # The executor running commands on the host of the node through SSH
+    if isinstance(cmd_executor, DockerCommandExecutor):
+        return cmd_executor.ssh_command_executor
+    if isinstance(cmd_executor, SSHCommandExecutor):
+        return cmd_executor
+    return None
+
+
 class DockerCommandExecutor(CommandExecutor):
     def __init__(self, call_context, docker_config, **common_args):
         CommandExecutor.__init__(self, call_context)
@@ -840,12 +1136,31 @@ class DockerCommandExecutor(CommandExecutor):
         self.ssh_command_executor.run_rsync_down(
             host_source, target, options=options)
 
+    def get_host_path(self, path):
+        return os.path.join(
+            self._get_docker_host_mount_location(
+                self.ssh_command_executor.cluster_name), path.lstrip("/"))
+
+    def supports_rsync_relay(self):
+        return self.ssh_command_executor.supports_rsync_relay()
+
+    def run_rsync_relay(self, source_executor, source, target, relay_key,
+                        options=None):
+        # The files are synced to the host mount location of the node
+        # which is mounted in the container
+        self.ssh_command_executor.run_rsync_relay(
+            source_executor, source, self.get_host_path(target), relay_key,
+            options=options)
+
     def remote_shell_command_str(self):
         inner_str = self.ssh_command_executor.remote_shell_command_str().replace(
             "ssh", "ssh -tt", 1).strip("\n")
         return inner_str + " {} exec -it {} /bin/bash\n".format(
             self.docker_cmd, self.container_name)
 
+    def close(self):
+        self.ssh_command_executor.close()
+
     def _check_docker_installed(self):
         no_exist = "NoExist"
         output = self.ssh_command_executor.run(
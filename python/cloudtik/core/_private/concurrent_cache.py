@@ -1,21 +1,114 @@
 import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class _Loading:
+    """The state of a key being loaded which other threads can wait for."""
+    def __init__(self):
+        self.thread_id = threading.get_ident()
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
 
 
 class ConcurrentObjectCache:
     """An object cache which is thread safe.
+
+    The number of objects can be bounded by max_size with the least recently
+    used objects evicted first and the objects can expire after ttl_s seconds.
+    The lock of the cache is not held when loading an object so that the
+    objects of different keys can be loaded in parallel, while the concurrent
+    gets of the same key wait for a single load.
     """
-    def __init__(self):
-        self._lock = threading.RLock()
-        self._cache = {}
+    def __init__(self, max_size: Optional[int] = None,
+                 ttl_s: Optional[float] = None):
+        self._max_size = max_size
+        self._ttl_s = ttl_s
+        self._lock = threading.Lock()
+        # key -> (value, load time) in the order of least recent use
+        self._cache = OrderedDict()
+        self._loading: Dict[Any, _Loading] = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
 
     def get(self, key, load_function, **load_args):
         with self._lock:
-            if key in self._cache:
-                return self._cache[key]
+            entry = self._cache.get(key)
+            if entry is not None:
+                if self._is_expired(entry):
+                    del self._cache[key]
+                    self._expirations += 1
+                else:
+                    self._cache.move_to_end(key)
+                    self._hits += 1
+                    return entry[0]
+
+            loading = self._loading.get(key)
+            if loading is None:
+                loading = _Loading()
+                self._loading[key] = loading
+                self._misses += 1
+                owner = True
+            elif loading.thread_id == threading.get_ident():
+                # Loading the same key again while loading it
+                self._misses += 1
+                loading = None
+                owner = False
+            else:
+                self._hits += 1
+                owner = False
+
+        if loading is None:
+            return load_function(**load_args)
+        if not owner:
+            loading.done.wait()
+            if loading.error is not None:
+                raise loading.error
+            return loading.value
+
+        try:
             value = load_function(**load_args)
-            self._cache[key] = value
-            return value
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            loading.error = e
+            loading.done.set()
+            raise
+
+        with self._lock:
+            del self._loading[key]
+            self._cache[key] = (value, time.monotonic())
+            self._cache.move_to_end(key)
+            self._evict()
+        loading.value = value
+        loading.done.set()
+        return value
 
     def clear(self):
         with self._lock:
-            self._cache = {}
+            self._cache = OrderedDict()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._cache),
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+    def _is_expired(self, entry) -> bool:
+        return self._ttl_s is not None and (
+            time.monotonic() - entry[1] >= self._ttl_s)
+
+    def _evict(self):
+        if self._max_size is None:
+            return
+        while len(self._cache) > self._max_size:
+            self._cache.popitem(last=False)
+            self._evictions += 1
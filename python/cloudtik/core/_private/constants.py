@@ -113,6 +113,14 @@ CLOUDTIK_NODE_START_WAIT_S = env_integer("CLOUDTIK_NODE_START_WAIT_S", 900)
 # Interval at which to check if node SSH became available.
 CLOUDTIK_NODE_SSH_INTERVAL_S = env_integer("CLOUDTIK_NODE_SSH_INTERVAL_S", 5)
 
+# How long the pooled SSH master connection to a node stays open after
+# the last command, in seconds.
+CLOUDTIK_SSH_CONTROL_PERSIST_S = env_integer("CLOUDTIK_SSH_CONTROL_PERSIST_S", 600)
+
+# Interval at which to check if the pooled SSH master connection is alive.
+CLOUDTIK_SSH_CONTROL_CHECK_INTERVAL_S = env_integer(
+    "CLOUDTIK_SSH_CONTROL_CHECK_INTERVAL_S", 30)
+
 # Abort autoscaling if more than this number of errors are encountered. This
 # is a safety feature to prevent e.g. runaway node launches.
 CLOUDTIK_MAX_NUM_FAILURES = env_integer("CLOUDTIK_MAX_NUM_FAILURES", 5)
@@ -122,13 +130,59 @@ CLOUDTIK_MAX_NUM_FAILURES = env_integer("CLOUDTIK_MAX_NUM_FAILURES", 5)
 # the limit of CLOUDTIK_MAX_CONCURRENT_LAUNCHES.
 CLOUDTIK_MAX_LAUNCH_BATCH = env_integer("CLOUDTIK_MAX_LAUNCH_BATCH", 5)
 
+# Max number of the runtime hashes cached for the config variants.
+CLOUDTIK_RUNTIME_HASH_CACHE_MAX_SIZE = env_integer(
+    "CLOUDTIK_RUNTIME_HASH_CACHE_MAX_SIZE", 64)
+
+# Max number of files of which the content hashes are cached by file stat.
+CLOUDTIK_FILE_HASH_CACHE_MAX_ENTRIES = env_integer(
+    "CLOUDTIK_FILE_HASH_CACHE_MAX_ENTRIES", 100000)
+
+# Whether to persist the file hash cache to the temp dir for reusing
+# across processes.
+CLOUDTIK_FILE_HASH_CACHE_PERSISTENT = env_bool(
+    "CLOUDTIK_FILE_HASH_CACHE_PERSISTENT", True)
+
+# Number of threads for hashing the files of file mounts.
+CLOUDTIK_FILE_HASH_PARALLELISM = env_integer(
+    "CLOUDTIK_FILE_HASH_PARALLELISM", 8)
+
+# Max number of file mounts to sync to a node at a time.
+CLOUDTIK_FILE_MOUNTS_SYNC_PARALLELISM = env_integer(
+    "CLOUDTIK_FILE_MOUNTS_SYNC_PARALLELISM", 4)
+
+# Whether to skip syncing the file mounts of which the content hashes
+# recorded on the node are not changed.
+CLOUDTIK_FILE_MOUNTS_SYNC_SKIP_UNCHANGED = env_bool(
+    "CLOUDTIK_FILE_MOUNTS_SYNC_SKIP_UNCHANGED", True)
+
 # Max number of nodes to launch at a time.
 CLOUDTIK_MAX_CONCURRENT_LAUNCHES = env_integer(
     "CLOUDTIK_MAX_CONCURRENT_LAUNCHES", 10)
 
+# Max number of the create, terminate and tag calls to a node provider
+# in flight at a time.
+CLOUDTIK_PROVIDER_MAX_CONCURRENT_CALLS = env_integer(
+    "CLOUDTIK_PROVIDER_MAX_CONCURRENT_CALLS", 16)
+
+# Max number of the create, terminate and tag calls to a node provider
+# started per second. Zero for no limit.
+CLOUDTIK_PROVIDER_MAX_CALLS_PER_SECOND = env_integer(
+    "CLOUDTIK_PROVIDER_MAX_CALLS_PER_SECOND", 0)
+
 # Interval at which to perform autoscaling updates.
 CLOUDTIK_UPDATE_INTERVAL_S = env_integer("CLOUDTIK_UPDATE_INTERVAL_S", 5)
 
+# Interval at which to re-sync the tags and ips of all the non-terminated nodes
+# from provider. In between, the cluster scaler maintains them incrementally.
+CLOUDTIK_NODE_STATE_FULL_SYNC_INTERVAL_S = env_integer(
+    "CLOUDTIK_NODE_STATE_FULL_SYNC_INTERVAL_S", 60)
+
+# Interval at which to re-list the non-terminated node ids from provider.
+# Zero for re-listing at every autoscaling update.
+CLOUDTIK_NODE_STATE_RELIST_INTERVAL_S = env_integer(
+    "CLOUDTIK_NODE_STATE_RELIST_INTERVAL_S", 0)
+
 # We will attempt to restart on nodes it hasn't heard from
 # in more than this interval.
 CLOUDTIK_HEARTBEAT_TIMEOUT_S = env_integer("CLOUDTIK_HEARTBEAT_TIMEOUT_S", 30)
@@ -136,6 +190,33 @@ CLOUDTIK_HEARTBEAT_TIMEOUT_S = env_integer("CLOUDTIK_HEARTBEAT_TIMEOUT_S", 30)
 CLOUDTIK_SCALING_STATE_TIMEOUT_S = env_integer("CLOUDTIK_SCALING_STATE_TIMEOUT_S", 5)
 CLOUDTIK_NODE_RESOURCE_STATE_TIMEOUT_S = env_integer("CLOUDTIK_NODE_RESOURCE_STATE_TIMEOUT_S", 5)
 
+# Interval at which to rewrite an unchanged node resource state in full.
+# In between, only the resource time of the unchanged state is refreshed.
+CLOUDTIK_NODE_RESOURCE_STATE_REPUBLISH_S = env_integer(
+    "CLOUDTIK_NODE_RESOURCE_STATE_REPUBLISH_S", 60)
+
+# The layout of the state tables in Redis: "keys" for a string key for each
+# record or "hash" for a hash for each table on each shard. All the processes
+# of a cluster must use the same layout.
+CLOUDTIK_STATE_TABLE_LAYOUT = os.environ.get("CLOUDTIK_STATE_TABLE_LAYOUT", "keys")
+
+# Whether the writes to the node table and the user state tables also record
+# a versioned change feed so that the readers read only the changed records.
+# The readers miss the changes of the writers without the change feed, so all
+# the processes of a cluster must use the same version to enable it.
+CLOUDTIK_STATE_TABLE_CHANGE_FEED = env_bool("CLOUDTIK_STATE_TABLE_CHANGE_FEED", False)
+
+# The max number of deleted records kept in the change feed of a table on each
+# shard. A reader missed the trimmed deletions will read a full snapshot.
+CLOUDTIK_STATE_TABLE_CHANGE_FEED_MAX_DELETED = env_integer(
+    "CLOUDTIK_STATE_TABLE_CHANGE_FEED_MAX_DELETED", 10000)
+
+# The encoding of the heartbeat and the resource state records: "json" for
+# the JSON records or "binary" for the compact binary records. The binary
+# records can be read only by the versions with the binary codecs, so all the
+# processes of a cluster must use the same version to enable binary.
+CLOUDTIK_STATE_RECORD_ENCODING = os.environ.get("CLOUDTIK_STATE_RECORD_ENCODING", "json")
+
 CLOUDTIK_HEARTBEAT_PERIOD_SECONDS = env_integer("CLOUDTIK_HEARTBEAT_PERIOD_SECONDS", 1)
 
 # The maximum number of nodes (including failed nodes) that the cluster scaler will
@@ -209,6 +290,7 @@ KV_NAMESPACE_SESSION = "session"
 
 LOG_MONITOR_MAX_OPEN_FILES = 200
 
+# The messages are JSON lists of the new lines of the log files
 LOG_FILE_CHANNEL = "CLOUDKIT_LOG_CHANNEL"
 
 DEFAULT_PROXY_PORT = 6000
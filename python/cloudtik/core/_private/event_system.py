@@ -15,6 +15,10 @@ class CreateClusterEvent(Enum):
         acquiring_new_head_node : Invoked before the head node is acquired.
         head_node_acquired : Invoked after the head node is acquired.
         ssh_control_acquired : Invoked when the node is being updated.
+        sync_file_mounts : Invoked before the file mounts are synced to a
+            node with the source node of the files (None for the head).
+        sync_file_mounts_completed : Invoked after the file mounts are synced
+            to a node.
         run_initialization_cmd : Invoked before all initialization
             commands are called and again before each initialization command.
         run_setup_cmd : Invoked before all setup commands are
@@ -32,6 +36,8 @@ class CreateClusterEvent(Enum):
     acquiring_new_head_node = auto()
     head_node_acquired = auto()
     ssh_control_acquired = auto()
+    sync_file_mounts = auto()
+    sync_file_mounts_completed = auto()
     run_initialization_cmd = auto()
     run_setup_cmd = auto()
     start_cloudtik_runtime = auto()
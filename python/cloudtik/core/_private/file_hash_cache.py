@@ -0,0 +1,119 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+FILE_HASH_CHUNK_SIZE = 2 ** 20
+
+# A file modified within this interval may be modified again within the
+# same mtime granularity without changing its stat, so it is not cached.
+_RACY_MODIFICATION_INTERVAL_NS = 2 * 10 ** 9
+
+
+def _file_stat_key(st: os.stat_result):
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+def hash_file(path: str) -> str:
+    hasher = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(FILE_HASH_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class FileHashCache:
+    """A thread safe LRU cache of the content hashes of files.
+
+    The hash of a file is reused as long as the size, the mtime and the inode
+    of the file are not changed. The cache can be persisted to a file so that
+    the hashes can be reused across processes.
+    """
+
+    def __init__(self, max_entries: int, cache_file: Optional[str] = None,
+                 parallelism: int = 1):
+        self.max_entries = max_entries
+        self.cache_file = cache_file
+        self.parallelism = parallelism
+        self._lock = threading.Lock()
+        # path -> (stat key, hash) in the order of least recent use
+        self._entries = OrderedDict()
+        self._dirty = False
+        self._loaded = False
+
+    def get_file_hash(self, path: str) -> str:
+        st = os.stat(path)
+        stat_key = _file_stat_key(st)
+        with self._lock:
+            self._load_if_needed()
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == stat_key:
+                self._entries.move_to_end(path)
+                return entry[1]
+
+        file_hash = hash_file(path)
+        if time.time_ns() - st.st_mtime_ns < _RACY_MODIFICATION_INTERVAL_NS:
+            return file_hash
+
+        with self._lock:
+            self._entries[path] = (stat_key, file_hash)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+        return file_hash
+
+    def get_file_hashes(self, paths: List[str]) -> List[str]:
+        """Return the hashes of the files in the same order. The files are
+        hashed in parallel."""
+        if self.parallelism <= 1 or len(paths) <= 1:
+            return [self.get_file_hash(path) for path in paths]
+        with ThreadPoolExecutor(
+                max_workers=min(self.parallelism, len(paths))) as executor:
+            return list(executor.map(self.get_file_hash, paths))
+
+    def save(self) -> None:
+        """Persist the cache to the cache file if there are changes."""
+        if self.cache_file is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = [[path, stat_key, file_hash]
+                       for path, (stat_key, file_hash) in self._entries.items()]
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp_file = "{}.{}.tmp".format(self.cache_file, os.getpid())
+            with open(tmp_file, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            logger.debug("Failed to save the file hash cache: {}".format(e))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries = OrderedDict()
+            self._dirty = True
+
+    def _load_if_needed(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.cache_file is None or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file) as f:
+                entries = json.load(f)
+            for path, stat_key, file_hash in entries[-self.max_entries:]:
+                self._entries[path] = (stat_key, file_hash)
+        except (OSError, ValueError) as e:
+            logger.debug("Failed to load the file hash cache: {}".format(e))
+            self._entries = OrderedDict()
@@ -0,0 +1,59 @@
+"""Codec of the messages published to the log channel.
+
+A message is a JSON list of the new lines of the log files. A compressed
+message starts with a format byte which never appears as the first byte of
+a JSON message ("[" or "{"), so the subscribers can decode the messages
+published in any format with decode_log_message.
+"""
+
+import json
+import zlib
+from typing import Any, Dict, List, Union
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+LOG_COMPRESSION_NONE = "none"
+LOG_COMPRESSION_ZLIB = "zlib"
+LOG_COMPRESSION_LZ4 = "lz4"
+
+LOG_FORMAT_ZLIB = 1
+LOG_FORMAT_LZ4 = 2
+
+
+def encode_log_message(records: List[Dict[str, Any]],
+                       compression: str = LOG_COMPRESSION_NONE,
+                       min_compress_bytes: int = 0) -> Union[str, bytes]:
+    """Encode the records to a message, compressed if not smaller than
+    min_compress_bytes. Fall back to zlib if lz4 is not available."""
+    data = json.dumps(records)
+    if compression == LOG_COMPRESSION_NONE or len(data) < min_compress_bytes:
+        return data
+    if compression not in [LOG_COMPRESSION_ZLIB, LOG_COMPRESSION_LZ4]:
+        raise ValueError("Unknown log compression: {}".format(compression))
+
+    raw = data.encode("utf-8")
+    if compression == LOG_COMPRESSION_LZ4 and lz4_frame is not None:
+        return bytes([LOG_FORMAT_LZ4]) + lz4_frame.compress(raw)
+    return bytes([LOG_FORMAT_ZLIB]) + zlib.compress(raw, 1)
+
+
+def decode_log_message(data: Union[bytes, str]) -> List[Dict[str, Any]]:
+    """Decode a message published in any of the formats to the records."""
+    if isinstance(data, bytes) and data and data[0] == LOG_FORMAT_ZLIB:
+        data = zlib.decompress(data[1:])
+    elif isinstance(data, bytes) and data and data[0] == LOG_FORMAT_LZ4:
+        if lz4_frame is None:
+            raise ValueError(
+                "The lz4 package is required to decode the log message.")
+        data = lz4_frame.decompress(data[1:])
+    elif isinstance(data, bytes) and data and data[0] not in b"[{":
+        raise ValueError("Unknown log message format: {}".format(data[0]))
+
+    records = json.loads(data)
+    # A single record published by the old versions
+    if isinstance(records, dict):
+        return [records]
+    return records
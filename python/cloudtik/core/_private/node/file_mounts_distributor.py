@@ -0,0 +1,136 @@
+import logging
+import threading
+from typing import List, Optional, Tuple
+
+from cloudtik.core._private.command_executor import SSHRelayKey
+from cloudtik.core.command_executor import CommandExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class FileMountsDistributor:
+    """Distribute the file mounts from the head to the workers in a tree.
+
+    The workers which have synced the file mounts become the sources of the
+    file mounts for the other workers. Each source including the head syncs
+    to at most fan_out workers at a time, so the number of nodes having the
+    file mounts grows by fan_out times in each round instead of by fan_out.
+
+    A distributor is for one version of the file mounts contents. A new
+    distributor is created when the contents are changed.
+
+    The distributor owns the command executors of the sources added. They
+    are closed when the sources are removed or the distributor is closed
+    and no nodes are syncing from them.
+
+    The workers sync to each other with an ephemeral relay key of the
+    distributor instead of the cluster key. The key is removed from a source
+    when its executor is closed and deleted when the distributor is closed.
+    """
+
+    def __init__(self, fan_out: int):
+        assert fan_out > 0
+        self.fan_out = fan_out
+        self._cond = threading.Condition()
+        # The source node id (None for the head) -> the command executor
+        # of the source and the number of the nodes being synced from it
+        self._sources = {None: [None, 0]}
+        # The sources removed which are closed after the syncs are done
+        self._removed_sources = {}
+        self._closed = False
+        self._relay_key = None
+        self._relay_key_lock = threading.Lock()
+
+    def acquire_source(self) -> Tuple[Optional[str], Optional[CommandExecutor]]:
+        """Wait for a source which is not syncing to fan_out nodes and return
+        the node id and the command executor of the source. The least busy
+        source is chosen with the workers preferred over the head."""
+        with self._cond:
+            while True:
+                syncing, _, source_id = min(
+                    (syncing, node_id is None, node_id)
+                    for node_id, (_, syncing) in self._sources.items())
+                if syncing < self.fan_out:
+                    source = self._sources[source_id]
+                    source[1] += 1
+                    return source_id, source[0]
+                self._cond.wait()
+
+    def release_source(self, source_id: Optional[str], failed: bool = False):
+        """Release the source acquired. A failed worker source is not used
+        any longer."""
+        executors_to_close = []
+        with self._cond:
+            source = self._removed_sources.get(source_id)
+            if source is not None:
+                source[1] -= 1
+                if source[1] == 0:
+                    del self._removed_sources[source_id]
+                    executors_to_close.append(source[0])
+            else:
+                source = self._sources.get(source_id)
+                if source is not None:
+                    source[1] -= 1
+                    if failed and source_id is not None:
+                        logger.info(
+                            "Stop syncing file mounts from node {}.".format(
+                                source_id))
+                        self._remove_source(source_id, executors_to_close)
+            self._cond.notify_all()
+        _close_executors(executors_to_close)
+
+    def add_source(self, node_id: str, cmd_executor: CommandExecutor):
+        """Add the node as a source. The distributor takes the ownership of
+        the command executor which should not be used by the caller."""
+        with self._cond:
+            if self._closed or node_id in self._sources:
+                added = False
+            else:
+                self._sources[node_id] = [cmd_executor, 0]
+                added = True
+            self._cond.notify_all()
+        if not added:
+            _close_executors([cmd_executor])
+
+    def get_relay_key(self) -> SSHRelayKey:
+        """Return the relay key of the distribution, created on first use."""
+        with self._relay_key_lock:
+            if self._closed:
+                raise RuntimeError("The file mounts distributor is closed.")
+            if self._relay_key is None:
+                self._relay_key = SSHRelayKey()
+            return self._relay_key
+
+    def close(self):
+        """Stop syncing from the workers and close their command executors
+        when the syncs from them are done. The local relay key is deleted."""
+        executors_to_close = []
+        with self._cond:
+            self._closed = True
+            for source_id in list(self._sources.keys()):
+                if source_id is not None:
+                    self._remove_source(source_id, executors_to_close)
+            self._cond.notify_all()
+        _close_executors(executors_to_close)
+        with self._relay_key_lock:
+            if self._relay_key is not None:
+                self._relay_key.delete()
+
+    def _remove_source(self, source_id, executors_to_close: List):
+        source = self._sources.pop(source_id)
+        if source[1] > 0:
+            self._removed_sources[source_id] = source
+        else:
+            executors_to_close.append(source[0])
+
+
+def _close_executors(executors):
+    for cmd_executor in executors:
+        if cmd_executor is None:
+            continue
+        try:
+            cmd_executor.close()
+        except Exception as e:
+            logger.warning(
+                "Failed to close the command executor of the file mounts "
+                "source: {}".format(e))
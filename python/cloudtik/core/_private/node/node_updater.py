@@ -1,13 +1,18 @@
 import click
+import hashlib
+import json
 import logging
 import os
 import subprocess
 import time
+from concurrent.futures import ThreadPoolExecutor
+from shlex import quote
 from typing import Dict
 from threading import Thread
 
 from cloudtik.core._private.utils import with_runtime_environment_variables, with_node_ip_environment_variables, \
-    _get_cluster_uri, _is_use_internal_ip, get_node_type, with_environment_variables_from_config
+    _get_cluster_uri, _is_use_internal_ip, get_node_type, with_environment_variables_from_config, \
+    add_content_hashes
 from cloudtik.core.command_executor import get_cmd_to_print
 from cloudtik.core.tags import CLOUDTIK_TAG_NODE_STATUS, CLOUDTIK_TAG_RUNTIME_CONFIG, \
     CLOUDTIK_TAG_FILE_MOUNTS_CONTENTS, \
@@ -20,7 +25,8 @@ from cloudtik.core._private.log_timer import LogTimer
 from cloudtik.core._private.cli_logger import cf, CliLogger
 import cloudtik.core._private.subprocess_output_util as cmd_output_util
 from cloudtik.core._private.constants import CLOUDTIK_RESOURCES_ENV, CLOUDTIK_RUNTIME_ENV_NODE_NUMBER, \
-    CLOUDTIK_RUNTIME_ENV_NODE_TYPE, CLOUDTIK_RUNTIME_ENV_PROVIDER_TYPE
+    CLOUDTIK_RUNTIME_ENV_NODE_TYPE, CLOUDTIK_RUNTIME_ENV_PROVIDER_TYPE, CLOUDTIK_FILE_MOUNTS_SYNC_PARALLELISM, \
+    CLOUDTIK_FILE_MOUNTS_SYNC_SKIP_UNCHANGED
 from cloudtik.core._private.event_system import (CreateClusterEvent,
                                                   global_event_system)
 
@@ -31,6 +37,9 @@ READY_CHECK_INTERVAL = 5
 
 SETUP_COMMAND_DEFAULT_NUMBER_OF_RETRIES = 5
 
+# The content hashes of the file mounts synced to the node
+FILE_MOUNTS_SYNC_STATE_FILE = "~/.cloudtik/file_mounts.json"
+
 
 class NodeUpdater:
     """A process for syncing files and running init commands on a node.
@@ -60,6 +69,8 @@ class NodeUpdater:
         for_recovery: True if updater is for a recovering node. Only used for
             metric tracking.
         runtime_config: The runtime configuration may be needed for running node commands
+        file_mounts_distributor: If set, the file mounts are synced from the
+            head or the other updated nodes through it.
     """
 
     def __init__(self,
@@ -86,16 +97,18 @@ class NodeUpdater:
                  restart_only=False,
                  for_recovery=False,
                  runtime_config=None,
-                 environment_variables: Dict[str, object] = None):
+                 environment_variables: Dict[str, object] = None,
+                 file_mounts_distributor=None):
         self.config = config
         self.call_context = call_context
         self.log_prefix = "NodeUpdater: {}: ".format(node_id)
         use_internal_ip = (use_internal_ip
                            or _is_use_internal_ip(provider_config))
-        self.cmd_executor = provider.get_command_executor(
-            self.call_context,
+        self._cmd_executor_args = (
             self.log_prefix, node_id, auth_config, cluster_name,
             process_runner, use_internal_ip, docker_config)
+        self.cmd_executor = provider.get_command_executor(
+            self.call_context, *self._cmd_executor_args)
 
         self.daemon = True
         self.node_id = node_id
@@ -133,11 +146,17 @@ class NodeUpdater:
         self.runtime_config = runtime_config
         self.cluster_uri = _get_cluster_uri(self.provider_type, cluster_name)
         self.environment_variables = environment_variables
+        self.file_mounts_distributor = file_mounts_distributor
 
     @property
     def cli_logger(self) -> CliLogger:
         return self.call_context.cli_logger
 
+    def close(self):
+        """Release the connections to the node held by the command executor.
+        The updater can still be used after closing."""
+        self.cmd_executor.close()
+
     def run(self):
         update_start_time = time.time()
         if self.call_context.does_allow_interactive(
@@ -175,6 +194,9 @@ class NodeUpdater:
                 # todo: why do we ignore this here
                 return
             raise
+        finally:
+            # Tear down the connections to the node used by the update
+            self.close()
 
         tags_to_set = {
             CLOUDTIK_TAG_NODE_STATUS: STATUS_UP_TO_DATE,
@@ -190,8 +212,10 @@ class NodeUpdater:
         self.update_time = time.time() - update_start_time
         self.exitcode = 0
 
-    def sync_file_mounts(self, sync_cmd, step_numbers=(1, 2)):
+    def sync_file_mounts(self, sync_cmd, step_numbers=(1, 2), upload=True):
         # step_numbers is (# of previous steps, total steps)
+        # The unchanged file mounts are skipped only for uploading because
+        # the hashes saved on the node are of the local contents uploaded.
         current_step, total_steps = step_numbers
 
         nolog_paths = []
@@ -200,14 +224,12 @@ class NodeUpdater:
                 "~/cloudtik_bootstrap_key.pem", "~/cloudtik_bootstrap_config.yaml"
             ]
 
-        def do_sync(remote_path, local_path, allow_non_existing_paths=False):
+        def plan_sync(remote_path, local_path, allow_non_existing_paths=False):
             if allow_non_existing_paths and not os.path.exists(local_path):
-                self.cli_logger.print("sync: {} does not exist. Skipping.",
-                                 local_path)
                 # Ignore missing source files. In the future we should support
                 # the --delete-missing-args command to delete files that have
                 # been removed
-                return
+                return None
 
             assert os.path.exists(local_path), local_path
 
@@ -216,16 +238,12 @@ class NodeUpdater:
                     local_path += "/"
                 if not remote_path.endswith("/"):
                     remote_path += "/"
+            return remote_path, local_path
 
+        def do_sync(sync_path):
+            remote_path, local_path = sync_path
             with LogTimer(self.log_prefix +
                           "Synced {} to {}".format(local_path, remote_path)):
-                is_docker = (self.docker_config
-                             and self.docker_config.get("enabled", False))
-                if not is_docker:
-                    # The DockerCommandRunner handles this internally.
-                    self.cmd_executor.run(
-                        "mkdir -p {}".format(os.path.dirname(remote_path)),
-                        run_env="host")
                 sync_cmd(
                     local_path, remote_path, docker_mount_if_possible=True)
 
@@ -234,12 +252,48 @@ class NodeUpdater:
                     self.cli_logger.print("{} from {}", cf.bold(remote_path),
                                      cf.bold(local_path))
 
+        file_mounts = [
+            plan_sync(remote_path, local_path)
+            for remote_path, local_path in self.file_mounts.items()]
+        synced_files = [
+            plan_sync(path, path, allow_non_existing_paths=True)
+            for path in self.cluster_synced_files]
+        sync_paths = [sync_path for sync_path in file_mounts + synced_files
+                      if sync_path is not None]
+        synced_hashes = self._prepare_sync_paths(
+            sync_paths, read_synced_hashes=upload)
+        sync_hashes = self._get_sync_hashes(sync_paths) if upload else {}
+        old_synced_hashes = dict(synced_hashes)
+
+        def sync_all(sync_paths_to_sync):
+            to_sync = []
+            for sync_path in sync_paths_to_sync:
+                remote_path, local_path = sync_path
+                sync_hash = sync_hashes.get(remote_path)
+                if sync_hash is not None and synced_hashes.get(
+                        remote_path) == sync_hash:
+                    self.cli_logger.print("{} from {} is up to date. Skipping.",
+                                     cf.bold(remote_path), cf.bold(local_path))
+                else:
+                    to_sync.append(sync_path)
+            if len(to_sync) <= 1 or CLOUDTIK_FILE_MOUNTS_SYNC_PARALLELISM <= 1:
+                for sync_path in to_sync:
+                    do_sync(sync_path)
+            else:
+                # The file mounts are independent of each other
+                with ThreadPoolExecutor(max_workers=min(
+                        CLOUDTIK_FILE_MOUNTS_SYNC_PARALLELISM,
+                        len(to_sync))) as executor:
+                    list(executor.map(do_sync, to_sync))
+            for remote_path, _ in to_sync:
+                if remote_path in sync_hashes:
+                    synced_hashes[remote_path] = sync_hashes[remote_path]
+
         # Rsync file mounts
         with self.cli_logger.group(
                 "Processing file mounts",
                 _numbered=("[]", current_step, total_steps)):
-            for remote_path, local_path in self.file_mounts.items():
-                do_sync(remote_path, local_path)
+            sync_all(file_mounts)
             current_step += 1
 
         if self.cluster_synced_files:
@@ -248,14 +302,133 @@ class NodeUpdater:
                     _numbered=("[]", current_step, total_steps)):
                 self.cli_logger.print("synced files: {}",
                                  str(self.cluster_synced_files))
-                for path in self.cluster_synced_files:
-                    do_sync(path, path, allow_non_existing_paths=True)
+                for path, sync_path in zip(self.cluster_synced_files, synced_files):
+                    if sync_path is None:
+                        self.cli_logger.print("sync: {} does not exist. Skipping.",
+                                         path)
+                sync_all([sync_path for sync_path in synced_files
+                          if sync_path is not None])
                 current_step += 1
         else:
             self.cli_logger.print(
                 "No worker file mounts to sync",
                 _numbered=("[]", current_step, total_steps))
 
+        if upload and synced_hashes != old_synced_hashes:
+            self._save_synced_hashes(synced_hashes)
+
+    def _prepare_sync_paths(self, sync_paths, read_synced_hashes=True):
+        """Create the parent directories of the paths to sync and get the
+        content hashes of the synced paths on the node in one command."""
+        cmds = []
+        is_docker = (self.docker_config
+                     and self.docker_config.get("enabled", False))
+        if not is_docker:
+            # The DockerCommandRunner handles this internally.
+            remote_dirs = sorted(set(
+                os.path.dirname(remote_path) for remote_path, _ in sync_paths))
+            remote_dirs = [remote_dir for remote_dir in remote_dirs if remote_dir]
+            if remote_dirs:
+                cmds.append("mkdir -p {}".format(" ".join(remote_dirs)))
+        if not (CLOUDTIK_FILE_MOUNTS_SYNC_SKIP_UNCHANGED and
+                read_synced_hashes):
+            if cmds:
+                self.cmd_executor.run(" && ".join(cmds), run_env="host")
+            return {}
+
+        cmds.append("{{ cat {} 2>/dev/null || true; }}".format(
+            FILE_MOUNTS_SYNC_STATE_FILE))
+        output = self.cmd_executor.run(
+            " && ".join(cmds), with_output=True, run_env="host")
+        try:
+            if isinstance(output, bytes):
+                output = output.decode("utf-8")
+            synced_hashes = json.loads(output)
+            if isinstance(synced_hashes, dict):
+                return synced_hashes
+        except ValueError:
+            pass
+        return {}
+
+    def _get_sync_hashes(self, sync_paths):
+        if not CLOUDTIK_FILE_MOUNTS_SYNC_SKIP_UNCHANGED:
+            return {}
+        rsync_options_str = json.dumps(
+            self.rsync_options, sort_keys=True).encode("utf-8")
+        sync_hashes = {}
+        for remote_path, local_path in sync_paths:
+            hasher = hashlib.sha1()
+            hasher.update(rsync_options_str)
+            hasher.update(local_path.encode("utf-8"))
+            add_content_hashes(hasher, local_path)
+            sync_hashes[remote_path] = hasher.hexdigest()
+        return sync_hashes
+
+    def _save_synced_hashes(self, synced_hashes):
+        if not CLOUDTIK_FILE_MOUNTS_SYNC_SKIP_UNCHANGED:
+            return
+        self.cmd_executor.run(
+            "mkdir -p {} && printf '%s' {} > {}".format(
+                os.path.dirname(FILE_MOUNTS_SYNC_STATE_FILE),
+                quote(json.dumps(synced_hashes, sort_keys=True)),
+                FILE_MOUNTS_SYNC_STATE_FILE),
+            run_env="host")
+
+    def distribute_file_mounts(self, step_numbers=(1, 2)):
+        distributor = self.file_mounts_distributor
+        if not self.cmd_executor.supports_rsync_relay():
+            # Synced from the head without the distributor
+            distributor = None
+        if distributor is None:
+            source_id = None
+            source_executor = None
+        else:
+            source_id, source_executor = distributor.acquire_source()
+
+        global_event_system.execute_callback(
+            self.cluster_uri,
+            CreateClusterEvent.sync_file_mounts,
+            {"node_id": self.node_id, "source": source_id})
+
+        failed = False
+        try:
+            if source_executor is None:
+                self.sync_file_mounts(self.rsync_up, step_numbers=step_numbers)
+            else:
+                try:
+                    relay_key = distributor.get_relay_key()
+
+                    def rsync_relay(
+                            source, target, docker_mount_if_possible=False):
+                        # The files have been synced to the same target on
+                        # the source
+                        self.rsync_relay(
+                            source_executor, target, target, relay_key)
+
+                    self.sync_file_mounts(rsync_relay, step_numbers=step_numbers)
+                except Exception as e:
+                    failed = True
+                    self.cli_logger.warning(
+                        "Failed to sync file mounts from node {}: {}. "
+                        "Syncing from the head.", source_id, str(e))
+                    self.sync_file_mounts(self.rsync_up, step_numbers=step_numbers)
+        finally:
+            if distributor is not None:
+                distributor.release_source(source_id, failed=failed)
+
+        if distributor is not None:
+            # This node can now sync the file mounts to the other nodes.
+            # The distributor owns a separate executor of the node because
+            # the executor of the updater is closed when the update is done.
+            distributor.add_source(
+                self.node_id, self.provider.get_command_executor(
+                    self.call_context, *self._cmd_executor_args))
+
+        global_event_system.execute_callback(
+            self.cluster_uri,
+            CreateClusterEvent.sync_file_mounts_completed,
+            {"node_id": self.node_id, "source": source_id})
+
     def wait_ready(self, deadline):
         with self.cli_logger.group(
                 "Waiting for SSH to become available",
@@ -405,8 +578,7 @@ class NodeUpdater:
             self.provider.set_node_tags(
                 self.node_id, {CLOUDTIK_TAG_NODE_STATUS: STATUS_SYNCING_FILES})
             self.cli_logger.labeled_value("New status", STATUS_SYNCING_FILES)
-            self.sync_file_mounts(
-                self.rsync_up, step_numbers=(3, NUM_SETUP_STEPS))
+            self.distribute_file_mounts(step_numbers=(3, NUM_SETUP_STEPS))
 
             # Only run setup commands if runtime_hash has changed because
             # we don't want to run setup_commands every time the head node
@@ -449,6 +621,11 @@ class NodeUpdater:
                 _numbered=("[]", 8, NUM_SETUP_STEPS)):
             self._exec_start_commands(runtime_envs)
 
+    def _is_batch_commands(self, commands):
+        # Run the commands of a group in one remote session. The profile is
+        # read once by the session, so it is enabled only on request.
+        return len(commands) > 1 and self.config.get("batch_commands", False)
+
     def get_cmd_to_print(self, cmd):
         verbose = False if self.cli_logger.verbosity == 0 else True
         return get_cmd_to_print(cmd, verbose)
@@ -462,6 +639,15 @@ class NodeUpdater:
         self.cli_logger.verbose("`rsync`ed {} (local) to {} (remote)",
                            cf.bold(source), cf.bold(target))
 
+    def rsync_relay(self, source_executor, source, target, relay_key):
+        options = {}
+        options["rsync_exclude"] = self.rsync_options.get("rsync_exclude")
+        options["rsync_filter"] = self.rsync_options.get("rsync_filter")
+        self.cmd_executor.run_rsync_relay(
+            source_executor, source, target, relay_key, options=options)
+        self.cli_logger.verbose("`rsync`ed {} (remote) to {} (remote)",
+                           cf.bold(source), cf.bold(target))
+
     def rsync_down(self, source, target, docker_mount_if_possible=False):
         options = {}
         options["docker_mount_if_possible"] = docker_mount_if_possible
@@ -481,6 +667,10 @@ class NodeUpdater:
                 show_status=True):
             for command_group in self.initialization_commands:
                 commands = command_group.get("commands", [])
+                if self._is_batch_commands(commands):
+                    self._exec_initialization_command_batch(
+                        commands, runtime_envs)
+                    continue
                 for cmd in commands:
                     self._exec_initialization_command(cmd, runtime_envs)
 
@@ -513,6 +703,32 @@ class NodeUpdater:
                 "Initialization command failed."
             ) from None
 
+    def _exec_initialization_command_batch(self, commands, runtime_envs):
+        for cmd in commands:
+            global_event_system.execute_callback(
+                self.cluster_uri,
+                CreateClusterEvent.run_initialization_cmd,
+                {"node_id": self.node_id, "command": cmd})
+        try:
+            # Run outside docker with the ssh_private_key.
+            self.cmd_executor.run_batch_with_retry(
+                commands,
+                environment_variables=runtime_envs,
+                ssh_options_override_ssh_key=self.auth_config.get("ssh_private_key"),
+                run_env="host",
+                number_of_retries=self.config.get("number_of_retries"),
+                retry_interval=self.config.get("retry_interval")
+            )
+        except ProcessRunnerError as e:
+            if e.msg_type == "ssh_command_failed":
+                self.cli_logger.error("Failed.")
+                self.cli_logger.error(
+                    "See above for stderr.")
+
+            raise click.ClickException(
+                "Initialization command failed."
+            ) from None
+
     def _exec_setup_commands(self, runtime_envs):
         global_event_system.execute_callback(
             self.cluster_uri,
@@ -530,6 +746,9 @@ class NodeUpdater:
                         command_group_name,
                         _numbered=("()", i + 1, total)):
                     commands = command_group.get("commands", [])
+                    if self._is_batch_commands(commands):
+                        self._exec_setup_command_batch(commands, runtime_envs)
+                        continue
                     for cmd in commands:
                         self._exec_setup_command(cmd, runtime_envs)
 
@@ -561,6 +780,36 @@ class NodeUpdater:
             raise click.ClickException(
                 "Setup command failed.")
 
+    def _exec_setup_command_batch(self, commands, runtime_envs):
+        for cmd in commands:
+            global_event_system.execute_callback(
+                self.cluster_uri,
+                CreateClusterEvent.run_setup_cmd,
+                {"node_id": self.node_id, "command": cmd})
+            cmd_to_print = self.get_cmd_to_print(cmd)
+            self.cli_logger.print("- {}", cmd_to_print)
+
+        if self.config.get("retry_setup_command", True):
+            number_of_retries = self.config.get(
+                "number_of_retries", SETUP_COMMAND_DEFAULT_NUMBER_OF_RETRIES)
+        else:
+            number_of_retries = 1
+        try:
+            # Runs in the container if docker is in use
+            self.cmd_executor.run_batch_with_retry(
+                commands, environment_variables=runtime_envs, run_env="auto",
+                number_of_retries=number_of_retries,
+                retry_interval=self.config.get("retry_interval")
+            )
+        except ProcessRunnerError as e:
+            if e.msg_type == "ssh_command_failed":
+                self.cli_logger.error("Failed.")
+                self.cli_logger.error(
+                    "See above for stderr.")
+
+            raise click.ClickException(
+                "Setup command failed.")
+
     def _exec_start_commands(self, runtime_envs):
         global_event_system.execute_callback(
             self.cluster_uri,
@@ -576,6 +825,9 @@ class NodeUpdater:
                         command_group_name,
                         _numbered=("()", i + 1, total)):
                     commands = command_group.get("commands", [])
+                    if self._is_batch_commands(commands):
+                        self._exec_start_command_batch(commands, runtime_envs)
+                        continue
                     for cmd in commands:
                         self._exec_start_command(cmd, runtime_envs)
         global_event_system.execute_callback(
@@ -583,7 +835,7 @@ class NodeUpdater:
             CreateClusterEvent.start_cloudtik_runtime_completed,
             {"node_id": self.node_id})
 
-    def _exec_start_command(self, cmd, runtime_envs):
+    def _get_start_environment_variables(self, runtime_envs):
         # Add a resource override env variable if needed:
         if self.provider_type == "local":
             # Local NodeProvider doesn't need resource override.
@@ -595,6 +847,10 @@ class NodeUpdater:
         else:
             env_vars = {}
         env_vars.update(runtime_envs)
+        return env_vars
+
+    def _exec_start_command(self, cmd, runtime_envs):
+        env_vars = self._get_start_environment_variables(runtime_envs)
 
         cmd_to_print = self.get_cmd_to_print(cmd)
         self.cli_logger.print("- {}", cmd_to_print)
@@ -615,6 +871,30 @@ class NodeUpdater:
 
             raise click.ClickException("Start command failed.")
 
+    def _exec_start_command_batch(self, commands, runtime_envs):
+        env_vars = self._get_start_environment_variables(runtime_envs)
+
+        for cmd in commands:
+            cmd_to_print = self.get_cmd_to_print(cmd)
+            self.cli_logger.print("- {}", cmd_to_print)
+
+        try:
+            old_redirected = self.call_context.is_output_redirected()
+            self.call_context.set_output_redirected(False)
+            # Runs in the container if docker is in use
+            self.cmd_executor.run_batch_with_retry(
+                commands,
+                environment_variables=env_vars,
+                run_env="auto",
+                number_of_retries=1)
+            self.call_context.set_output_redirected(old_redirected)
+        except ProcessRunnerError as e:
+            if e.msg_type == "ssh_command_failed":
+                self.cli_logger.error("Failed.")
+                self.cli_logger.error("See above for stderr.")
+
+            raise click.ClickException("Start command failed.")
+
     def exec_commands(self, action_name, commands, envs):
         with LogTimer(
                 self.log_prefix + "Exec commands", show_status=True):
@@ -627,6 +907,9 @@ class NodeUpdater:
                         command_group_name,
                         _numbered=("()", i + 1, total)):
                     commands = command_group.get("commands", [])
+                    if self._is_batch_commands(commands):
+                        self._exec_command_batch(commands, envs)
+                        continue
                     for cmd in commands:
                         self._exec_command(cmd, envs)
 
@@ -651,6 +934,29 @@ class NodeUpdater:
 
             raise click.ClickException("Exec command failed.")
 
+    def _exec_command_batch(self, commands, envs):
+        env_vars = {}
+        if envs:
+            env_vars.update(envs)
+
+        for cmd in commands:
+            cmd_to_print = self.get_cmd_to_print(cmd)
+            self.cli_logger.print("- {}", cmd_to_print)
+
+        try:
+            # Runs in the container if docker is in use
+            self.cmd_executor.run_batch_with_retry(
+                commands,
+                environment_variables=env_vars,
+                run_env="auto",
+                number_of_retries=1)
+        except ProcessRunnerError as e:
+            if e.msg_type == "ssh_command_failed":
+                self.cli_logger.error("Failed.")
+                self.cli_logger.error("See above for stderr.")
+
+            raise click.ClickException("Exec command failed.")
+
 
 class NodeUpdaterThread(NodeUpdater, Thread):
     def __init__(self, *args, **kwargs):
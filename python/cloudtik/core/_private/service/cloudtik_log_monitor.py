@@ -1,7 +1,6 @@
 import argparse
 import errno
 import glob
-import json
 import logging.handlers
 import os
 import platform
@@ -9,11 +8,15 @@ import re
 import shutil
 import time
 import traceback
+from collections import defaultdict
 
 import cloudtik.core._private.constants as constants
 import cloudtik.core._private.services as services
 import cloudtik.core._private.utils as utils
+from cloudtik.core._private.log_codec import encode_log_message, \
+    LOG_COMPRESSION_NONE
 from cloudtik.core._private.logging_utils import setup_component_logger
+from cloudtik.core._private.service.log_dir_watcher import LogDirWatcher
 
 # TODO (haifeng): check what is this comment about
 # Logger for this module. It should be configured at the entry point
@@ -34,6 +37,77 @@ LOG_NAME_UPDATE_INTERVAL_S = float(
 # log monitor start giving backpressure to lower cpu usages.
 LOG_MONITOR_MANY_FILES_THRESHOLD = int(
     os.getenv("CLOUDTIK_LOG_MONITOR_MANY_FILES_THRESHOLD", 1000))
+# The max bytes to read from a file at a time.
+LOG_MONITOR_READ_CHUNK_BYTES = int(
+    os.getenv("CLOUDTIK_LOG_MONITOR_READ_CHUNK_BYTES", 1024 * 1024))
+# The new lines of the files are published in one batch when the lines
+# are more than the max bytes or the first lines are older than the interval.
+LOG_MONITOR_BATCH_MAX_BYTES = int(
+    os.getenv("CLOUDTIK_LOG_MONITOR_BATCH_MAX_BYTES", 1024 * 1024))
+LOG_MONITOR_BATCH_INTERVAL_S = float(
+    os.getenv("CLOUDTIK_LOG_MONITOR_BATCH_INTERVAL_S", 0.1))
+# The interval to rescan the log directory when watching it by inotify.
+LOG_MONITOR_RESCAN_INTERVAL_S = float(
+    os.getenv("CLOUDTIK_LOG_MONITOR_RESCAN_INTERVAL_S", 10))
+# The max bytes of the lines per second published for all the files of the
+# node. Over the rate, the files are not read until the rate allows.
+# Zero for no limit.
+LOG_MONITOR_NODE_RATE_BYTES = int(
+    os.getenv("CLOUDTIK_LOG_MONITOR_NODE_RATE_BYTES", 4 * 1024 * 1024))
+# The max bytes of the lines per second published for a file. The lines of
+# a file over the rate are dropped. Zero for no limit.
+LOG_MONITOR_FILE_RATE_BYTES = int(
+    os.getenv("CLOUDTIK_LOG_MONITOR_FILE_RATE_BYTES", 1024 * 1024))
+# The seconds of the rates allowed in a burst.
+LOG_MONITOR_RATE_BURST_S = float(
+    os.getenv("CLOUDTIK_LOG_MONITOR_RATE_BURST_S", 2))
+# The interval to publish the summary of the lines dropped.
+LOG_MONITOR_DROPPED_SUMMARY_INTERVAL_S = float(
+    os.getenv("CLOUDTIK_LOG_MONITOR_DROPPED_SUMMARY_INTERVAL_S", 10))
+# The compression of the batches published: none, zlib or lz4.
+LOG_MONITOR_COMPRESSION = os.getenv(
+    "CLOUDTIK_LOG_MONITOR_COMPRESSION", LOG_COMPRESSION_NONE)
+# The batches smaller than this are not compressed.
+LOG_MONITOR_COMPRESSION_MIN_BYTES = int(
+    os.getenv("CLOUDTIK_LOG_MONITOR_COMPRESSION_MIN_BYTES", 1024))
+
+
+class TokenBucket:
+    """A token bucket of the bytes allowed at a rate with a burst capacity.
+
+    The bytes consumed may be more than the tokens available, in which case
+    no tokens are available until the debt is refilled.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_time = time.monotonic()
+
+    def available(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.last_time) * self.rate)
+        self.last_time = now
+        return self.tokens
+
+    def consume(self, amount):
+        self.available()
+        self.tokens -= amount
+
+    def wait_time(self):
+        """The seconds to wait for any tokens available."""
+        tokens = self.available()
+        if tokens > 0:
+            return 0
+        return -tokens / self.rate + 0.001
+
+
+def _create_token_bucket(rate):
+    if rate <= 0:
+        return None
+    return TokenBucket(rate, rate * LOG_MONITOR_RATE_BURST_S)
 
 
 class LogFileInfo:
@@ -56,6 +130,9 @@ class LogFileInfo:
         self.worker_pid = worker_pid
         self.actor_name = None
         self.task_name = None
+        # The last incomplete line read
+        self.partial_line = b""
+        self.rate_limiter = _create_token_bucket(LOG_MONITOR_FILE_RATE_BYTES)
 
 
 class LogMonitor:
@@ -72,9 +149,14 @@ class LogMonitor:
        files.
     3. Then, we will open as many closed files as we can that may have new
        lines (judged by an increase in file size since the last time the file
-       was opened).
+       was read).
     4. Then we will loop through the open files and see if there are any new
-       lines in the file. If so, we will publish them to Redis.
+       lines in the file. If so, we will add them to the batch of lines
+       which is published to Redis when large or old enough.
+
+    On Linux, the log directory is watched by inotify. The directory is
+    scanned only when files are added or removed and only the files modified
+    are opened and read. Otherwise, the directory and the files are polled.
 
     Attributes:
         host (str): The hostname of this machine. Used to improve the log
@@ -88,6 +170,14 @@ class LogMonitor:
             files.
         can_open_more_files (bool): True if we can still open more files and
             false otherwise.
+        watcher (LogDirWatcher): The inotify watcher of the log directory or
+            None if polling.
+        updated_filenames (set): The filenames which may have new lines when
+            watching.
+        rate_limiter (TokenBucket): The rate limit of the lines published of
+            all the files or None if not limited.
+        dropped_lines (dict): The number of the lines dropped of each file
+            over its rate limit since the last summary published.
     """
 
     def __init__(self,
@@ -103,6 +193,15 @@ class LogMonitor:
         self.open_file_infos = []
         self.closed_file_infos = []
         self.can_open_more_files = True
+        self.watcher = LogDirWatcher.create(logs_dir)
+        self.updated_filenames = set()
+        self.batch = []
+        self.batch_bytes = 0
+        self.batch_start_time = None
+        self.rate_limiter = _create_token_bucket(LOG_MONITOR_NODE_RATE_BYTES)
+        # The lines dropped of each file since the last summary published
+        self.dropped_lines = defaultdict(int)
+        self.last_dropped_summary_time = time.time()
 
     def close_all_files(self):
         """Close all open files (so that we can open more)."""
@@ -135,6 +234,7 @@ class LogMonitor:
                             "was not found.")
                     else:
                         raise e
+                self._remove_log_filename(file_info.filename)
             else:
                 self.closed_file_infos.append(file_info)
         self.can_open_more_files = True
@@ -174,6 +274,7 @@ class LogMonitor:
                 is_err_file = file_path.endswith("err")
 
                 self.log_filenames.add(file_path)
+                self.updated_filenames.add(file_path)
                 self.closed_file_infos.append(
                     LogFileInfo(
                         filename=file_path,
@@ -207,6 +308,10 @@ class LogMonitor:
 
             file_info = self.closed_file_infos.pop(0)
             assert file_info.file_handle is None
+            if (self.watcher is not None
+                    and file_info.filename not in self.updated_filenames):
+                files_with_no_updates.append(file_info)
+                continue
             # Get the file size to see if it has gotten bigger since we last
             # opened it.
             try:
@@ -216,13 +321,13 @@ class LogMonitor:
                 if e.errno == errno.ENOENT:
                     logger.warning(f"Warning: The file {file_info.filename} "
                                    "was not found.")
-                    self.log_filenames.remove(file_info.filename)
+                    self._remove_log_filename(file_info.filename)
                     continue
                 raise e
 
             # If some new lines have been added to this file, try to reopen the
             # file.
-            if file_size > file_info.size_when_last_opened:
+            if file_size > file_info.file_position:
                 try:
                     f = open(file_info.filename, "rb")
                 except (IOError, OSError) as e:
@@ -230,70 +335,165 @@ class LogMonitor:
                         logger.warning(
                             f"Warning: The file {file_info.filename} "
                             "was not found.")
-                        self.log_filenames.remove(file_info.filename)
+                        self._remove_log_filename(file_info.filename)
                         continue
                     else:
                         raise e
 
                 f.seek(file_info.file_position)
-                file_info.filesize_when_last_opened = file_size
+                file_info.size_when_last_opened = file_size
                 file_info.file_handle = f
                 self.open_file_infos.append(file_info)
             else:
+                self.updated_filenames.discard(file_info.filename)
                 files_with_no_updates.append(file_info)
 
         # Add the files with no changes back to the list of closed files.
         self.closed_file_infos += files_with_no_updates
 
+    def _remove_log_filename(self, filename):
+        self.log_filenames.remove(filename)
+        self.updated_filenames.discard(filename)
+
+    def read_lines(self, file_info):
+        """Read the new complete lines of a file in one chunk.
+
+        Returns:
+            A tuple of the lines read and whether the file may have more.
+        """
+        try:
+            data = file_info.file_handle.read(LOG_MONITOR_READ_CHUNK_BYTES)
+        except Exception:
+            logger.error(
+                f"Error: Reading file: {file_info.filename}, "
+                f"position: {file_info.file_handle.tell()} "
+                "failed.")
+            raise
+        has_more = len(data) == LOG_MONITOR_READ_CHUNK_BYTES
+
+        data = file_info.partial_line + data
+        end = data.rfind(b"\n")
+        if end < 0:
+            if len(data) < LOG_MONITOR_READ_CHUNK_BYTES:
+                file_info.partial_line = data
+                return [], has_more
+            # Publish a line longer than the chunk as is
+            end = len(data)
+        file_info.partial_line = data[end + 1:]
+        # Replace any characters not in UTF-8 with
+        # a replacement character, see
+        # https://stackoverflow.com/a/38565489/10891801
+        return data[:end].decode("utf-8", "replace").split("\n"), has_more
+
+    def limit_rate(self, file_info, lines):
+        """Drop the lines over the rate limit of the file and consume the
+        rate of the node by the lines kept."""
+        size = sum(len(line) for line in lines)
+        if file_info.rate_limiter is not None:
+            allowed = file_info.rate_limiter.available()
+            if size > allowed:
+                num_lines = 0
+                size = 0
+                for line in lines:
+                    if size + len(line) > allowed:
+                        break
+                    size += len(line)
+                    num_lines += 1
+                self.dropped_lines[file_info.filename] += \
+                    len(lines) - num_lines
+                lines = lines[:num_lines]
+            file_info.rate_limiter.consume(size)
+        if self.rate_limiter is not None:
+            self.rate_limiter.consume(size)
+        return lines
+
+    def add_dropped_summary(self):
+        """Add the summary of the lines dropped to the batch periodically."""
+        now = time.time()
+        if (not self.dropped_lines or now - self.last_dropped_summary_time <
+                LOG_MONITOR_DROPPED_SUMMARY_INTERVAL_S):
+            return
+        lines = [
+            f"Dropped {num_lines} lines of {filename} "
+            "over the log rate limit."
+            for filename, num_lines in self.dropped_lines.items()]
+        for line in lines:
+            logger.warning(line)
+        self.batch.append({
+            "ip": self.ip,
+            "pid": "cloudtik_log_monitor",
+            "job": None,
+            "is_err": True,
+            "lines": lines,
+            "actor_name": None,
+            "task_name": None,
+            "dropped_lines": {
+                os.path.basename(filename): num_lines
+                for filename, num_lines in self.dropped_lines.items()},
+        })
+        if self.batch_start_time is None:
+            self.batch_start_time = now
+        self.dropped_lines = defaultdict(int)
+        self.last_dropped_summary_time = now
+
+    def add_to_batch(self, file_info, lines):
+        self.batch.append({
+            "ip": self.ip,
+            "pid": file_info.worker_pid,
+            "job": file_info.job_id,
+            "is_err": file_info.is_err_file,
+            "lines": lines,
+            "actor_name": file_info.actor_name,
+            "task_name": file_info.task_name,
+        })
+        self.batch_bytes += sum(len(line) for line in lines)
+        if self.batch_start_time is None:
+            self.batch_start_time = time.time()
+
+    def publish_batch(self):
+        """Publish the batch of lines to Redis if large or old enough.
+
+        Returns:
+            True if the batch was published and false otherwise.
+        """
+        if not self.batch:
+            return False
+        if (self.batch_bytes < LOG_MONITOR_BATCH_MAX_BYTES
+                and time.time() - self.batch_start_time <
+                LOG_MONITOR_BATCH_INTERVAL_S):
+            return False
+        self.redis_client.publish(
+            constants.LOG_FILE_CHANNEL,
+            encode_log_message(
+                self.batch, LOG_MONITOR_COMPRESSION,
+                LOG_MONITOR_COMPRESSION_MIN_BYTES))
+        self.batch = []
+        self.batch_bytes = 0
+        self.batch_start_time = None
+        return True
+
     def check_log_files_and_publish_updates(self):
         """Get any changes to the log files and push updates to Redis.
 
         Returns:
-            True if anything was published and false otherwise.
+            True if anything was read and false otherwise.
         """
-        anything_published = False
-        lines_to_publish = []
-
-        def flush():
-            nonlocal lines_to_publish
-            nonlocal anything_published
-            if len(lines_to_publish) > 0:
-                data = {
-                    "ip": self.ip,
-                    "pid": file_info.worker_pid,
-                    "job": file_info.job_id,
-                    "is_err": file_info.is_err_file,
-                    "lines": lines_to_publish,
-                    "actor_name": file_info.actor_name,
-                    "task_name": file_info.task_name,
-                }
-                self.redis_client.publish(constants.LOG_FILE_CHANNEL,
-                                          json.dumps(data))
-                anything_published = True
-                lines_to_publish = []
-
-        for file_info in self.open_file_infos:
+        anything_read = False
+        for i, file_info in enumerate(self.open_file_infos):
             assert not file_info.file_handle.closed
+            if (self.watcher is not None
+                    and file_info.filename not in self.updated_filenames):
+                continue
+            if (self.rate_limiter is not None
+                    and self.rate_limiter.available() <= 0):
+                # Leave the new lines in the files until the rate allows.
+                # Start from this file next time to not starve the files.
+                self.open_file_infos = (self.open_file_infos[i:] +
+                                        self.open_file_infos[:i])
+                break
 
-            max_num_lines_to_read = 100
-            for _ in range(max_num_lines_to_read):
-                try:
-                    next_line = file_info.file_handle.readline()
-                    # Replace any characters not in UTF-8 with
-                    # a replacement character, see
-                    # https://stackoverflow.com/a/38565489/10891801
-                    next_line = next_line.decode("utf-8", "replace")
-                    if next_line == "":
-                        break
-                    if next_line[-1] == "\n":
-                        next_line = next_line[:-1]
-                    lines_to_publish.append(next_line)
-                except Exception:
-                    logger.error(
-                        f"Error: Reading file: {file_info.filename}, "
-                        f"position: {file_info.file_info.file_handle.tell()} "
-                        "failed.")
-                    raise
+            lines_to_publish, has_more = self.read_lines(file_info)
+            lines_to_publish = self.limit_rate(file_info, lines_to_publish)
 
             # TODO (haifeng) : correct and add the processes we will have
             if file_info.file_position == 0:
@@ -304,16 +504,71 @@ class LogMonitor:
 
             # Record the current position in the file.
             file_info.file_position = file_info.file_handle.tell()
-            flush()
-
-        return anything_published
+            if not has_more:
+                self.updated_filenames.discard(file_info.filename)
+            if len(lines_to_publish) > 0:
+                self.add_to_batch(file_info, lines_to_publish)
+                anything_read = True
+                if self.batch_bytes >= LOG_MONITOR_BATCH_MAX_BYTES:
+                    self.publish_batch()
+
+        self.add_dropped_summary()
+        self.publish_batch()
+        return anything_read
+
+    def wait_for_updates(self):
+        """Wait for the changes of the log files when watching."""
+        # Not to spin on the updated files which are no longer tracked
+        self.updated_filenames.intersection_update(
+            file_info.filename for file_info in
+            self.open_file_infos + self.closed_file_infos)
+        now = time.time()
+        if self.updated_filenames:
+            timeout = self.rate_limiter.wait_time() \
+                if self.rate_limiter is not None else 0
+            if self.batch:
+                timeout = min(timeout, max(
+                    0, self.batch_start_time + LOG_MONITOR_BATCH_INTERVAL_S -
+                    now))
+        elif self.batch:
+            timeout = max(
+                0, self.batch_start_time + LOG_MONITOR_BATCH_INTERVAL_S - now)
+        else:
+            timeout = LOG_MONITOR_RESCAN_INTERVAL_S
+        if self.dropped_lines:
+            timeout = min(timeout, max(
+                0, self.last_dropped_summary_time +
+                LOG_MONITOR_DROPPED_SUMMARY_INTERVAL_S - now))
+        modified, files_changed, overflowed = self.watcher.wait(timeout)
+
+        if files_changed or overflowed or not (modified or self.batch):
+            # Scan when files changed or on timeout to not miss any files
+            self.update_log_filenames()
+        if overflowed:
+            # The files modified are not known
+            self.updated_filenames.update(self.log_filenames)
+        for name in modified:
+            filename = f"{self.logs_dir}/{name}"
+            if filename in self.log_filenames:
+                self.updated_filenames.add(filename)
+        self.publish_batch()
 
     def run(self):
         """Run the log monitor.
 
-        This will query Redis once every second to check if there are new log
-        files to monitor. It will also store those log files in Redis.
+        When watching the log directory, this will wait for the changes of the
+        log files. Otherwise, this will check the log directory for new log
+        files every LOG_NAME_UPDATE_INTERVAL_S seconds under pressure and
+        poll the log files. The new lines are published to Redis in batches.
         """
+        if self.watcher is not None:
+            logger.info(f"Watching the log directory {self.logs_dir}.")
+            self.update_log_filenames()
+            while True:
+                self.open_closed_files()
+                self.check_log_files_and_publish_updates()
+                self.wait_for_updates()
+
         total_log_files = 0
         last_updated = time.time()
         while True:
@@ -323,10 +578,10 @@ class LogMonitor:
                 total_log_files = self.update_log_filenames()
                 last_updated = time.time()
             self.open_closed_files()
-            anything_published = self.check_log_files_and_publish_updates()
-            # If nothing was published, then wait a little bit before checking
+            anything_read = self.check_log_files_and_publish_updates()
+            # If nothing was read, then wait a little bit before checking
             # for logs to avoid using too much CPU.
-            if not anything_published:
+            if not anything_read:
                 time.sleep(0.1)
 
 
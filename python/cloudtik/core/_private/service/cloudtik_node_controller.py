@@ -9,7 +9,6 @@ import traceback
 import threading
 from multiprocessing.synchronize import Event
 from typing import Optional
-import json
 import psutil
 import subprocess
 
@@ -17,6 +16,9 @@ import cloudtik
 from cloudtik.core._private import constants, services
 from cloudtik.core._private.logging_utils import setup_component_logger
 from cloudtik.core._private.state.control_state import ControlState
+from cloudtik.core._private.state.record_codec import is_binary_encoding, \
+    get_heartbeat_codec, get_record_codec
+from cloudtik.core._private.state.state_table_store import NODE_INFO_TABLE
 from cloudtik.core._private.utils import get_runtime_processes, make_node_id
 
 logger = logging.getLogger(__name__)
@@ -66,6 +68,13 @@ class NodeController:
         self.control_state = ControlState()
         self.control_state.initialize_control_state(ip, port, redis_password)
         self.node_table = self.control_state.get_node_table()
+        # With binary encoding, the heartbeats carry only the heartbeat fields
+        # and the node info is published to the node info table on change
+        self.separate_node_info = is_binary_encoding()
+        self.heartbeat_codec = get_heartbeat_codec()
+        self.record_codec = get_record_codec()
+        self.node_info_table = self.control_state.get_user_state_table(NODE_INFO_TABLE)
+        self.published_node_info = None
         self.processes_to_check = constants.CLOUDTIK_PROCESSES
         runtime_list = runtimes.split(",") if runtimes and len(runtimes) > 0 else None
         self.processes_to_check.extend(get_runtime_processes(runtime_list))
@@ -84,6 +93,8 @@ class NodeController:
                 self._check_process()
             except Exception as e:
                 logger.exception("Error happened when checking processes: " + str(e))
+            if self.separate_node_info:
+                self._publish_node_info()
             time.sleep(constants.CLOUDTIK_UPDATE_INTERVAL_S)
 
     def _handle_failure(self, error):
@@ -104,15 +115,34 @@ class NodeController:
         while True:
             time.sleep(constants.CLOUDTIK_HEARTBEAT_PERIOD_SECONDS)
             now = time.time()
-            node_info = self.node_info.copy()
-            node_info.update({"last_heartbeat_time": now})
-            node_info_as_json = json.dumps(node_info)
+            if self.separate_node_info:
+                heartbeat = {
+                    "node_id": self.node_id,
+                    "node_ip": self.node_ip,
+                    "last_heartbeat_time": now,
+                }
+            else:
+                heartbeat = self.node_info.copy()
+                heartbeat.update({"last_heartbeat_time": now})
             try:
-                self.node_table.put(self.node_id, node_info_as_json)
+                self.node_table.put(
+                    self.node_id, self.heartbeat_codec.encode(heartbeat))
             except Exception as e:
                 logger.exception("Failed sending heartbeat: " + str(e))
                 logger.exception(traceback.format_exc())
 
+    def _publish_node_info(self):
+        # Publish only when the node info changed
+        if self.node_info == self.published_node_info:
+            return
+        node_info = self.node_info.copy()
+        try:
+            self.node_info_table.put(
+                self.node_id, self.record_codec.encode(node_info))
+            self.published_node_info = node_info
+        except Exception as e:
+            logger.exception("Failed publishing node info: " + str(e))
+
     def _parse_resource_list(self):
         node_resource_dict = {}
         resource_split = self.static_resource_list.split(",")
@@ -0,0 +1,106 @@
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+from typing import Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# The inotify events from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+               | IN_CREATE | IN_DELETE)
+_EVENT_HEADER = struct.Struct("iIII")
+_READ_BUFFER_SIZE = 64 * 1024
+
+
+class LogDirWatcher:
+    """Watch the files of a directory for changes with Linux inotify.
+
+    wait() blocks until some files of the directory are changed or the
+    timeout and returns the names of the modified files and whether files
+    were added or removed. When the inotify queue overflows, the changes
+    are not known, so the caller should rescan all the files.
+    """
+
+    def __init__(self, fd: int, path: str):
+        self._fd = fd
+        self.path = path
+
+    @staticmethod
+    def create(path: str) -> Optional["LogDirWatcher"]:
+        """Create a watcher of the directory or None if not supported."""
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(
+                ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+            wd = libc.inotify_add_watch(
+                fd, os.fsencode(path), ctypes.c_uint32(_WATCH_MASK))
+            if wd < 0:
+                err = ctypes.get_errno()
+                os.close(fd)
+                raise OSError(err, "inotify_add_watch failed")
+        except (OSError, AttributeError) as e:
+            logger.info(f"Inotify is not available for {path}: {e}")
+            return None
+        return LogDirWatcher(fd, path)
+
+    def wait(self, timeout: Optional[float]) -> Tuple[Set[str], bool, bool]:
+        """Wait for the changes of the files.
+
+        Returns:
+            A tuple of the names of the modified files, whether any files
+            were added or removed and whether the events overflowed.
+        """
+        modified = set()
+        files_changed = False
+        overflowed = False
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return modified, files_changed, overflowed
+        while True:
+            try:
+                data = os.read(self._fd, _READ_BUFFER_SIZE)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                raise
+            if not data:
+                break
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + name_len].rstrip(b"\0")
+                offset += name_len
+                if mask & IN_Q_OVERFLOW:
+                    overflowed = True
+                if mask & (IN_CREATE | IN_MOVED_TO | IN_MOVED_FROM
+                           | IN_DELETE):
+                    files_changed = True
+                if name and mask & (IN_MODIFY | IN_CLOSE_WRITE
+                                    | IN_MOVED_TO):
+                    modified.add(os.fsdecode(name))
+        return modified, files_changed, overflowed
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,217 @@
+"""Versioned change feed of the state tables.
+
+Each write to a table with change feed bumps a monotonic sequence of the
+table on the shard of the record and records the sequence of the change for
+the record key in a sorted set, all in one atomic script. A reader remembers
+the sequence it has read up to for each shard and asks only for the records
+changed since then. The sorted sets keep only the latest sequence for each
+key so the changes read are bounded by the number of records changed instead
+of the number of writes.
+
+The deleted keys are kept in a separate sorted set trimmed to a max size.
+When a reader is behind the trimmed deletions or the shard is reset, it falls
+back to read a full snapshot of the table.
+"""
+
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from cloudtik.core._private.state.redis_shards_client import RedisShard, TABLE_SEPERATOR
+from cloudtik.core._private.state.redis_shards_scanner import RedisShardsScanner, decode_value
+
+logger = logging.getLogger(__name__)
+
+CHANGE_FEED_SEQUENCE_PREFIX = "__change_feed_sequence__" + TABLE_SEPERATOR
+CHANGE_FEED_CHANGED_PREFIX = "__change_feed_changed__" + TABLE_SEPERATOR
+CHANGE_FEED_DELETED_PREFIX = "__change_feed_deleted__" + TABLE_SEPERATOR
+CHANGE_FEED_TRIMMED_PREFIX = "__change_feed_trimmed__" + TABLE_SEPERATOR
+
+# KEYS: record storage, sequence, changed, deleted, [version]
+# ARGV: key, value, whether the storage is a hash
+_PUT_SCRIPT = """
+local sequence = redis.call('INCR', KEYS[2])
+if ARGV[3] == '1' then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+else
+    redis.call('SET', KEYS[1], ARGV[2])
+end
+redis.call('ZADD', KEYS[3], sequence, ARGV[1])
+redis.call('ZREM', KEYS[4], ARGV[1])
+if KEYS[5] then
+    redis.call('INCR', KEYS[5])
+end
+return sequence
+"""
+
+# KEYS: record storage, sequence, changed, deleted, trimmed, [version]
+# ARGV: key, whether the storage is a hash, max deleted keys to keep
+_DELETE_SCRIPT = """
+local sequence = redis.call('INCR', KEYS[2])
+local deleted
+if ARGV[2] == '1' then
+    deleted = redis.call('HDEL', KEYS[1], ARGV[1])
+else
+    deleted = redis.call('DEL', KEYS[1])
+end
+redis.call('ZREM', KEYS[3], ARGV[1])
+redis.call('ZADD', KEYS[4], sequence, ARGV[1])
+local excess = redis.call('ZCARD', KEYS[4]) - tonumber(ARGV[3])
+if excess > 0 then
+    local trimmed = redis.call('ZRANGE', KEYS[4], excess - 1, excess - 1, 'WITHSCORES')
+    redis.call('SET', KEYS[5], trimmed[2])
+    redis.call('ZREMRANGEBYRANK', KEYS[4], 0, excess - 1)
+end
+if KEYS[6] then
+    redis.call('INCR', KEYS[6])
+end
+return deleted
+"""
+
+
+def _change_feed_keys(table_name):
+    return (CHANGE_FEED_SEQUENCE_PREFIX + table_name,
+            CHANGE_FEED_CHANGED_PREFIX + table_name,
+            CHANGE_FEED_DELETED_PREFIX + table_name,
+            CHANGE_FEED_TRIMMED_PREFIX + table_name)
+
+
+def put_with_change(redis_shard: RedisShard, table_name, key, value,
+                    storage_key, hash_storage=False, version_key=None,
+                    pipeline=None):
+    """Put the record to the storage key and record the change."""
+    sequence_key, changed_key, deleted_key, _ = _change_feed_keys(table_name)
+    keys = [storage_key, sequence_key, changed_key, deleted_key]
+    if version_key is not None:
+        keys.append(version_key)
+    return redis_shard.run_script(
+        _PUT_SCRIPT, keys, [key, value, "1" if hash_storage else "0"],
+        pipeline=pipeline)
+
+
+def delete_with_change(redis_shard: RedisShard, table_name, key,
+                       storage_key, max_deleted,
+                       hash_storage=False, version_key=None,
+                       pipeline=None):
+    """Delete the record from the storage key and record the change."""
+    keys = [storage_key, *_change_feed_keys(table_name)]
+    if version_key is not None:
+        keys.append(version_key)
+    return redis_shard.run_script(
+        _DELETE_SCRIPT, keys, [key, "1" if hash_storage else "0", max_deleted],
+        pipeline=pipeline)
+
+
+class ChangeFeedReader:
+    """Reads the records of a table changed since the last read.
+
+    The first read and the reads which missed changes return a full snapshot.
+    """
+
+    def __init__(self, store_client, table_name, raw_values=False):
+        self._store_client = store_client
+        self._table_name = table_name
+        self._raw_values = raw_values
+        self._sequence_key, self._changed_key, self._deleted_key, \
+            self._trimmed_key = _change_feed_keys(table_name)
+        # The sequence read up to for each shard address
+        self._sequences: Optional[Dict[str, int]] = None
+
+    def get_sequences(self) -> Optional[Dict[str, int]]:
+        return self._sequences
+
+    def read_changes(self) -> Tuple[bool, List[Tuple[str, Optional[str]]]]:
+        """Read the changes since last read.
+
+        Returns:
+            bool: whether the changes are a full snapshot of the table.
+            List[Tuple[str, Optional[str]]]: the changed (key, value) pairs.
+                The value is None if the record was deleted.
+        """
+        scanner = RedisShardsScanner(
+            self._store_client.get_redis_shards_client(), self._table_name)
+        shards = scanner.get_distinct_shards()
+        if self._sequences is None:
+            return True, self._read_snapshot(shards)
+
+        changes = []
+        sequences = {}
+        for shard in shards:
+            address = shard.get_address()
+            sequence = self._sequences.get(address)
+            if sequence is None:
+                return True, self._read_snapshot(shards)
+            shard_changes, shard_sequence = self._read_shard_changes(
+                shard, sequence)
+            if shard_changes is None:
+                # The reader is behind the trimmed deletions or shard reset
+                return True, self._read_snapshot(shards)
+            changes += shard_changes
+            sequences[address] = shard_sequence
+
+        self._sequences = sequences
+        return False, changes
+
+    def _read_shard_changes(self, shard: RedisShard, sequence: int):
+        since = "({}".format(sequence)
+        # Read in a transaction so that no change is missed in between
+        pipeline = shard.pipeline(transaction=True)
+        pipeline.get(self._trimmed_key)
+        pipeline.get(self._sequence_key)
+        pipeline.zrangebyscore(self._changed_key, since, "+inf", withscores=True)
+        pipeline.zrangebyscore(self._deleted_key, since, "+inf", withscores=True)
+        trimmed, current, changed, deleted = pipeline.execute()
+        if (trimmed is not None and int(trimmed) > sequence) or (
+                int(current or 0) < sequence):
+            return None, sequence
+
+        changes = []
+        if changed:
+            keys = [key.decode("utf-8") for key, _ in changed]
+            values = self._store_client.get_shard_values(
+                shard, self._table_name, keys)
+            for key, value in zip(keys, values):
+                # None if deleted after reading the changed keys
+                changes.append((key, decode_value(value, self._raw_values)
+                                if value is not None else None))
+            sequence = max(sequence, int(changed[-1][1]))
+        if deleted:
+            changes += [(key.decode("utf-8"), None) for key, _ in deleted]
+            sequence = max(sequence, int(deleted[-1][1]))
+        return changes, sequence
+
+    def _read_snapshot(self, shards):
+        # Read the sequences before the snapshot so that the changes happened
+        # during the snapshot will be read again next time
+        sequences = {}
+        for shard in shards:
+            sequence = shard.get(self._sequence_key)
+            sequences[shard.get_address()] = int(sequence or 0)
+        changes = list(self._store_client.iter_all(
+            self._table_name, self._raw_values))
+        self._sequences = sequences
+        return changes
+
+
+class ChangeFeedView:
+    """The decoded records of a table maintained by applying the changes.
+
+    Only the changed records are decoded on each update.
+    """
+
+    def __init__(self, reader: ChangeFeedReader,
+                 decode: Callable[[str], Any] = json.loads):
+        self._reader = reader
+        self._decode = decode
+        self.records: Dict[str, Any] = {}
+
+    def update(self) -> Dict[str, Any]:
+        is_snapshot, changes = self._reader.read_changes()
+        if is_snapshot:
+            self.records = {}
+        for key, value in changes:
+            if value is None:
+                self.records.pop(key, None)
+            else:
+                self.records[key] = self._decode(value)
+        return self.records
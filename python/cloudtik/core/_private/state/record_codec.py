@@ -0,0 +1,124 @@
+"""Codecs of the records stored in the state tables.
+
+The binary records start with a format byte which never appears as the first
+byte of a JSON record ("{"), so the readers can decode the records written in
+any format, including the JSON records written by the old versions.
+"""
+
+import json
+import struct
+from typing import Any, Dict, Union
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from cloudtik.core._private.constants import CLOUDTIK_STATE_RECORD_ENCODING
+
+RECORD_ENCODING_JSON = "json"
+RECORD_ENCODING_BINARY = "binary"
+
+RECORD_FORMAT_HEARTBEAT = 1
+RECORD_FORMAT_MSGPACK = 2
+
+# format, last heartbeat time, length of node id, length of node ip
+_HEARTBEAT_HEADER = struct.Struct("<BdHH")
+
+
+class RecordCodec:
+    """Interface of encoding a record dict to bytes and decoding back."""
+
+    def encode(self, record: Dict[str, Any]) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class JsonRecordCodec(RecordCodec):
+    def encode(self, record: Dict[str, Any]) -> bytes:
+        return json.dumps(record, separators=(",", ":")).encode("utf-8")
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        return json.loads(data)
+
+
+class MsgpackRecordCodec(RecordCodec):
+    def encode(self, record: Dict[str, Any]) -> bytes:
+        return bytes([RECORD_FORMAT_MSGPACK]) + msgpack.packb(record)
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        return msgpack.unpackb(data[1:], raw=False)
+
+
+class HeartbeatRecordCodec(RecordCodec):
+    """Fixed layout of the heartbeat fields: node_id, node_ip and
+    last_heartbeat_time. Other fields are not encoded."""
+
+    def encode(self, record: Dict[str, Any]) -> bytes:
+        node_id = record["node_id"].encode("utf-8")
+        node_ip = record["node_ip"].encode("utf-8")
+        return _HEARTBEAT_HEADER.pack(
+            RECORD_FORMAT_HEARTBEAT, record["last_heartbeat_time"],
+            len(node_id), len(node_ip)) + node_id + node_ip
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        _, last_heartbeat_time, node_id_len, node_ip_len = \
+            _HEARTBEAT_HEADER.unpack_from(data)
+        offset = _HEARTBEAT_HEADER.size
+        node_id = data[offset:offset + node_id_len].decode("utf-8")
+        offset += node_id_len
+        node_ip = data[offset:offset + node_ip_len].decode("utf-8")
+        return {
+            "node_id": node_id,
+            "node_ip": node_ip,
+            "last_heartbeat_time": last_heartbeat_time,
+        }
+
+
+_json_codec = JsonRecordCodec()
+_heartbeat_codec = HeartbeatRecordCodec()
+_msgpack_codec = MsgpackRecordCodec() if msgpack is not None else None
+
+
+def _get_msgpack_codec() -> RecordCodec:
+    if _msgpack_codec is None:
+        raise RuntimeError(
+            "The binary state records require msgpack which is not installed.")
+    return _msgpack_codec
+
+
+_codecs_by_format = {
+    RECORD_FORMAT_HEARTBEAT: lambda: _heartbeat_codec,
+    RECORD_FORMAT_MSGPACK: _get_msgpack_codec,
+}
+
+
+def is_binary_encoding() -> bool:
+    return CLOUDTIK_STATE_RECORD_ENCODING == RECORD_ENCODING_BINARY
+
+
+def get_heartbeat_codec() -> RecordCodec:
+    """The codec for the heartbeat records with only the heartbeat fields."""
+    return _heartbeat_codec if is_binary_encoding() else _json_codec
+
+
+def get_record_codec() -> RecordCodec:
+    """The codec for the general records. The binary encoding requires
+    msgpack."""
+    if is_binary_encoding():
+        return _get_msgpack_codec()
+    return _json_codec
+
+
+def decode_record(data: Union[bytes, str]) -> Dict[str, Any]:
+    """Decode a record written in any of the formats."""
+    if isinstance(data, str):
+        return json.loads(data)
+    if not data or data[0] == ord("{"):
+        return _json_codec.decode(data)
+    get_codec = _codecs_by_format.get(data[0])
+    if get_codec is None:
+        raise ValueError("Unknown record format: {}".format(data[0]))
+    return get_codec().decode(data)
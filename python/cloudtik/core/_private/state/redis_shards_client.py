@@ -7,6 +7,10 @@ logger = logging.getLogger(__name__)
 
 TABLE_SEPERATOR = ":"
 
+# The prefixes of the keys for the tables stored as hashes
+HASH_TABLE_PREFIX = "__hash_table__" + TABLE_SEPERATOR
+HASH_TABLE_VERSION_PREFIX = "__hash_table_version__" + TABLE_SEPERATOR
+
 
 def generate_match_pattern(table_name):
     return table_name + TABLE_SEPERATOR + "*"
@@ -16,6 +20,14 @@ def generate_redis_key(table_name, key):
     return table_name + TABLE_SEPERATOR + key
 
 
+def generate_hash_table_key(table_name):
+    return HASH_TABLE_PREFIX + table_name
+
+
+def generate_hash_table_version_key(table_name):
+    return HASH_TABLE_VERSION_PREFIX + table_name
+
+
 def hash_redis_key(redis_key):
     md5 = hashlib.md5()
     if isinstance(redis_key, bytes):
@@ -25,6 +37,13 @@ def hash_redis_key(redis_key):
     return int(md5.hexdigest(), 16)
 
 
+def encode_value(value):
+    # The value is either a string or already encoded bytes
+    if isinstance(value, str):
+        return value.encode()
+    return value
+
+
 def get_real_key(redis_key, table_name):
     # get the real key from shard key
     pos = len(table_name) + len(TABLE_SEPERATOR)
@@ -35,13 +54,19 @@ def get_real_key(redis_key, table_name):
 class RedisShard:
     def __init__(self):
         self._redis_client = None
+        self._address = None
+        self._scripts = {}
 
     def connect(self, redis_address, redis_port, redis_password):
+        self._address = "{}:{}".format(redis_address, redis_port)
         self._redis_client = redis.StrictRedis(
             host=redis_address, port=redis_port, password=redis_password)
 
+    def get_address(self):
+        return self._address
+
     def put(self, key, value):
-        self._redis_client.set(key, value.encode())
+        self._redis_client.set(key, encode_value(value))
 
     def get(self, key):
         return self._redis_client.get(key)
@@ -52,12 +77,49 @@ class RedisShard:
     def mget(self, keys):
         return self._redis_client.mget(keys)
 
+    def hset(self, name, key, value, version_key=None):
+        pipeline = self.pipeline()
+        pipeline.hset(name, key, encode_value(value))
+        if version_key is not None:
+            pipeline.incr(version_key)
+        pipeline.execute()
+
+    def hget(self, name, key):
+        return self._redis_client.hget(name, key)
+
+    def hmget(self, name, keys):
+        return self._redis_client.hmget(name, keys)
+
+    def hdel(self, name, key, version_key=None):
+        pipeline = self.pipeline()
+        pipeline.hdel(name, key)
+        if version_key is not None:
+            pipeline.incr(version_key)
+        return pipeline.execute()[0]
+
+    def hscan(self, name, cursor, batch_size):
+        return self._redis_client.hscan(name, cursor, count=batch_size)
+
     def scan(self, cursor, match_pattern, batch_size):
         return self._redis_client.scan(cursor, match_pattern, batch_size)
 
     def lrange(self, key, start=0, stop=-1):
         return self._redis_client.lrange(key, start, stop)
 
+    def run_script(self, script, keys, args, pipeline=None):
+        # The script is loaded once and then run by its sha. If a pipeline
+        # is given, the script is queued to the pipeline.
+        registered_script = self._scripts.get(script)
+        if registered_script is None:
+            registered_script = self._redis_client.register_script(script)
+            self._scripts[script] = registered_script
+        return registered_script(keys=keys, args=args, client=pipeline)
+
+    def pipeline(self, transaction=False):
+        # Non-transactional pipeline by default for batching the commands
+        # in one round trip
+        return self._redis_client.pipeline(transaction=transaction)
+
 
 def get_redis_shards_addresses(primary_shard: RedisShard):
     redis_addresses = []
@@ -1,4 +1,7 @@
 import logging
+import queue
+import threading
+
 import redis
 
 from cloudtik.core._private.state.redis_shards_client import \
@@ -8,23 +11,44 @@ logger = logging.getLogger(__name__)
 
 SCAN_BATCH_SIZE = 1024
 
+# Marks the end of the scan of one shard in the result queue
+_SHARD_SCAN_DONE = object()
+
 
 class RedisShardsScanner:
     def __init__(self, redis_shards_client: RedisShardsClient, table_name):
         self._redis_shards_client = redis_shards_client
         self._table_name = table_name
 
-    def scan_keys_and_values(self, match_pattern):
+    def scan_keys_and_values(self, match_pattern, raw_values=False):
         all_key_value = {}
+        for key, value in self.scan_keys_and_values_pipelined(
+                match_pattern, raw_values):
+            all_key_value[key] = value
+        return all_key_value
 
-        def values_callback(key_value_map):
-            all_key_value.update(key_value_map)
+    def scan_keys_and_values_pipelined(self, match_pattern, raw_values=False):
+        """Scan the keys and values of all the shards in parallel.
 
-        def keys_callback(keys):
-            scan_values(self._redis_shards_client, self._table_name, keys, values_callback)
+        For each shard, the MGET of the values of the current batch of keys
+        and the SCAN of next batch of keys are sent in one pipeline so that
+        each batch takes one round trip. The shards are scanned concurrently
+        with a thread for each shard and the (key, value) pairs are yielded
+        as soon as they arrive. The values are kept as bytes if raw_values.
+        """
+        def scan_shard(shard):
+            return scan_shard_pipelined(
+                shard, self._table_name, match_pattern, raw_values=raw_values)
 
-        self.scan_keys(match_pattern, keys_callback)
-        return all_key_value
+        return scan_shards_in_parallel(self.get_distinct_shards(), scan_shard)
+
+    def scan_hash_keys_and_values(self, hash_name, raw_values=False):
+        """Scan the hash with the given name of all the shards in parallel
+        and yield the (key, value) pairs as soon as they arrive."""
+        def scan_shard(shard):
+            return scan_shard_hash(shard, hash_name, raw_values=raw_values)
+
+        return scan_shards_in_parallel(self.get_distinct_shards(), scan_shard)
 
     def scan_keys(self, match_pattern, keys_callback):
         batch_size = SCAN_BATCH_SIZE
@@ -40,6 +64,96 @@ class RedisShardsScanner:
                     new_cursor, match_pattern, batch_size)
                 keys_callback(keys)
 
+    def get_distinct_shards(self):
+        # The primary shard may also be listed as a data shard
+        shards = []
+        addresses = set()
+        shard_size = self._redis_shards_client.get_shards_size()
+        for shard_index in range(shard_size):
+            shard = self._redis_shards_client.get_shard_by_index(shard_index)
+            address = shard.get_address()
+            if address in addresses:
+                continue
+            addresses.add(address)
+            shards.append(shard)
+        return shards
+
+
+def scan_shards_in_parallel(shards, scan_shard):
+    """Yield the (key, value) pairs of the batches returned by the scan_shard
+    generator function of each shard with a thread for each shard."""
+    if len(shards) <= 1:
+        for shard in shards:
+            for key_values in scan_shard(shard):
+                yield from key_values
+        return
+
+    results = queue.Queue()
+
+    def scan_one(shard):
+        try:
+            for key_values in scan_shard(shard):
+                results.put(key_values)
+            results.put(_SHARD_SCAN_DONE)
+        except Exception as e:
+            results.put(e)
+
+    for shard in shards:
+        threading.Thread(
+            target=scan_one, args=(shard,), daemon=True).start()
+
+    remaining = len(shards)
+    while remaining > 0:
+        result = results.get()
+        if result is _SHARD_SCAN_DONE:
+            remaining -= 1
+        elif isinstance(result, Exception):
+            raise result
+        else:
+            yield from result
+
+
+def decode_value(value, raw_values=False):
+    return value if raw_values else value.decode("utf-8")
+
+
+def scan_shard_hash(shard, hash_name, batch_size=SCAN_BATCH_SIZE,
+                    raw_values=False):
+    """Scan the hash of a shard and yield the batches of (key, value) pairs."""
+    cursor, key_values = shard.hscan(hash_name, 0, batch_size)
+    while True:
+        if key_values:
+            yield [(k.decode("utf-8"), decode_value(v, raw_values))
+                   for k, v in key_values.items()]
+        if cursor == 0:
+            break
+        cursor, key_values = shard.hscan(hash_name, cursor, batch_size)
+
+
+def scan_shard_pipelined(shard, table_name, match_pattern,
+                         batch_size=SCAN_BATCH_SIZE, raw_values=False):
+    """Scan the keys and values of a shard and yield the batches of
+    (key, value) pairs. The value of a batch is read in the same round trip
+    of the scan of the next batch."""
+    cursor, keys = shard.scan(0, match_pattern, batch_size)
+    while keys or cursor != 0:
+        pipeline = shard.pipeline()
+        if keys:
+            pipeline.mget(keys)
+        if cursor != 0:
+            pipeline.scan(cursor, match_pattern, batch_size)
+        results = pipeline.execute()
+
+        if keys:
+            yield [(get_real_key(k, table_name).decode("utf-8"),
+                    decode_value(v, raw_values))
+                   for k, v in zip(keys, results[0]) if v is not None]
+            results = results[1:]
+        if cursor != 0:
+            cursor, keys = results[0]
+        else:
+            keys = []
+
 
 def get_scan_by_shards(shards_client: RedisShardsClient, keys):
     scan_by_shards = {}
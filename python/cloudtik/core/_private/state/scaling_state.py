@@ -3,14 +3,18 @@ import logging
 import time
 
 from cloudtik.core._private.constants import CLOUDTIK_HEARTBEAT_TIMEOUT_S, CLOUDTIK_SCALING_STATE_TIMEOUT_S, \
-    CLOUDTIK_NODE_RESOURCE_STATE_TIMEOUT_S
+    CLOUDTIK_NODE_RESOURCE_STATE_TIMEOUT_S, CLOUDTIK_NODE_RESOURCE_STATE_REPUBLISH_S
+from cloudtik.core._private.state.change_feed import ChangeFeedView
 from cloudtik.core._private.state.control_state import ControlState
 from cloudtik.core._private.state.kv_store import kv_put, kv_get
+from cloudtik.core._private.state.record_codec import decode_record, get_record_codec
 from cloudtik.core.scaling_policy import ScalingState
 
 CLOUDTIK_AUTOSCALING_INSTRUCTIONS = "autoscaling_instructions"
 STATE_FETCH_TIMEOUT = 60
 RESOURCE_STATE_TABLE = "resource_state"
+# The refreshed resource times of the unchanged node resource states
+RESOURCE_TIME_TABLE = "resource_time"
 
 logger = logging.getLogger(__name__)
 
@@ -38,12 +42,31 @@ class ScalingStateClient:
                  nums_reconnect_retry: int = 5):
         self._control_state = control_state
         self._nums_reconnect_retry = nums_reconnect_retry
+        # The decoded records maintained from the change feeds of the tables
+        self._table_views = {}
+        # node id -> (the node resource state without resource time, the
+        # time written in full, the time written or refreshed) published
+        self._published_resource_states = {}
+
+    def _get_table_records(self, state_table, table_name):
+        """Iterate the decoded records of the table. Only the records changed
+        since last time are read and decoded if the table has change feed."""
+        if not state_table.has_change_feed():
+            return (decode_record(value) for _, value in state_table.iter_all(
+                raw_values=True))
+
+        table_view = self._table_views.get(table_name)
+        if table_view is None:
+            table_view = ChangeFeedView(
+                state_table.get_change_feed_reader(raw_values=True),
+                decode=decode_record)
+            self._table_views[table_name] = table_view
+        return table_view.update().values()
 
     def get_cluster_heartbeat_state(self, timeout: int = STATE_FETCH_TIMEOUT):
         node_table = self._control_state.get_node_table()
         cluster_heartbeat_state = ClusterHeartbeatState()
-        for node_info_as_json in node_table.get_all().values():
-            node_info = json.loads(node_info_as_json)
+        for node_info in self._get_table_records(node_table, "node_table"):
             # Filter out the stale record in the node table
             delta = time.time() - node_info.get("last_heartbeat_time", 0)
             if delta < CLOUDTIK_HEARTBEAT_TIMEOUT_S:
@@ -67,11 +90,16 @@ class ScalingStateClient:
                 scaling_state.set_autoscaling_instructions(autoscaling_instructions)
 
         # Get resource state of nodes
+        resource_times = self._get_refreshed_resource_times()
         resource_state_table = self._control_state.get_user_state_table(RESOURCE_STATE_TABLE)
-        for resource_state_as_json in resource_state_table.get_all().values():
-            resource_state = json.loads(resource_state_as_json)
+        for resource_state in self._get_table_records(
+                resource_state_table, RESOURCE_STATE_TABLE):
             # Filter out the stale record in the node table
-            resource_time = resource_state.get("resource_time", 0)
+            resource_time = max(
+                resource_state.get("resource_time", 0),
+                resource_times.get(resource_state["node_id"], 0))
+            if resource_time != resource_state.get("resource_time", 0):
+                resource_state = dict(resource_state, resource_time=resource_time)
             delta = now - resource_time
             if delta < CLOUDTIK_NODE_RESOURCE_STATE_TIMEOUT_S:
                 node_id = resource_state["node_id"]
@@ -87,14 +115,48 @@ class ScalingStateClient:
         node_resource_states = scaling_state.node_resource_states
         lost_nodes = scaling_state.lost_nodes
         if node_resource_states is not None or lost_nodes is not None:
+            self._update_node_resource_states(
+                node_resource_states or {}, lost_nodes or {})
+
+    def _update_node_resource_states(self, node_resource_states, lost_nodes):
+        """Write only the node resource states changed since last published.
+        The unchanged states only get their resource times refreshed before
+        they expire. All the writes of a table are sent in one batch."""
+        record_codec = get_record_codec()
+        refresh_interval = CLOUDTIK_NODE_RESOURCE_STATE_TIMEOUT_S / 2
+        resource_states = {}
+        resource_times = {}
+        for node_id, node_resource_state in node_resource_states.items():
+            resource_time = node_resource_state.get("resource_time", 0)
+            content = dict(node_resource_state)
+            content.pop("resource_time", None)
+            published = self._published_resource_states.get(node_id)
+            if (published is None or published[0] != content or
+                    resource_time - published[1] >= CLOUDTIK_NODE_RESOURCE_STATE_REPUBLISH_S):
+                resource_states[node_id] = record_codec.encode(node_resource_state)
+                self._published_resource_states[node_id] = (
+                    content, resource_time, resource_time)
+            elif resource_time - published[2] >= refresh_interval:
+                resource_times[node_id] = record_codec.encode(
+                    {"node_id": node_id, "resource_time": resource_time})
+                self._published_resource_states[node_id] = (
+                    published[0], published[1], resource_time)
+
+        for node_id in lost_nodes:
+            self._published_resource_states.pop(node_id, None)
+
+        if resource_states or lost_nodes:
             resource_state_table = self._control_state.get_user_state_table(RESOURCE_STATE_TABLE)
-            if node_resource_states is not None:
-                for node_id, node_resource_state in node_resource_states.items():
-                    resource_state_as_json = json.dumps(node_resource_state)
-                    resource_state_table.put(node_id, resource_state_as_json)
-            if lost_nodes is not None:
-                for node_id in lost_nodes:
-                    resource_state_table.delete(node_id)
+            resource_state_table.write_batch(resource_states, list(lost_nodes))
+        if resource_times or lost_nodes:
+            resource_time_table = self._control_state.get_user_state_table(RESOURCE_TIME_TABLE)
+            resource_time_table.write_batch(resource_times, list(lost_nodes))
+
+    def _get_refreshed_resource_times(self):
+        resource_time_table = self._control_state.get_user_state_table(RESOURCE_TIME_TABLE)
+        return {record["node_id"]: record["resource_time"]
+                for record in self._get_table_records(
+                    resource_time_table, RESOURCE_TIME_TABLE)}
 
     @staticmethod
     def create_from(control_state):
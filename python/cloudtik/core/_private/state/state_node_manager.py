@@ -1,6 +1,7 @@
 import logging
 
 
+from cloudtik.core._private.state.record_codec import decode_record
 from cloudtik.core._private.state.state_table_store import StateTableStore
 
 logger = logging.getLogger(__name__)
@@ -22,4 +23,7 @@ class StateNodeManager:
         self._state_table_store.get_node_table().delete(node_id)
 
     def get_node_table(self):
-        self._state_table_store.get_node_table().get_all()
+        node_table = self._state_table_store.get_node_table().get_all(
+            raw_values=True)
+        return {node_id: decode_record(value)
+                for node_id, value in node_table.items()}
@@ -1,32 +1,73 @@
 import logging
+from typing import Any, Dict, Iterable
 
 from cloudtik.core._private.state.redis_shards_client import RedisShardsClient
-from cloudtik.core._private.state.store_client import StoreClient
+from cloudtik.core._private.constants import CLOUDTIK_STATE_TABLE_LAYOUT, \
+    CLOUDTIK_STATE_TABLE_CHANGE_FEED
+from cloudtik.core._private.state.change_feed import ChangeFeedReader
+from cloudtik.core._private.state.store_client import StoreClient, create_store_client
 
 logger = logging.getLogger(__name__)
 
 
 class StateTable:
-    def __init__(self, store_client: StoreClient, table_name):
+    def __init__(self, store_client: StoreClient, table_name,
+                 change_feed: bool = False):
         self._store_client = store_client
         self._table_name = table_name
+        self._change_feed = change_feed
 
     def put(self, key, value):
-        self._store_client.put(self._table_name, key, value)
+        self._store_client.put(
+            self._table_name, key, value, change_feed=self._change_feed)
 
     def get(self, key):
         return self._store_client.get(self._table_name, key)
 
-    def get_all(self):
-        return self._store_client.get_all(self._table_name)
+    def get_all(self, raw_values=False):
+        return self._store_client.get_all(self._table_name, raw_values)
+
+    def iter_all(self, raw_values=False):
+        return self._store_client.iter_all(self._table_name, raw_values)
 
     def delete(self, key):
-        self._store_client.delete(self._table_name, key)
+        self._store_client.delete(
+            self._table_name, key, change_feed=self._change_feed)
+
+    def write_batch(self, puts: Dict[str, Any] = None,
+                    deletes: Iterable[str] = None):
+        """Put and delete the records in one round trip for each shard."""
+        self._store_client.write_batch(
+            self._table_name, puts or {}, deletes or [],
+            change_feed=self._change_feed)
+
+    def has_change_feed(self):
+        return self._change_feed
+
+    def get_change_feed_reader(self, raw_values=False) -> ChangeFeedReader:
+        """Return a new reader reading the changes of the table since its
+        last read. The table must be written with change feed."""
+        if not self._change_feed:
+            raise RuntimeError(
+                "Table {} has no change feed.".format(self._table_name))
+        return ChangeFeedReader(
+            self._store_client, self._table_name, raw_values)
+
+    def get_version(self):
+        """Return the version increasing on each change of the table or None
+        if the table layout doesn't keep versions."""
+        return self._store_client.get_version(self._table_name)
+
+
+# The table of the static node info and the process status which changes
+# much less often than the heartbeats in the node table
+NODE_INFO_TABLE = "node_info_table"
 
 
 class NodeStateTable(StateTable):
     def __init__(self, store_client: StoreClient):
-        super().__init__(store_client, "node_table")
+        super().__init__(store_client, "node_table",
+                         change_feed=CLOUDTIK_STATE_TABLE_CHANGE_FEED)
 
 
 class StateTableStore:
@@ -34,8 +75,12 @@ class StateTableStore:
     Class wraps the access of all the table tables from Redis sharding
     """
 
-    def __init__(self, redis_shards_client: RedisShardsClient):
-        self._store_client = StoreClient(redis_shards_client)
+    def __init__(self, redis_shards_client: RedisShardsClient,
+                 table_layout: str = None):
+        if table_layout is None:
+            table_layout = CLOUDTIK_STATE_TABLE_LAYOUT
+        self._store_client = create_store_client(
+            redis_shards_client, table_layout)
         self._node_table = NodeStateTable(self._store_client)
         self._user_state_tables = {}
 
@@ -47,6 +92,8 @@ class StateTableStore:
         if user_state_table is not None:
             return user_state_table
 
-        user_state_table = StateTable(self._store_client, table_name)
+        user_state_table = StateTable(
+            self._store_client, table_name,
+            change_feed=CLOUDTIK_STATE_TABLE_CHANGE_FEED)
         self._user_state_tables[table_name] = user_state_table
         return user_state_table
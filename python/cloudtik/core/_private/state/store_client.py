@@ -1,35 +1,212 @@
 import logging
 
+from cloudtik.core._private.constants import CLOUDTIK_STATE_TABLE_CHANGE_FEED_MAX_DELETED
+from cloudtik.core._private.state.change_feed import put_with_change, delete_with_change
 from cloudtik.core._private.state.redis_shards_client import \
-    RedisShardsClient, generate_match_pattern, generate_redis_key
+    RedisShardsClient, generate_match_pattern, generate_redis_key, \
+    generate_hash_table_key, generate_hash_table_version_key, encode_value
 from cloudtik.core._private.state.redis_shards_scanner import RedisShardsScanner
 
 logger = logging.getLogger(__name__)
 
+# Each record of a table is stored as a Redis string key
+STATE_TABLE_LAYOUT_KEYS = "keys"
+# Each table is stored as one Redis hash for each shard
+STATE_TABLE_LAYOUT_HASH = "hash"
+
 
 class StoreClient:
     def __init__(self, redis_shards_client: RedisShardsClient):
         self._redis_shards_client = redis_shards_client
 
-    def put(self, table_name, key, value):
+    def get_redis_shards_client(self):
+        return self._redis_shards_client
+
+    def put(self, table_name, key, value, change_feed=False):
         redis_key = generate_redis_key(table_name, key)
         redis_shard = self._redis_shards_client.get_shard(redis_key)
-        redis_shard.put(redis_key, value)
+        if change_feed:
+            put_with_change(redis_shard, table_name, key, value, redis_key)
+        else:
+            redis_shard.put(redis_key, value)
 
     def get(self, table_name, key):
         redis_key = generate_redis_key(table_name, key)
         redis_shard = self._redis_shards_client.get_shard(redis_key)
         return redis_shard.get(redis_key)
 
-    def delete(self, table_name, key):
+    def write_batch(self, table_name, puts, deletes, change_feed=False):
+        """Put the (key, value) pairs of puts and delete the keys of deletes
+        with one pipeline for each shard."""
+        for redis_shard, shard_puts, shard_deletes in self._group_by_shard(
+                table_name, puts, deletes):
+            pipeline = redis_shard.pipeline()
+            for key, value in shard_puts:
+                redis_key = generate_redis_key(table_name, key)
+                if change_feed:
+                    put_with_change(
+                        redis_shard, table_name, key, value, redis_key,
+                        pipeline=pipeline)
+                else:
+                    pipeline.set(redis_key, encode_value(value))
+            for key in shard_deletes:
+                redis_key = generate_redis_key(table_name, key)
+                if change_feed:
+                    delete_with_change(
+                        redis_shard, table_name, key, redis_key,
+                        CLOUDTIK_STATE_TABLE_CHANGE_FEED_MAX_DELETED,
+                        pipeline=pipeline)
+                else:
+                    pipeline.delete(redis_key)
+            pipeline.execute()
+
+    def _group_by_shard(self, table_name, puts, deletes):
+        shards = {}
+
+        def get_shard_writes(key):
+            redis_shard = self._get_shard(table_name, key)
+            shard_writes = shards.get(id(redis_shard))
+            if shard_writes is None:
+                shard_writes = (redis_shard, [], [])
+                shards[id(redis_shard)] = shard_writes
+            return shard_writes
+
+        for key, value in puts.items():
+            get_shard_writes(key)[1].append((key, value))
+        for key in deletes:
+            get_shard_writes(key)[2].append(key)
+        return shards.values()
+
+    def _get_shard(self, table_name, key):
+        redis_key = generate_redis_key(table_name, key)
+        return self._redis_shards_client.get_shard(redis_key)
+
+    def delete(self, table_name, key, change_feed=False):
         redis_key = generate_redis_key(table_name, key)
         redis_shard = self._redis_shards_client.get_shard(redis_key)
-        redis_shard.delete(redis_key)
+        if change_feed:
+            delete_with_change(
+                redis_shard, table_name, key, redis_key,
+                CLOUDTIK_STATE_TABLE_CHANGE_FEED_MAX_DELETED)
+        else:
+            redis_shard.delete(redis_key)
 
-    def get_all(self, table_name):
+    def get_all(self, table_name, raw_values=False):
         match_pattern = generate_match_pattern(table_name)
         scanner = RedisShardsScanner(self._redis_shards_client, table_name)
-        return scanner.scan_keys_and_values(match_pattern)
+        return scanner.scan_keys_and_values(match_pattern, raw_values)
+
+    def iter_all(self, table_name, raw_values=False):
+        """Return a generator of (key, value) pairs streamed from all shards.
+        The values are decoded as strings unless raw_values."""
+        match_pattern = generate_match_pattern(table_name)
+        scanner = RedisShardsScanner(self._redis_shards_client, table_name)
+        return scanner.scan_keys_and_values_pipelined(match_pattern, raw_values)
+
+    def get_shard_values(self, redis_shard, table_name, keys):
+        """Return the values of the keys stored on the shard."""
+        return redis_shard.mget(
+            [generate_redis_key(table_name, key) for key in keys])
+
+    def get_version(self, table_name):
+        """Return the version of the table which increases on each change.
+        None if the layout doesn't support table version."""
+        return None
+
+
+class HashStoreClient(StoreClient):
+    """Store client storing each table as one Redis hash for each shard.
+
+    Reading all the records of a table scans only the hashes of the table
+    instead of the whole key space. Each change on the table also increases
+    the table version counter on the shard.
+    """
+
+    def __init__(self, redis_shards_client: RedisShardsClient):
+        super().__init__(redis_shards_client)
+
+    def put(self, table_name, key, value, change_feed=False):
+        redis_shard = self._get_shard(table_name, key)
+        hash_key = generate_hash_table_key(table_name)
+        version_key = generate_hash_table_version_key(table_name)
+        if change_feed:
+            put_with_change(
+                redis_shard, table_name, key, value, hash_key,
+                hash_storage=True, version_key=version_key)
+        else:
+            redis_shard.hset(hash_key, key, value, version_key=version_key)
+
+    def get(self, table_name, key):
+        redis_shard = self._get_shard(table_name, key)
+        return redis_shard.hget(generate_hash_table_key(table_name), key)
+
+    def write_batch(self, table_name, puts, deletes, change_feed=False):
+        hash_key = generate_hash_table_key(table_name)
+        version_key = generate_hash_table_version_key(table_name)
+        for redis_shard, shard_puts, shard_deletes in self._group_by_shard(
+                table_name, puts, deletes):
+            pipeline = redis_shard.pipeline()
+            for key, value in shard_puts:
+                if change_feed:
+                    put_with_change(
+                        redis_shard, table_name, key, value, hash_key,
+                        hash_storage=True, version_key=version_key,
+                        pipeline=pipeline)
+                else:
+                    pipeline.hset(hash_key, key, encode_value(value))
+            for key in shard_deletes:
+                if change_feed:
+                    delete_with_change(
+                        redis_shard, table_name, key, hash_key,
+                        CLOUDTIK_STATE_TABLE_CHANGE_FEED_MAX_DELETED,
+                        hash_storage=True, version_key=version_key,
+                        pipeline=pipeline)
+                else:
+                    pipeline.hdel(hash_key, key)
+            if not change_feed:
+                pipeline.incrby(
+                    version_key, len(shard_puts) + len(shard_deletes))
+            pipeline.execute()
+
+    def delete(self, table_name, key, change_feed=False):
+        redis_shard = self._get_shard(table_name, key)
+        hash_key = generate_hash_table_key(table_name)
+        version_key = generate_hash_table_version_key(table_name)
+        if change_feed:
+            delete_with_change(
+                redis_shard, table_name, key, hash_key,
+                CLOUDTIK_STATE_TABLE_CHANGE_FEED_MAX_DELETED,
+                hash_storage=True, version_key=version_key)
+        else:
+            redis_shard.hdel(hash_key, key, version_key=version_key)
+
+    def get_all(self, table_name, raw_values=False):
+        return dict(self.iter_all(table_name, raw_values))
+
+    def iter_all(self, table_name, raw_values=False):
+        scanner = RedisShardsScanner(self._redis_shards_client, table_name)
+        return scanner.scan_hash_keys_and_values(
+            generate_hash_table_key(table_name), raw_values)
+
+    def get_shard_values(self, redis_shard, table_name, keys):
+        return redis_shard.hmget(generate_hash_table_key(table_name), keys)
+
+    def get_version(self, table_name):
+        version_key = generate_hash_table_version_key(table_name)
+        scanner = RedisShardsScanner(self._redis_shards_client, table_name)
+        version = 0
+        for redis_shard in scanner.get_distinct_shards():
+            shard_version = redis_shard.get(version_key)
+            if shard_version is not None:
+                version += int(shard_version)
+        return version
 
 
 
+def create_store_client(redis_shards_client: RedisShardsClient,
+                        table_layout: str = STATE_TABLE_LAYOUT_KEYS) -> StoreClient:
+    if table_layout == STATE_TABLE_LAYOUT_KEYS:
+        return StoreClient(redis_shards_client)
+    elif table_layout == STATE_TABLE_LAYOUT_HASH:
+        return HashStoreClient(redis_shards_client)
+    raise ValueError("Unsupported state table layout: {}".format(table_layout))
@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+
+class _TagBatch:
+    def __init__(self):
+        self.node_tags = defaultdict(dict)
+        self.done = threading.Event()
+        # The error of writing the batch
+        self.error = None
+        # The node id -> the error of writing the tags of the node
+        self.node_errors = {}
+
+
+class NodeTagCoalescer:
+    """Coalesce the tag writes of the nodes from multiple threads into batches.
+
+    The first write starts a batch which collects the writes of the other
+    threads for batch_delay_s seconds before the batch is written with
+    write_tags by that thread. write_tags may return the errors of the nodes
+    failed by the node id. Each write returns when its batch is written or
+    raises the error of its node or the error raised by write_tags. The
+    batches are written in order one at a time.
+    """
+
+    def __init__(self,
+                 write_tags: Callable[
+                     [Dict[str, Dict[str, str]]],
+                     Optional[Dict[str, Exception]]],
+                 batch_delay_s: float):
+        self.write_tags = write_tags
+        self.batch_delay_s = batch_delay_s
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        # The batch collecting the writes
+        self._batch = None
+        # The batches closed and not written yet
+        self._writing: List[_TagBatch] = []
+
+    def set_node_tags(self, node_id: str, tags: Dict[str, str]) -> None:
+        with self._lock:
+            batch = self._batch
+            is_batching_thread = batch is None
+            if is_batching_thread:
+                batch = self._batch = _TagBatch()
+            batch.node_tags[node_id].update(tags)
+
+        if is_batching_thread:
+            time.sleep(self.batch_delay_s)
+            with self._write_lock:
+                with self._lock:
+                    self._batch = None
+                    self._writing.append(batch)
+                try:
+                    batch.node_errors = self.write_tags(batch.node_tags) or {}
+                except Exception as e:
+                    batch.error = e
+                finally:
+                    with self._lock:
+                        self._writing.remove(batch)
+                    batch.done.set()
+        else:
+            batch.done.wait()
+
+        error = batch.error or batch.node_errors.get(node_id)
+        if error is not None:
+            raise error
+
+    def pending_node_tags(self, node_id: str) -> Dict[str, str]:
+        """Return the tags of the node which are not written yet."""
+        tags = {}
+        with self._lock:
+            for batch in self._writing:
+                tags.update(batch.node_tags.get(node_id, {}))
+            if self._batch is not None:
+                tags.update(self._batch.node_tags.get(node_id, {}))
+        return tags
@@ -38,6 +38,7 @@ from cloudtik.core._private.constants import CLOUDTIK_WHEELS, CLOUDTIK_CLUSTER_P
     CLOUDTIK_RUNTIME_ENV_NODE_TYPE, PRIVACY_REPLACEMENT_TEMPLATE, PRIVACY_REPLACEMENT, CLOUDTIK_CONFIG_SECRET, \
     CLOUDTIK_ENCRYPTION_PREFIX
 from cloudtik.core._private.core_utils import _load_class, double_quote, check_process_exists
+from cloudtik.core._private.file_hash_cache import FileHashCache
 from cloudtik.core._private.crypto import AESCipher
 from cloudtik.core._private.runtime_factory import _get_runtime, _get_runtime_cls, DEFAULT_RUNTIMES
 from cloudtik.core.node_provider import NodeProvider
@@ -1173,8 +1174,7 @@ def with_node_ip_environment_variables(
     return ip_envs
 
 
-def hash_launch_conf(node_conf, auth):
-    hasher = hashlib.sha1()
+def _get_full_auth(auth):
     # For hashing, we replace the path to the key with the
     # key itself. This is to make sure the hashes are the
     # same even if keys live at different locations on different
@@ -1184,42 +1184,95 @@ def hash_launch_conf(node_conf, auth):
         if key_type in auth:
             with open(os.path.expanduser(auth[key_type])) as key:
                 full_auth[key_type] = key.read()
+    return full_auth
+
+
+def _hash_launch_conf_with_full_auth(node_conf, full_auth):
+    hasher = hashlib.sha1()
     hasher.update(
         json.dumps([node_conf, full_auth], sort_keys=True).encode("utf-8"))
     return hasher.hexdigest()
 
 
+def hash_launch_conf(node_conf, auth):
+    return _hash_launch_conf_with_full_auth(node_conf, _get_full_auth(auth))
+
+
+class LaunchHashCache:
+    """The launch hashes of the node types for one version of the config.
+
+    The SSH keys are read and the launch config of each node type is hashed
+    only once for the config. A new cache is created when the config changes.
+    """
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self._full_auth = ConcurrentObjectCache()
+        self._launch_hashes = ConcurrentObjectCache()
+
+    def get(self, node_type: Optional[str]) -> str:
+        return self._launch_hashes.get(
+            node_type, self._hash_launch_conf, node_type=node_type)
+
+    def _hash_launch_conf(self, node_type):
+        launch_config = {}
+        if node_type:
+            launch_config.update(
+                self.config["available_node_types"][node_type]["node_config"])
+        full_auth = self._full_auth.get(
+            "auth", _get_full_auth, auth=self.config["auth"])
+        return _hash_launch_conf_with_full_auth(launch_config, full_auth)
+
+
 # Cache the file hashes to avoid rescanning it each time. Also, this avoids
 # inadvertently restarting workers if the file mount content is mutated on the
 # head node.
 # This global cache needs to be protected for thread concurrency for future cases
-_hash_cache = ConcurrentObjectCache()
+# The cache is bounded for the config variants over the life of the controller.
+_hash_cache = ConcurrentObjectCache(
+    max_size=constants.CLOUDTIK_RUNTIME_HASH_CACHE_MAX_SIZE)
 
 HASH_CONTEXT_HEAD_NODE_CONTENTS_HASH = "head_node_contents_hash"
 HASH_CONTEXT_CONTENTS_HASHER = "contents_hasher"
 
+_file_hash_cache = None
 
-def add_content_hashes(hasher, path, allow_non_existing_paths: bool = False):
-    def add_hash_of_file(fpath):
-        with open(fpath, "rb") as f:
-            for chunk in iter(lambda: f.read(2 ** 20), b""):
-                hasher.update(chunk)
 
+def get_file_hash_cache() -> FileHashCache:
+    # The hashes of the unchanged files (by size, mtime and inode) are reused
+    # even if the config changed or in a new process if persistent
+    global _file_hash_cache
+    if _file_hash_cache is None:
+        cache_file = None
+        if constants.CLOUDTIK_FILE_HASH_CACHE_PERSISTENT:
+            cache_file = os.path.join(
+                get_cloudtik_temp_dir(), "file_hash_cache.json")
+        _file_hash_cache = FileHashCache(
+            max_entries=constants.CLOUDTIK_FILE_HASH_CACHE_MAX_ENTRIES,
+            cache_file=cache_file,
+            parallelism=constants.CLOUDTIK_FILE_HASH_PARALLELISM)
+    return _file_hash_cache
+
+
+def add_content_hashes(hasher, path, allow_non_existing_paths: bool = False):
     path = os.path.expanduser(path)
     if allow_non_existing_paths and not os.path.exists(path):
         return
+    file_hash_cache = get_file_hash_cache()
     if os.path.isdir(path):
         dirs = []
         for dirpath, _, filenames in os.walk(path):
             dirs.append((dirpath, sorted(filenames)))
-        for dirpath, filenames in sorted(dirs):
+        dirs.sort()
+        fpaths = [os.path.join(dirpath, name)
+                  for dirpath, filenames in dirs for name in filenames]
+        file_hashes = iter(file_hash_cache.get_file_hashes(fpaths))
+        for dirpath, filenames in dirs:
             hasher.update(dirpath.encode("utf-8"))
             for name in filenames:
                 hasher.update(name.encode("utf-8"))
-                fpath = os.path.join(dirpath, name)
-                add_hash_of_file(fpath)
+                hasher.update(next(file_hashes).encode("utf-8"))
     else:
-        add_hash_of_file(path)
+        hasher.update(file_hash_cache.get_file_hash(path).encode("utf-8"))
 
 
 def load_runtime_hash(hash_context: Dict[str, Any], file_mounts, hash_str: str):
@@ -1293,6 +1346,7 @@ def hash_runtime_conf(file_mounts,
     else:
         runtime_hash_for_node_types = None
 
+    get_file_hash_cache().save()
     return runtime_hash, file_mounts_contents_hash, runtime_hash_for_node_types
 
 
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from cloudtik.core._private.constants import \
+    CLOUDTIK_PROVIDER_MAX_CONCURRENT_CALLS, CLOUDTIK_PROVIDER_MAX_CALLS_PER_SECOND
+from cloudtik.core.node_provider import NodeProvider
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncNodeProvider:
+    """Interface for creating, terminating and tagging nodes asynchronously.
+
+    **Important**: This is an INTERNAL API that is only exposed for the purpose
+    of implementing custom node providers. A node provider can optionally
+    return its asyncio based implementation from
+    NodeProvider.get_async_node_provider(). Otherwise, the calls of the node
+    provider are run in threads by NodeProviderAsyncAdapter.
+
+    The methods are coroutines which are called from one event loop, so that
+    the calls to the cloud can be in flight at the same time.
+    """
+
+    def __init__(self, provider: NodeProvider) -> None:
+        self.provider = provider
+
+    async def create_node_with_resources(
+            self, node_config: Dict[str, Any], tags: Dict[str, str],
+            count: int,
+            resources: Dict[str, float]) -> Optional[Dict[str, Any]]:
+        """Create nodes with a given resource config."""
+        raise NotImplementedError
+
+    async def terminate_nodes(self, node_ids: List[str]) -> None:
+        """Terminates a set of nodes."""
+        raise NotImplementedError
+
+    async def set_node_tags(self, node_id: str, tags: Dict[str, str]) -> None:
+        """Sets the tag values (string dict) for the specified node."""
+        raise NotImplementedError
+
+
+class _AsyncRateLimiter:
+    """Limit the number of calls started per second."""
+
+    def __init__(self, calls_per_second: int):
+        self.interval = 1.0 / calls_per_second
+        self.next_time = 0.0
+
+    async def acquire(self):
+        now = time.monotonic()
+        wait = self.next_time - now
+        self.next_time = max(now, self.next_time) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class NodeProviderAsyncAdapter(AsyncNodeProvider):
+    """Run the calls of a sync node provider in a thread pool.
+
+    The calls in flight are limited by max_concurrent_calls and the calls
+    started each second are limited by max_calls_per_second (zero for no
+    limit). Terminating the nodes is split into the batches of
+    max_terminate_nodes which are terminated at the same time.
+    """
+
+    def __init__(self,
+                 provider: NodeProvider,
+                 max_concurrent_calls: int = CLOUDTIK_PROVIDER_MAX_CONCURRENT_CALLS,
+                 max_calls_per_second: int = CLOUDTIK_PROVIDER_MAX_CALLS_PER_SECOND):
+        super().__init__(provider)
+        self.max_concurrent_calls = max_concurrent_calls
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_calls,
+            thread_name_prefix="node_provider_call")
+        self._rate_limiter = _AsyncRateLimiter(
+            max_calls_per_second) if max_calls_per_second > 0 else None
+        # Created in the event loop at first call
+        self._semaphore = None
+
+    async def _call(self, func, *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_calls)
+        async with self._semaphore:
+            if self._rate_limiter is not None:
+                await self._rate_limiter.acquire()
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+
+    async def create_node_with_resources(
+            self, node_config: Dict[str, Any], tags: Dict[str, str],
+            count: int,
+            resources: Dict[str, float]) -> Optional[Dict[str, Any]]:
+        return await self._call(
+            self.provider.create_node_with_resources,
+            node_config, tags, count, resources)
+
+    async def terminate_nodes(self, node_ids: List[str]) -> None:
+        if not node_ids:
+            return
+        if type(self.provider).terminate_nodes is NodeProvider.terminate_nodes:
+            # No batch method, terminate the nodes one by one at the same time
+            calls = [self._call(self.provider.terminate_node, node_id)
+                     for node_id in node_ids]
+        else:
+            batch_size = self.provider.max_terminate_nodes or len(node_ids)
+            calls = [self._call(self.provider.terminate_nodes,
+                                node_ids[start:start + batch_size])
+                     for start in range(0, len(node_ids), batch_size)]
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        errors = [result for result in results
+                  if isinstance(result, Exception)]
+        if errors:
+            logger.error("Failed to terminate {} of {} calls.".format(
+                len(errors), len(calls)))
+            raise errors[0]
+
+    async def set_node_tags(self, node_id: str, tags: Dict[str, str]) -> None:
+        await self._call(self.provider.set_node_tags, node_id, tags)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def get_async_node_provider(provider: NodeProvider) -> AsyncNodeProvider:
+    async_provider = provider.get_async_node_provider()
+    if async_provider is None:
+        async_provider = NodeProviderAsyncAdapter(provider)
+    return async_provider
@@ -1,4 +1,6 @@
 import time
+import uuid
+from shlex import quote
 from typing import Any, List, Tuple, Dict, Optional
 
 from cloudtik.core._private.call_context import CallContext
@@ -17,6 +19,21 @@ def get_cmd_to_print(cmd, verbose=False):
     return cmd_to_print
 
 
+def _with_command_batch(cmds: List[str], start: int, status_file: str) -> str:
+    """Make a script running the commands from start in order which stops at
+    the first failed command. The index of the running command is kept in the
+    status file which is removed when all the commands succeeded or when it is
+    read after a failure. Each command runs in a subshell as if it runs in its
+    own session."""
+    status_file = quote(status_file)
+    script = []
+    for i in range(start, len(cmds)):
+        script.append("echo {} > {}".format(i, status_file))
+        script.append("(\n{}\n) || exit $?".format(cmds[i]))
+    script.append("rm -f {}".format(status_file))
+    return "\n".join(script)
+
+
 class CommandExecutor:
     """Interface to run commands on a remote cluster node.
 
@@ -119,6 +136,76 @@ class CommandExecutor:
                 else:
                     raise e
 
+    def run_batch_with_retry(
+            self,
+            cmds: List[str],
+            environment_variables: Dict[str, object] = None,
+            run_env: str = "auto",
+            ssh_options_override_ssh_key: str = "",
+            number_of_retries: Optional[int] = None,
+            retry_interval: Optional[int] = None
+    ) -> None:
+        """Run the commands in order in one remote shell session.
+
+        When a command failed, the failed command and the commands after it
+        are run again in a new session with the failed command retried up
+        to number_of_retries times.
+        """
+        retries = number_of_retries if number_of_retries is not None else COMMAND_RUN_DEFAULT_NUMBER_OF_RETRIES
+        interval = retry_interval if retry_interval is not None else COMMAND_RUN_DEFAULT_RETRY_DELAY_S
+        verbose = False if self.cli_logger.verbosity == 0 else True
+        status_file = "/tmp/cloudtik-batch-{}.status".format(uuid.uuid4().hex)
+        start = 0
+        while True:
+            try:
+                self.run(_with_command_batch(cmds, start, status_file),
+                         environment_variables=environment_variables,
+                         run_env=run_env,
+                         ssh_options_override_ssh_key=ssh_options_override_ssh_key)
+                return
+            except Exception as e:
+                failed = self._get_batch_failed_index(
+                    status_file, start, len(cmds), run_env,
+                    ssh_options_override_ssh_key)
+                if failed != start:
+                    # The retries are for each of the commands
+                    retries = number_of_retries if number_of_retries is not None else COMMAND_RUN_DEFAULT_NUMBER_OF_RETRIES
+                    start = failed
+                cmd_to_print = get_cmd_to_print(cmds[start], verbose)
+                retries -= 1
+                if retries > 0:
+                    self.cli_logger.warning(
+                        "Error running command: {}. Retrying in {} seconds.",
+                        cmd_to_print,
+                        interval
+                    )
+                    time.sleep(interval)
+                else:
+                    self.cli_logger.error(
+                        "Failed command: {}", cmd_to_print)
+                    raise e
+
+    def _get_batch_failed_index(self, status_file, start, end, run_env,
+                                ssh_options_override_ssh_key):
+        # The failed command is unknown if the session failed before
+        # running any command or the status cannot be read. The status file
+        # is removed after read and written again by the next attempt.
+        try:
+            output = self.run(
+                "cat {f} 2>/dev/null; rm -f {f}".format(f=quote(status_file)),
+                with_output=True,
+                run_env=run_env,
+                ssh_options_override_ssh_key=ssh_options_override_ssh_key,
+                silent=True)
+            if isinstance(output, bytes):
+                output = output.decode("utf-8")
+            failed = int(output.strip())
+        except Exception:
+            return start
+        if failed < start or failed >= end:
+            return start
+        return failed
+
     def run_rsync_up(self,
                      source: str,
                      target: str,
@@ -143,6 +230,31 @@ class CommandExecutor:
         """
         raise NotImplementedError
 
+    def supports_rsync_relay(self) -> bool:
+        """Whether the files can be synced directly between the nodes with
+        run_rsync_relay."""
+        return False
+
+    def run_rsync_relay(self,
+                        source_executor: "CommandExecutor",
+                        source: str,
+                        target: str,
+                        relay_key: Any,
+                        options: Optional[Dict[str, Any]] = None) -> None:
+        """Rsync the files synced up to another node directly from that node
+        to this cluster node.
+
+        Args:
+            source_executor (CommandExecutor): The executor of the node
+                from which the files are synced.
+            source (str): The (remote) source path on the node of
+                source_executor.
+            target (str): The (remote) destination path.
+            relay_key: The ephemeral key with which the node of
+                source_executor connects to this node.
+        """
+        raise NotImplementedError
+
     def remote_shell_command_str(self) -> str:
         """Return the command the user can use to open a shell."""
         raise NotImplementedError
@@ -164,3 +276,11 @@ class CommandExecutor:
     def bootstrap_data_disks(self) -> None:
         """Used to format and mount data disks on host."""
         pass
+
+    def close(self) -> None:
+        """Release the connections held by this executor.
+
+        The executor can still be used after closing, in which case the
+        connections are acquired again.
+        """
+        pass
@@ -194,6 +194,15 @@ class NodeProvider:
         """
         return None
 
+    def get_async_node_provider(self) -> Optional["AsyncNodeProvider"]:
+        """Return the asyncio based implementation of creating, terminating
+        and tagging the nodes if the node provider has one.
+
+        By default, this is "None" and the calls of this provider are run
+        in threads by NodeProviderAsyncAdapter.
+        """
+        return None
+
     @staticmethod
     def prepare_config(cluster_config: Dict[str, Any]) -> Dict[str, Any]:
         """Prepare the necessary configs for user before merge with system defaults and validation"""
@@ -1,7 +1,6 @@
 import copy
 import json
 import logging
-import time
 from pathlib import Path
 from threading import RLock
 from uuid import uuid4
@@ -25,11 +24,11 @@ from cloudtik.providers._private._azure.config import (AZURE_MSI_NAME,
 from cloudtik.providers._private._azure.utils import (_get_node_info, get_azure_sdk_function,
                                                       get_credential, get_azure_cloud_storage_config,
                                                       get_default_azure_cloud_storage)
+from cloudtik.providers._private._azure.node_terminator import AzureNodeTerminator
 from cloudtik.providers._private.utils import validate_config_dict
 
 VM_NAME_MAX_LEN = 64
 VM_NAME_UUID_LEN = 8
-RESOURCE_CHECK_TIME = 20
 
 logger = logging.getLogger(__name__)
 azure_logger = logging.getLogger(
@@ -76,6 +75,11 @@ class AzureNodeProvider(NodeProvider):
         # cache node objects
         self.cached_nodes = {}
 
+        # delete the terminated nodes in background
+        self.node_terminator = AzureNodeTerminator(
+            self.compute_client, self.network_client,
+            provider_config["resource_group"])
+
     def with_environment_variables(self, node_type_config: Dict[str, Any], node_id: str):
         return with_azure_environment_variables(self.provider_config, node_type_config, node_id)
 
@@ -95,12 +99,17 @@ class AzureNodeProvider(NodeProvider):
         return self.cached_nodes
 
     def _extract_metadata(self, vm):
-        return _extract_metadata_for_node(
+        metadata = _extract_metadata_for_node(
             vm,
             resource_group=self.provider_config["resource_group"],
             compute_client=self.compute_client,
             network_client=self.network_client
         )
+        # gather disks to delete when terminating
+        disk_names = [d.name for d in vm.storage_profile.data_disks]
+        disk_names.append(vm.storage_profile.os_disk.name)
+        metadata["disk_names"] = disk_names
+        return metadata
 
     def non_terminated_nodes(self, tag_filters):
         """Return a list of node ids filtered by the specified tags dict.
@@ -120,6 +129,7 @@ class AzureNodeProvider(NodeProvider):
         return [
             k for k, v in nodes.items()
             if not v["status"].startswith("deallocat")
+            and not self.node_terminator.is_terminating(k)
         ]
 
     def get_node_info(self, node_id):
@@ -134,6 +144,8 @@ class AzureNodeProvider(NodeProvider):
 
     def is_terminated(self, node_id):
         """Return whether the specified node is terminated."""
+        if self.node_terminator.is_terminating(node_id):
+            return True
         # always get current status
         node = self._get_node(node_id=node_id)
         return node["status"].startswith("deallocat")
@@ -217,78 +229,32 @@ class AzureNodeProvider(NodeProvider):
     def terminate_node(self, node_id):
         """Terminates the specified node. This will delete the VM and
            associated resources (NIC, IP, Storage) for the specified node."""
+        self.terminate_nodes([node_id])
 
-        resource_group = self.provider_config["resource_group"]
-        try:
-            # get metadata for node
-            metadata = self._get_node(node_id)
-        except KeyError:
-            # node no longer exists
-            return
+    def terminate_nodes(self, node_ids):
+        """Terminates the specified nodes. The VMs and the associated
+           resources are deleted in background and the nodes are
+           terminated immediately."""
+        if not node_ids:
+            return None
 
         # TODO: deallocate instead of delete to allow possible reuse
         # self.compute_client.virtual_machines.deallocate(
         #   resource_group_name=resource_group,
         #   vm_name=node_id)
-
-        # gather disks to delete later
-        vm = self.compute_client.virtual_machines.get(
-            resource_group_name=resource_group, vm_name=node_id)
-        disks = {d.name for d in vm.storage_profile.data_disks}
-        disks.add(vm.storage_profile.os_disk.name)
-
-        try:
-            # delete machine, must wait for this to complete
-            delete = get_azure_sdk_function(
-                client=self.compute_client.virtual_machines,
-                function_name="delete")
-            delete(resource_group_name=resource_group, vm_name=node_id).wait()
-        except Exception as e:
-            logger.warning("Failed to delete VM: {}".format(e))
-
-        try:
-            # delete nic
-            delete = get_azure_sdk_function(
-                client=self.network_client.network_interfaces,
-                function_name="delete")
-            delete(
-                resource_group_name=resource_group,
-                network_interface_name=metadata["nic_name"])
-        except Exception as e:
-            logger.warning("Failed to delete nic: {}".format(e))
-
-        # delete ip address
-        if "public_ip_name" in metadata:
-            retry_time = RESOURCE_CHECK_TIME
-            delete = get_azure_sdk_function(
-                client=self.network_client.public_ip_addresses,
-                function_name="delete")
-            cli_logger.print("Deleting public ip address...")
-            while retry_time > 0:
-                try:
-                    delete(
-                        resource_group_name=resource_group,
-                        public_ip_address_name=metadata["public_ip_name"])
-                    cli_logger.print("Successfully deleted public ip address.")
-                    break
-                except Exception as e:
-                    retry_time = retry_time - 1
-                    if retry_time > 0:
-                        cli_logger.warning(
-                            "Failed to delete public ip address. "
-                            "Remaining {} tries to delete public ip address...".format(retry_time))
-                        time.sleep(1)
-                    else:
-                        cli_logger.error("Failed to delete public ip address. {}", str(e))
-
-        # delete disks
-        for disk in disks:
-            try:
-                delete = get_azure_sdk_function(
-                    client=self.compute_client.disks, function_name="delete")
-                delete(resource_group_name=resource_group, disk_name=disk)
-            except Exception as e:
-                logger.warning("Failed to delete disk: {}".format(e))
+        nodes = self._get_filtered_nodes({})
+        for node_id in node_ids:
+            metadata = nodes.get(node_id)
+            if metadata is None:
+                # node no longer exists
+                continue
+            self.node_terminator.terminate(node_id, metadata)
+
+        progress = self.node_terminator.get_progress()
+        logger.info("{} nodes are terminating with {} resources remaining "
+                    "to delete.".format(len(progress),
+                                      sum(map(len, progress.values()))))
+        return None
 
     def _get_node(self, node_id):
         self._get_filtered_nodes({})  # Side effect: updates cache
@@ -0,0 +1,182 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from cloudtik.providers._private._azure.utils import get_azure_sdk_function
+
+logger = logging.getLogger(__name__)
+
+# The interval to check the progress of the deletions
+TERMINATION_POLL_INTERVAL = 1
+# The number of threads to start the deletions
+TERMINATION_WORKERS = 16
+# The public ip address can be deleted only after it is released by the nic
+PUBLIC_IP_DELETE_ATTEMPTS = 20
+DELETE_RETRY_DELAY = 1
+
+
+class _ResourceDeletion:
+    def __init__(self,
+                 resource_type: str,
+                 resource_name: str,
+                 delete: Callable,
+                 after: Optional[List["_ResourceDeletion"]] = None,
+                 max_attempts: int = 1):
+        self.resource_type = resource_type
+        self.resource_name = resource_name
+        self.delete = delete
+        self.after = after or []
+        self.max_attempts = max_attempts
+        self.attempts = 0
+        self.next_attempt_time = 0
+        # The future of starting the deletion, its result is the poller
+        self.future = None
+        self.done = False
+
+    def is_ready(self, now: float) -> bool:
+        return now >= self.next_attempt_time and all(
+            deletion.done for deletion in self.after)
+
+
+class AzureNodeTerminator:
+    """Delete the VMs of the nodes and their resources in the background.
+
+    The VM of a node is deleted first, then its nic and disks, and then its
+    public ip address after the nic is deleted. The deletions of all the
+    nodes are started in parallel by a thread pool and the long-running
+    operation pollers returned are checked by a background thread until
+    all the deletions of the nodes are done. The background thread is not
+    a daemon so that the process waits for the pending deletions to finish.
+    """
+
+    def __init__(self, compute_client, network_client, resource_group: str):
+        self.compute_client = compute_client
+        self.network_client = network_client
+        self.resource_group = resource_group
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            TERMINATION_WORKERS, thread_name_prefix="AzureNodeTerminator")
+        self._deletions: Dict[str, List[_ResourceDeletion]] = {}
+        self._thread = None
+
+    def terminate(self, node_id: str, metadata: Dict) -> None:
+        """Start deleting the VM of the node and its resources."""
+        deletions = self._get_deletions(node_id, metadata)
+        with self._lock:
+            if node_id in self._deletions:
+                return
+            self._deletions[node_id] = deletions
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="AzureNodeTerminator")
+                self._thread.start()
+
+    def is_terminating(self, node_id: str) -> bool:
+        with self._lock:
+            return node_id in self._deletions
+
+    def get_progress(self) -> Dict[str, List[str]]:
+        """Return the resources of each terminating node remaining to
+        delete."""
+        with self._lock:
+            return {
+                node_id: ["{} {}".format(
+                    deletion.resource_type, deletion.resource_name)
+                    for deletion in deletions if not deletion.done]
+                for node_id, deletions in self._deletions.items()}
+
+    def _get_deletions(self, node_id, metadata) -> List[_ResourceDeletion]:
+        resource_group = self.resource_group
+        delete_vm = get_azure_sdk_function(
+            client=self.compute_client.virtual_machines,
+            function_name="delete")
+        delete_nic = get_azure_sdk_function(
+            client=self.network_client.network_interfaces,
+            function_name="delete")
+        delete_disk = get_azure_sdk_function(
+            client=self.compute_client.disks, function_name="delete")
+
+        vm = _ResourceDeletion(
+            "VM", node_id,
+            lambda: delete_vm(
+                resource_group_name=resource_group, vm_name=node_id))
+        nic_name = metadata["nic_name"]
+        nic = _ResourceDeletion(
+            "nic", nic_name,
+            lambda: delete_nic(
+                resource_group_name=resource_group,
+                network_interface_name=nic_name),
+            after=[vm])
+        deletions = [vm, nic]
+
+        public_ip_name = metadata.get("public_ip_name")
+        if public_ip_name:
+            delete_public_ip = get_azure_sdk_function(
+                client=self.network_client.public_ip_addresses,
+                function_name="delete")
+            deletions.append(_ResourceDeletion(
+                "public ip address", public_ip_name,
+                lambda: delete_public_ip(
+                    resource_group_name=resource_group,
+                    public_ip_address_name=public_ip_name),
+                after=[nic],
+                max_attempts=PUBLIC_IP_DELETE_ATTEMPTS))
+
+        for disk_name in metadata.get("disk_names", []):
+            deletions.append(_ResourceDeletion(
+                "disk", disk_name,
+                lambda disk_name=disk_name: delete_disk(
+                    resource_group_name=resource_group, disk_name=disk_name),
+                after=[vm]))
+        return deletions
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._deletions:
+                    self._thread = None
+                    return
+                node_deletions = list(self._deletions.items())
+
+            for node_id, deletions in node_deletions:
+                for deletion in deletions:
+                    self._update(deletion)
+                if all(deletion.done for deletion in deletions):
+                    with self._lock:
+                        del self._deletions[node_id]
+                        remaining = len(self._deletions)
+                    logger.info(
+                        "Node {} terminated. {} nodes remaining to "
+                        "terminate.".format(node_id, remaining))
+            time.sleep(TERMINATION_POLL_INTERVAL)
+
+    def _update(self, deletion: _ResourceDeletion):
+        if deletion.done:
+            return
+        now = time.time()
+        if deletion.future is None:
+            if deletion.is_ready(now):
+                deletion.attempts += 1
+                deletion.future = self._executor.submit(deletion.delete)
+            return
+        if not deletion.future.done():
+            return
+
+        try:
+            poller = deletion.future.result()
+            if poller is not None:
+                if not poller.done():
+                    return
+                # Raise the error of the operation if failed
+                poller.result()
+            deletion.done = True
+        except Exception as e:
+            if deletion.attempts < deletion.max_attempts:
+                deletion.future = None
+                deletion.next_attempt_time = now + DELETE_RETRY_DELAY
+            else:
+                logger.warning("Failed to delete {} {}: {}".format(
+                    deletion.resource_type, deletion.resource_name, e))
+                deletion.done = True
@@ -1,6 +1,5 @@
 import copy
 import logging
-import time
 from typing import Dict, Any
 from uuid import uuid4
 
@@ -22,6 +21,7 @@ from cloudtik.providers._private._kubernetes.config import bootstrap_kubernetes,
     bootstrap_kubernetes_for_api, cleanup_kubernetes_cluster, with_kubernetes_environment_variables, get_head_hostname, \
     get_worker_hostname, prepare_kubernetes_config, get_head_external_service_address, _get_node_info, \
     _get_node_public_ip, get_default_kubernetes_cloud_storage
+from cloudtik.providers._private._kubernetes.pod_informer import PodInformer
 from cloudtik.providers._private._kubernetes.utils import to_label_selector, \
     create_and_configure_pvc_for_pod, delete_persistent_volume_claims, get_pod_persistent_volume_claims, \
     delete_persistent_volume_claims_by_name
@@ -29,8 +29,8 @@ from cloudtik.providers._private.utils import validate_config_dict
 
 logger = logging.getLogger(__name__)
 
-MAX_TAG_RETRIES = 3
-DELAY_BEFORE_TAG_RETRY = .5
+# Pods in these phases are not considered as non-terminated nodes
+TERMINATED_POD_PHASES = ["Failed", "Unknown", "Succeeded", "Terminating"]
 
 
 class KubernetesNodeProvider(NodeProvider):
@@ -38,51 +38,51 @@ class KubernetesNodeProvider(NodeProvider):
         NodeProvider.__init__(self, provider_config, cluster_name)
         self.cluster_name = cluster_name
         self.namespace = provider_config["namespace"]
+        # All the reads of the pods of the cluster are served by the informer
+        self.pod_informer = PodInformer(
+            self.namespace,
+            to_label_selector({CLOUDTIK_TAG_CLUSTER_NAME: self.cluster_name}))
 
     def with_environment_variables(self, node_type_config: Dict[str, Any], node_id: str):
         """Export necessary environment variables for running node commands"""
         return with_kubernetes_environment_variables(self.provider_config, node_type_config, node_id)
 
     def non_terminated_nodes(self, tag_filters):
-        # Match pods that are in the 'Pending' or 'Running' phase.
-        # Unfortunately there is no OR operator in field selectors, so we
-        # have to match on NOT any of the other phases.
-        field_selector = ",".join([
-            "status.phase!=Failed",
-            "status.phase!=Unknown",
-            "status.phase!=Succeeded",
-            "status.phase!=Terminating",
-        ])
-
-        tag_filters[CLOUDTIK_TAG_CLUSTER_NAME] = self.cluster_name
-        label_selector = to_label_selector(tag_filters)
-        pod_list = core_api().list_namespaced_pod(
-            self.namespace,
-            field_selector=field_selector,
-            label_selector=label_selector)
-
-        # Don't return pods marked for deletion,
+        # Match pods that are in the 'Pending' or 'Running' phase
+        # and don't return pods marked for deletion,
         # i.e. pods with non-null metadata.DeletionTimestamp.
+        def is_non_terminated(pod):
+            phase = pod.status.phase if pod.status else None
+            if (phase in TERMINATED_POD_PHASES
+                    or pod.metadata.deletion_timestamp is not None):
+                return False
+            labels = pod.metadata.labels or {}
+            for k, v in tag_filters.items():
+                if labels.get(k) != v:
+                    return False
+            return True
+
         return [
-            pod.metadata.name for pod in pod_list.items
-            if pod.metadata.deletion_timestamp is None
+            pod.metadata.name for pod in self.pod_informer.list_pods()
+            if is_non_terminated(pod)
         ]
 
     def get_node_info(self, node_id):
-        pod = core_api().read_namespaced_pod(node_id, self.namespace)
+        pod = self.pod_informer.get_pod(node_id)
         return _get_node_info(pod, self.provider_config, self.namespace, self.cluster_name)
 
     def is_running(self, node_id):
-        pod = core_api().read_namespaced_pod(node_id, self.namespace)
+        pod = self.pod_informer.get_pod(node_id)
         return pod.status.phase == "Running"
 
     def is_terminated(self, node_id):
-        pod = core_api().read_namespaced_pod(node_id, self.namespace)
+        pod = self.pod_informer.get_pod(node_id)
         return pod.status.phase not in ["Running", "Pending"]
 
     def node_tags(self, node_id):
-        pod = core_api().read_namespaced_pod(node_id, self.namespace)
-        return pod.metadata.labels
+        pod = self.pod_informer.get_pod(node_id)
+        # The pod is owned by the informer
+        return dict(pod.metadata.labels or {})
 
     def external_ip(self, node_id):
         if _is_use_internal_ip(self.provider_config):
@@ -94,7 +94,7 @@ class KubernetesNodeProvider(NodeProvider):
         return _get_node_public_ip(tags, self.namespace, self.cluster_name)
 
     def internal_ip(self, node_id):
-        pod = core_api().read_namespaced_pod(node_id, self.namespace)
+        pod = self.pod_informer.get_pod(node_id)
         return pod.status.pod_ip
 
     def get_node_id(self, ip_address, use_internal_ip=True) -> str:
@@ -102,26 +102,16 @@ class KubernetesNodeProvider(NodeProvider):
             raise ValueError("Must use internal IPs with Kubernetes.")
         return super().get_node_id(ip_address, use_internal_ip=use_internal_ip)
 
-    def set_node_tags(self, node_ids, tags):
-        for _ in range(MAX_TAG_RETRIES - 1):
-            try:
-                self._set_node_tags(node_ids, tags)
-                return
-            except ApiException as e:
-                if e.status == 409:
-                    logger.info(log_prefix + "Caught a 409 error while setting"
-                                " node tags. Retrying...")
-                    time.sleep(DELAY_BEFORE_TAG_RETRY)
-                    continue
-                else:
-                    raise
-        # One more try
-        self._set_node_tags(node_ids, tags)
-
-    def _set_node_tags(self, node_id, tags):
-        pod = core_api().read_namespaced_pod(node_id, self.namespace)
-        pod.metadata.labels.update(tags)
-        core_api().patch_namespaced_pod(node_id, self.namespace, pod)
+    def set_node_tags(self, node_id, tags):
+        # A merge patch of the labels needs no read of the pod
+        # and doesn't conflict with the other updates of the pod
+        patch = {
+            "metadata": {
+                "labels": tags
+            }
+        }
+        pod = core_api().patch_namespaced_pod(node_id, self.namespace, patch)
+        self.pod_informer.update_pod(pod)
 
     def create_node(self, node_config, tags, count):
         conf = copy.deepcopy(node_config)
@@ -156,6 +146,7 @@ class KubernetesNodeProvider(NodeProvider):
                 _pod_spec, data_disks, self.cluster_name, self.namespace)
             try:
                 pod = core_api().create_namespaced_pod(self.namespace, _pod_spec)
+                self.pod_informer.update_pod(pod)
                 new_nodes.append(pod)
             except ApiException:
                 logger.error("Error happened when creating the pod. Try clean up its PVCs...")
@@ -201,6 +192,7 @@ class KubernetesNodeProvider(NodeProvider):
                                " but the pod was not found (404).")
             else:
                 raise
+        self.pod_informer.mark_deleted(node_id)
 
         try:
             delete_persistent_volume_claims_by_name(pod_pvcs, self.namespace)
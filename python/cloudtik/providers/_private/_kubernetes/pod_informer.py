@@ -0,0 +1,166 @@
+import copy
+import datetime
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from kubernetes import watch
+from kubernetes.client.rest import ApiException
+
+from cloudtik.providers._private._kubernetes import core_api, log_prefix
+
+logger = logging.getLogger(__name__)
+
+HTTP_STATUS_GONE = 410
+
+POD_WATCH_TIMEOUT_S = 300
+# The client side timeout of the watch request in case the server doesn't
+# end the watch at the server side timeout
+POD_WATCH_REQUEST_TIMEOUT_S = POD_WATCH_TIMEOUT_S + 30
+POD_WATCH_RETRY_DELAY_S = 5
+
+
+def _get_resource_version(pod) -> Optional[int]:
+    try:
+        return int(pod.metadata.resource_version)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class PodInformer:
+    """A local index of the pods of a cluster kept in sync by LIST and WATCH.
+
+    The pods are listed once and then watched from the resource version of
+    the list by a background thread. When the resource version is too old
+    for the API server (410 Gone), the pods are listed again. The reads are
+    served from the index, so the API server is called only for a pod which
+    is not known yet.
+    """
+
+    def __init__(self, namespace: str, label_selector: str):
+        self.namespace = namespace
+        self.label_selector = label_selector
+        self._lock = threading.Lock()
+        self._list_lock = threading.Lock()
+        self._pods: Dict[str, object] = {}
+        self._resource_version = None
+        self._synced = False
+        self._thread = None
+        self._watch = None
+        self._stopped = False
+
+    def get_pod(self, name: str):
+        """Get the pod from the index or from the API server if not known."""
+        self._ensure_synced()
+        with self._lock:
+            pod = self._pods.get(name)
+        if pod is None:
+            pod = core_api().read_namespaced_pod(name, self.namespace)
+        return pod
+
+    def list_pods(self) -> List[object]:
+        self._ensure_synced()
+        with self._lock:
+            return list(self._pods.values())
+
+    def update_pod(self, pod):
+        """Update the index with a pod returned by a create or patch call."""
+        with self._lock:
+            self._set_pod(pod)
+
+    def mark_deleted(self, name: str):
+        """Mark the pod as being deleted after a delete call so that it is
+        not listed as a non-terminated pod before the watch catches up."""
+        with self._lock:
+            pod = self._pods.get(name)
+            if pod is None or pod.metadata.deletion_timestamp is not None:
+                return
+            # The pod object may be in use by the callers
+            pod = copy.copy(pod)
+            pod.metadata = copy.copy(pod.metadata)
+            pod.metadata.deletion_timestamp = datetime.datetime.now(
+                datetime.timezone.utc)
+            self._pods[name] = pod
+
+    def stop(self):
+        self._stopped = True
+        if self._watch is not None:
+            self._watch.stop()
+
+    def _ensure_synced(self):
+        if self._synced:
+            return
+        with self._list_lock:
+            if self._synced:
+                return
+            self._list()
+            self._synced = True
+            self._thread = threading.Thread(
+                target=self._run, name="PodInformer", daemon=True)
+            self._thread.start()
+
+    def _list(self):
+        pod_list = core_api().list_namespaced_pod(
+            self.namespace, label_selector=self.label_selector)
+        with self._lock:
+            self._pods = {pod.metadata.name: pod for pod in pod_list.items}
+            self._resource_version = pod_list.metadata.resource_version
+
+    def _set_pod(self, pod):
+        name = pod.metadata.name
+        existing = self._pods.get(name)
+        if existing is not None:
+            # Don't overwrite with an older state
+            existing_version = _get_resource_version(existing)
+            version = _get_resource_version(pod)
+            if (existing_version is not None and version is not None
+                    and version < existing_version):
+                return
+        self._pods[name] = pod
+
+    def _run(self):
+        while not self._stopped:
+            try:
+                self._watch_pods()
+            except ApiException as e:
+                if e.status == HTTP_STATUS_GONE:
+                    logger.debug(log_prefix + "Pod watch expired. Listing the pods again.")
+                    self._relist()
+                else:
+                    logger.warning(log_prefix + "Error watching the pods: {}".format(e))
+                    time.sleep(POD_WATCH_RETRY_DELAY_S)
+            except Exception as e:
+                logger.warning(log_prefix + "Error watching the pods: {}".format(e))
+                time.sleep(POD_WATCH_RETRY_DELAY_S)
+
+    def _relist(self):
+        while not self._stopped:
+            try:
+                self._list()
+                return
+            except Exception as e:
+                logger.warning(log_prefix + "Error listing the pods: {}".format(e))
+                time.sleep(POD_WATCH_RETRY_DELAY_S)
+
+    def _watch_pods(self):
+        self._watch = watch.Watch()
+        for event in self._watch.stream(
+                core_api().list_namespaced_pod,
+                self.namespace,
+                label_selector=self.label_selector,
+                resource_version=self._resource_version,
+                allow_watch_bookmarks=True,
+                timeout_seconds=POD_WATCH_TIMEOUT_S,
+                _request_timeout=POD_WATCH_REQUEST_TIMEOUT_S):
+            if self._stopped:
+                break
+            self._handle_event(event["type"], event["object"])
+
+    def _handle_event(self, event_type, pod):
+        with self._lock:
+            if event_type in ["ADDED", "MODIFIED"]:
+                self._set_pod(pod)
+            elif event_type == "DELETED":
+                self._pods.pop(pod.metadata.name, None)
+            self._resource_version = pod.metadata.resource_version
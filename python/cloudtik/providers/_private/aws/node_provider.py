@@ -2,7 +2,6 @@ import copy
 import threading
 from collections import defaultdict, OrderedDict
 import logging
-import time
 from typing import Any, Dict, List
 
 import botocore
@@ -12,6 +11,7 @@ from cloudtik.core.tags import CLOUDTIK_TAG_CLUSTER_NAME, CLOUDTIK_TAG_NODE_NAME
     CLOUDTIK_TAG_LAUNCH_CONFIG, CLOUDTIK_TAG_NODE_KIND, CLOUDTIK_TAG_USER_NODE_TYPE
 
 from cloudtik.core._private.log_timer import LogTimer
+from cloudtik.core._private.tag_coalescer import NodeTagCoalescer
 from cloudtik.core._private.cli_logger import cli_logger, cf
 
 from cloudtik.providers._private.aws.config import verify_s3_storage, bootstrap_aws, post_prepare_aws, \
@@ -64,16 +64,10 @@ class AWSNodeProvider(NodeProvider):
 
         # Tags that we believe to actually be on EC2.
         self.tag_cache = {}
-        # Tags that we will soon upload.
-        self.tag_cache_pending = defaultdict(dict)
-        # Number of threads waiting for a batched tag update.
-        self.batch_thread_count = 0
-        self.batch_update_done = threading.Event()
-        self.batch_update_done.set()
-        self.ready_for_new_batch = threading.Event()
-        self.ready_for_new_batch.set()
         self.tag_cache_lock = threading.Lock()
-        self.count_lock = threading.Lock()
+        # Batches the tags that we will soon upload.
+        self.tag_coalescer = NodeTagCoalescer(
+            self._update_node_tags, TAG_BATCH_DELAY)
 
         # Cache of node objects from the last nodes() call. This avoids
         # excessive DescribeInstances requests.
@@ -133,9 +127,9 @@ class AWSNodeProvider(NodeProvider):
 
     def node_tags(self, node_id):
         with self.tag_cache_lock:
-            d1 = self.tag_cache[node_id]
-            d2 = self.tag_cache_pending.get(node_id, {})
-            return dict(d1, **d2)
+            d1 = dict(self.tag_cache[node_id])
+        d2 = self.tag_coalescer.pending_node_tags(node_id)
+        return dict(d1, **d2)
 
     def external_ip(self, node_id):
         node = self._get_cached_node(node_id)
@@ -154,40 +148,16 @@ class AWSNodeProvider(NodeProvider):
         return node.private_ip_address
 
     def set_node_tags(self, node_id, tags):
-        is_batching_thread = False
-        with self.tag_cache_lock:
-            if not self.tag_cache_pending:
-                is_batching_thread = True
-                # Wait for threads in the last batch to exit
-                self.ready_for_new_batch.wait()
-                self.ready_for_new_batch.clear()
-                self.batch_update_done.clear()
-            self.tag_cache_pending[node_id].update(tags)
-
-        if is_batching_thread:
-            time.sleep(TAG_BATCH_DELAY)
-            with self.tag_cache_lock:
-                self._update_node_tags()
-                self.batch_update_done.set()
-
-        with self.count_lock:
-            self.batch_thread_count += 1
-        self.batch_update_done.wait()
-
-        with self.count_lock:
-            self.batch_thread_count -= 1
-            if self.batch_thread_count == 0:
-                self.ready_for_new_batch.set()
-
-    def _update_node_tags(self):
-        batch_updates = defaultdict(list)
+        self.tag_coalescer.set_node_tags(node_id, tags)
 
-        for node_id, tags in self.tag_cache_pending.items():
-            for x in tags.items():
-                batch_updates[x].append(node_id)
-            self.tag_cache[node_id].update(tags)
+    def _update_node_tags(self, node_tags):
+        batch_updates = defaultdict(list)
 
-        self.tag_cache_pending = defaultdict(dict)
+        with self.tag_cache_lock:
+            for node_id, tags in node_tags.items():
+                for x in tags.items():
+                    batch_updates[x].append(node_id)
+                self.tag_cache[node_id].update(tags)
 
         self._create_tags(batch_updates)
 
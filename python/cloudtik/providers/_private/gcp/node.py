@@ -27,6 +27,7 @@ from copy import deepcopy
 from typing import Any, Dict, List, Optional, Tuple, Union
 import logging
 import abc
+import threading
 import time
 import re
 from uuid import uuid4
@@ -38,6 +39,8 @@ from googleapiclient.discovery import Resource
 from googleapiclient.errors import HttpError
 
 from cloudtik.core.tags import CLOUDTIK_TAG_CLUSTER_NAME, CLOUDTIK_TAG_NODE_NAME
+from cloudtik.providers._private.gcp.operation_poller import OperationPoller, \
+    get_operation_poller
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +52,8 @@ MAX_POLLS = 12
 # TPU deletion uses MAX_POLLS
 MAX_POLLS_TPU = MAX_POLLS * 8
 POLL_INTERVAL = 5
+# The maximum number of calls in one batch request
+MAX_BATCH_REQUESTS = 1000
 
 
 def _retry_on_exception(exception: Union[Exception, Tuple[Exception]],
@@ -201,20 +206,107 @@ class GCPTPUNode(GCPNode):
 class GCPResource(metaclass=abc.ABCMeta):
     """Abstraction around compute and TPU resources"""
 
+    # The default number of polls of the poll interval to wait an operation
+    max_polls = MAX_POLLS
+
     def __init__(self, resource: Resource, project_id: str,
-                 availability_zone: str, cluster_name: str) -> None:
+                 availability_zone: str, cluster_name: str,
+                 operation_poller: Optional[OperationPoller] = None) -> None:
         self.resource = resource
         self.project_id = project_id
         self.availability_zone = availability_zone
         self.cluster_name = cluster_name
+        self.operation_poller = operation_poller or get_operation_poller()
+        # The http client of a resource is not thread safe
+        self._api_lock = threading.Lock()
+
+    def _execute(self, request):
+        with self._api_lock:
+            return request.execute()
+
+    def _execute_batch(
+            self, requests: List[Tuple[str, Any]]
+    ) -> Dict[str, Union[dict, Exception]]:
+        """Executes the requests in batch requests.
+
+        Returns the response or the HttpError of each request id.
+        """
+        results = {}
+        if len(requests) == 1:
+            request_id, request = requests[0]
+            try:
+                results[request_id] = self._execute(request)
+            except HttpError as e:
+                results[request_id] = e
+            return results
+
+        def callback(request_id, response, exception):
+            results[request_id] = exception if exception is not None \
+                else response
+
+        for i in range(0, len(requests), MAX_BATCH_REQUESTS):
+            batch = self.resource.new_batch_http_request(callback=callback)
+            for request_id, request in requests[i:i + MAX_BATCH_REQUESTS]:
+                batch.add(request, request_id=request_id)
+            self._execute(batch)
+        return results
+
+    @abc.abstractmethod
+    def get_operation(self, operation: dict) -> dict:
+        """Returns the current state of an operation."""
+        return
+
+    def get_operations(
+            self, operations: List[dict]) -> List[Union[dict, Exception]]:
+        """Returns the current state or the error of each operation."""
+        results = []
+        for operation in operations:
+            try:
+                results.append(self.get_operation(operation))
+            except HttpError as e:
+                results.append(e)
+        return results
 
     @abc.abstractmethod
+    def is_operation_done(self, result: dict) -> bool:
+        return False
+
     def wait_for_operation(self,
                            operation: dict,
-                           max_polls: int = MAX_POLLS,
+                           max_polls: Optional[int] = None,
                            poll_interval: int = POLL_INTERVAL) -> dict:
         """Waits a preset amount of time for operation to complete."""
-        return None
+        logger.debug("wait_for_operation: "
+                     f"Waiting for operation {operation['name']} to finish...")
+        timeout_s = (max_polls or self.max_polls) * poll_interval
+        return self.operation_poller.wait(self, operation, timeout_s)
+
+    def wait_for_operations(
+            self,
+            operations: Dict[str, Union[dict, Exception]],
+            max_polls: Optional[int] = None,
+            poll_interval: int = POLL_INTERVAL
+    ) -> Dict[str, Union[dict, Exception]]:
+        """Waits for the operations to complete together.
+
+        Returns the result or the error of each operation by the key of
+        the operation. An error in place of an operation is returned as is.
+        """
+        timeout_s = (max_polls or self.max_polls) * poll_interval
+        futures = {
+            key: self.operation_poller.submit(self, operation, timeout_s)
+            for key, operation in operations.items()
+            if not isinstance(operation, Exception)}
+        results = {}
+        for key, operation in operations.items():
+            if key not in futures:
+                results[key] = operation
+                continue
+            try:
+                results[key] = futures[key].result()
+            except Exception as e:
+                results[key] = e
+        return results
 
     @abc.abstractmethod
     def list_instances(
@@ -232,6 +324,18 @@ class GCPResource(metaclass=abc.ABCMeta):
         """Returns a single instance."""
         return
 
+    def get_instances(
+            self, node_ids: List[str]) -> Dict[str, Union["GCPNode", Exception]]:
+        """Returns the instance or the error of each instance by the
+        instance name."""
+        instances = {}
+        for node_id in node_ids:
+            try:
+                instances[node_id] = self.get_instance(node_id)
+            except HttpError as e:
+                instances[node_id] = e
+        return instances
+
     @abc.abstractmethod
     def set_labels(self,
                    node: GCPNode,
@@ -242,6 +346,25 @@ class GCPResource(metaclass=abc.ABCMeta):
         Completely replaces the labels dictionary."""
         return
 
+    def set_labels_batch(
+            self,
+            node_labels: List[Tuple["GCPNode", dict]],
+            wait_for_operation: bool = True
+    ) -> Dict[str, Union[dict, Exception]]:
+        """Sets labels on the instances and returns the result or the error
+        of each instance by the instance name."""
+        operations = {}
+        for node, labels in node_labels:
+            try:
+                operations[node["name"]] = self.set_labels(
+                    node, labels, wait_for_operation=False)
+            except HttpError as e:
+                operations[node["name"]] = e
+
+        if wait_for_operation:
+            return self.wait_for_operations(operations)
+        return operations
+
     @abc.abstractmethod
     def create_instance(self,
                         base_config: dict,
@@ -270,8 +393,14 @@ class GCPResource(metaclass=abc.ABCMeta):
         ]
 
         if wait_for_operation:
-            results = [(self.wait_for_operation(operation), node_name)
-                       for operation, node_name in operations]
+            # Wait for the operations together, raising the first error
+            results = self.wait_for_operations(
+                {node_name: operation for operation, node_name in operations})
+            for result in results.values():
+                if isinstance(result, Exception):
+                    raise result
+            results = [(results[node_name], node_name)
+                       for _, node_name in operations]
         else:
             results = operations
 
@@ -283,6 +412,24 @@ class GCPResource(metaclass=abc.ABCMeta):
         """Deletes an instance and returns result."""
         return
 
+    def delete_instances(
+            self, node_ids: List[str],
+            wait_for_operation: bool = True
+    ) -> Dict[str, Union[dict, Exception]]:
+        """Deletes the instances and returns the result or the error of each
+        instance by the instance name."""
+        operations = {}
+        for node_id in node_ids:
+            try:
+                operations[node_id] = self.delete_instance(
+                    node_id, wait_for_operation=False)
+            except HttpError as e:
+                operations[node_id] = e
+
+        if wait_for_operation:
+            return self.wait_for_operations(operations, max_polls=MAX_POLLS)
+        return operations
+
     @abc.abstractmethod
     def from_instance(self, instance) -> "GCPNode":
         """Construct an instance."""
@@ -292,30 +439,25 @@ class GCPResource(metaclass=abc.ABCMeta):
 class GCPCompute(GCPResource):
     """Abstraction around GCP compute resource"""
 
-    def wait_for_operation(self,
-                           operation: dict,
-                           max_polls: int = MAX_POLLS,
-                           poll_interval: int = POLL_INTERVAL) -> dict:
-        """Poll for compute zone operation until finished."""
-        logger.debug("wait_for_compute_zone_operation: "
-                    f"Waiting for operation {operation['name']} to finish...")
-
-        for _ in range(max_polls):
-            result = self.resource.zoneOperations().get(
-                project=self.project_id,
-                operation=operation["name"],
-                zone=self.availability_zone).execute()
-            if "error" in result:
-                raise Exception(result["error"])
+    def _get_operation_request(self, operation: dict):
+        return self.resource.zoneOperations().get(
+            project=self.project_id,
+            operation=operation["name"],
+            zone=self.availability_zone)
 
-            if result["status"] == "DONE":
-                logger.debug("wait_for_compute_zone_operation: "
-                            f"Operation {operation['name']} finished.")
-                break
+    def get_operation(self, operation: dict) -> dict:
+        return self._execute(self._get_operation_request(operation))
 
-            time.sleep(poll_interval)
+    def get_operations(
+            self, operations: List[dict]) -> List[Union[dict, Exception]]:
+        """Gets the compute zone operations in batch requests."""
+        results = self._execute_batch(
+            [(str(i), self._get_operation_request(operation))
+             for i, operation in enumerate(operations)])
+        return [results[str(i)] for i in range(len(operations))]
 
-        return result
+    def is_operation_done(self, result: dict) -> bool:
+        return result["status"] == "DONE"
 
     def list_instances(self, label_filters: Optional[dict] = None
                        ) -> List[GCPComputeNode]:
@@ -349,38 +491,55 @@ class GCPCompute(GCPResource):
 
         filter_expr = " AND ".join(not_empty_filters)
 
-        response = self.resource.instances().list(
+        response = self._execute(self.resource.instances().list(
             project=self.project_id,
             zone=self.availability_zone,
             filter=filter_expr,
-        ).execute()
+        ))
 
         instances = response.get("items", [])
         return [GCPComputeNode(i, self) for i in instances]
 
-    def get_instance(self, node_id: str) -> GCPComputeNode:
-        instance = self.resource.instances().get(
+    def _get_instance_request(self, node_id: str):
+        return self.resource.instances().get(
             project=self.project_id,
             zone=self.availability_zone,
             instance=node_id,
-        ).execute()
+        )
+
+    def get_instance(self, node_id: str) -> GCPComputeNode:
+        instance = self._execute(self._get_instance_request(node_id))
 
         return GCPComputeNode(instance, self)
 
-    def set_labels(self,
-                   node: GCPComputeNode,
-                   labels: dict,
-                   wait_for_operation: bool = True) -> dict:
+    def get_instances(
+            self, node_ids: List[str]
+    ) -> Dict[str, Union[GCPComputeNode, Exception]]:
+        results = self._execute_batch(
+            [(node_id, self._get_instance_request(node_id))
+             for node_id in node_ids])
+        return {
+            node_id: result if isinstance(result, Exception)
+            else GCPComputeNode(result, self)
+            for node_id, result in results.items()}
+
+    def _set_labels_request(self, node: GCPComputeNode, labels: dict):
         body = {
             "labels": dict(node["labels"], **labels),
             "labelFingerprint": node["labelFingerprint"]
         }
         node_id = node["name"]
-        operation = self.resource.instances().setLabels(
+        return self.resource.instances().setLabels(
             project=self.project_id,
             zone=self.availability_zone,
             instance=node_id,
-            body=body).execute()
+            body=body)
+
+    def set_labels(self,
+                   node: GCPComputeNode,
+                   labels: dict,
+                   wait_for_operation: bool = True) -> dict:
+        operation = self._execute(self._set_labels_request(node, labels))
 
         if wait_for_operation:
             result = self.wait_for_operation(operation)
@@ -389,6 +548,19 @@ class GCPCompute(GCPResource):
 
         return result
 
+    def set_labels_batch(
+            self,
+            node_labels: List[Tuple[GCPComputeNode, dict]],
+            wait_for_operation: bool = True
+    ) -> Dict[str, Union[dict, Exception]]:
+        operations = self._execute_batch(
+            [(node["name"], self._set_labels_request(node, labels))
+             for node, labels in node_labels])
+
+        if wait_for_operation:
+            return self.wait_for_operations(operations)
+        return operations
+
     def _convert_resources_to_urls(
             self, configuration_dict: Dict[str, Any]) -> Dict[str, Any]:
         """Ensures that resources are in their full URL form.
@@ -458,11 +630,11 @@ class GCPCompute(GCPResource):
         # https://cloud.google.com/compute/docs/reference/rest/v1/instances/insert
         source_instance_template = config.pop("sourceInstanceTemplate", None)
 
-        operation = self.resource.instances().insert(
+        operation = self._execute(self.resource.instances().insert(
             project=self.project_id,
             zone=self.availability_zone,
             sourceInstanceTemplate=source_instance_template,
-            body=config).execute()
+            body=config))
 
         if wait_for_operation:
             result = self.wait_for_operation(operation)
@@ -471,13 +643,16 @@ class GCPCompute(GCPResource):
 
         return result, name
 
-    def delete_instance(self, node_id: str,
-                        wait_for_operation: bool = True) -> dict:
-        operation = self.resource.instances().delete(
+    def _delete_instance_request(self, node_id: str):
+        return self.resource.instances().delete(
             project=self.project_id,
             zone=self.availability_zone,
             instance=node_id,
-        ).execute()
+        )
+
+    def delete_instance(self, node_id: str,
+                        wait_for_operation: bool = True) -> dict:
+        operation = self._execute(self._delete_instance_request(node_id))
 
         if wait_for_operation:
             result = self.wait_for_operation(operation)
@@ -486,6 +661,18 @@ class GCPCompute(GCPResource):
 
         return result
 
+    def delete_instances(
+            self, node_ids: List[str],
+            wait_for_operation: bool = True
+    ) -> Dict[str, Union[dict, Exception]]:
+        operations = self._execute_batch(
+            [(node_id, self._delete_instance_request(node_id))
+             for node_id in node_ids])
+
+        if wait_for_operation:
+            return self.wait_for_operations(operations)
+        return operations
+
     def from_instance(self, instance) -> GCPComputeNode:
         return GCPComputeNode(instance, self)
 
@@ -499,33 +686,21 @@ class GCPTPU(GCPResource):
     def path(self):
         return f"projects/{self.project_id}/locations/{self.availability_zone}"
 
-    def wait_for_operation(self,
-                           operation: dict,
-                           max_polls: int = MAX_POLLS_TPU,
-                           poll_interval: int = POLL_INTERVAL) -> dict:
-        """Poll for TPU operation until finished."""
-        logger.debug("wait_for_tpu_operation: "
-                    f"Waiting for operation {operation['name']} to finish...")
+    max_polls = MAX_POLLS_TPU
 
-        for _ in range(max_polls):
-            result = self.resource.projects().locations().operations().get(
-                name=f"{operation['name']}").execute()
-            if "error" in result:
-                raise Exception(result["error"])
+    def get_operation(self, operation: dict) -> dict:
+        return self._execute(
+            self.resource.projects().locations().operations().get(
+                name=f"{operation['name']}"))
 
-            if "response" in result:
-                logger.debug("wait_for_tpu_operation: "
-                            f"Operation {operation['name']} finished.")
-                break
-
-            time.sleep(poll_interval)
-
-        return result
+    def is_operation_done(self, result: dict) -> bool:
+        return "response" in result
 
     def list_instances(
             self, label_filters: Optional[dict] = None) -> List[GCPTPUNode]:
-        response = self.resource.projects().locations().nodes().list(
-            parent=self.path).execute()
+        response = self._execute(
+            self.resource.projects().locations().nodes().list(
+                parent=self.path))
 
         instances = response.get("nodes", [])
         instances = [GCPTPUNode(i, self) for i in instances]
@@ -556,8 +731,8 @@ class GCPTPU(GCPResource):
         return instances
 
     def get_instance(self, node_id: str) -> GCPTPUNode:
-        instance = self.resource.projects().locations().nodes().get(
-            name=node_id).execute()
+        instance = self._execute(
+            self.resource.projects().locations().nodes().get(name=node_id))
 
         return GCPTPUNode(instance, self)
 
@@ -573,11 +748,12 @@ class GCPTPU(GCPResource):
         }
         update_mask = "labels"
 
-        operation = self.resource.projects().locations().nodes().patch(
-            name=node["name"],
-            updateMask=update_mask,
-            body=body,
-        ).execute()
+        operation = self._execute(
+            self.resource.projects().locations().nodes().patch(
+                name=node["name"],
+                updateMask=update_mask,
+                body=body,
+            ))
 
         if wait_for_operation:
             result = self.wait_for_operation(operation)
@@ -609,11 +785,12 @@ class GCPTPU(GCPResource):
             # https://cloud.google.com/tpu/docs/users-guide-tpu-vm#create-curl
             config["networkConfig"]["enableExternalIps"] = True
 
-        operation = self.resource.projects().locations().nodes().create(
-            parent=self.path,
-            body=config,
-            nodeId=name,
-        ).execute()
+        operation = self._execute(
+            self.resource.projects().locations().nodes().create(
+                parent=self.path,
+                body=config,
+                nodeId=name,
+            ))
 
         if wait_for_operation:
             result = self.wait_for_operation(operation)
@@ -624,8 +801,8 @@ class GCPTPU(GCPResource):
 
     def delete_instance(self, node_id: str,
                         wait_for_operation: bool = True) -> dict:
-        operation = self.resource.projects().locations().nodes().delete(
-            name=node_id).execute()
+        operation = self._execute(
+            self.resource.projects().locations().nodes().delete(name=node_id))
 
         # No need to increase MAX_POLLS for deletion
         if wait_for_operation:
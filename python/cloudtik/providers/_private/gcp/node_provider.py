@@ -1,4 +1,5 @@
-from typing import Any, Dict
+from collections import defaultdict
+from typing import Any, Dict, List
 from functools import wraps
 from threading import RLock
 import time
@@ -7,6 +8,7 @@ import logging
 import googleapiclient
 
 from cloudtik.core._private.cli_logger import cli_logger
+from cloudtik.core._private.tag_coalescer import NodeTagCoalescer
 from cloudtik.core.node_provider import NodeProvider
 
 from cloudtik.providers._private.gcp.config import (
@@ -16,7 +18,7 @@ from cloudtik.providers._private.gcp.config import (
 # (API endpoints), which can differ widely, making it impossible to use
 # the same logic for everything.
 from cloudtik.providers._private.gcp.node import (
-    GCPResource, GCPNode, GCPCompute, GCPTPU, GCPNodeType)
+    GCPResource, GCPNode, GCPCompute, GCPTPU, GCPNodeType, MAX_POLLS)
 
 from cloudtik.providers._private.gcp.utils import _get_node_info, \
     construct_clients_from_provider_config, get_node_type, get_gcp_cloud_storage_config, get_default_gcp_cloud_storage
@@ -24,6 +26,8 @@ from cloudtik.providers._private.utils import validate_config_dict
 
 logger = logging.getLogger(__name__)
 
+TAG_BATCH_DELAY = 1
+
 
 def _retry(method, max_tries=5, backoff_s=1):
     """Retry decorator for methods of GCPNodeProvider.
@@ -56,6 +60,8 @@ def _retry(method, max_tries=5, backoff_s=1):
 class GCPNodeProvider(NodeProvider):
     def __init__(self, provider_config: dict, cluster_name: str):
         NodeProvider.__init__(self, provider_config, cluster_name)
+        # The lock protects only the node cache. The cloud API calls and
+        # the operation waits are done out of the lock.
         self.lock = RLock()
         self._construct_clients()
 
@@ -63,6 +69,10 @@ class GCPNodeProvider(NodeProvider):
         # excessive DescribeInstances requests.
         self.cached_nodes: Dict[str, GCPNode] = {}
 
+        # The label updates from multiple threads are written in batches
+        self.tag_coalescer = NodeTagCoalescer(
+            self._update_node_tags, TAG_BATCH_DELAY)
+
     def with_environment_variables(self, node_type_config: Dict[str, Any], node_id: str):
         return with_gcp_environment_variables(self.provider_config, node_type_config, node_id)
 
@@ -96,98 +106,162 @@ class GCPNodeProvider(NodeProvider):
 
     @_retry
     def non_terminated_nodes(self, tag_filters: dict):
-        with self.lock:
-            instances = []
+        instances = []
 
-            for resource in self.resources.values():
-                node_instances = resource.list_instances(tag_filters)
-                instances += node_instances
+        for resource in self.resources.values():
+            node_instances = resource.list_instances(tag_filters)
+            instances += node_instances
 
+        with self.lock:
             # Note: All the operations use "name" as the unique instance id
             self.cached_nodes = {i["name"]: i for i in instances}
-            return [i["name"] for i in instances]
+        return [i["name"] for i in instances]
 
     def is_running(self, node_id: str):
-        with self.lock:
-            node = self._get_cached_node(node_id)
-            return node.is_running()
+        node = self._get_cached_node(node_id)
+        return node.is_running()
 
     def is_terminated(self, node_id: str):
-        with self.lock:
-            node = self._get_cached_node(node_id)
-            return node.is_terminated()
+        node = self._get_cached_node(node_id)
+        return node.is_terminated()
 
     def node_tags(self, node_id: str):
-        with self.lock:
-            node = self._get_cached_node(node_id)
-            return node.get_labels()
+        node = self._get_cached_node(node_id)
+        labels = self.tag_coalescer.pending_node_tags(node_id)
+        return dict(node.get_labels(), **labels)
 
     def get_node_info(self, node_id):
-        with self.lock:
-            node = self._get_cached_node(node_id)
-            return _get_node_info(node)
+        node = self._get_cached_node(node_id)
+        return _get_node_info(node)
 
-    @_retry
     def set_node_tags(self, node_id: str, tags: dict):
-        with self.lock:
-            labels = tags
-            node = self._get_node(node_id)
+        self.tag_coalescer.set_node_tags(node_id, tags)
 
+    @_retry
+    def _update_node_tags(
+            self, node_tags: Dict[str, Dict[str, str]]
+    ) -> Dict[str, Exception]:
+        """Update the labels of the nodes and return the errors of the
+        nodes failed by the node id."""
+        node_ids_by_resource = defaultdict(list)
+        for node_id in node_tags:
             resource = self._get_resource_depending_on_node_name(node_id)
-
-            result = resource.set_labels(node=node, labels=labels)
-
-            return result
+            node_ids_by_resource[resource].append(node_id)
+
+        # Get the nodes of the batch for the latest label fingerprints
+        errors = {}
+        node_labels_by_resource = defaultdict(list)
+        for resource, node_ids in node_ids_by_resource.items():
+            nodes = resource.get_instances(node_ids)
+            for node_id, node in nodes.items():
+                if isinstance(node, Exception):
+                    errors[node_id] = node
+                    continue
+                with self.lock:
+                    self.cached_nodes[node_id] = node
+                node_labels_by_resource[resource].append(
+                    (node, node_tags[node_id]))
+
+        # Submit the label updates of all the resources before waiting
+        operations_by_resource = {
+            resource: resource.set_labels_batch(
+                node_labels, wait_for_operation=False)
+            for resource, node_labels in node_labels_by_resource.items()}
+
+        for resource, operations in operations_by_resource.items():
+            results = resource.wait_for_operations(operations)
+            for node_id, result in results.items():
+                if isinstance(result, Exception):
+                    errors[node_id] = result
+                    continue
+                with self.lock:
+                    node = self.cached_nodes.get(node_id)
+                    if node is not None:
+                        node["labels"] = dict(
+                            node.get_labels(), **node_tags[node_id])
+        return errors
 
     def external_ip(self, node_id: str):
-        with self.lock:
-            node = self._get_cached_node(node_id)
+        node = self._get_cached_node(node_id)
 
+        ip = node.get_external_ip()
+        if ip is None:
+            node = self._get_node(node_id)
             ip = node.get_external_ip()
-            if ip is None:
-                node = self._get_node(node_id)
-                ip = node.get_external_ip()
 
-            return ip
+        return ip
 
     def internal_ip(self, node_id: str):
-        with self.lock:
-            node = self._get_cached_node(node_id)
+        node = self._get_cached_node(node_id)
 
+        ip = node.get_internal_ip()
+        if ip is None:
+            node = self._get_node(node_id)
             ip = node.get_internal_ip()
-            if ip is None:
-                node = self._get_node(node_id)
-                ip = node.get_internal_ip()
 
-            return ip
+        return ip
 
     @_retry
     def create_node(self, base_config: dict, tags: dict, count: int) -> None:
-        with self.lock:
-            labels = tags  # gcp uses "labels" instead of aws "tags"
+        labels = tags  # gcp uses "labels" instead of aws "tags"
 
-            node_type = get_node_type(base_config)
-            resource = self.resources[node_type]
+        node_type = get_node_type(base_config)
+        resource = self.resources[node_type]
 
-            resource.create_instances(base_config, labels, count)
+        resource.create_instances(base_config, labels, count)
 
     @_retry
     def terminate_node(self, node_id: str):
-        with self.lock:
-            resource = self._get_resource_depending_on_node_name(node_id)
-            try:
-                result = resource.delete_instance(
-                    node_id=node_id,
+        resource = self._get_resource_depending_on_node_name(node_id)
+        result = None
+        try:
+            result = resource.delete_instance(
+                node_id=node_id,
+            )
+        except googleapiclient.errors.HttpError as http_error:
+            if http_error.resp.status == 404:
+                logger.warning(
+                    f"Tried to delete the node with id {node_id} "
+                    "but it was already gone."
                 )
-            except googleapiclient.errors.HttpError as http_error:
-                if http_error.resp.status == 404:
+            else:
+                raise http_error from None
+        return result
+
+    @_retry
+    def terminate_nodes(self, node_ids: List[str]):
+        if not node_ids:
+            return None
+
+        node_ids_by_resource = defaultdict(list)
+        for node_id in node_ids:
+            resource = self._get_resource_depending_on_node_name(node_id)
+            node_ids_by_resource[resource].append(node_id)
+
+        # Submit the deletions of all the resources before waiting
+        operations_by_resource = {
+            resource: resource.delete_instances(
+                resource_node_ids, wait_for_operation=False)
+            for resource, resource_node_ids in node_ids_by_resource.items()}
+
+        error = None
+        for resource, operations in operations_by_resource.items():
+            results = resource.wait_for_operations(
+                operations, max_polls=MAX_POLLS)
+            for node_id, result in results.items():
+                if not isinstance(result, Exception):
+                    continue
+                if isinstance(result, googleapiclient.errors.HttpError) \
+                        and result.resp.status == 404:
                     logger.warning(
                         f"Tried to delete the node with id {node_id} "
                         "but it was already gone."
                     )
                 else:
-                    raise http_error from None
-            return result
+                    error = error or result
+        if error is not None:
+            raise error
+        return None
 
     @_retry
     def _get_node(self, node_id: str) -> GCPNode:
@@ -197,14 +271,15 @@ class GCPNodeProvider(NodeProvider):
             if node_id in self.cached_nodes:
                 return self.cached_nodes[node_id]
 
-            resource = self._get_resource_depending_on_node_name(node_id)
-            instance = resource.get_instance(node_id=node_id)
+        resource = self._get_resource_depending_on_node_name(node_id)
+        instance = resource.get_instance(node_id=node_id)
 
-            return instance
+        return instance
 
     def _get_cached_node(self, node_id: str) -> GCPNode:
-        if node_id in self.cached_nodes:
-            return self.cached_nodes[node_id]
+        with self.lock:
+            if node_id in self.cached_nodes:
+                return self.cached_nodes[node_id]
 
         return self._get_node(node_id)
 
@@ -0,0 +1,147 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+# The first poll of an operation is after the initial interval and the
+# interval doubles after each poll until the max interval.
+OPERATION_POLL_INITIAL_INTERVAL = 1
+OPERATION_POLL_MAX_INTERVAL = 5
+
+
+class _PendingOperation:
+    def __init__(self, resource, operation: dict, timeout_s: float,
+                 initial_interval: float):
+        self.resource = resource
+        self.operation = operation
+        self.future = Future()
+        now = time.time()
+        self.deadline = now + timeout_s
+        self.interval = initial_interval
+        self.next_poll_time = now + initial_interval
+
+
+class OperationPoller:
+    """Poll the pending GCP operations of all the threads in one thread.
+
+    The operations due at the same time are polled together with one
+    get_operations call of each resource. The poll interval of each
+    operation backs off exponentially from the initial interval to the max
+    interval. An operation which is not done before its timeout completes
+    with its last state, an operation with an error completes with an
+    exception.
+
+    A resource polled by the poller implements get_operations(operations)
+    returning the state or the exception of each operation, and
+    is_operation_done(result).
+    """
+
+    def __init__(self,
+                 initial_interval: float = OPERATION_POLL_INITIAL_INTERVAL,
+                 max_interval: float = OPERATION_POLL_MAX_INTERVAL):
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self._cond = threading.Condition()
+        self._pending: List[_PendingOperation] = []
+        self._thread = None
+
+    def submit(self, resource, operation: dict, timeout_s: float) -> Future:
+        """Submit an operation to poll and return the future of its result."""
+        pending = _PendingOperation(
+            resource, operation, timeout_s, self.initial_interval)
+        with self._cond:
+            self._pending.append(pending)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="GCPOperationPoller", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return pending.future
+
+    def wait(self, resource, operation: dict, timeout_s: float) -> dict:
+        return self.submit(resource, operation, timeout_s).result()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.time()
+                    due = [pending for pending in self._pending
+                           if pending.next_poll_time <= now]
+                    if due:
+                        break
+                    if self._pending:
+                        next_poll_time = min(
+                            pending.next_poll_time for pending in self._pending)
+                        self._cond.wait(next_poll_time - now)
+                    else:
+                        self._cond.wait()
+            try:
+                self._poll(due)
+            except Exception as e:
+                logger.exception(
+                    "Error polling the GCP operations: {}".format(e))
+                self._complete(due, error=e)
+
+    def _poll(self, due: List[_PendingOperation]):
+        due_by_resource = defaultdict(list)
+        for pending in due:
+            due_by_resource[pending.resource].append(pending)
+
+        for resource, pending_operations in due_by_resource.items():
+            try:
+                results = resource.get_operations(
+                    [pending.operation for pending in pending_operations])
+            except Exception as e:
+                self._complete(pending_operations, error=e)
+                continue
+
+            now = time.time()
+            for pending, result in zip(pending_operations, results):
+                if isinstance(result, Exception):
+                    self._complete([pending], error=result)
+                elif "error" in result:
+                    self._complete(
+                        [pending], error=Exception(result["error"]))
+                elif resource.is_operation_done(result):
+                    logger.debug(
+                        f"Operation {pending.operation['name']} finished.")
+                    self._complete([pending], result=result)
+                elif now >= pending.deadline:
+                    self._complete([pending], result=result)
+                else:
+                    pending.interval = min(
+                        pending.interval * 2, self.max_interval)
+                    pending.next_poll_time = min(
+                        now + pending.interval, pending.deadline)
+
+    def _complete(self, pending_operations: List[_PendingOperation],
+                  result=None, error=None):
+        with self._cond:
+            for pending in pending_operations:
+                if pending in self._pending:
+                    self._pending.remove(pending)
+        for pending in pending_operations:
+            if pending.future.done():
+                continue
+            if error is not None:
+                pending.future.set_exception(error)
+            else:
+                pending.future.set_result(result)
+
+
+_operation_poller = None
+_operation_poller_lock = threading.Lock()
+
+
+def get_operation_poller() -> OperationPoller:
+    """Return the operation poller shared by the GCP resources."""
+    global _operation_poller
+    with _operation_poller_lock:
+        if _operation_poller is None:
+            _operation_poller = OperationPoller()
+        return _operation_poller
@@ -1,6 +1,7 @@
 import json
 from http.client import RemoteDisconnected
 import os
+import threading
 from typing import Any, Optional
 from typing import Dict
 import logging
@@ -14,6 +15,11 @@ logger = logging.getLogger(__name__)
 
 DEFAULT_CLOUD_SIMULATOR_PORT = 8282
 
+# The request type for a batch of node provider requests
+CLOUD_SIMULATOR_BATCH_REQUEST = "batch"
+
+_http_sessions = threading.local()
+
 
 def _get_cloud_simulator_address(provider_config):
     cloud_simulator_address = provider_config["cloud_simulator_address"]
@@ -23,6 +29,16 @@ def _get_cloud_simulator_address(provider_config):
     return cloud_simulator_address
 
 
+def _get_http_session():
+    # Keep one session for each thread to reuse the keep-alive connections
+    session = getattr(_http_sessions, "session", None)
+    if session is None:
+        import requests  # `requests` is not part of stdlib.
+        session = requests.Session()
+        _http_sessions.session = session
+    return session
+
+
 def _get_http_response_from_simulator(cloud_simulator_address, request):
     headers = {
         "Content-Type": "application/json",
@@ -31,10 +47,9 @@ def _get_http_response_from_simulator(cloud_simulator_address, request):
     cloud_simulator_endpoint = "http://" + cloud_simulator_address
 
     try:
-        import requests  # `requests` is not part of stdlib.
         from requests.exceptions import ConnectionError
 
-        r = requests.get(
+        r = _get_http_session().get(
             cloud_simulator_endpoint,
             data=request_message,
             headers=headers,
@@ -56,6 +71,23 @@ def _get_http_response_from_simulator(cloud_simulator_address, request):
     return response
 
 
+def _get_batch_response_from_simulator(cloud_simulator_address, requests):
+    """Send the requests in one batch and return the list of responses."""
+    if not requests:
+        return []
+    batch_request = {"type": CLOUD_SIMULATOR_BATCH_REQUEST, "args": (requests, )}
+    batch_response = _get_http_response_from_simulator(
+        cloud_simulator_address, batch_request)
+    responses = []
+    for request, (succeeded, response) in zip(requests, batch_response):
+        if not succeeded:
+            raise RuntimeError(
+                "Cloud Simulator failed request {}: {}".format(
+                    request["type"], response))
+        responses.append(response)
+    return responses
+
+
 def prepare_local(config: Dict[str, Any]) -> Dict[str, Any]:
     """
     Prepare local cluster config for ingestion by cluster launcher and scaler.
@@ -1,3 +1,4 @@
+from contextlib import contextmanager
 from filelock import FileLock
 from threading import RLock
 import json
@@ -19,58 +20,143 @@ filelock_logger.setLevel(logging.WARNING)
 
 
 class ClusterState:
+    """The state of the nodes shared through the state file.
+
+    The state is kept in memory and reloaded only when the state file was
+    changed by others (detected by the inode, mtime and size of the file).
+    The changes made in a transaction are written once at the end of the
+    outermost transaction by writing a temp file and renaming it, which is
+    done before releasing the file lock so that other processes holding the
+    file lock always see the latest state. If an exception is raised in a
+    transaction, the changes are discarded and the state is reloaded from
+    the state file.
+
+    The node info dicts returned by get are shared and must not be modified.
+    """
+
     def __init__(self, lock_path, save_path, provider_config):
         self.lock = RLock()
         self.file_lock = FileLock(lock_path)
         self.save_path = save_path
-
+        self._nodes = None
+        self._file_stat = None
+        self._dirty = False
+        self._failed = False
+        self._transaction_depth = 0
+
+        with self.transaction():
+            list_of_node_ips = get_list_of_node_ips(provider_config)
+            nodes = self._nodes
+            logger.info(
+                "Cluster State: "
+                "Loaded cluster state: {}".format(nodes))
+
+            # Filter removed node ips.
+            for node_ip in list(nodes):
+                if node_ip not in list_of_node_ips:
+                    del nodes[node_ip]
+
+            for node_ip in list_of_node_ips:
+                if node_ip not in nodes:
+                    nodes[node_ip] = {
+                        "tags": {},
+                        "state": "terminated",
+                    }
+            assert len(nodes) == len(list_of_node_ips)
+            logger.info(
+                "Cluster State: "
+                "Writing cluster state: {}".format(nodes))
+            self._dirty = True
+
+    @contextmanager
+    def transaction(self):
+        """Hold the locks for a consistent read-modify-write of the state."""
         with self.lock:
             with self.file_lock:
-                list_of_node_ips = get_list_of_node_ips(provider_config)
-                if os.path.exists(self.save_path):
-                    nodes = json.loads(open(self.save_path).read())
-                else:
-                    nodes = {}
-                logger.info(
-                    "Cluster State: "
-                    "Loaded cluster state: {}".format(nodes))
-
-                # Filter removed node ips.
-                for node_ip in list(nodes):
-                    if node_ip not in list_of_node_ips:
-                        del nodes[node_ip]
-
-                for node_ip in list_of_node_ips:
-                    if node_ip not in nodes:
-                        nodes[node_ip] = {
-                            "tags": {},
-                            "state": "terminated",
-                        }
-                assert len(nodes) == len(list_of_node_ips)
-                with open(self.save_path, "w") as f:
-                    logger.info(
-                        "Cluster State: "
-                        "Writing cluster state: {}".format(nodes))
-                    f.write(json.dumps(nodes))
+                self._transaction_depth += 1
+                try:
+                    if self._transaction_depth == 1:
+                        self._load_if_changed()
+                    yield
+                except BaseException:
+                    # The whole transaction is discarded even if an inner
+                    # failure is handled by the outer transaction
+                    self._failed = True
+                    raise
+                finally:
+                    self._transaction_depth -= 1
+                    if self._transaction_depth == 0:
+                        if self._failed:
+                            self._discard()
+                        elif self._dirty:
+                            try:
+                                self._save()
+                            except BaseException:
+                                self._discard()
+                                raise
 
     def get(self):
         with self.lock:
-            with self.file_lock:
-                nodes = json.loads(open(self.save_path).read())
-                return nodes
+            self._refresh()
+            return dict(self._nodes)
+
+    def get_node(self, node_id):
+        with self.lock:
+            self._refresh()
+            return self._nodes[node_id]
 
     def put(self, node_id, info):
         assert "tags" in info
         assert "state" in info
-        with self.lock:
-            with self.file_lock:
-                nodes = self.get()
-                nodes[node_id] = info
-                with open(self.save_path, "w") as f:
-                    logger.debug("Cluster State: "
-                                 "Writing cluster state: {}".format(
-                                    list(nodes)))
-                    f.write(json.dumps(nodes))
+        with self.transaction():
+            self._nodes[node_id] = {
+                **info, "tags": dict(info["tags"])}
+            self._dirty = True
+
+    def _refresh(self):
+        if self._transaction_depth == 0:
+            # The state file is replaced atomically and can be read
+            # without the file lock
+            self._load_if_changed()
+
+    def _load_if_changed(self):
+        try:
+            st = os.stat(self.save_path)
+            file_stat = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            file_stat = None
+        if self._nodes is not None and file_stat == self._file_stat:
+            return
+        if file_stat is None:
+            nodes = {}
+        else:
+            with open(self.save_path) as f:
+                nodes = json.load(f)
+        self._nodes = nodes
+        self._file_stat = file_stat
+
+    def _discard(self):
+        # Reloaded from the state file when used next time
+        self._nodes = None
+        self._file_stat = None
+        self._dirty = False
+        self._failed = False
+
+    def _save(self):
+        logger.debug("Cluster State: "
+                     "Writing cluster state: {}".format(list(self._nodes)))
+        tmp_path = "{}.{}.tmp".format(self.save_path, os.getpid())
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(json.dumps(self._nodes))
+            os.replace(tmp_path, self.save_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        st = os.stat(self.save_path)
+        self._file_stat = (st.st_ino, st.st_mtime_ns, st.st_size)
+        self._dirty = False
 
 
 class LocalNodeProvider(NodeProvider):
@@ -113,13 +199,13 @@ class LocalNodeProvider(NodeProvider):
         return matching_ips
 
     def is_running(self, node_id):
-        return self.state.get()[node_id]["state"] == "running"
+        return self.state.get_node(node_id)["state"] == "running"
 
     def is_terminated(self, node_id):
         return not self.is_running(node_id)
 
     def node_tags(self, node_id):
-        return self.state.get()[node_id]["tags"]
+        return dict(self.state.get_node(node_id)["tags"])
 
     def external_ip(self, node_id):
         """Returns an external ip if the user has supplied one.
@@ -142,15 +228,14 @@ class LocalNodeProvider(NodeProvider):
         return socket.gethostbyname(node_id)
 
     def set_node_tags(self, node_id, tags):
-        with self.state.file_lock:
-            info = self.state.get()[node_id]
-            info["tags"].update(tags)
-            self.state.put(node_id, info)
+        with self.state.transaction():
+            info = self.state.get_node(node_id)
+            self.state.put(node_id, {**info, "tags": {**info["tags"], **tags}})
 
     def create_node(self, node_config, tags, count):
         """Creates min(count, currently available) nodes."""
         instance_type = _get_request_instance_type(node_config)
-        with self.state.file_lock:
+        with self.state.transaction():
             nodes = self.state.get()
             for node_id, info in nodes.items():
                 if info["state"] != "terminated":
@@ -160,21 +245,18 @@ class LocalNodeProvider(NodeProvider):
                 if instance_type != node_instance_type:
                     continue
 
-                info["tags"] = tags
-                info["state"] = "running"
-                self.state.put(node_id, info)
+                self.state.put(node_id, {**info, "tags": tags, "state": "running"})
                 count = count - 1
                 if count == 0:
                     return
 
     def terminate_node(self, node_id):
-        nodes = self.state.get()
-        info = nodes[node_id]
-        info["state"] = "terminated"
-        self.state.put(node_id, info)
+        with self.state.transaction():
+            info = self.state.get_node(node_id)
+            self.state.put(node_id, {**info, "state": "terminated"})
 
     def get_node_info(self, node_id):
-        node = self.state.get()[node_id]
+        node = self.state.get_node(node_id)
         node_instance_type = self.get_node_instance_type(node_id)
         node_info = {"node_id": node_id,
                      "instance_type": node_instance_type,
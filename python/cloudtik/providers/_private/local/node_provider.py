@@ -1,10 +1,12 @@
 import logging
+import threading
 from typing import Any, Dict
 
 from cloudtik.core.node_provider import NodeProvider
 from cloudtik.core.tags import CLOUDTIK_TAG_CLUSTER_NAME
 from cloudtik.providers._private.local.config import prepare_local, set_node_types_resources, \
-    _get_cloud_simulator_address, _get_http_response_from_simulator, post_prepare_local
+    _get_cloud_simulator_address, _get_http_response_from_simulator, post_prepare_local, \
+    _get_batch_response_from_simulator
 
 logger = logging.getLogger(__name__)
 
@@ -17,30 +19,86 @@ class CloudSimulatorNodeProvider(NodeProvider):
     should be provided in the provider section in the cluster config.
     The server receives HTTP requests from this class and uses
     LocalNodeProvider to get their responses.
+
+    The tags, the ips and the running states of the non-terminated nodes are
+    fetched in one batch request when listing the nodes and cached until the
+    next listing.
     """
 
     def __init__(self, provider_config, cluster_name):
         NodeProvider.__init__(self, provider_config, cluster_name)
         self.cloud_simulator_address = _get_cloud_simulator_address(provider_config)
+        self.cache_lock = threading.Lock()
+        self.tag_cache = {}
+        self.internal_ip_cache = {}
+        self.running_cache = {}
 
     def _get_http_response(self, request):
         return _get_http_response_from_simulator(self.cloud_simulator_address, request)
 
+    def _get_batch_response(self, requests):
+        return _get_batch_response_from_simulator(self.cloud_simulator_address, requests)
+
     def non_terminated_nodes(self, tag_filters):
         # Only get the non terminated nodes associated with this cluster name.
         tag_filters[CLOUDTIK_TAG_CLUSTER_NAME] = self.cluster_name
         request = {"type": "non_terminated_nodes", "args": (tag_filters, )}
-        return self._get_http_response(request)
+        node_ids = self._get_http_response(request)
+        self._update_node_cache(node_ids)
+        return node_ids
+
+    def _update_node_cache(self, node_ids):
+        requests = []
+        for node_id in node_ids:
+            requests.append({"type": "node_tags", "args": (node_id, )})
+            requests.append({"type": "is_running", "args": (node_id, )})
+            with self.cache_lock:
+                if node_id in self.internal_ip_cache:
+                    continue
+            requests.append({"type": "internal_ip", "args": (node_id, )})
+        responses = iter(self._get_batch_response(requests))
+
+        tag_cache = {}
+        internal_ip_cache = {}
+        running_cache = {}
+        with self.cache_lock:
+            for request in requests:
+                node_id = request["args"][0]
+                if request["type"] == "node_tags":
+                    tag_cache[node_id] = next(responses)
+                elif request["type"] == "is_running":
+                    running_cache[node_id] = next(responses)
+                else:
+                    internal_ip_cache[node_id] = next(responses)
+            for node_id in node_ids:
+                if node_id not in internal_ip_cache and (
+                        node_id in self.internal_ip_cache):
+                    internal_ip_cache[node_id] = self.internal_ip_cache[node_id]
+            self.tag_cache = tag_cache
+            self.internal_ip_cache = internal_ip_cache
+            self.running_cache = running_cache
 
     def is_running(self, node_id):
+        with self.cache_lock:
+            running = self.running_cache.get(node_id)
+            if running is not None:
+                return running
         request = {"type": "is_running", "args": (node_id, )}
         return self._get_http_response(request)
 
     def is_terminated(self, node_id):
+        with self.cache_lock:
+            running = self.running_cache.get(node_id)
+            if running is not None:
+                return not running
         request = {"type": "is_terminated", "args": (node_id, )}
         return self._get_http_response(request)
 
     def node_tags(self, node_id):
+        with self.cache_lock:
+            tags = self.tag_cache.get(node_id)
+            if tags is not None:
+                return dict(tags)
         request = {"type": "node_tags", "args": (node_id, )}
         return self._get_http_response(request)
 
@@ -50,6 +108,10 @@ class CloudSimulatorNodeProvider(NodeProvider):
         return response
 
     def internal_ip(self, node_id):
+        with self.cache_lock:
+            ip = self.internal_ip_cache.get(node_id)
+            if ip is not None:
+                return ip
         request = {"type": "internal_ip", "args": (node_id, )}
         response = self._get_http_response(request)
         return response
@@ -63,18 +125,34 @@ class CloudSimulatorNodeProvider(NodeProvider):
             "args": (node_config, tags, count),
         }
         self._get_http_response(request)
+        # The terminated nodes may be reused with new tags
+        with self.cache_lock:
+            self.tag_cache = {}
+            self.running_cache = {}
 
     def set_node_tags(self, node_id, tags):
         request = {"type": "set_node_tags", "args": (node_id, tags)}
         self._get_http_response(request)
+        with self.cache_lock:
+            cached_tags = self.tag_cache.get(node_id)
+            if cached_tags is not None:
+                self.tag_cache[node_id] = {**cached_tags, **tags}
 
     def terminate_node(self, node_id):
         request = {"type": "terminate_node", "args": (node_id, )}
         self._get_http_response(request)
+        self._remove_node_cache([node_id])
 
     def terminate_nodes(self, node_ids):
         request = {"type": "terminate_nodes", "args": (node_ids, )}
         self._get_http_response(request)
+        self._remove_node_cache(node_ids)
+
+    def _remove_node_cache(self, node_ids):
+        with self.cache_lock:
+            for node_id in node_ids:
+                self.tag_cache.pop(node_id, None)
+                self.running_cache.pop(node_id, None)
 
     def get_node_info(self, node_id):
         request = {"type": "get_node_info", "args": (node_id,)}
@@ -6,13 +6,14 @@ locally in LocalNodeProvider. To start the webserver the user runs:
 import argparse
 import logging
 import threading
-from http.server import SimpleHTTPRequestHandler, HTTPServer
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 import json
 import socket
 
 import yaml
 
-from cloudtik.providers._private.local.config import DEFAULT_CLOUD_SIMULATOR_PORT
+from cloudtik.providers._private.local.config import DEFAULT_CLOUD_SIMULATOR_PORT, \
+    CLOUD_SIMULATOR_BATCH_REQUEST
 from cloudtik.providers._private.local.local_node_provider import LocalNodeProvider
 
 
@@ -27,23 +28,47 @@ def load_provider_config(config_file):
     return config_object
 
 
+def _call_node_provider(node_provider, request):
+    return getattr(node_provider, request["type"])(*request["args"])
+
+
+def _call_node_provider_batch(node_provider, requests):
+    # Each response of a batch is a pair of whether succeeded and the
+    # return value or the error message
+    responses = []
+    for request in requests:
+        try:
+            responses.append(
+                (True, _call_node_provider(node_provider, request)))
+        except Exception as e:
+            logger.exception(
+                "Cloud Simulator failed request: {}".format(request["type"]))
+            responses.append((False, str(e)))
+    return responses
+
+
 def runner_handler(node_provider):
     class Handler(SimpleHTTPRequestHandler):
         """A custom handler for Cloud Simulator.
 
         Handles all requests and responses coming into and from the
-        remote CloudSimulatorNodeProvider.
+        remote CloudSimulatorNodeProvider. The connections are kept alive
+        for the following requests.
         """
+        protocol_version = "HTTP/1.1"
 
-        def _do_header(self, response_code=200, headers=None):
+        def _do_header(self, response_code=200, headers=None,
+                       content_length=0):
             """Sends the header portion of the HTTP response.
 
             Args:
                 response_code (int): Standard HTTP response code
                 headers (list[tuples]): Standard HTTP response headers
+                content_length (int): The length of the response body
             """
             if headers is None:
                 headers = [("Content-type", "application/json")]
+            headers = headers + [("Content-Length", str(content_length))]
 
             self.send_response(response_code)
             for key, value in headers:
@@ -59,17 +84,27 @@ def runner_handler(node_provider):
             if self.headers["content-length"]:
                 raw_data = (self.rfile.read(
                     int(self.headers["content-length"]))).decode("utf-8")
-                logger.info("Cloud Simulator received request: " +
-                            str(raw_data))
+                logger.debug("Cloud Simulator received request: " +
+                             str(raw_data))
                 request = json.loads(raw_data)
-                response = getattr(node_provider,
-                                   request["type"])(*request["args"])
-                logger.info("Cloud Simulator response content: " +
-                            str(raw_data))
+                if request["type"] == CLOUD_SIMULATOR_BATCH_REQUEST:
+                    response = _call_node_provider_batch(
+                        node_provider, *request["args"])
+                else:
+                    response = _call_node_provider(node_provider, request)
                 response_code = 200
-                message = json.dumps(response)
-                self._do_header(response_code=response_code)
-                self.wfile.write(message.encode())
+                message = json.dumps(response).encode()
+                logger.debug("Cloud Simulator response content: " +
+                             str(message))
+                self._do_header(response_code=response_code,
+                                content_length=len(message))
+                self.wfile.write(message)
+            else:
+                self._do_header(response_code=400)
+
+        def log_message(self, format, *args):
+            # Don't log each request to stderr
+            logger.debug(format, *args)
 
     return Handler
 
@@ -92,7 +127,8 @@ class CloudSimulator(threading.Thread):
         address = (host, self._port)
 
         provider_config = load_provider_config(config)
-        self._server = HTTPServer(
+        # Serve each connection in its own thread
+        self._server = ThreadingHTTPServer(
             address,
             runner_handler(LocalNodeProvider(provider_config, cluster_name=None)),
         )
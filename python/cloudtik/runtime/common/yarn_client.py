@@ -0,0 +1,188 @@
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+
+from cloudtik.core._private import constants
+from cloudtik.core._private.services import address_to_ip
+from cloudtik.core._private.utils import make_node_id
+
+YARN_REST_ENDPOINT_CLUSTER_NODES = "http://{}:{}/ws/v1/cluster/nodes"
+YARN_REST_ENDPOINT_CLUSTER_METRICS = "http://{}:{}/ws/v1/cluster/metrics"
+
+YARN_REST_REQUEST_TIMEOUT = 10
+
+logger = logging.getLogger(__name__)
+
+
+def _address_to_ip(address):
+    try:
+        return address_to_ip(address)
+    except Exception:
+        return None
+
+
+class YarnRestClient:
+    """Client of the REST API of a YARN resource manager.
+
+    The connections are kept alive between the requests. The responses are
+    cached with their ETag or Last-Modified headers and the requests are
+    conditional on them, so an unchanged resource is neither sent nor parsed
+    again.
+    """
+
+    def __init__(self, host: str, port):
+        self.host = host
+        self.port = port
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        # url -> (validator headers, parsed response)
+        self._responses: Dict[str, Tuple[Dict[str, str], Any]] = {}
+
+    def get_cluster_metrics(self) -> Dict[str, Any]:
+        return self._get(YARN_REST_ENDPOINT_CLUSTER_METRICS.format(
+            self.host, self.port))
+
+    def get_cluster_nodes(self) -> Dict[str, Any]:
+        return self._get(YARN_REST_ENDPOINT_CLUSTER_NODES.format(
+            self.host, self.port))
+
+    def _get(self, url):
+        with self._lock:
+            headers = {}
+            cached = self._responses.get(url)
+            if cached is not None:
+                headers = cached[0]
+            response = self._session.get(
+                url, headers=headers, timeout=YARN_REST_REQUEST_TIMEOUT)
+            if response.status_code == 304 and cached is not None:
+                return cached[1]
+            response.raise_for_status()
+            content = response.json()
+
+            validators = {}
+            if "ETag" in response.headers:
+                validators["If-None-Match"] = response.headers["ETag"]
+            if "Last-Modified" in response.headers:
+                validators["If-Modified-Since"] = response.headers["Last-Modified"]
+            if validators:
+                self._responses[url] = (validators, content)
+            else:
+                self._responses.pop(url, None)
+            return content
+
+
+_yarn_rest_clients: Dict[Tuple[str, Any], YarnRestClient] = {}
+_yarn_rest_clients_lock = threading.Lock()
+
+
+def get_yarn_rest_client(host: str, port) -> YarnRestClient:
+    """Get the client shared by all the users of the resource manager."""
+    with _yarn_rest_clients_lock:
+        client = _yarn_rest_clients.get((host, port))
+        if client is None:
+            client = YarnRestClient(host, port)
+            _yarn_rest_clients[(host, port)] = client
+        return client
+
+
+class _TrackedNode:
+    def __init__(self, node_id, node_ip):
+        self.node_id = node_id
+        self.node_ip = node_ip
+        self.version = None
+        self.resource_time = None
+
+
+class YarnNodeTracker:
+    """Make the node resource states from the YARN nodes incrementally.
+
+    A node resource state is made only for a node which changed since its
+    last state: its lastHealthUpdate moved or its state or resources changed.
+    The unchanged node gets a new state only before its last state expires.
+    A lost node is reported once when it becomes lost. The ips of the node
+    host names are resolved once.
+    """
+
+    def __init__(self,
+                 refresh_interval_s: float =
+                 constants.CLOUDTIK_NODE_RESOURCE_STATE_TIMEOUT_S / 2):
+        self.refresh_interval_s = refresh_interval_s
+        # node host name -> tracked node
+        self._nodes: Dict[str, _TrackedNode] = {}
+
+    def update(self, cluster_nodes_response: Dict[str, Any], state_time: float
+               ) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        node_resource_states = {}
+        lost_nodes = {}
+        cluster_nodes = []
+        if ("nodes" in cluster_nodes_response
+                and cluster_nodes_response["nodes"]
+                and "node" in cluster_nodes_response["nodes"]):
+            cluster_nodes = cluster_nodes_response["nodes"]["node"]
+
+        nodes = {}
+        for node in cluster_nodes:
+            host_name = node["nodeHostName"]
+            tracked_node = self._nodes.get(host_name)
+            if tracked_node is None:
+                node_ip = _address_to_ip(host_name)
+                if node_ip is None:
+                    continue
+                tracked_node = _TrackedNode(make_node_id(node_ip), node_ip)
+            nodes[host_name] = tracked_node
+
+            version = self._get_node_version(node)
+            if node["state"] != "RUNNING":
+                if tracked_node.version != version:
+                    lost_nodes[tracked_node.node_id] = tracked_node.node_ip
+                    tracked_node.version = version
+                continue
+
+            if (tracked_node.version == version
+                    and state_time - tracked_node.resource_time < self.refresh_interval_s):
+                continue
+            node_resource_states[tracked_node.node_id] = _get_node_resource_state(
+                tracked_node, node, state_time)
+            tracked_node.version = version
+            tracked_node.resource_time = state_time
+
+        self._nodes = nodes
+        return node_resource_states, lost_nodes
+
+    @staticmethod
+    def _get_node_version(node):
+        cpu_load = node.get("resourceUtilization", {}).get("nodeCPUUsage", 0.0)
+        return (node.get("lastHealthUpdate"), node["state"],
+                node.get("availableVirtualCores"), node.get("usedVirtualCores"),
+                node.get("availMemoryMB"), node.get("usedMemoryMB"),
+                node.get("numContainers"), cpu_load)
+
+
+def _get_node_resource_state(tracked_node, node, state_time):
+    total_resources = {
+        constants.CLOUDTIK_RESOURCE_CPU: node["availableVirtualCores"] + node["usedVirtualCores"],
+        constants.CLOUDTIK_RESOURCE_MEMORY: int(node["availMemoryMB"] + node["usedMemoryMB"]) * 1024 * 1024
+    }
+    free_resources = {
+        constants.CLOUDTIK_RESOURCE_CPU: node["availableVirtualCores"],
+        constants.CLOUDTIK_RESOURCE_MEMORY: int(node["availMemoryMB"]) * 1024 * 1024
+    }
+    cpu_load = 0.0
+    if "resourceUtilization" in node:
+        cpu_load = node["resourceUtilization"].get("nodeCPUUsage", 0.0)
+    resource_load = {
+        "utilization": {
+            constants.CLOUDTIK_RESOURCE_CPU: cpu_load
+        },
+        "in_use": True if node["numContainers"] > 0 else False
+    }
+    return {
+        "node_id": tracked_node.node_id,
+        "node_ip": tracked_node.node_ip,
+        "resource_time": state_time,
+        "total_resources": total_resources,
+        "available_resources": free_resources,
+        "resource_load": resource_load
+    }
@@ -1,18 +1,14 @@
-import json
 import logging
 from typing import Any, Dict, Optional
 import time
-import urllib.request
-import urllib.error
+
+import requests
 
 from cloudtik.core._private import constants
-from cloudtik.core._private.services import address_to_ip
-from cloudtik.core._private.utils import make_node_id, get_resource_demands_for_cpu, RUNTIME_CONFIG_KEY, \
+from cloudtik.core._private.utils import get_resource_demands_for_cpu, RUNTIME_CONFIG_KEY, \
     convert_nodes_to_cpus, get_resource_demands_for_memory, convert_nodes_to_memory
 from cloudtik.core.scaling_policy import ScalingPolicy, ScalingState
-
-FLINK_YARN_REST_ENDPOINT_CLUSTER_NODES = "http://{}:{}/ws/v1/cluster/nodes"
-FLINK_YARN_REST_ENDPOINT_CLUSTER_METRICS = "http://{}:{}/ws/v1/cluster/metrics"
+from cloudtik.runtime.common.yarn_client import get_yarn_rest_client, YarnNodeTracker
 
 FLINK_SCALING_MODE_APPS_PENDING = "apps-pending"
 FLINK_SCALING_MODE_AGGRESSIVE = "aggressive"
@@ -33,13 +29,6 @@ AGGRESSIVE_FREE_RATIO_THRESHOLD_DEFAULT = 0.1
 logger = logging.getLogger(__name__)
 
 
-def _address_to_ip(address):
-    try:
-        return address_to_ip(address)
-    except Exception:
-        return None
-
-
 class FlinkScalingPolicy(ScalingPolicy):
     def __init__(self,
                  config: Dict[str, Any],
@@ -61,6 +50,8 @@ class FlinkScalingPolicy(ScalingPolicy):
         self.reset(config)
 
         self.rest_port = rest_port
+        self.yarn_client = get_yarn_rest_client(head_ip, rest_port)
+        self.yarn_node_tracker = YarnNodeTracker()
         self.last_state_time = 0
         self.last_resource_demands_time = 0
         self.last_resource_state_snapshot = None
@@ -173,17 +164,12 @@ class FlinkScalingPolicy(ScalingPolicy):
             "containersPending": 0,
         """
 
-        cluster_metrics_url = FLINK_YARN_REST_ENDPOINT_CLUSTER_METRICS.format(
-            self.head_ip, self.rest_port)
         try:
-            response = urllib.request.urlopen(cluster_metrics_url, timeout=10)
-            content = response.read()
-        except urllib.error.URLError as e:
+            cluster_metrics_response = self.yarn_client.get_cluster_metrics()
+        except requests.exceptions.RequestException as e:
             logger.error("Failed to retrieve the cluster metrics: {}".format(str(e)))
             return None
 
-        cluster_metrics_response = json.loads(content)
-
         autoscaling_instructions = {}
         resource_demands = []
 
@@ -275,59 +261,12 @@ class FlinkScalingPolicy(ScalingPolicy):
             }
         """
 
-        cluster_nodes_url = FLINK_YARN_REST_ENDPOINT_CLUSTER_NODES.format(
-            self.head_ip, self.rest_port)
         try:
-            response = urllib.request.urlopen(cluster_nodes_url, timeout=10)
-            content = response.read()
-        except urllib.error.URLError as e:
+            cluster_nodes_response = self.yarn_client.get_cluster_nodes()
+        except requests.exceptions.RequestException as e:
             logger.error("Failed to retrieve the cluster nodes metrics: {}".format(str(e)))
             return None, None
 
-        cluster_nodes_response = json.loads(content)
-        node_resource_states = {}
-        lost_nodes = {}
-        if ("nodes" in cluster_nodes_response
-                and "node" in cluster_nodes_response["nodes"]):
-            cluster_nodes = cluster_nodes_response["nodes"]["node"]
-            for node in cluster_nodes:
-                host_name = node["nodeHostName"]
-                node_ip = _address_to_ip(host_name)
-                if node_ip is None:
-                    continue
-
-                node_id = make_node_id(node_ip)
-                if node["state"] != "RUNNING":
-                    lost_nodes[node_id] = node_ip
-                    continue
-
-                total_resources = {
-                    constants.CLOUDTIK_RESOURCE_CPU: node["availableVirtualCores"] + node["usedVirtualCores"],
-                    constants.CLOUDTIK_RESOURCE_MEMORY: int(node["availMemoryMB"] + node["usedMemoryMB"]) * 1024 * 1024
-                }
-                free_resources = {
-                    constants.CLOUDTIK_RESOURCE_CPU: node["availableVirtualCores"],
-                    constants.CLOUDTIK_RESOURCE_MEMORY: int(node["availMemoryMB"]) * 1024 * 1024
-                }
-                cpu_load = 0.0
-                if "resourceUtilization" in node:
-                    cpu_load = node["resourceUtilization"].get("nodeCPUUsage", 0.0)
-                resource_load = {
-                    "utilization": {
-                        constants.CLOUDTIK_RESOURCE_CPU: cpu_load
-                    },
-                    "in_use": True if node["numContainers"] > 0 else False
-                }
-                node_resource_state = {
-                    "node_id": node_id,
-                    "node_ip": node_ip,
-                    "resource_time": self.last_state_time,
-                    "total_resources": total_resources,
-                    "available_resources": free_resources,
-                    "resource_load": resource_load
-                }
-                # logger.debug("Node metrics: {}".format(node))
-                # logger.debug("Node resources: {}".format(node_resource_state))
-                node_resource_states[node_id] = node_resource_state
-
-        return node_resource_states, lost_nodes
+        # Only the nodes changed since their last states are reported
+        return self.yarn_node_tracker.update(
+            cluster_nodes_response, self.last_state_time)
@@ -1,21 +1,20 @@
-import json
 import logging
+import math
+from collections import deque
 from typing import Any, Dict, Optional
 import time
-import urllib.request
-import urllib.error
+
+import requests
 
 from cloudtik.core._private import constants
-from cloudtik.core._private.services import address_to_ip
-from cloudtik.core._private.utils import make_node_id, get_resource_demands_for_cpu, RUNTIME_CONFIG_KEY, \
+from cloudtik.core._private.utils import get_resource_demands_for_cpu, RUNTIME_CONFIG_KEY, \
     convert_nodes_to_cpus, get_resource_demands_for_memory, convert_nodes_to_memory
 from cloudtik.core.scaling_policy import ScalingPolicy, ScalingState
-
-SPARK_YARN_REST_ENDPOINT_CLUSTER_NODES = "http://{}:{}/ws/v1/cluster/nodes"
-SPARK_YARN_REST_ENDPOINT_CLUSTER_METRICS = "http://{}:{}/ws/v1/cluster/metrics"
+from cloudtik.runtime.common.yarn_client import get_yarn_rest_client, YarnNodeTracker
 
 SPARK_SCALING_MODE_APPS_PENDING = "apps-pending"
 SPARK_SCALING_MODE_AGGRESSIVE = "aggressive"
+SPARK_SCALING_MODE_PREDICTIVE = "predictive"
 
 SPARK_SCALING_RESOURCE_MEMORY = constants.CLOUDTIK_RESOURCE_MEMORY
 SPARK_SCALING_RESOURCE_CPU = constants.CLOUDTIK_RESOURCE_CPU
@@ -29,15 +28,31 @@ APP_PENDING_FREE_CORES_THRESHOLD_DEFAULT = 4
 APP_PENDING_FREE_MEMORY_THRESHOLD_DEFAULT = 1024
 # When the free resource ratio is lower than this threshold, it starts up scaling
 AGGRESSIVE_FREE_RATIO_THRESHOLD_DEFAULT = 0.1
+# The number of the recent cluster metrics to estimate the demand growth rate
+PREDICTIVE_WINDOW_SIZE_DEFAULT = 12
+# The seconds in which the pending and the growing demands are to be satisfied
+PREDICTIVE_TARGET_LATENCY_DEFAULT = 120
+# The seconds to wait after a scaling up before the next scaling up
+PREDICTIVE_COOLDOWN_DEFAULT = 60
+# The max number of nodes to request for a scaling up
+PREDICTIVE_MAX_SCALING_STEP_DEFAULT = 10
 
 logger = logging.getLogger(__name__)
 
 
-def _address_to_ip(address):
-    try:
-        return address_to_ip(address)
-    except Exception:
-        return None
+def _get_growth_rate(times, values):
+    """The least squares slope of the values over the times."""
+    n = len(times)
+    if n < 2:
+        return 0.0
+    mean_time = sum(times) / n
+    mean_value = sum(values) / n
+    variance = sum((t - mean_time) ** 2 for t in times)
+    if variance == 0:
+        return 0.0
+    covariance = sum((t - mean_time) * (v - mean_value)
+                     for t, v in zip(times, values))
+    return covariance / variance
 
 
 class SparkScalingPolicy(ScalingPolicy):
@@ -57,10 +72,19 @@ class SparkScalingPolicy(ScalingPolicy):
         self.apps_pending_free_cores_threshold = APP_PENDING_FREE_CORES_THRESHOLD_DEFAULT
         self.apps_pending_free_memory_threshold = APP_PENDING_FREE_MEMORY_THRESHOLD_DEFAULT
         self.aggressive_free_ratio_threshold = AGGRESSIVE_FREE_RATIO_THRESHOLD_DEFAULT
+        self.predictive_window_size = PREDICTIVE_WINDOW_SIZE_DEFAULT
+        self.predictive_target_latency = PREDICTIVE_TARGET_LATENCY_DEFAULT
+        self.predictive_cooldown = PREDICTIVE_COOLDOWN_DEFAULT
+        self.predictive_max_scaling_step = PREDICTIVE_MAX_SCALING_STEP_DEFAULT
+        # The recent (time, cluster metrics) for predictive mode
+        self.metrics_window = deque(maxlen=self.predictive_window_size)
+        self.last_scaling_up_time = 0
 
         self.reset(config)
 
         self.rest_port = rest_port
+        self.yarn_client = get_yarn_rest_client(head_ip, rest_port)
+        self.yarn_node_tracker = YarnNodeTracker()
         self.last_state_time = 0
         self.last_resource_demands_time = 0
         self.last_resource_state_snapshot = None
@@ -83,6 +107,17 @@ class SparkScalingPolicy(ScalingPolicy):
             "apps_pending_free_memory_threshold", APP_PENDING_FREE_MEMORY_THRESHOLD_DEFAULT)
         self.aggressive_free_ratio_threshold = self.scaling_config.get(
             "aggressive_free_cores_ratio_threshold", AGGRESSIVE_FREE_RATIO_THRESHOLD_DEFAULT)
+        self.predictive_window_size = self.scaling_config.get(
+            "predictive_window_size", PREDICTIVE_WINDOW_SIZE_DEFAULT)
+        self.predictive_target_latency = self.scaling_config.get(
+            "predictive_target_latency", PREDICTIVE_TARGET_LATENCY_DEFAULT)
+        self.predictive_cooldown = self.scaling_config.get(
+            "predictive_cooldown", PREDICTIVE_COOLDOWN_DEFAULT)
+        self.predictive_max_scaling_step = self.scaling_config.get(
+            "predictive_max_scaling_step", PREDICTIVE_MAX_SCALING_STEP_DEFAULT)
+        if self.metrics_window.maxlen != self.predictive_window_size:
+            self.metrics_window = deque(
+                self.metrics_window, maxlen=self.predictive_window_size)
 
     def get_scaling_state(self) -> Optional[ScalingState]:
         self.last_state_time = time.time()
@@ -108,6 +143,10 @@ class SparkScalingPolicy(ScalingPolicy):
             free_ratio = available/total
             if free_ratio < self.aggressive_free_ratio_threshold:
                 num_cores = self.get_number_of_cores_to_scale(self.scaling_step)
+        elif self.scaling_mode == SPARK_SCALING_MODE_PREDICTIVE:
+            num_cores = self._predict_resource_to_scale(
+                "allocatedVirtualCores", "pendingVirtualCores", "totalVirtualCores",
+                self.get_number_of_cores_to_scale)
         else:
             # apps-pending mode
             if (cluster_metrics["appsPending"] >= self.apps_pending_threshold
@@ -129,6 +168,10 @@ class SparkScalingPolicy(ScalingPolicy):
             free_ratio = available/total
             if free_ratio < self.aggressive_free_ratio_threshold:
                 memory_to_scale = self.get_memory_to_scale(self.scaling_step)
+        elif self.scaling_mode == SPARK_SCALING_MODE_PREDICTIVE:
+            memory_to_scale = self._predict_resource_to_scale(
+                "allocatedMB", "pendingMB", "totalMB",
+                self.get_memory_to_scale, unit=1024 * 1024)
         else:
             # apps-pending mode
             if (cluster_metrics["appsPending"] >= self.apps_pending_threshold
@@ -137,7 +180,53 @@ class SparkScalingPolicy(ScalingPolicy):
 
         return memory_to_scale
 
+    def _predict_resource_to_scale(
+            self, allocated_key, pending_key, total_key, convert_nodes, unit=1):
+        # predictive mode
+        # The demand (allocated and pending) in target latency is predicted
+        # with its growth rate over the recent metrics. It scales up the nodes
+        # to meet the demand which the total resources are short of. The
+        # resources requested are packed into the free resources first by the
+        # scheduler, so the free resources are requested in addition to the
+        # resources of the nodes to add.
+        if self.last_state_time - self.last_scaling_up_time < self.predictive_cooldown:
+            # The nodes of the last scaling up may not join yet
+            return 0
+
+        times = []
+        demands = []
+        for state_time, cluster_metrics in self.metrics_window:
+            times.append(state_time)
+            demands.append(float(cluster_metrics.get(allocated_key, 0)) +
+                           float(cluster_metrics.get(pending_key, 0)))
+        if not demands:
+            return 0
+
+        growth_rate = max(_get_growth_rate(times, demands), 0.0)
+        predicted_demand = demands[-1] + growth_rate * self.predictive_target_latency
+        cluster_metrics = self.metrics_window[-1][1]
+        total = float(cluster_metrics.get(total_key, 0))
+        shortage = predicted_demand - total
+        if shortage <= 0:
+            return 0
+        free = max(total - float(cluster_metrics.get(allocated_key, 0)), 0.0)
+
+        # The resources of a node in the unit of the metrics
+        node_resource = convert_nodes(1) / unit
+        if node_resource <= 0:
+            return 0
+        nodes = min(math.ceil(shortage / node_resource),
+                    self.predictive_max_scaling_step)
+        logger.debug("Predicted demand {} with growth rate {}/s: "
+                     "{} more nodes are needed.".format(
+                        predicted_demand, growth_rate, nodes))
+        self.last_scaling_up_time = self.last_state_time
+        return convert_nodes(nodes) + int(free * unit)
+
     def _need_more_resources(self, cluster_metrics):
+        if self.scaling_mode == SPARK_SCALING_MODE_PREDICTIVE:
+            self.metrics_window.append((self.last_state_time, cluster_metrics))
+
         requesting_resources = {}
         if self.scaling_resource == SPARK_SCALING_RESOURCE_MEMORY:
             requesting_memory = self._need_more_memory(cluster_metrics)
@@ -173,17 +262,12 @@ class SparkScalingPolicy(ScalingPolicy):
             "containersPending": 0,
         """
 
-        cluster_metrics_url = SPARK_YARN_REST_ENDPOINT_CLUSTER_METRICS.format(
-            self.head_ip, self.rest_port)
         try:
-            response = urllib.request.urlopen(cluster_metrics_url, timeout=10)
-            content = response.read()
-        except urllib.error.URLError as e:
+            cluster_metrics_response = self.yarn_client.get_cluster_metrics()
+        except requests.exceptions.RequestException as e:
             logger.error("Failed to retrieve the cluster metrics: {}".format(str(e)))
             return None
 
-        cluster_metrics_response = json.loads(content)
-
         autoscaling_instructions = {}
         resource_demands = []
 
@@ -275,59 +359,12 @@ class SparkScalingPolicy(ScalingPolicy):
             }
         """
 
-        cluster_nodes_url = SPARK_YARN_REST_ENDPOINT_CLUSTER_NODES.format(
-            self.head_ip, self.rest_port)
         try:
-            response = urllib.request.urlopen(cluster_nodes_url, timeout=10)
-            content = response.read()
-        except urllib.error.URLError as e:
+            cluster_nodes_response = self.yarn_client.get_cluster_nodes()
+        except requests.exceptions.RequestException as e:
             logger.error("Failed to retrieve the cluster nodes metrics: {}".format(str(e)))
             return None, None
 
-        cluster_nodes_response = json.loads(content)
-        node_resource_states = {}
-        lost_nodes = {}
-        if ("nodes" in cluster_nodes_response
-                and "node" in cluster_nodes_response["nodes"]):
-            cluster_nodes = cluster_nodes_response["nodes"]["node"]
-            for node in cluster_nodes:
-                host_name = node["nodeHostName"]
-                node_ip = _address_to_ip(host_name)
-                if node_ip is None:
-                    continue
-
-                node_id = make_node_id(node_ip)
-                if node["state"] != "RUNNING":
-                    lost_nodes[node_id] = node_ip
-                    continue
-
-                total_resources = {
-                    constants.CLOUDTIK_RESOURCE_CPU: node["availableVirtualCores"] + node["usedVirtualCores"],
-                    constants.CLOUDTIK_RESOURCE_MEMORY: int(node["availMemoryMB"] + node["usedMemoryMB"]) * 1024 * 1024
-                }
-                free_resources = {
-                    constants.CLOUDTIK_RESOURCE_CPU: node["availableVirtualCores"],
-                    constants.CLOUDTIK_RESOURCE_MEMORY: int(node["availMemoryMB"]) * 1024 * 1024
-                }
-                cpu_load = 0.0
-                if "resourceUtilization" in node:
-                    cpu_load = node["resourceUtilization"].get("nodeCPUUsage", 0.0)
-                resource_load = {
-                    "utilization": {
-                        constants.CLOUDTIK_RESOURCE_CPU: cpu_load
-                    },
-                    "in_use": True if node["numContainers"] > 0 else False
-                }
-                node_resource_state = {
-                    "node_id": node_id,
-                    "node_ip": node_ip,
-                    "resource_time": self.last_state_time,
-                    "total_resources": total_resources,
-                    "available_resources": free_resources,
-                    "resource_load": resource_load
-                }
-                # logger.debug("Node metrics: {}".format(node))
-                # logger.debug("Node resources: {}".format(node_resource_state))
-                node_resource_states[node_id] = node_resource_state
-
-        return node_resource_states, lost_nodes
+        # Only the nodes changed since their last states are reported
+        return self.yarn_node_tracker.update(
+            cluster_nodes_response, self.last_state_time)
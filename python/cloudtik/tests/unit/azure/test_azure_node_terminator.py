@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("azure.mgmt.compute")
+
+from cloudtik.providers._private._azure import node_terminator  # noqa: E402
+from cloudtik.providers._private._azure.node_terminator import \
+    AzureNodeTerminator  # noqa: E402
+
+
+class MockPoller:
+    def __init__(self, events, name, polls_to_done=2):
+        self.events = events
+        self.name = name
+        self.polls_to_done = polls_to_done
+
+    def done(self):
+        self.polls_to_done -= 1
+        if self.polls_to_done > 0:
+            return False
+        self.events.append("deleted " + self.name)
+        return True
+
+    def result(self):
+        return None
+
+
+class MockOperations:
+    def __init__(self, events, key, failures=0):
+        self.events = events
+        self.key = key
+        self.failures = failures
+        self.lock = threading.Lock()
+
+    def begin_delete(self, resource_group_name, **kwargs):
+        name = kwargs[self.key]
+        with self.lock:
+            if self.failures > 0:
+                self.failures -= 1
+                raise Exception("In use")
+            self.events.append("delete " + name)
+        return MockPoller(self.events, name)
+
+
+class MockClient:
+    def __init__(self, **operations):
+        self.__dict__.update(operations)
+
+
+class TestAzureNodeTerminator:
+    def test_terminate(self, monkeypatch):
+        monkeypatch.setattr(node_terminator, "TERMINATION_POLL_INTERVAL", 0.01)
+        monkeypatch.setattr(node_terminator, "DELETE_RETRY_DELAY", 0.01)
+        events = []
+        compute_client = MockClient(
+            virtual_machines=MockOperations(events, "vm_name"),
+            disks=MockOperations(events, "disk_name"))
+        network_client = MockClient(
+            network_interfaces=MockOperations(
+                events, "network_interface_name"),
+            public_ip_addresses=MockOperations(
+                events, "public_ip_address_name", failures=2))
+        terminator = AzureNodeTerminator(
+            compute_client, network_client, "resource-group")
+
+        for i in range(3):
+            terminator.terminate("node-{}".format(i), {
+                "nic_name": "nic-{}".format(i),
+                "public_ip_name": "ip-{}".format(i),
+                "disk_names": ["disk-{}".format(i)]})
+        assert terminator.is_terminating("node-1")
+        assert terminator.get_progress()["node-1"] == [
+            "VM node-1", "nic nic-1", "public ip address ip-1", "disk disk-1"]
+
+        for _ in range(500):
+            if not terminator.get_progress():
+                break
+            time.sleep(0.01)
+        assert not terminator.is_terminating("node-1")
+
+        for i in range(3):
+            deleted = events.index("deleted node-{}".format(i))
+            assert events.index("delete nic-{}".format(i)) > deleted
+            assert events.index("delete disk-{}".format(i)) > deleted
+            assert events.index("delete ip-{}".format(i)) > events.index(
+                "deleted nic-{}".format(i))
+            assert "deleted ip-{}".format(i) in events
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(pytest.main(["-v", __file__]))
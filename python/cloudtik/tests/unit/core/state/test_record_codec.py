@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+import cloudtik.core._private.state.record_codec as record_codec
+from cloudtik.core._private.state.record_codec import HeartbeatRecordCodec, JsonRecordCodec, \
+    MsgpackRecordCodec, decode_record, msgpack, get_heartbeat_codec, get_record_codec
+
+RESOURCE_STATE = {
+    "node_id": "node-1",
+    "node_ip": "10.0.0.1",
+    "resource_time": 1660000000.5,
+    "total_resources": {"CPU": 8.0, "memory": 1024.0},
+    "available_resources": {"CPU": 2.0},
+    "resource_load": {},
+}
+
+
+class TestRecordCodec:
+    def test_heartbeat_codec(self):
+        heartbeat = {
+            "node_id": "node-1",
+            "node_ip": "10.0.0.1",
+            "last_heartbeat_time": 1660000000.123,
+        }
+        data = HeartbeatRecordCodec().encode(heartbeat)
+        assert len(data) < len(json.dumps(heartbeat))
+        assert decode_record(data) == heartbeat
+
+    def test_json_codec(self):
+        data = JsonRecordCodec().encode(RESOURCE_STATE)
+        assert decode_record(data) == RESOURCE_STATE
+
+    def test_old_json_record(self):
+        as_json = json.dumps(RESOURCE_STATE)
+        assert decode_record(as_json) == RESOURCE_STATE
+        assert decode_record(as_json.encode("utf-8")) == RESOURCE_STATE
+
+    def test_json_by_default(self):
+        # The binary records are opt-in for the compatibility with old readers
+        assert isinstance(get_heartbeat_codec(), JsonRecordCodec)
+        assert isinstance(get_record_codec(), JsonRecordCodec)
+
+    def test_binary_without_msgpack(self, monkeypatch):
+        # The binary encoding never falls back to JSON silently
+        monkeypatch.setattr(record_codec, "CLOUDTIK_STATE_RECORD_ENCODING", "binary")
+        monkeypatch.setattr(record_codec, "_msgpack_codec", None)
+        assert isinstance(get_heartbeat_codec(), HeartbeatRecordCodec)
+        with pytest.raises(RuntimeError):
+            get_record_codec()
+        with pytest.raises(RuntimeError):
+            decode_record(bytes([record_codec.RECORD_FORMAT_MSGPACK]))
+
+    @pytest.mark.skipif(msgpack is None, reason="msgpack is not installed")
+    def test_msgpack_codec(self):
+        data = MsgpackRecordCodec().encode(RESOURCE_STATE)
+        assert decode_record(data) == RESOURCE_STATE
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(pytest.main(["-v", __file__]))
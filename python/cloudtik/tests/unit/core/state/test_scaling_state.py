@@ -0,0 +1,93 @@
+import pytest
+
+from cloudtik.core._private.state.scaling_state import ScalingStateClient, \
+    RESOURCE_STATE_TABLE, RESOURCE_TIME_TABLE
+from cloudtik.core.scaling_policy import ScalingState
+
+
+class MemoryStateTable:
+    def __init__(self):
+        self.records = {}
+        self.writes = 0
+        self.batches = 0
+
+    def has_change_feed(self):
+        return False
+
+    def iter_all(self, raw_values=False):
+        return iter(list(self.records.items()))
+
+    def write_batch(self, puts=None, deletes=None):
+        self.batches += 1
+        for key, value in (puts or {}).items():
+            self.records[key] = value
+            self.writes += 1
+        for key in deletes or []:
+            self.records.pop(key, None)
+            self.writes += 1
+
+
+class MemoryControlState:
+    def __init__(self):
+        self.tables = {}
+
+    def get_user_state_table(self, table_name):
+        return self.tables.setdefault(table_name, MemoryStateTable())
+
+
+def _resource_state(node_id, resource_time, available_cpus=4):
+    return {
+        "node_id": node_id,
+        "node_ip": "10.0.0.1",
+        "resource_time": resource_time,
+        "total_resources": {"CPU": 4},
+        "available_resources": {"CPU": available_cpus},
+        "resource_load": {"in_use": available_cpus < 4},
+    }
+
+
+def _update(client, resource_states, lost_nodes=None):
+    client.update_scaling_state(ScalingState(
+        node_resource_states={
+            state["node_id"]: state for state in resource_states},
+        lost_nodes=lost_nodes))
+
+
+class TestScalingStateClient:
+    def test_delta_writes(self, monkeypatch):
+        control_state = MemoryControlState()
+        client = ScalingStateClient(control_state)
+        states = control_state.get_user_state_table(RESOURCE_STATE_TABLE)
+        times = control_state.get_user_state_table(RESOURCE_TIME_TABLE)
+
+        _update(client, [_resource_state("node-1", 100),
+                         _resource_state("node-2", 100)])
+        assert states.writes == 2 and states.batches == 1
+
+        # Unchanged states are not written again until refreshed
+        _update(client, [_resource_state("node-1", 101),
+                         _resource_state("node-2", 101)])
+        assert states.writes == 2 and times.writes == 0
+        _update(client, [_resource_state("node-1", 104),
+                         _resource_state("node-2", 104, 2)])
+        assert states.writes == 3 and times.writes == 1
+
+        monkeypatch.setattr(
+            "cloudtik.core._private.state.scaling_state.kv_get", lambda key: None)
+        monkeypatch.setattr(
+            "cloudtik.core._private.state.scaling_state.time.time", lambda: 105)
+        scaling_state = client.get_scaling_state()
+        assert scaling_state.node_resource_states["node-1"]["resource_time"] == 104
+        assert scaling_state.node_resource_states["node-2"][
+            "available_resources"] == {"CPU": 2}
+
+        _update(client, [], lost_nodes={"node-1": "10.0.0.1"})
+        assert "node-1" not in states.records
+        assert "node-1" not in times.records
+        assert "node-1" not in client.get_scaling_state().node_resource_states
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(pytest.main(["-v", __file__]))
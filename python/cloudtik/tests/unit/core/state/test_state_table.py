@@ -12,6 +12,9 @@ CLOUDTIK_REDIS_EXECUTABLE = os.path.join(
 from cloudtik.core._private.services import start_cloudtik_process, wait_for_redis_to_start
 import cloudtik.core._private.constants as constants
 from cloudtik.core._private.state.control_state import ControlState
+import cloudtik.core._private.state.state_table_store as state_table_store
+from cloudtik.core._private.state.state_table_store import StateTableStore
+from cloudtik.core._private.state.store_client import STATE_TABLE_LAYOUT_HASH
 
 processes = []
 TEST_KEYS = ['node-1', 'node-2', 'node-3', 'node-4', 'node-5']
@@ -61,11 +64,18 @@ class TestNodeTable:
                                          password=constants.CLOUDTIK_REDIS_DEFAULT_PASSWORD)
         redis_client.rpush("RedisShards", "127.0.0.1:52345")
         redis_client.set("NumRedisShards", 1)
+        # The change feed is opt-in, enable it for the change feed tests
+        self.change_feed = state_table_store.CLOUDTIK_STATE_TABLE_CHANGE_FEED
+        state_table_store.CLOUDTIK_STATE_TABLE_CHANGE_FEED = True
         self.control_state = ControlState()
         self.control_state.initialize_control_state('127.0.0.1', constants.CLOUDTIK_DEFAULT_PORT,
                                                     constants.CLOUDTIK_REDIS_DEFAULT_PASSWORD)
         self.node_table = self.control_state.get_node_table()
 
+    @classmethod
+    def teardown_class(self):
+        state_table_store.CLOUDTIK_STATE_TABLE_CHANGE_FEED = self.change_feed
+
     @pytest.mark.parametrize("key", TEST_KEYS)
     @pytest.mark.parametrize("value",
                              [{"ip": "127.0.0.1"}, {"ip": "127.0.0.2"}, {"ip": "127.0.0.3"}, {"ip": "127.0.0.4"}])
@@ -79,6 +89,87 @@ class TestNodeTable:
         for key in TEST_KEYS:
             assert key in res.keys()
 
+    def test_iter_all(self):
+        res = dict(self.node_table.iter_all())
+        for key in TEST_KEYS:
+            assert key in res.keys()
+        assert res == self.node_table.get_all()
+
+    def test_change_feed(self):
+        reader = self.node_table.get_change_feed_reader()
+        is_snapshot, changes = reader.read_changes()
+        assert is_snapshot
+        assert dict(changes) == self.node_table.get_all()
+
+        is_snapshot, changes = reader.read_changes()
+        assert not is_snapshot
+        assert changes == []
+
+        self.node_table.put("node-changed", json.dumps({"ip": "127.0.0.1"}))
+        self.node_table.delete(TEST_KEYS[0])
+        is_snapshot, changes = reader.read_changes()
+        assert not is_snapshot
+        assert sorted(changes) == sorted(
+            [("node-changed", json.dumps({"ip": "127.0.0.1"})), (TEST_KEYS[0], None)])
+
+    def test_write_batch(self):
+        reader = self.node_table.get_change_feed_reader()
+        reader.read_changes()
+        self.node_table.put("node-batch-deleted", json.dumps({"ip": "127.0.0.1"}))
+        self.node_table.write_batch(
+            {"node-batch-1": json.dumps({"ip": "127.0.0.1"}),
+             "node-batch-2": json.dumps({"ip": "127.0.0.2"})},
+            ["node-batch-deleted"])
+        res = self.node_table.get_all()
+        assert "node-batch-1" in res and "node-batch-2" in res
+        assert "node-batch-deleted" not in res
+        is_snapshot, changes = reader.read_changes()
+        assert not is_snapshot
+        assert sorted(key for key, _ in changes) == [
+            "node-batch-1", "node-batch-2", "node-batch-deleted"]
+
+
+class TestHashNodeTable:
+    @classmethod
+    def setup_class(self):
+        self.control_state = ControlState()
+        self.control_state.initialize_control_state('127.0.0.1', constants.CLOUDTIK_DEFAULT_PORT,
+                                                    constants.CLOUDTIK_REDIS_DEFAULT_PASSWORD)
+        redis_shards_client = self.control_state.control_state_accessor.redis_shard_client
+        state_table_store = StateTableStore(redis_shards_client, STATE_TABLE_LAYOUT_HASH)
+        self.node_table = state_table_store.get_node_table()
+
+    def test_put_and_get_all(self):
+        version = self.node_table.get_version()
+        for key in TEST_KEYS:
+            self.node_table.put(key, json.dumps({"ip": "127.0.0.1"}))
+        assert self.node_table.get_version() == version + len(TEST_KEYS)
+
+        res = self.node_table.get_all()
+        for key in TEST_KEYS:
+            assert key in res.keys()
+        assert res == dict(self.node_table.iter_all())
+
+    def test_delete(self):
+        self.node_table.put("node-deleted", json.dumps({"ip": "127.0.0.1"}))
+        version = self.node_table.get_version()
+        self.node_table.delete("node-deleted")
+        assert self.node_table.get("node-deleted") is None
+        assert "node-deleted" not in self.node_table.get_all()
+        assert self.node_table.get_version() == version + 1
+
+    def test_write_batch(self):
+        self.node_table.put("node-batch-deleted", json.dumps({"ip": "127.0.0.1"}))
+        version = self.node_table.get_version()
+        self.node_table.write_batch(
+            {key: json.dumps({"ip": "127.0.0.2"}) for key in TEST_KEYS},
+            ["node-batch-deleted"])
+        res = self.node_table.get_all()
+        for key in TEST_KEYS:
+            assert json.loads(res[key]) == {"ip": "127.0.0.2"}
+        assert "node-batch-deleted" not in res
+        assert self.node_table.get_version() == version + len(TEST_KEYS) + 1
+
 
 if __name__ == "__main__":
     import sys
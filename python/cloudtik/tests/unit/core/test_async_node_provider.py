@@ -0,0 +1,146 @@
+import threading
+import time
+
+import pytest
+
+from cloudtik.core._private.cluster.node_provider_executor import \
+    NodeProviderExecutor
+from cloudtik.core._private.tag_coalescer import NodeTagCoalescer
+from cloudtik.core.async_node_provider import NodeProviderAsyncAdapter, \
+    get_async_node_provider
+from cloudtik.core.node_provider import NodeProvider
+
+CALL_TIME = 0.1
+
+
+class SlowNodeProvider(NodeProvider):
+    def __init__(self):
+        super().__init__({}, "test-cluster")
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.terminated = []
+
+    def _call(self):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(CALL_TIME)
+        with self.lock:
+            self.in_flight -= 1
+
+    def create_node(self, node_config, tags, count):
+        self._call()
+
+    def terminate_node(self, node_id):
+        self._call()
+        with self.lock:
+            self.terminated.append(node_id)
+
+
+class BatchNodeProvider(SlowNodeProvider):
+    max_terminate_nodes = 2
+
+    def terminate_nodes(self, node_ids):
+        assert len(node_ids) <= self.max_terminate_nodes
+        self._call()
+        with self.lock:
+            self.terminated.extend(node_ids)
+
+
+class TestNodeProviderExecutor:
+    def test_concurrent_calls(self):
+        provider = SlowNodeProvider()
+        async_provider = get_async_node_provider(provider)
+        assert isinstance(async_provider, NodeProviderAsyncAdapter)
+        executor = NodeProviderExecutor(async_provider)
+        try:
+            start = time.time()
+            executor.terminate_nodes(["node-{}".format(i) for i in range(8)])
+            assert time.time() - start < CALL_TIME * 4
+            assert sorted(provider.terminated) == [
+                "node-{}".format(i) for i in range(8)]
+
+            threads = [threading.Thread(
+                target=executor.create_node_with_resources,
+                args=({}, {}, 1, {})) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert provider.max_in_flight == 8
+        finally:
+            executor.stop()
+
+    def test_limits(self):
+        provider = BatchNodeProvider()
+        executor = NodeProviderExecutor(NodeProviderAsyncAdapter(
+            provider, max_concurrent_calls=2, max_calls_per_second=20))
+        try:
+            start = time.time()
+            executor.terminate_nodes(["node-{}".format(i) for i in range(7)])
+            # Four batch calls with two at a time
+            assert time.time() - start >= CALL_TIME * 2
+            assert provider.max_in_flight == 2
+            assert sorted(provider.terminated) == [
+                "node-{}".format(i) for i in range(7)]
+        finally:
+            executor.stop()
+
+
+class TestNodeTagCoalescer:
+    def test_coalesce(self):
+        batches = []
+
+        def write_tags(node_tags):
+            assert coalescer.pending_node_tags("node-0") == {"status": "up"}
+            batches.append(dict(node_tags))
+
+        coalescer = NodeTagCoalescer(write_tags, batch_delay_s=0.1)
+        threads = [threading.Thread(
+            target=coalescer.set_node_tags,
+            args=("node-{}".format(i), {"status": "up"})) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(batches) == 1
+        assert len(batches[0]) == 10
+        assert coalescer.pending_node_tags("node-0") == {}
+
+    def test_error(self):
+        def write_tags(node_tags):
+            raise RuntimeError("failed")
+
+        coalescer = NodeTagCoalescer(write_tags, batch_delay_s=0)
+        with pytest.raises(RuntimeError):
+            coalescer.set_node_tags("node-1", {"status": "up"})
+
+    def test_node_error(self):
+        def write_tags(node_tags):
+            return {"node-1": RuntimeError("failed")}
+
+        coalescer = NodeTagCoalescer(write_tags, batch_delay_s=0.1)
+        errors = {}
+
+        def set_node_tags(node_id):
+            try:
+                coalescer.set_node_tags(node_id, {"status": "up"})
+            except RuntimeError as e:
+                errors[node_id] = e
+
+        threads = [threading.Thread(
+            target=set_node_tags, args=("node-{}".format(i),))
+            for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Each write raises only the error of its node
+        assert list(errors) == ["node-1"]
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(pytest.main(["-v", __file__]))
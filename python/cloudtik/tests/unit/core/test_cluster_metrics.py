@@ -0,0 +1,53 @@
+import pytest
+
+from cloudtik.core._private.cluster.cluster_metrics import ClusterMetrics
+
+
+def _update(cluster_metrics, ip, resource_time, static_resources, dynamic_resources):
+    cluster_metrics.update_node_resources(
+        ip, "node-" + ip, resource_time, static_resources, dynamic_resources, {})
+
+
+class TestClusterMetrics:
+    def test_idle_ips(self):
+        cluster_metrics = ClusterMetrics()
+        for i in range(40):
+            _update(cluster_metrics, "10.0.0.{}".format(i), 100 + i,
+                    {"CPU": 4}, {"CPU": 2})
+        # The idle nodes keep the last used time
+        for i in range(40):
+            _update(cluster_metrics, "10.0.0.{}".format(i), 200 + i,
+                    {"CPU": 4}, {"CPU": 4 if i % 2 else 2})
+
+        idle_ips = cluster_metrics.get_idle_ips(horizon=120)
+        assert idle_ips == ["10.0.0.{}".format(i) for i in range(1, 20, 2)]
+        assert cluster_metrics.last_used_time_by_ip["10.0.0.1"] == 101
+        assert cluster_metrics.last_resource_time_by_ip["10.0.0.1"] == 201
+
+        cluster_metrics.prune_active_ips(
+            ["10.0.0.{}".format(i) for i in range(5, 40)])
+        assert "10.0.0.1" not in cluster_metrics.last_used_time_by_ip
+        assert "10.0.0.1" not in cluster_metrics.static_resources_by_ip
+        assert len(cluster_metrics.last_used_time_by_ip) == 35
+        assert cluster_metrics.get_idle_ips(horizon=120)[0] == "10.0.0.5"
+        assert cluster_metrics.last_used_time_by_ip["10.0.0.5"] == 105
+
+    def test_resource_usage(self):
+        cluster_metrics = ClusterMetrics()
+        _update(cluster_metrics, "10.0.0.1", 100, {"CPU": 4}, {"CPU": 1})
+        _update(cluster_metrics, "10.0.0.2", 100,
+                {"CPU": 4, "GPU": 2}, {"GPU": 1})
+        assert cluster_metrics.resources_avail_summary() == "8 CPUs, 2 GPUs"
+        assert cluster_metrics.summary().usage == {
+            "CPU": (7.0, 8.0), "GPU": (1.0, 2.0)}
+
+        _update(cluster_metrics, "10.0.0.2", 101, {"CPU": 4}, {"CPU": 4})
+        assert cluster_metrics.resources_avail_summary() == "8 CPUs"
+        cluster_metrics.prune_active_ips(["10.0.0.2"])
+        assert cluster_metrics.summary().usage == {"CPU": (0.0, 4.0)}
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(pytest.main(["-v", __file__]))
@@ -0,0 +1,155 @@
+import pytest
+
+from cloudtik.core._private.cluster.cluster_node_state import ClusterNodeState
+from cloudtik.core.tags import CLOUDTIK_TAG_NODE_KIND, CLOUDTIK_TAG_NODE_STATUS, \
+    NODE_KIND_HEAD, NODE_KIND_WORKER, STATUS_UP_TO_DATE, STATUS_UNINITIALIZED
+
+
+class FakeProvider:
+    """A provider counting the calls of listing and fetching the nodes."""
+
+    def __init__(self):
+        self.nodes = {}
+        self.ips = {}
+        self.list_calls = 0
+        self.fetched = []
+
+    def add_node(self, node_id, node_kind, status=STATUS_UP_TO_DATE, ip=None):
+        self.nodes[node_id] = {
+            CLOUDTIK_TAG_NODE_KIND: node_kind,
+            CLOUDTIK_TAG_NODE_STATUS: status}
+        self.ips[node_id] = ip
+
+    def non_terminated_nodes(self, tag_filters):
+        self.list_calls += 1
+        return list(self.nodes.keys())
+
+    def node_tags(self, node_id):
+        self.fetched.append(node_id)
+        if node_id not in self.nodes:
+            raise Exception("Node {} not found".format(node_id))
+        return dict(self.nodes[node_id])
+
+    def internal_ip(self, node_id):
+        return self.ips.get(node_id)
+
+    def set_node_tags(self, node_id, tags):
+        self.nodes[node_id].update(tags)
+
+
+@pytest.fixture
+def provider():
+    provider = FakeProvider()
+    provider.add_node("head", NODE_KIND_HEAD, ip="10.0.0.1")
+    provider.add_node("worker-1", NODE_KIND_WORKER, ip="10.0.0.2")
+    return provider
+
+
+def _create_node_state(provider):
+    node_state = ClusterNodeState(
+        provider, full_sync_interval_s=100, relist_interval_s=10)
+    node_state.update(now=0)
+    provider.list_calls = 0
+    provider.fetched = []
+    return node_state
+
+
+class TestClusterNodeState:
+    def test_full_sync(self, provider):
+        node_state = _create_node_state(provider)
+        assert node_state.head_id == "head"
+        assert node_state.worker_ids == ["worker-1"]
+        assert node_state.get_node_id("10.0.0.2") == "worker-1"
+
+        # Tags changed outside are caught only by the full sync
+        provider.nodes["worker-1"]["custom"] = "value"
+        node_state.update(now=50)
+        assert "custom" not in node_state.node_tags("worker-1")
+        node_state.update(now=100)
+        assert provider.list_calls == 2
+        assert sorted(provider.fetched) == ["head", "worker-1"]
+        assert node_state.node_tags("worker-1")["custom"] == "value"
+
+        node_state.request_full_sync()
+        provider.fetched = []
+        node_state.update(now=101)
+        assert sorted(provider.fetched) == ["head", "worker-1"]
+
+    def test_launch(self, provider):
+        node_state = _create_node_state(provider)
+        provider.add_node("worker-2", NODE_KIND_WORKER, ip="10.0.0.3")
+        node_state.nodes_launched()
+        node_state.update(now=1)
+        # Re-listed before the re-list interval and only the new node fetched
+        assert provider.list_calls == 1
+        assert provider.fetched == ["worker-2"]
+        assert node_state.worker_ids == ["worker-1", "worker-2"]
+        assert node_state.internal_ip("worker-2") == "10.0.0.3"
+
+        # Not re-listed without launching
+        node_state.update(now=2)
+        assert provider.list_calls == 1
+
+    def test_remove(self, provider):
+        node_state = _create_node_state(provider)
+        node_state.remove_nodes(["worker-1"])
+        assert node_state.worker_ids == []
+        assert node_state.all_node_ids == ["head"]
+        assert node_state.get_node_id("10.0.0.2") is None
+
+        # A terminated node is removed when re-listed
+        provider.add_node("worker-2", NODE_KIND_WORKER, ip="10.0.0.3")
+        node_state.update(now=10)
+        del provider.nodes["worker-2"]
+        node_state.update(now=20)
+        assert node_state.all_node_ids == ["head", "worker-1"]
+        assert node_state.get_node_id("10.0.0.3") is None
+
+    def test_refresh_unsettled(self, provider):
+        provider.add_node(
+            "worker-2", NODE_KIND_WORKER, status=STATUS_UNINITIALIZED)
+        node_state = _create_node_state(provider)
+
+        # The unsettled node is refreshed at each update without re-listing
+        node_state.update(now=1)
+        assert provider.fetched == ["worker-2"]
+        assert provider.list_calls == 0
+
+        provider.ips["worker-2"] = "10.0.0.3"
+        provider.nodes["worker-2"][CLOUDTIK_TAG_NODE_STATUS] = \
+            STATUS_UP_TO_DATE
+        node_state.update(now=2)
+        assert node_state.get_node_id("10.0.0.3") == "worker-2"
+
+        # The settled nodes are not refreshed
+        provider.fetched = []
+        node_state.update(now=3)
+        assert provider.fetched == []
+        assert provider.list_calls == 0
+
+    def test_refresh_unsettled_gone(self, provider):
+        provider.add_node(
+            "worker-2", NODE_KIND_WORKER, status=STATUS_UNINITIALIZED)
+        node_state = _create_node_state(provider)
+
+        # Failed to refresh the node terminated, list again
+        del provider.nodes["worker-2"]
+        node_state.update(now=1)
+        assert provider.list_calls == 1
+        assert node_state.worker_ids == ["worker-1"]
+
+    def test_set_node_tags(self, provider):
+        node_state = _create_node_state(provider)
+        tags = node_state.node_tags("worker-1")
+        node_state.set_node_tags("worker-1", {"custom": "value"})
+        assert provider.nodes["worker-1"]["custom"] == "value"
+        assert node_state.node_tags("worker-1")["custom"] == "value"
+        # The tags returned are not updated in place
+        assert "custom" not in tags
+        assert provider.fetched == []
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(pytest.main(["-v", __file__]))
@@ -0,0 +1,272 @@
+import glob
+import os
+import subprocess
+
+import pytest
+
+from cloudtik.core._private.call_context import CallContext
+from cloudtik.core._private.command_executor import SSHCommandExecutor, \
+    SSHConnectionPool, SSHRelayKey, _ssh_connection_pool, \
+    _with_environment_variables
+from cloudtik.core.command_executor import CommandExecutor
+
+
+class ControlProcessRunner:
+    def __init__(self, master_alive=True, master_hang=False):
+        self.master_alive = master_alive
+        self.master_hang = master_hang
+        self.calls = []
+
+    def check_call(self, cmd, *args, **kwargs):
+        self.calls.append(cmd)
+        if "-O" in cmd and cmd[cmd.index("-O") + 1] == "check":
+            if self.master_hang:
+                raise subprocess.TimeoutExpired(cmd, kwargs.get("timeout"))
+            if not self.master_alive:
+                raise subprocess.CalledProcessError(255, cmd)
+
+    def check_output(self, cmd):
+        self.check_call(cmd)
+        return b"command-output"
+
+    def control_calls(self, control_command):
+        return [cmd for cmd in self.calls
+                if "-O" in cmd and cmd[cmd.index("-O") + 1] == control_command]
+
+
+class MockIPProvider:
+    def internal_ip(self, node_id):
+        return "10.0.0.1"
+
+
+def _create_executor(process_runner, node_id="node-1"):
+    return SSHCommandExecutor(
+        CallContext(), "", node_id, MockIPProvider(),
+        {"ssh_user": "ubuntu"}, "test-cluster", process_runner,
+        use_internal_ip=True)
+
+
+class TestSSHConnectionPool:
+    def test_master_shared_and_stopped(self):
+        runner = ControlProcessRunner()
+        pool = SSHConnectionPool()
+        master = pool.acquire("node-1", ["ssh", "ubuntu@node-1"], runner)
+        assert pool.acquire("node-1", ["ssh", "ubuntu@node-1"], runner) is master
+        pool.release("node-1", master)
+        assert runner.control_calls("stop") == []
+        pool.release("node-1", master)
+        assert runner.control_calls("stop") == [
+            ["ssh", "-O", "stop", "ubuntu@node-1"]]
+        assert "node-1" not in pool.masters
+
+    def test_check_interval(self):
+        runner = ControlProcessRunner()
+        pool = SSHConnectionPool()
+        master = pool.acquire("node-1", ["ssh", "ubuntu@node-1"], runner)
+        assert master.check()
+        assert master.check()
+        assert len(runner.control_calls("check")) == 1
+
+        runner.master_alive = False
+        master.alive = False
+        assert not master.check()
+        assert not master.check()
+        assert len(runner.control_calls("check")) == 3
+        assert not master.stale
+
+    def test_stale(self):
+        runner = ControlProcessRunner()
+        pool = SSHConnectionPool()
+        master = pool.acquire("node-1", ["ssh", "ubuntu@node-1"], runner)
+        assert master.check()
+
+        # The master exited is not stale and replaced by the next command
+        runner.master_alive = False
+        master.last_check_time = 0
+        assert not master.check()
+        assert not master.stale
+        runner.master_alive = True
+        assert master.check()
+
+        # The master not responding is stale and not checked again
+        runner.master_hang = True
+        master.last_check_time = 0
+        assert not master.check()
+        assert master.stale
+        assert not master.check()
+        assert len(runner.control_calls("check")) == 4
+
+        pool.remove("node-1", master)
+        assert "node-1" not in pool.masters
+        pool.release("node-1", master)
+        assert runner.control_calls("stop") == []
+
+
+class TestSSHCommandExecutor:
+    def test_commands_share_master(self):
+        runner = ControlProcessRunner()
+        executors = [_create_executor(runner) for _ in range(2)]
+        for executor in executors:
+            executor.run("uptime", with_output=True)
+            executor.run_rsync_up("/tmp/source", "/tmp/target")
+        assert len(runner.control_calls("check")) == 1
+        assert len(_ssh_connection_pool.masters) == 1
+
+        executors[0].close()
+        assert runner.control_calls("stop") == []
+        executors[1].close()
+        assert len(runner.control_calls("stop")) == 1
+        assert len(_ssh_connection_pool.masters) == 0
+
+        # The commands except the control commands use the control socket
+        for cmd in runner.calls:
+            if "-O" not in cmd:
+                assert any("ControlMaster=auto" in arg for arg in cmd)
+
+    def test_stale_master(self):
+        runner = ControlProcessRunner(master_hang=True)
+        executors = [_create_executor(runner) for _ in range(2)]
+        executors[0].run("uptime", with_output=True)
+        # The stale master is removed and the commands run without
+        # multiplexing
+        assert executors[0].ssh_master is None
+        assert len(_ssh_connection_pool.masters) == 0
+        assert "ControlMaster=no" in runner.calls[-1]
+        assert "ControlPath=none" in runner.calls[-1]
+
+        runner.calls = []
+        executors[0].run_rsync_up("/tmp/source", "/tmp/target")
+        assert runner.control_calls("check") == []
+        assert "ControlMaster=no" in runner.calls[-1][2]
+
+        # The other executor gets a new master
+        runner.master_hang = False
+        executors[1].run("uptime", with_output=True)
+        assert len(_ssh_connection_pool.masters) == 1
+        assert "ControlMaster=auto" in runner.calls[-1]
+        for executor in executors:
+            executor.close()
+        assert len(_ssh_connection_pool.masters) == 0
+        assert len(runner.control_calls("stop")) == 1
+
+
+class TestRsyncRelay:
+    def test_relay_key(self):
+        runner = ControlProcessRunner()
+        source = _create_executor(runner, node_id="node-1")
+        target = _create_executor(runner, node_id="node-2")
+        relay_key = SSHRelayKey()
+        try:
+            assert relay_key.public_key.endswith(" " + relay_key.name)
+            target.run_rsync_relay(source, "/tmp/source", "/tmp/target",
+                                   relay_key)
+            target.run_rsync_relay(source, "/tmp/source", "/tmp/target",
+                                   relay_key)
+        finally:
+            relay_key.delete()
+        assert not os.path.exists(relay_key.key_dir)
+
+        commands = [cmd[-1] for cmd in runner.calls if "-O" not in cmd]
+        # The relay key instead of the cluster key is installed on the
+        # source once
+        installs = [cmd for cmd in runner.calls
+                    if cmd[0] == "rsync" and cmd[-2] == relay_key.private_key]
+        assert len(installs) == 1
+        assert installs[0][-1].endswith(relay_key.remote_private_key)
+        # The relay key is authorized on the target only during the syncs
+        authorizes = [i for i, cmd in enumerate(commands)
+                      if "authorized_keys" in cmd and "echo" in cmd]
+        revokes = [i for i, cmd in enumerate(commands)
+                   if "authorized_keys" in cmd and "sed" in cmd]
+        relays = [i for i, cmd in enumerate(commands)
+                  if "--rsync-path" in cmd]
+        assert len(relays) == 2
+        assert all("-i {}".format(relay_key.remote_private_key) in
+                   commands[i] for i in relays)
+        assert len(authorizes) == len(revokes) == 2
+        for authorize, relay, revoke in zip(authorizes, relays, revokes):
+            assert authorize < relay < revoke
+
+        # The relay key is removed from the source when closed
+        source.close()
+        target.close()
+        assert "rm -f {}".format(
+            relay_key.remote_private_key) in runner.calls[-2][-1]
+
+    def test_relay_not_supported(self):
+        runner = ControlProcessRunner()
+        target = SSHCommandExecutor(
+            CallContext(), "", "node-2", MockIPProvider(),
+            {"ssh_user": "ubuntu", "ssh_proxy_command": "nc proxy 22"},
+            "test-cluster", runner, use_internal_ip=True)
+        assert not target.supports_rsync_relay()
+        with pytest.raises(RuntimeError):
+            target.run_rsync_relay(_create_executor(runner), "/tmp/source",
+                                   "/tmp/target", None)
+
+
+class LocalShellExecutor(CommandExecutor):
+    def __init__(self):
+        CommandExecutor.__init__(self, CallContext())
+        self.sessions = 0
+
+    def run(self, cmd=None, with_output=False, environment_variables=None,
+            **kwargs):
+        self.sessions += 1
+        if environment_variables:
+            cmd, _ = _with_environment_variables(cmd, environment_variables)
+        if with_output:
+            return subprocess.check_output(["bash", "-c", cmd])
+        return subprocess.check_call(["bash", "-c", cmd])
+
+
+def _batch_status_files():
+    return set(glob.glob("/tmp/cloudtik-batch-*.status"))
+
+
+class TestCommandBatch:
+    def test_run_batch(self, tmp_path):
+        output = tmp_path / "output"
+        executor = LocalShellExecutor()
+        executor.run_batch_with_retry(
+            ["cd /; echo $NAME-1 >> {}".format(output),
+             "echo $NAME-2 >> {}  # comment".format(output),
+             "pwd >> {}".format(output)],
+            environment_variables={"NAME": "cmd"},
+            number_of_retries=1)
+        assert executor.sessions == 1
+        assert output.read_text().split() == ["cmd-1", "cmd-2", os.getcwd()]
+
+    def test_retry_failed_command(self, tmp_path):
+        output = tmp_path / "output"
+        counter = tmp_path / "counter"
+        executor = LocalShellExecutor()
+        status_files = _batch_status_files()
+        executor.run_batch_with_retry(
+            ["echo 1 >> {}".format(output),
+             "echo x >> {c}; test $(wc -l < {c}) -ge 2".format(c=counter),
+             "echo 3 >> {}".format(output)],
+            number_of_retries=2, retry_interval=0)
+        # The succeeded command is not run again
+        assert output.read_text().split() == ["1", "3"]
+        assert counter.read_text().split() == ["x", "x"]
+        assert _batch_status_files() == status_files
+
+    def test_failed_command(self, tmp_path):
+        output = tmp_path / "output"
+        executor = LocalShellExecutor()
+        status_files = _batch_status_files()
+        with pytest.raises(subprocess.CalledProcessError):
+            executor.run_batch_with_retry(
+                ["echo 1 >> {}".format(output), "false",
+                 "echo 3 >> {}".format(output)],
+                number_of_retries=2, retry_interval=0)
+        assert output.read_text().split() == ["1"]
+        # The status files of the failed attempts are removed
+        assert _batch_status_files() == status_files
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(pytest.main(["-v", __file__]))
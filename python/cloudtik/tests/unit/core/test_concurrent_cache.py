@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+from cloudtik.core._private.concurrent_cache import ConcurrentObjectCache
+
+
+class TestConcurrentObjectCache:
+    def test_lru_eviction(self):
+        cache = ConcurrentObjectCache(max_size=2)
+        for key in ["a", "b", "a", "c"]:
+            cache.get(key, lambda k: k.upper(), k=key)
+        assert cache.get("a", lambda: "reloaded") == "A"
+        assert cache.get("b", lambda: "reloaded") == "reloaded"
+        stats = cache.get_stats()
+        assert stats["size"] == 2
+        assert stats["hits"] == 2
+        assert stats["misses"] == 4
+        assert stats["evictions"] == 2
+
+    def test_ttl_expiration(self):
+        cache = ConcurrentObjectCache(ttl_s=0.05)
+        assert cache.get("a", lambda: 1) == 1
+        assert cache.get("a", lambda: 2) == 1
+        time.sleep(0.1)
+        assert cache.get("a", lambda: 3) == 3
+        assert cache.get_stats()["expirations"] == 1
+
+    def test_single_flight(self):
+        cache = ConcurrentObjectCache()
+        started = threading.Event()
+        release = threading.Event()
+        loads = []
+
+        def slow_load():
+            loads.append(1)
+            started.set()
+            release.wait()
+            return "slow"
+
+        results = []
+        threads = [threading.Thread(
+            target=lambda: results.append(cache.get("slow", slow_load)))
+            for _ in range(4)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        # Other keys are not blocked by the slow load
+        assert cache.get("fast", lambda: "fast") == "fast"
+        release.set()
+        for thread in threads:
+            thread.join()
+        assert results == ["slow"] * 4
+        assert len(loads) == 1
+
+    def test_load_failure_not_cached(self):
+        cache = ConcurrentObjectCache()
+
+        def fail():
+            raise ValueError("failed")
+
+        with pytest.raises(ValueError):
+            cache.get("a", fail)
+        assert cache.get("a", lambda: 1) == 1
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(pytest.main(["-v", __file__]))
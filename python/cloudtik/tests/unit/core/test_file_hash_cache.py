@@ -0,0 +1,57 @@
+import hashlib
+import os
+
+import pytest
+
+from cloudtik.core._private import file_hash_cache
+from cloudtik.core._private.file_hash_cache import FileHashCache
+
+
+def _write(path, content, mtime_ns):
+    with open(path, "w") as f:
+        f.write(content)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+class TestFileHashCache:
+    def test_hash_reused_until_stat_changed(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "a.txt")
+        _write(path, "hello", 10 ** 18)
+        cache = FileHashCache(max_entries=10)
+        assert cache.get_file_hash(path) == hashlib.sha1(b"hello").hexdigest()
+
+        hashed = []
+        original_hash_file = file_hash_cache.hash_file
+        monkeypatch.setattr(
+            file_hash_cache, "hash_file",
+            lambda p: hashed.append(p) or original_hash_file(p))
+        cache.get_file_hash(path)
+        assert hashed == []
+
+        _write(path, "world", 10 ** 18 + 1)
+        assert cache.get_file_hash(path) == hashlib.sha1(b"world").hexdigest()
+        assert hashed == [path]
+
+    def test_lru_eviction_and_persistence(self, tmp_path):
+        cache_file = str(tmp_path / "cache" / "hashes.json")
+        paths = []
+        for i in range(4):
+            path = str(tmp_path / "{}.txt".format(i))
+            _write(path, str(i), 10 ** 18)
+            paths.append(path)
+
+        cache = FileHashCache(max_entries=3, cache_file=cache_file)
+        hashes = cache.get_file_hashes(paths)
+        assert hashes == [hashlib.sha1(str(i).encode()).hexdigest() for i in range(4)]
+        assert FileHashCache(max_entries=3, parallelism=4).get_file_hashes(paths) == hashes
+        cache.save()
+
+        loaded = FileHashCache(max_entries=3, cache_file=cache_file)
+        loaded._load_if_needed()
+        assert list(loaded._entries.keys()) == paths[1:]
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(pytest.main(["-v", __file__]))
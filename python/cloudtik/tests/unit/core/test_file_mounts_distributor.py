@@ -0,0 +1,134 @@
+import os
+import queue
+import threading
+
+import pytest
+
+from cloudtik.core._private.node.file_mounts_distributor import \
+    FileMountsDistributor
+
+
+class MockCommandExecutor:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestFileMountsDistributor:
+    def test_sources(self):
+        distributor = FileMountsDistributor(fan_out=2)
+        assert distributor.acquire_source() == (None, None)
+        distributor.release_source(None)
+        executor = MockCommandExecutor("worker-1")
+        distributor.add_source("worker-1", executor)
+        # The workers are preferred over the head
+        assert distributor.acquire_source() == ("worker-1", executor)
+        assert distributor.acquire_source() == (None, None)
+        assert distributor.acquire_source() == ("worker-1", executor)
+        assert distributor.acquire_source() == (None, None)
+
+        acquired = []
+        thread = threading.Thread(
+            target=lambda: acquired.append(distributor.acquire_source()))
+        thread.start()
+        thread.join(timeout=0.1)
+        assert thread.is_alive()
+        distributor.release_source("worker-1", failed=True)
+        thread.join(timeout=0.1)
+        # The failed source is not used any longer
+        assert thread.is_alive()
+        assert not executor.closed
+        distributor.release_source(None)
+        thread.join(timeout=5)
+        assert acquired == [(None, None)]
+        # Closed after the other sync from it is done
+        distributor.release_source("worker-1")
+        assert executor.closed
+
+    def test_close(self):
+        distributor = FileMountsDistributor(fan_out=2)
+        executors = [MockCommandExecutor("worker-{}".format(i))
+                     for i in range(2)]
+        for executor in executors:
+            distributor.add_source(executor.name, executor)
+        assert distributor.acquire_source() == ("worker-0", executors[0])
+
+        distributor.close()
+        assert not executors[0].closed
+        assert executors[1].closed
+        # Only the head is used after closed
+        assert distributor.acquire_source() == (None, None)
+        distributor.release_source("worker-0")
+        assert executors[0].closed
+
+        executor = MockCommandExecutor("worker-2")
+        distributor.add_source("worker-2", executor)
+        assert executor.closed
+
+    def test_relay_key(self):
+        distributor = FileMountsDistributor(fan_out=2)
+        relay_key = distributor.get_relay_key()
+        assert distributor.get_relay_key() is relay_key
+        assert os.path.exists(relay_key.private_key)
+
+        # The relay key is deleted when closed
+        distributor.close()
+        assert not os.path.exists(relay_key.key_dir)
+        with pytest.raises(RuntimeError):
+            distributor.get_relay_key()
+
+    def test_tree_distribution(self):
+        fan_out = 2
+        num_workers = 30
+        distributor = FileMountsDistributor(fan_out=fan_out)
+        acquisitions = queue.Queue()
+        syncing = {}
+        max_syncing = {}
+        lock = threading.Lock()
+        done = {}
+
+        def update(node_id):
+            source_id, _ = distributor.acquire_source()
+            with lock:
+                syncing[source_id] = syncing.get(source_id, 0) + 1
+                max_syncing[source_id] = max(
+                    max_syncing.get(source_id, 0), syncing[source_id])
+            done[node_id] = threading.Event()
+            acquisitions.put(node_id)
+            done[node_id].wait()
+            with lock:
+                syncing[source_id] -= 1
+            distributor.release_source(source_id)
+            distributor.add_source(node_id, MockCommandExecutor(node_id))
+
+        threads = {}
+        for i in range(num_workers):
+            node_id = "worker-{}".format(i)
+            threads[node_id] = threading.Thread(target=update, args=(node_id,))
+            threads[node_id].start()
+
+        # Each round syncs to fan_out nodes from each of the head and the
+        # nodes synced in the previous rounds
+        synced = 0
+        rounds = 0
+        while synced < num_workers:
+            expected = min(num_workers - synced, (synced + 1) * fan_out)
+            in_round = [acquisitions.get(timeout=5) for _ in range(expected)]
+            rounds += 1
+            for node_id in in_round:
+                done[node_id].set()
+                threads[node_id].join(timeout=5)
+            synced += expected
+
+        assert acquisitions.empty()
+        assert rounds == 4
+        assert max(max_syncing.values()) == fan_out
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(pytest.main(["-v", __file__]))
@@ -0,0 +1,190 @@
+import sys
+
+import pytest
+
+from cloudtik.core._private.log_codec import decode_log_message, \
+    encode_log_message, LOG_COMPRESSION_ZLIB, LOG_COMPRESSION_LZ4
+from cloudtik.core._private.service import cloudtik_log_monitor
+from cloudtik.core._private.service.cloudtik_log_monitor import LogMonitor
+from cloudtik.core._private.service.log_dir_watcher import LogDirWatcher
+
+
+class MockRedisClient:
+    def __init__(self):
+        self.messages = []
+
+    def publish(self, channel, message):
+        self.messages.append(decode_log_message(message))
+
+
+@pytest.fixture
+def log_monitor(tmp_path, monkeypatch):
+    monkeypatch.setattr(cloudtik_log_monitor.services,
+                        "get_node_ip_address", lambda: "10.0.0.1")
+    monkeypatch.setattr(cloudtik_log_monitor.services,
+                        "create_redis_client",
+                        lambda *args, **kwargs: MockRedisClient())
+    monitor = LogMonitor(str(tmp_path), "127.0.0.1:6379")
+    yield monitor
+    if monitor.watcher is not None:
+        monitor.watcher.close()
+
+
+def _write(path, data):
+    with open(path, "ab") as f:
+        f.write(data)
+
+
+def _check(monitor):
+    monitor.update_log_filenames()
+    monitor.open_closed_files()
+    monitor.check_log_files_and_publish_updates()
+
+
+class TestLogMonitor:
+    def test_batched_publish(self, tmp_path, log_monitor, monkeypatch):
+        monkeypatch.setattr(
+            cloudtik_log_monitor, "LOG_MONITOR_BATCH_INTERVAL_S", 0)
+        monkeypatch.setattr(
+            cloudtik_log_monitor, "LOG_MONITOR_READ_CHUNK_BYTES", 16)
+        # Polling the files
+        log_monitor.watcher = None
+        _write(tmp_path / "worker-a-01-1.out", b"line 1\nline 2\nline")
+        _write(tmp_path / "worker-b-02-2.err", b"error 1\n")
+
+        _check(log_monitor)
+        messages = log_monitor.redis_client.messages
+        # The lines of both the files are published in one message
+        assert len(messages) == 1
+        assert sorted(
+            (record["job"], record["lines"]) for record in messages[0]) == [
+            ("01", ["line 1", "line 2"]), ("02", ["error 1"])]
+
+        # The incomplete line is published when completed
+        _write(tmp_path / "worker-a-01-1.out", b" 3\n")
+        _check(log_monitor)
+        _check(log_monitor)
+        assert messages[1] == [{
+            "ip": "10.0.0.1", "pid": 1, "job": "01", "is_err": False,
+            "lines": ["line 3"], "actor_name": None, "task_name": None}]
+        assert len(messages) == 2
+
+    def test_rate_limit(self, tmp_path, log_monitor, monkeypatch):
+        monkeypatch.setattr(
+            cloudtik_log_monitor, "LOG_MONITOR_BATCH_INTERVAL_S", 0)
+        monkeypatch.setattr(
+            cloudtik_log_monitor, "LOG_MONITOR_DROPPED_SUMMARY_INTERVAL_S", 0)
+        monkeypatch.setattr(
+            cloudtik_log_monitor, "LOG_MONITOR_COMPRESSION",
+            LOG_COMPRESSION_ZLIB)
+        monkeypatch.setattr(
+            cloudtik_log_monitor, "LOG_MONITOR_COMPRESSION_MIN_BYTES", 0)
+        log_monitor.watcher = None
+        log_monitor.rate_limiter = cloudtik_log_monitor.TokenBucket(0.001, 19)
+        _write(tmp_path / "worker-a-01-1.out", b"0123456789\n" * 3)
+        _write(tmp_path / "worker-b-02-2.out", b"0123456789\n")
+
+        log_monitor.update_log_filenames()
+        for file_info in log_monitor.closed_file_infos:
+            file_info.rate_limiter = cloudtik_log_monitor.TokenBucket(
+                0.001, 15)
+        log_monitor.open_closed_files()
+        log_monitor.check_log_files_and_publish_updates()
+        messages = log_monitor.redis_client.messages
+        assert len(messages) == 1
+        records = {record["pid"]: record for record in messages[0]}
+        # The lines over the rate of the file are dropped
+        assert records[1]["lines"] == ["0123456789"]
+        assert records[2]["lines"] == ["0123456789"]
+        assert records["cloudtik_log_monitor"]["dropped_lines"] == {
+            "worker-a-01-1.out": 2}
+
+        # The files are not read until the rate of the node allows
+        _write(tmp_path / "worker-b-02-2.out", b"0123456789\n")
+        log_monitor.check_log_files_and_publish_updates()
+        assert len(messages) == 1
+        log_monitor.rate_limiter.tokens = 19
+        for file_info in log_monitor.open_file_infos:
+            file_info.rate_limiter.tokens = 15
+        log_monitor.check_log_files_and_publish_updates()
+        assert messages[1] == [{
+            "ip": "10.0.0.1", "pid": 2, "job": "02", "is_err": False,
+            "lines": ["0123456789"], "actor_name": None, "task_name": None}]
+
+    @pytest.mark.skipif(not sys.platform.startswith("linux"),
+                        reason="Inotify is only available on Linux.")
+    def test_watch(self, tmp_path, log_monitor):
+        assert log_monitor.watcher is not None
+        log_monitor.update_log_filenames()
+        _write(tmp_path / "worker-a-01-1.out", b"line 1\n")
+        _write(tmp_path / "cloudtik_log_monitor.log", b"not tracked\n")
+
+        log_monitor.wait_for_updates()
+        assert log_monitor.updated_filenames == {
+            f"{tmp_path}/worker-a-01-1.out"}
+        log_monitor.open_closed_files()
+        log_monitor.check_log_files_and_publish_updates()
+        assert not log_monitor.updated_filenames
+
+        _write(tmp_path / "worker-a-01-1.out", b"line 2\n")
+        modified, files_changed, overflowed = log_monitor.watcher.wait(1)
+        assert modified == {"worker-a-01-1.out"}
+        assert not files_changed and not overflowed
+
+    @pytest.mark.skipif(not sys.platform.startswith("linux"),
+                        reason="Inotify is only available on Linux.")
+    def test_watch_dead_worker_file(self, tmp_path, log_monitor, monkeypatch):
+        monkeypatch.setattr(
+            cloudtik_log_monitor, "LOG_MONITOR_BATCH_INTERVAL_S", 0)
+        monkeypatch.setattr(
+            cloudtik_log_monitor, "LOG_MONITOR_RESCAN_INTERVAL_S", 0.5)
+        waits = []
+        wait = log_monitor.watcher.wait
+
+        def recorded_wait(timeout):
+            waits.append(timeout)
+            return wait(timeout)
+
+        monkeypatch.setattr(log_monitor.watcher, "wait", recorded_wait)
+        (tmp_path / "old").mkdir()
+        filename = f"{tmp_path}/worker-a-01-999999999.out"
+        _write(filename, b"line 1\n")
+        log_monitor.update_log_filenames()
+        log_monitor.open_closed_files()
+        log_monitor.check_log_files_and_publish_updates()
+        _write(filename, b"line 2\n")
+        log_monitor.updated_filenames.add(filename)
+
+        # The file of the dead worker is moved and no longer tracked
+        log_monitor.close_all_files()
+        assert (tmp_path / "old" / "worker-a-01-999999999.out").exists()
+        assert filename not in log_monitor.log_filenames
+        assert not log_monitor.updated_filenames
+
+        # Wait for the changes instead of spinning on the moved file
+        log_monitor.updated_filenames.add(filename)
+        log_monitor.wait_for_updates()
+        assert waits == [0.5]
+        assert not log_monitor.updated_filenames
+
+
+@pytest.mark.parametrize(
+    "compression", [LOG_COMPRESSION_ZLIB, LOG_COMPRESSION_LZ4])
+def test_log_codec(compression):
+    records = [{"ip": "10.0.0.1", "lines": ["line {}".format(i)
+                                            for i in range(100)]}]
+    message = encode_log_message(records, compression)
+    assert isinstance(message, bytes)
+    assert decode_log_message(message) == records
+    # Not compressed
+    message = encode_log_message(records, compression, 1024 * 1024)
+    assert decode_log_message(message.encode("utf-8")) == records
+    assert decode_log_message('{"ip": "10.0.0.1"}') == [{"ip": "10.0.0.1"}]
+
+
+def test_watcher_not_supported(tmp_path):
+    assert LogDirWatcher.create(str(tmp_path / "not_exist")) is None
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main(["-v", __file__]))
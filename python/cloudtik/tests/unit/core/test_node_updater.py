@@ -0,0 +1,182 @@
+import json
+import os
+import shlex
+import threading
+
+import pytest
+
+from cloudtik.core._private.call_context import CallContext
+from cloudtik.core._private.node import node_updater
+from cloudtik.core._private.node.node_updater import NodeUpdater, \
+    FILE_MOUNTS_SYNC_STATE_FILE
+
+
+class MockCommandExecutor:
+    """Keep the state file of the synced file mounts in memory."""
+
+    def __init__(self):
+        self.commands = []
+        self.state = None
+        self.closed = False
+
+    def run(self, cmd, with_output=False, run_env="auto", **kwargs):
+        self.commands.append(cmd)
+        if "printf" in cmd and FILE_MOUNTS_SYNC_STATE_FILE in cmd:
+            args = shlex.split(cmd.split("&&")[1])
+            self.state = args[args.index("%s") + 1]
+        if with_output:
+            if "cat " + FILE_MOUNTS_SYNC_STATE_FILE in cmd:
+                return (self.state or "").encode("utf-8")
+            return b""
+
+    def close(self):
+        self.closed = True
+
+
+class MockProvider:
+    def __init__(self, cmd_executor):
+        self.cmd_executor = cmd_executor
+
+    def get_command_executor(self, *args, **kwargs):
+        return self.cmd_executor
+
+
+class MockSync:
+    """Record the syncs and wait for the parallel syncs with a barrier."""
+
+    def __init__(self, parallel=1):
+        self.synced = []
+        self.lock = threading.Lock()
+        self.barrier = threading.Barrier(parallel, timeout=5)
+
+    def __call__(self, source, target, docker_mount_if_possible=False):
+        self.barrier.wait()
+        with self.lock:
+            self.synced.append((source, target))
+
+
+@pytest.fixture
+def local_files(tmp_path):
+    for name in ["dir-1", "dir-2"]:
+        os.makedirs(tmp_path / name)
+        (tmp_path / name / "file").write_text(name)
+    (tmp_path / "file").write_text("file")
+    return tmp_path
+
+
+def _create_updater(cmd_executor, file_mounts, cluster_synced_files=None):
+    return NodeUpdater(
+        config={}, call_context=CallContext(), node_id="node-1",
+        provider_config={"type": "local"},
+        provider=MockProvider(cmd_executor),
+        auth_config={"ssh_user": "ubuntu"}, cluster_name="test",
+        file_mounts=file_mounts, initialization_commands=[],
+        setup_commands=[], start_commands=[], runtime_hash="",
+        file_mounts_contents_hash="", is_head_node=False,
+        cluster_synced_files=cluster_synced_files)
+
+
+class TestSyncFileMounts:
+    def test_sync(self, local_files):
+        cmd_executor = MockCommandExecutor()
+        file_mounts = {
+            "/root/dir-1": str(local_files / "dir-1"),
+            "/root/dir-2/": str(local_files / "dir-2"),
+            "/root/conf/file": str(local_files / "file")}
+        updater = _create_updater(
+            cmd_executor, file_mounts,
+            cluster_synced_files=[str(local_files / "not-exist")])
+
+        # The file mounts are synced in parallel
+        sync = MockSync(parallel=3)
+        updater.sync_file_mounts(sync)
+        assert sorted(sync.synced) == [
+            (str(local_files / "dir-1") + "/", "/root/dir-1/"),
+            (str(local_files / "dir-2") + "/", "/root/dir-2/"),
+            (str(local_files / "file"), "/root/conf/file")]
+        # The parent directories are created and the hashes are read in
+        # one command
+        assert cmd_executor.commands[0].startswith(
+            "mkdir -p /root/conf /root/dir-1 /root/dir-2 && ")
+        assert sorted(json.loads(cmd_executor.state)) == [
+            "/root/conf/file", "/root/dir-1/", "/root/dir-2/"]
+
+        # The unchanged file mounts are skipped
+        cmd_executor.commands = []
+        sync = MockSync()
+        _create_updater(cmd_executor, file_mounts).sync_file_mounts(sync)
+        assert sync.synced == []
+        # The hashes are not saved again
+        assert len(cmd_executor.commands) == 1
+
+        # Only the changed file mount is synced
+        (local_files / "dir-2" / "file").write_text("changed")
+        old_state = json.loads(cmd_executor.state)
+        sync = MockSync()
+        _create_updater(cmd_executor, file_mounts).sync_file_mounts(sync)
+        assert sync.synced == [
+            (str(local_files / "dir-2") + "/", "/root/dir-2/")]
+        new_state = json.loads(cmd_executor.state)
+        assert new_state["/root/dir-2/"] != old_state["/root/dir-2/"]
+        assert new_state["/root/dir-1/"] == old_state["/root/dir-1/"]
+
+    def test_sync_cluster_synced_files(self, local_files):
+        cmd_executor = MockCommandExecutor()
+        updater = _create_updater(
+            cmd_executor, {}, cluster_synced_files=[
+                str(local_files / "file"), str(local_files / "not-exist")])
+        sync = MockSync()
+        updater.sync_file_mounts(sync)
+        # The missing source of the cluster synced files is skipped
+        assert sync.synced == [
+            (str(local_files / "file"), str(local_files / "file"))]
+        assert list(json.loads(cmd_executor.state)) == [
+            str(local_files / "file")]
+
+    def test_missing_source(self, local_files):
+        updater = _create_updater(
+            MockCommandExecutor(),
+            {"/root/not-exist": str(local_files / "not-exist")})
+        with pytest.raises(AssertionError):
+            updater.sync_file_mounts(MockSync())
+
+    def test_sync_unchanged_disabled(self, local_files, monkeypatch):
+        monkeypatch.setattr(
+            node_updater, "CLOUDTIK_FILE_MOUNTS_SYNC_SKIP_UNCHANGED", False)
+        cmd_executor = MockCommandExecutor()
+        file_mounts = {"/root/dir-1": str(local_files / "dir-1")}
+        for _ in range(2):
+            sync = MockSync()
+            _create_updater(cmd_executor, file_mounts).sync_file_mounts(sync)
+            assert len(sync.synced) == 1
+        assert cmd_executor.commands == ["mkdir -p /root/dir-1"] * 2
+        assert cmd_executor.state is None
+
+    def test_sync_down(self, local_files):
+        cmd_executor = MockCommandExecutor()
+        file_mounts = {"/root/dir-1": str(local_files / "dir-1")}
+        _create_updater(cmd_executor, file_mounts).sync_file_mounts(MockSync())
+        state = cmd_executor.state
+
+        # The file mounts synced down are not skipped by the hashes of the
+        # uploaded contents and the hashes are not saved
+        cmd_executor.commands = []
+        sync = MockSync()
+        _create_updater(cmd_executor, file_mounts).sync_file_mounts(
+            sync, upload=False)
+        assert sync.synced == [
+            (str(local_files / "dir-1") + "/", "/root/dir-1/")]
+        assert cmd_executor.commands == ["mkdir -p /root/dir-1"]
+        assert cmd_executor.state == state
+
+
+def test_close():
+    cmd_executor = MockCommandExecutor()
+    _create_updater(cmd_executor, {}).close()
+    assert cmd_executor.closed
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(pytest.main(["-v", __file__]))
@@ -0,0 +1,134 @@
+import copy
+import random
+
+import pytest
+
+from cloudtik.core._private.cluster.resource_demand_scheduler import get_bin_pack_residual, get_nodes_for, \
+    _utilization_score
+
+NODE_TYPES = {
+    "head.default": {
+        "resources": {"CPU": 4, "memory": 160},
+        "max_workers": 0,
+    },
+    "worker.cpu": {
+        "resources": {"CPU": 8, "memory": 320},
+        "max_workers": 10,
+    },
+    "worker.gpu": {
+        "resources": {"CPU": 16, "GPU": 4, "memory": 640},
+        "max_workers": 4,
+    },
+}
+
+
+def _dict_bin_pack_residual(node_resources, resource_demands, strict_spread=False):
+    """The naive dict based first-fit packing used as the reference."""
+    def fits(node, resources):
+        for k, v in resources.items():
+            if v > node.get(k, 0.0):
+                return False
+        return True
+
+    unfulfilled = []
+    nodes = copy.deepcopy(node_resources)
+    used = []
+    for demand in sorted(
+            resource_demands,
+            key=lambda demand: (len(demand.values()),
+                                sum(demand.values()),
+                                sorted(demand.items())),
+            reverse=True):
+        found = False
+        node = None
+        for i in range(len(nodes)):
+            node = nodes[i]
+            if fits(node, demand):
+                found = True
+                if strict_spread:
+                    used.append(node)
+                    del nodes[i]
+                break
+        if found and node:
+            for k, v in demand.items():
+                node[k] -= v
+        else:
+            unfulfilled.append(demand)
+
+    return unfulfilled, nodes + used
+
+
+def _random_demands(rng, num, fractional):
+    shapes = [{"CPU": 1}, {"CPU": 2}, {"CPU": 1, "memory": 40}, {"GPU": 1, "CPU": 4}, {"memory": 100}]
+    if fractional:
+        shapes += [{"CPU": 0.5}, {"CPU": 0.1}, {"GPU": 0.25}]
+    return [dict(rng.choice(shapes)) for _ in range(num)]
+
+
+def _random_nodes(rng, num):
+    nodes = []
+    for _ in range(num):
+        node = copy.deepcopy(rng.choice(list(NODE_TYPES.values()))["resources"])
+        node["CPU"] = rng.randint(0, node["CPU"])
+        nodes.append(node)
+    return nodes
+
+
+class TestResourceDemandScheduler:
+
+    @pytest.mark.parametrize("fractional", [False, True])
+    @pytest.mark.parametrize("strict_spread", [False, True])
+    @pytest.mark.parametrize("seed", range(5))
+    def test_bin_pack_residual_same_as_dict(self, seed, strict_spread, fractional):
+        rng = random.Random(seed)
+        nodes = _random_nodes(rng, rng.randint(0, 50))
+        demands = _random_demands(rng, rng.randint(0, 200), fractional)
+        nodes_copy = copy.deepcopy(nodes)
+
+        unfulfilled, updated_nodes = get_bin_pack_residual(nodes, demands, strict_spread)
+        expected_unfulfilled, expected_nodes = _dict_bin_pack_residual(nodes, demands, strict_spread)
+        assert unfulfilled == expected_unfulfilled
+        assert updated_nodes == expected_nodes
+        # The input node resources are not modified
+        assert nodes == nodes_copy
+
+    def test_bin_pack_residual_fractional_subtraction(self):
+        demands = [{"CPU": 0.1}] * 12
+        unfulfilled, nodes = get_bin_pack_residual([{"CPU": 1}], demands)
+        expected_unfulfilled, expected_nodes = _dict_bin_pack_residual([{"CPU": 1}], demands)
+        # The residual of the repeated subtractions is not exactly zero
+        assert unfulfilled == expected_unfulfilled == [{"CPU": 0.1}] * 2
+        assert nodes == expected_nodes
+        assert nodes[0]["CPU"] == expected_nodes[0]["CPU"] != 0
+
+    def test_bin_pack_residual_missing_resource(self):
+        unfulfilled, nodes = get_bin_pack_residual(
+            [{"CPU": 4}, {"CPU": 2, "GPU": 1}], [{"GPU": 1}, {"GPU": 1}, {"CPU": 4}])
+        assert unfulfilled == [{"GPU": 1}]
+        assert nodes == [{"CPU": 0}, {"CPU": 2, "GPU": 0}]
+
+    def test_utilization_score(self):
+        assert _utilization_score({"CPU": 4, "GPU": 1}, [{"CPU": 1}]) is None
+        assert _utilization_score({"CPU": 4}, [{"GPU": 1}]) is None
+        score = _utilization_score({"CPU": 4, "memory": 160}, [{"CPU": 2}, {"CPU": 2}, {"CPU": 2}])
+        assert score[0] == 1
+        assert score[1] == 0
+
+    def test_get_nodes_for(self):
+        demands = [{"CPU": 8}] * 5 + [{"GPU": 1}] * 6
+        nodes_to_add, residual = get_nodes_for(
+            NODE_TYPES, {"head.default": 1}, "head.default", 20, demands)
+        assert residual == []
+        assert nodes_to_add["worker.gpu"] == 2
+        assert nodes_to_add["worker.gpu"] * 16 + nodes_to_add["worker.cpu"] * 8 >= 40
+
+        nodes_to_add, residual = get_nodes_for(
+            NODE_TYPES, {"head.default": 1}, "head.default", 3, [{"CPU": 1}] * 5, strict_spread=True)
+        assert sum(nodes_to_add.values()) == 3
+        assert residual == [{"CPU": 1}] * 2
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(pytest.main(["-v", __file__]))
@@ -5,7 +5,8 @@ import pytest
 
 from cloudtik.core._private.call_context import CallContext
 from cloudtik.core._private.utils import update_nested_dict, process_config_with_privacy, encrypt_config, \
-    decrypt_config, hash_runtime_conf, run_in_parallel_on_nodes, ParallelTaskSkipped
+    decrypt_config, hash_runtime_conf, run_in_parallel_on_nodes, ParallelTaskSkipped, \
+    hash_launch_conf, LaunchHashCache
 
 TARGET_DICT_WITH_MATCHED_LIST = {
     "test_list": [
@@ -252,6 +253,27 @@ class TestUtils:
         assert failures == 1
         assert skipped == 1
 
+    def test_launch_hash_cache(self, tmp_path):
+        key = tmp_path / "key.pem"
+        key.write_text("key-1")
+        config = {
+            "auth": {"ssh_user": "ubuntu", "ssh_private_key": str(key)},
+            "available_node_types": {
+                "worker": {"node_config": {"InstanceType": "m5.large"}}
+            }
+        }
+        launch_hash_cache = LaunchHashCache(config)
+        launch_hash = launch_hash_cache.get("worker")
+        assert launch_hash == hash_launch_conf(
+            {"InstanceType": "m5.large"}, config["auth"])
+        assert launch_hash_cache.get(None) == hash_launch_conf(
+            {}, config["auth"])
+
+        # The key is not read again for the same version of config
+        key.write_text("key-2")
+        assert launch_hash_cache.get("worker") == launch_hash
+        assert LaunchHashCache(config).get("worker") != launch_hash
+
 
 if __name__ == "__main__":
     import sys
@@ -1,9 +1,13 @@
+import threading
+from threading import RLock
 from typing import List
 
 import pytest
 
-from cloudtik.providers._private.gcp.node import GCPCompute
-from cloudtik.providers._private.gcp.node_provider import _retry
+from cloudtik.core._private.tag_coalescer import NodeTagCoalescer
+from cloudtik.providers._private.gcp.node import GCPCompute, GCPNodeType
+from cloudtik.providers._private.gcp.node_provider import _retry, \
+    GCPNodeProvider
 
 _PROJECT_NAME = "project-one"
 _AZ = "us-west1-b"
@@ -106,6 +110,118 @@ def test_convert_resources_to_urls_accelerators(test_case):
                "acceleratorType"] == result_accel
 
 
+class MockRequest:
+    def __init__(self, method, **kwargs):
+        self.method = method
+        self.kwargs = kwargs
+
+
+class MockBatch:
+    def __init__(self, api, callback):
+        self.api = api
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id=None):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.api.batches.append(
+            (self.requests[0][1].method, len(self.requests)))
+        for request_id, request in self.requests:
+            if request.kwargs["instance"] not in self.api.labels:
+                self.callback(request_id, None, RuntimeError("Not found"))
+            else:
+                self.callback(request_id, self.api.respond(request), None)
+
+
+class MockComputeApi:
+    def __init__(self, labels):
+        self.labels = labels
+        self.batches = []
+
+    def instances(self):
+        return self
+
+    def get(self, **kwargs):
+        return MockRequest("get", **kwargs)
+
+    def setLabels(self, **kwargs):
+        return MockRequest("setLabels", **kwargs)
+
+    def new_batch_http_request(self, callback=None):
+        return MockBatch(self, callback)
+
+    def respond(self, request):
+        instance = request.kwargs["instance"]
+        if request.method == "get":
+            return {"name": instance, "labels": self.labels[instance],
+                    "labelFingerprint": "fingerprint-" + instance}
+        assert request.kwargs["body"]["labelFingerprint"] == \
+            "fingerprint-" + instance
+        self.labels[instance] = request.kwargs["body"]["labels"]
+        return {"name": "operation-" + instance}
+
+
+def _create_provider(api):
+    gcp_compute = GCPCompute(api, _PROJECT_NAME, _AZ, "cluster_name")
+    gcp_compute.wait_for_operations = lambda operations: operations
+
+    provider = GCPNodeProvider.__new__(GCPNodeProvider)
+    provider.lock = RLock()
+    provider.cached_nodes = {}
+    provider.resources = {GCPNodeType.COMPUTE: gcp_compute}
+
+    def non_terminated_nodes(tag_filters):
+        raise AssertionError("The nodes should not be listed.")
+
+    provider.non_terminated_nodes = non_terminated_nodes
+    return provider
+
+
+def test_update_node_tags():
+    node_ids = ["node-{}-compute".format(i) for i in range(3)]
+    api = MockComputeApi({node_id: {"kind": "worker"} for node_id in node_ids})
+    provider = _create_provider(api)
+
+    assert provider._update_node_tags(
+        {node_id: {"status": "up-to-date"} for node_id in node_ids[:2]}) == {}
+    # Only the nodes of the batch are got in a batch request
+    assert api.batches == [("get", 2), ("setLabels", 2)]
+    assert api.labels[node_ids[0]] == {"kind": "worker", "status": "up-to-date"}
+    assert api.labels[node_ids[2]] == {"kind": "worker"}
+    assert provider.cached_nodes[node_ids[1]].get_labels() == {
+        "kind": "worker", "status": "up-to-date"}
+
+
+def test_update_node_tags_error():
+    node_ids = ["node-{}-compute".format(i) for i in range(3)]
+    api = MockComputeApi({node_id: {"kind": "worker"}
+                          for node_id in node_ids[:2]})
+    provider = _create_provider(api)
+    provider.tag_coalescer = NodeTagCoalescer(
+        provider._update_node_tags, batch_delay_s=0.1)
+
+    errors = {}
+
+    def set_node_tags(node_id):
+        try:
+            provider.set_node_tags(node_id, {"status": "up-to-date"})
+        except Exception as e:
+            errors[node_id] = e
+
+    threads = [threading.Thread(target=set_node_tags, args=(node_id,))
+               for node_id in node_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert api.batches == [("get", 3), ("setLabels", 2)]
+    # Only the write of the node failed raises the error of the node
+    assert list(errors) == [node_ids[2]]
+    assert api.labels[node_ids[0]] == {"kind": "worker", "status": "up-to-date"}
+
+
 if __name__ == "__main__":
     import sys
 
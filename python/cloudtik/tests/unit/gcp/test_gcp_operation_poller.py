@@ -0,0 +1,117 @@
+import threading
+
+import pytest
+
+from cloudtik.providers._private.gcp.node import GCPCompute
+from cloudtik.providers._private.gcp.operation_poller import OperationPoller
+
+_PROJECT_NAME = "project-one"
+_AZ = "us-west1-b"
+
+
+class MockResource:
+    """Operations are done after a number of polls."""
+
+    def __init__(self, polls_to_done):
+        self.polls_to_done = polls_to_done
+        self.polls = {}
+        self.get_operations_calls = []
+        self.lock = threading.Lock()
+
+    def get_operations(self, operations):
+        with self.lock:
+            self.get_operations_calls.append(
+                [operation["name"] for operation in operations])
+        results = []
+        for operation in operations:
+            name = operation["name"]
+            self.polls[name] = self.polls.get(name, 0) + 1
+            if name.startswith("error"):
+                results.append({"name": name, "error": "failed"})
+            elif self.polls[name] >= self.polls_to_done:
+                results.append({"name": name, "status": "DONE"})
+            else:
+                results.append({"name": name, "status": "RUNNING"})
+        return results
+
+    def is_operation_done(self, result):
+        return result["status"] == "DONE"
+
+
+class MockRequest:
+    def __init__(self, method, **kwargs):
+        self.method = method
+        self.kwargs = kwargs
+
+
+class MockBatch:
+    def __init__(self, api, callback):
+        self.api = api
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id=None):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.api.batches.append(len(self.requests))
+        for request_id, request in self.requests:
+            self.callback(request_id, {
+                "name": "operation-" + request.kwargs["instance"],
+                "status": "RUNNING"}, None)
+
+
+class MockComputeApi:
+    def __init__(self):
+        self.batches = []
+
+    def instances(self):
+        return self
+
+    def delete(self, **kwargs):
+        return MockRequest("delete", **kwargs)
+
+    def new_batch_http_request(self, callback=None):
+        return MockBatch(self, callback)
+
+
+class TestOperationPoller:
+    def test_multiplexed_polls(self):
+        poller = OperationPoller(initial_interval=0.01, max_interval=0.04)
+        resource = MockResource(polls_to_done=3)
+        futures = [poller.submit(resource, {"name": "op-{}".format(i)}, 10)
+                   for i in range(10)]
+        error_future = poller.submit(resource, {"name": "error-op"}, 10)
+
+        for i, future in enumerate(futures):
+            assert future.result(timeout=5) == {
+                "name": "op-{}".format(i), "status": "DONE"}
+        with pytest.raises(Exception, match="failed"):
+            error_future.result(timeout=5)
+
+        # The operations due together are polled together
+        assert len(resource.get_operations_calls) < 11 * 3
+        assert max(len(names) for names in
+                   resource.get_operations_calls) > 1
+        assert all(resource.polls["op-{}".format(i)] == 3 for i in range(10))
+
+    def test_timeout(self):
+        poller = OperationPoller(initial_interval=0.01, max_interval=0.02)
+        resource = MockResource(polls_to_done=1000)
+        result = poller.wait(resource, {"name": "op"}, 0.1)
+        assert result == {"name": "op", "status": "RUNNING"}
+
+    def test_batch_delete(self):
+        api = MockComputeApi()
+        gcp_compute = GCPCompute(api, _PROJECT_NAME, _AZ, "cluster_name")
+        node_ids = ["node-{}".format(i) for i in range(5)]
+        operations = gcp_compute.delete_instances(
+            node_ids, wait_for_operation=False)
+        assert api.batches == [5]
+        assert operations["node-3"]["name"] == "operation-node-3"
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(pytest.main(["-v", __file__]))
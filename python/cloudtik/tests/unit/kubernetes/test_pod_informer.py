@@ -0,0 +1,123 @@
+import queue
+import time
+
+import pytest
+from kubernetes.client import V1ObjectMeta, V1Pod, V1PodList, V1PodStatus, \
+    V1ListMeta
+from kubernetes.client.rest import ApiException
+
+from cloudtik.providers._private._kubernetes import pod_informer
+from cloudtik.providers._private._kubernetes.pod_informer import PodInformer
+
+
+def _pod(name, resource_version, phase="Running", labels=None):
+    return V1Pod(
+        metadata=V1ObjectMeta(
+            name=name, resource_version=str(resource_version),
+            labels=labels or {}),
+        status=V1PodStatus(phase=phase))
+
+
+class MockCoreApi:
+    def __init__(self, pods, resource_version):
+        self.pods = pods
+        self.resource_version = resource_version
+        self.lists = 0
+        self.reads = 0
+
+    def list_namespaced_pod(self, namespace, **kwargs):
+        self.lists += 1
+        return V1PodList(
+            items=list(self.pods),
+            metadata=V1ListMeta(resource_version=str(self.resource_version)))
+
+    def read_namespaced_pod(self, name, namespace):
+        self.reads += 1
+        return _pod(name, self.resource_version)
+
+
+class MockWatch:
+    events = queue.Queue()
+    resource_versions = []
+    request_timeouts = []
+
+    def stream(self, func, *args, **kwargs):
+        MockWatch.resource_versions.append(kwargs["resource_version"])
+        MockWatch.request_timeouts.append(kwargs.get("_request_timeout"))
+        while True:
+            event = MockWatch.events.get()
+            if event is None:
+                return
+            if isinstance(event, Exception):
+                raise event
+            yield event
+
+    def stop(self):
+        MockWatch.events.put(None)
+
+
+class TestPodInformer:
+    def test_watch(self, monkeypatch):
+        api = MockCoreApi([_pod("pod-1", 10), _pod("pod-2", 11)], 12)
+        monkeypatch.setattr(pod_informer, "core_api", lambda: api)
+        monkeypatch.setattr(pod_informer.watch, "Watch", MockWatch)
+        informer = PodInformer("default", "cluster=test")
+        try:
+            assert sorted(pod.metadata.name for pod in informer.list_pods()) == [
+                "pod-1", "pod-2"]
+            for _ in range(10):
+                assert informer.get_pod("pod-1").status.phase == "Running"
+            assert api.lists == 1 and api.reads == 0
+
+            MockWatch.events.put({"type": "MODIFIED", "object": _pod("pod-1", 13, "Failed")})
+            MockWatch.events.put({"type": "DELETED", "object": _pod("pod-2", 14)})
+            # Relist when the resource version is too old
+            api.pods = [_pod("pod-1", 13, "Failed"), _pod("pod-3", 15)]
+            api.resource_version = 16
+            MockWatch.events.put(ApiException(status=410))
+            MockWatch.events.put({"type": "ADDED", "object": _pod("pod-4", 17)})
+            for _ in range(100):
+                if len(MockWatch.resource_versions) == 2 and \
+                        informer.get_pod("pod-4").metadata.resource_version == "17":
+                    break
+                time.sleep(0.01)
+            assert MockWatch.resource_versions == ["12", "16"]
+            # The watch request is timed out at the client side too
+            assert all(timeout > pod_informer.POD_WATCH_TIMEOUT_S
+                       for timeout in MockWatch.request_timeouts)
+            assert api.lists == 2
+            assert sorted(pod.metadata.name for pod in informer.list_pods()) == [
+                "pod-1", "pod-3", "pod-4"]
+            assert informer.get_pod("pod-1").status.phase == "Failed"
+
+            # An older state doesn't overwrite the newer state
+            informer.update_pod(_pod("pod-1", 12, "Running"))
+            assert informer.get_pod("pod-1").status.phase == "Failed"
+        finally:
+            informer.stop()
+
+    def test_mark_deleted(self, monkeypatch):
+        api = MockCoreApi([_pod("pod-1", 10)], 11)
+        monkeypatch.setattr(pod_informer, "core_api", lambda: api)
+        informer = PodInformer("default", "cluster=test")
+        # Not watching
+        informer._synced = True
+        informer._list()
+
+        pod = informer.get_pod("pod-1")
+        informer.mark_deleted("pod-1")
+        assert informer.get_pod("pod-1").metadata.deletion_timestamp is not None
+        # The pod returned before is not changed
+        assert pod.metadata.deletion_timestamp is None
+        informer.mark_deleted("pod-2")
+        assert [pod.metadata.name for pod in informer.list_pods()] == ["pod-1"]
+
+        # Removed when the watch reports the deletion
+        informer._handle_event("DELETED", _pod("pod-1", 12))
+        assert informer.list_pods() == []
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(pytest.main(["-v", __file__]))
@@ -0,0 +1,134 @@
+import threading
+
+import pytest
+import yaml
+
+from cloudtik.core.tags import CLOUDTIK_TAG_CLUSTER_NAME
+from cloudtik.providers._private.local import config, local_node_provider, \
+    node_provider
+from cloudtik.providers._private.local.node_provider import \
+    CloudSimulatorNodeProvider
+from cloudtik.providers.local.service.cloudtik_cloud_simulator import \
+    CloudSimulator
+
+_CLUSTER_NAME = "test"
+
+
+@pytest.fixture
+def simulator(tmp_path, monkeypatch):
+    monkeypatch.setattr(local_node_provider, "get_cloud_simulator_lock_path",
+                        lambda: str(tmp_path / "simulator.lock"))
+    monkeypatch.setattr(local_node_provider, "get_cloud_simulator_state_path",
+                        lambda: str(tmp_path / "simulator.state"))
+    config_file = tmp_path / "simulator.yaml"
+    config_file.write_text(yaml.safe_dump({
+        "nodes": [{"ip": "127.0.0.{}".format(i), "instance_type": "small"}
+                  for i in range(1, 4)],
+        "instance_types": {"small": {"resources": {"CPU": 1}}}}))
+    simulator = CloudSimulator(str(config_file), "127.0.0.1", 0)
+
+    # Count the connections accepted by the server
+    server = simulator._server
+    process_request = server.process_request
+    server.connections = 0
+
+    def counted_process_request(request, client_address):
+        server.connections += 1
+        process_request(request, client_address)
+
+    server.process_request = counted_process_request
+    yield simulator
+    simulator.shutdown()
+
+
+def _get_address(simulator):
+    return "127.0.0.1:{}".format(simulator._server.server_address[1])
+
+
+@pytest.fixture
+def provider(simulator, monkeypatch):
+    provider = CloudSimulatorNodeProvider(
+        {"cloud_simulator_address": _get_address(simulator)}, _CLUSTER_NAME)
+    provider.requests = []
+    get_http_response = config._get_http_response_from_simulator
+
+    def recorded_get_http_response(address, request):
+        provider.requests.append(request["type"])
+        return get_http_response(address, request)
+
+    monkeypatch.setattr(node_provider, "_get_http_response_from_simulator",
+                        recorded_get_http_response)
+    monkeypatch.setattr(config, "_get_http_response_from_simulator",
+                        recorded_get_http_response)
+    return provider
+
+
+def test_batch_request(simulator):
+    address = _get_address(simulator)
+    responses = config._get_batch_response_from_simulator(address, [
+        {"type": "is_running", "args": ("127.0.0.1",)},
+        {"type": "internal_ip", "args": ("127.0.0.2",)},
+        {"type": "node_tags", "args": ("127.0.0.3",)}])
+    assert responses == [False, "127.0.0.2", {}]
+    assert config._get_batch_response_from_simulator(address, []) == []
+
+    # A failed request of the batch fails the batch
+    with pytest.raises(RuntimeError, match="node_tags"):
+        config._get_batch_response_from_simulator(address, [
+            {"type": "is_running", "args": ("127.0.0.1",)},
+            {"type": "node_tags", "args": ("10.0.0.1",)}])
+
+
+def test_thread_local_session(simulator):
+    address = _get_address(simulator)
+    session = config._get_http_session()
+    assert config._get_http_session() is session
+
+    sessions = []
+    thread = threading.Thread(
+        target=lambda: sessions.append(config._get_http_session()))
+    thread.start()
+    thread.join()
+    assert sessions[0] is not session
+
+    # The connection is kept alive for the following requests
+    connections = simulator._server.connections
+    for _ in range(5):
+        config._get_http_response_from_simulator(
+            address, {"type": "is_running", "args": ("127.0.0.1",)})
+    assert simulator._server.connections - connections <= 1
+
+
+def test_node_cache(provider):
+    provider.create_node(
+        {"instance_type": "small"}, {"name": "worker"}, 2)
+    node_ids = provider.non_terminated_nodes({})
+    assert sorted(node_ids) == ["127.0.0.1", "127.0.0.2"]
+    assert provider.requests == ["create_node", "non_terminated_nodes", "batch"]
+
+    # Served from the cache
+    provider.requests = []
+    for node_id in node_ids:
+        assert provider.is_running(node_id)
+        assert not provider.is_terminated(node_id)
+        assert provider.internal_ip(node_id) == node_id
+        assert provider.node_tags(node_id) == {
+            "name": "worker", CLOUDTIK_TAG_CLUSTER_NAME: _CLUSTER_NAME}
+    assert provider.requests == []
+
+    # The terminated node is not served from the cache
+    provider.terminate_node("127.0.0.1")
+    assert not provider.is_running("127.0.0.1")
+    assert provider.requests == ["terminate_node", "is_running"]
+
+    # The ips are not fetched again
+    provider.requests = []
+    provider.non_terminated_nodes({})
+    assert provider.requests == ["non_terminated_nodes", "batch"]
+    assert provider.internal_ip_cache == {"127.0.0.2": "127.0.0.2"}
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(pytest.main(["-v", __file__]))
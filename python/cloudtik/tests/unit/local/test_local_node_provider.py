@@ -0,0 +1,156 @@
+import json
+import os
+
+import pytest
+
+from cloudtik.providers._private.local import local_node_provider
+from cloudtik.providers._private.local.local_node_provider import ClusterState
+
+_PROVIDER_CONFIG = {
+    "nodes": [{"ip": "10.0.0.1"}, {"ip": "10.0.0.2"}]
+}
+
+
+@pytest.fixture
+def state_path(tmp_path):
+    return str(tmp_path / "cluster.state")
+
+
+def _create_cluster_state(tmp_path, state_path):
+    return ClusterState(
+        str(tmp_path / "cluster.lock"), state_path, _PROVIDER_CONFIG)
+
+
+def _read_state(state_path):
+    with open(state_path) as f:
+        return json.load(f)
+
+
+def _running(tags=None):
+    return {"tags": tags or {}, "state": "running"}
+
+
+class TestClusterState:
+    def test_init(self, tmp_path, state_path):
+        state = _create_cluster_state(tmp_path, state_path)
+        expected = {
+            "10.0.0.1": {"tags": {}, "state": "terminated"},
+            "10.0.0.2": {"tags": {}, "state": "terminated"}}
+        assert state.get() == expected
+        assert _read_state(state_path) == expected
+
+    def test_transaction(self, tmp_path, state_path, monkeypatch):
+        state = _create_cluster_state(tmp_path, state_path)
+        saves = []
+        save = state._save
+
+        def counted_save():
+            saves.append(list(state._nodes))
+            save()
+
+        monkeypatch.setattr(state, "_save", counted_save)
+
+        # Saved once at the end of the outermost transaction
+        with state.transaction():
+            state.put("10.0.0.1", _running())
+            state.put("10.0.0.2", _running())
+            assert _read_state(state_path)["10.0.0.1"]["state"] == "terminated"
+        assert len(saves) == 1
+        assert _read_state(state_path)["10.0.0.1"]["state"] == "running"
+
+        # Not saved when failed and the state is reloaded
+        with pytest.raises(RuntimeError):
+            with state.transaction():
+                state.put("10.0.0.1", _running({"name": "failed"}))
+                raise RuntimeError("Failed")
+        assert len(saves) == 1
+        assert state.get_node("10.0.0.1") == _running()
+
+        # A failed inner transaction discards the outer transaction
+        with state.transaction():
+            state.put("10.0.0.2", _running({"name": "outer"}))
+            try:
+                with state.transaction():
+                    raise RuntimeError("Failed")
+            except RuntimeError:
+                pass
+        assert len(saves) == 1
+        assert state.get_node("10.0.0.2") == _running()
+
+    def test_load_if_changed(self, tmp_path, state_path, monkeypatch):
+        state = _create_cluster_state(tmp_path, state_path)
+        other = _create_cluster_state(tmp_path, state_path)
+        # Reload the state saved by the other
+        state.get()
+        loads = []
+        load = json.load
+
+        def counted_load(f):
+            loads.append(f.name)
+            return load(f)
+
+        monkeypatch.setattr(local_node_provider.json, "load", counted_load)
+
+        # Not reloaded when the state file is not changed
+        for _ in range(3):
+            state.get()
+        assert loads == []
+
+        # Reloaded when the state file is changed by others
+        other.put("10.0.0.1", _running())
+        assert state.get_node("10.0.0.1") == _running()
+        assert loads == [state_path]
+        state.get()
+        assert len(loads) == 1
+
+        # Not reloaded after its own save
+        state.put("10.0.0.2", _running())
+        state.get()
+        assert len(loads) == 1
+
+        # A change of the same size and mtime replaced by a new file is
+        # detected by the inode
+        stat = os.stat(state_path)
+        with open(state_path) as f:
+            content = f.read().replace("10.0.0.1", "10.0.0.9")
+        os.remove(state_path)
+        with open(state_path, "w") as f:
+            f.write(content)
+        os.utime(state_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert os.stat(state_path).st_size == stat.st_size
+        assert "10.0.0.9" in state.get()
+
+    def test_atomic_save(self, tmp_path, state_path, monkeypatch):
+        state = _create_cluster_state(tmp_path, state_path)
+        replaces = []
+        replace = os.replace
+
+        def checked_replace(src, dst):
+            # The state file is complete until replaced
+            replaces.append((src, dst))
+            assert _read_state(dst)["10.0.0.1"]["state"] == "terminated"
+            assert _read_state(src)["10.0.0.1"]["state"] == "running"
+            replace(src, dst)
+
+        monkeypatch.setattr(local_node_provider.os, "replace", checked_replace)
+        state.put("10.0.0.1", _running())
+        assert replaces == [
+            ("{}.{}.tmp".format(state_path, os.getpid()), state_path)]
+        assert not os.path.exists(replaces[0][0])
+
+        # A failed save doesn't change the state file
+        def failed_replace(src, dst):
+            raise OSError("Failed")
+
+        monkeypatch.setattr(local_node_provider.os, "replace", failed_replace)
+        with pytest.raises(OSError):
+            state.put("10.0.0.2", _running())
+        assert _read_state(state_path)["10.0.0.2"]["state"] == "terminated"
+        assert not os.path.exists(replaces[0][0])
+        assert state.get_node("10.0.0.2")["state"] == "terminated"
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(pytest.main(["-v", __file__]))
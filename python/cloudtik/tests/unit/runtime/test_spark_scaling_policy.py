@@ -0,0 +1,73 @@
+import pytest
+
+from cloudtik.core._private.cluster.resource_demand_scheduler import \
+    get_bin_pack_residual
+from cloudtik.core._private.utils import get_resource_demands_for_cpu
+from cloudtik.runtime.spark.scaling_policy import SparkScalingPolicy
+
+CONFIG = {
+    "head_node_type": "head.default",
+    "available_node_types": {
+        "head.default": {"resources": {"CPU": 4}},
+        "worker.default": {"resources": {"CPU": 4}},
+    },
+    "runtime": {
+        "spark": {
+            "scaling": {
+                "auto_scaling": True,
+                "scaling_mode": "predictive",
+                "scaling_resource": "CPU",
+                "predictive_target_latency": 10,
+                "predictive_cooldown": 30,
+            }
+        }
+    }
+}
+
+
+def _cluster_metrics(allocated, pending, total=16):
+    return {
+        "allocatedVirtualCores": allocated,
+        "pendingVirtualCores": pending,
+        "totalVirtualCores": total,
+        "availableVirtualCores": total - allocated,
+    }
+
+
+def _need_more_cores(policy, state_time, cluster_metrics):
+    policy.last_state_time = state_time
+    return policy._need_more_resources(cluster_metrics)["CPU"]
+
+
+class TestSparkScalingPolicy:
+    def test_predictive_scaling(self):
+        policy = SparkScalingPolicy(CONFIG, "127.0.0.1", 8088)
+        assert _need_more_cores(policy, 100, _cluster_metrics(8, 0)) == 0
+        assert _need_more_cores(policy, 105, _cluster_metrics(10, 0)) == 0
+        # The demand growing about 1 core per second without pending is
+        # predicted to be short of about 10 cores in target latency
+        assert _need_more_cores(policy, 108, _cluster_metrics(16, 0)) == 12
+        # Cooldown after a scaling up
+        assert _need_more_cores(policy, 120, _cluster_metrics(16, 40)) == 0
+        assert _need_more_cores(policy, 140, _cluster_metrics(16, 40)) > 0
+
+    def test_backlog_without_growth(self):
+        policy = SparkScalingPolicy(CONFIG, "127.0.0.1", 8088)
+        assert _need_more_cores(policy, 100, _cluster_metrics(16, 100)) == 40
+
+    def test_free_capacity(self):
+        policy = SparkScalingPolicy(CONFIG, "127.0.0.1", 8088)
+        # 8 cores are free and the pending containers are short of 12 cores
+        cores = _need_more_cores(policy, 100, _cluster_metrics(8, 20))
+        assert cores == 20
+        # The scheduler packs the demands into the free cores first and adds
+        # the nodes for the shortage
+        unfulfilled, _ = get_bin_pack_residual(
+            [{"CPU": 8}], get_resource_demands_for_cpu(cores, CONFIG))
+        assert sum(demand["CPU"] for demand in unfulfilled) == 12
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(pytest.main(["-v", __file__]))
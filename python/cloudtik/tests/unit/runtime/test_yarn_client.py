@@ -0,0 +1,111 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cloudtik.runtime.common import yarn_client
+from cloudtik.runtime.common.yarn_client import YarnRestClient, YarnNodeTracker
+
+
+def _node(host_name, state="RUNNING", health_update=1, used_cores=0):
+    return {
+        "nodeHostName": host_name,
+        "state": state,
+        "lastHealthUpdate": health_update,
+        "numContainers": used_cores,
+        "usedMemoryMB": 0,
+        "availMemoryMB": 8192,
+        "usedVirtualCores": used_cores,
+        "availableVirtualCores": 8 - used_cores,
+    }
+
+
+def _nodes_response(*nodes):
+    return {"nodes": {"node": list(nodes)}}
+
+
+class TestYarnNodeTracker:
+    def test_changed_nodes(self, monkeypatch):
+        resolved = []
+
+        def address_to_ip(address):
+            resolved.append(address)
+            return "10.0.0.{}".format(address[-1])
+
+        monkeypatch.setattr(yarn_client, "_address_to_ip", address_to_ip)
+        tracker = YarnNodeTracker(refresh_interval_s=10)
+        states, lost = tracker.update(
+            _nodes_response(_node("host-1"), _node("host-2")), 100)
+        assert sorted(states) == ["node-10.0.0.1", "node-10.0.0.2"]
+        assert lost == {}
+
+        # Unchanged nodes are not reported again until refreshed
+        states, lost = tracker.update(
+            _nodes_response(_node("host-1"), _node("host-2")), 105)
+        assert states == {}
+        states, lost = tracker.update(
+            _nodes_response(_node("host-1", used_cores=2),
+                            _node("host-2", health_update=2)), 106)
+        assert sorted(states) == ["node-10.0.0.1", "node-10.0.0.2"]
+        assert states["node-10.0.0.1"]["available_resources"]["CPU"] == 6
+        states, lost = tracker.update(
+            _nodes_response(_node("host-1", used_cores=2),
+                            _node("host-2", health_update=2)), 116)
+        assert len(states) == 2
+
+        # A lost node is reported once
+        lost_nodes = []
+        for _ in range(2):
+            states, lost = tracker.update(
+                _nodes_response(_node("host-1", used_cores=2),
+                                _node("host-2", state="LOST")), 117)
+            assert states == {}
+            lost_nodes.append(lost)
+        assert lost_nodes == [{"node-10.0.0.2": "10.0.0.2"}, {}]
+        assert resolved == ["host-1", "host-2"]
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests = 0
+
+    def do_GET(self):
+        _MetricsHandler.requests += 1
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = json.dumps({"clusterMetrics": {"appsPending": 1}}).encode()
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestYarnRestClient:
+    def test_conditional_get(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _MetricsHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            client = YarnRestClient("127.0.0.1", server.server_address[1])
+            first = client.get_cluster_metrics()
+            assert first == {"clusterMetrics": {"appsPending": 1}}
+            assert client.get_cluster_metrics() is first
+            assert _MetricsHandler.requests == 2
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(pytest.main(["-v", __file__]))
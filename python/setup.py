@@ -110,6 +110,7 @@ setup_spec.install_requires = [
     "dataclasses; python_version < '3.7'",
     "filelock",
     "jsonschema",
+    "msgpack >= 1.0.0",
     "numpy >= 1.16; python_version < '3.9'",
     "numpy >= 1.19.3; python_version >= '3.9'",
     "prometheus_client >= 0.7.1",